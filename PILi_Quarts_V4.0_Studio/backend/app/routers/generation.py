@@ -10,6 +10,12 @@ from pathlib import Path
 
 from app.core.config import get_generated_directory
 from app.services.excel_generator import excel_generator
+from modules.rendering import (
+    Priority,
+    RenderQueueFull,
+    RenderTimeout,
+    get_render_executor,
+)
 
 # IMPORT LEGACY GENERATORS (THE "GOLDEN" MODELS)
 from app.services.generators.cotizacion_simple_generator import generar_cotizacion_simple
@@ -40,6 +46,35 @@ class DocumentRequest(BaseModel):
     doc_type: Optional[str] = None
     personalizacion: Optional[Dict[str, Any]] = {}
 
+async def _dispatch(fn, *args):
+    """Run a rendering job in the worker pool, mapping pool errors to HTTP"""
+    try:
+        return await get_render_executor().run(fn, *args, priority=Priority.INTERACTIVE)
+    except RenderQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Document renderer is busy, try again shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except RenderTimeout:
+        raise HTTPException(status_code=504, detail="Document rendering timed out")
+
+# --- Worker-side jobs (top-level + plain data so they pickle to the pool) ---
+
+def _render_excel_file(data: Dict[str, Any], filepath: str) -> str:
+    excel_generator.generar_cotizacion(data, filepath)
+    return filepath
+
+def _render_word_file(request_data: Dict[str, Any], output_path: str) -> str:
+    return _generate_word_internal(DocumentRequest(**request_data), output_path)
+
+def _render_pdf_file(request_data: Dict[str, Any], word_path: str) -> Optional[str]:
+    """Word first (The "Golden Model"), then LibreOffice (The "Golden Engine")"""
+    word_generated_path = _render_word_file(request_data, word_path)
+    if not pdf_generator_v2:
+        return None
+    return str(pdf_generator_v2.convertir_word_a_pdf(Path(word_generated_path)))
+
 @router.post("/excel")
 async def generate_excel(request: DocumentRequest):
     try:
@@ -49,7 +84,7 @@ async def generate_excel(request: DocumentRequest):
         filename = f"{safe_title}_{timestamp}.xlsx"
         filepath = os.path.join(storage_path, filename)
         
-        excel_generator.generar_cotizacion(request.data, filepath)
+        await _dispatch(_render_excel_file, request.data, filepath)
         
         if not os.path.exists(filepath):
              raise HTTPException(status_code=500, detail="Failed to create Excel file")
@@ -59,6 +94,8 @@ async def generate_excel(request: DocumentRequest):
             filename=filename,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Excel generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -106,7 +143,7 @@ async def generate_word(request: DocumentRequest):
         
         logger.info(f"📝 Generating Word (Legacy Method): {filename}")
         
-        final_path = _generate_word_internal(request, filepath)
+        final_path = await _dispatch(_render_word_file, request.model_dump(), filepath)
         
         if not os.path.exists(final_path):
              raise HTTPException(status_code=500, detail="Failed to create Word file")
@@ -116,6 +153,8 @@ async def generate_word(request: DocumentRequest):
             filename=filename,
             media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Word generation error: {e}")
         import traceback
@@ -138,12 +177,11 @@ async def generate_pdf(request: DocumentRequest):
         word_path = str(storage_path / word_filename)
         
         logger.info(f"🚀 Generating Base Word for PDF: {word_filename}")
-        word_generated_path = _generate_word_internal(request, word_path)
+        pdf_generated_path = await _dispatch(_render_pdf_file, request.model_dump(), word_path)
         
         # 2. Convert to PDF using LibreOffice (The "Golden Engine")
-        if pdf_generator_v2:
-            logger.info("🖨️ Converting to PDF via LibreOffice...")
-            pdf_path = pdf_generator_v2.convertir_word_a_pdf(Path(word_generated_path))
+        if pdf_generated_path:
+            pdf_path = Path(pdf_generated_path)
             
             if not pdf_path.exists():
                 raise HTTPException(status_code=500, detail="PDF conversion failed (LibreOffice error)")
@@ -157,6 +195,8 @@ async def generate_pdf(request: DocumentRequest):
             logger.error("❌ PDF Generator V2 (LibreOffice) not available")
             raise HTTPException(status_code=500, detail="PDF Engine Unavailable")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ PDF generation error: {e}")
         import traceback
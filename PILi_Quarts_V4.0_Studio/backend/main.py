@@ -59,6 +59,19 @@ app.mount("/static", StaticFiles(directory=static_path), name="static")
 def read_root():
     return {"status": "online", "message": "PILi Quarts API is running"}
 
+# Document rendering pool (PDF/Word/Excel run in worker processes)
+from modules.rendering import get_render_executor
+from modules.rendering.settings import get_render_settings
+
+@app.on_event("startup")
+async def start_render_pool():
+    if get_render_settings().warm_on_startup:
+        await get_render_executor().start()
+
+@app.on_event("shutdown")
+async def stop_render_pool():
+    await get_render_executor().shutdown()
+
 # Initialize Socket Manager
 import socketio
 from modules.pili.api.router import get_pili_brain
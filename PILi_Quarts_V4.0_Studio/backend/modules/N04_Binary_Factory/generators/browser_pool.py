@@ -0,0 +1,244 @@
+"""
+Pool persistente de navegadores Chromium (Playwright) para el render HTML -> PDF.
+
+Arrancar Chromium cuesta mucho más que imprimir una página, así que el pool
+mantiene N navegadores calientes (cada uno con su contexto y página) en un
+event loop dedicado. Los renders concurrentes toman un slot libre, reutilizan
+la página y la devuelven al pool.
+
+- Tamaño configurable: N04_PDF_POOL_SIZE (default 2)
+- Reciclaje: el contexto/página se recrea cada N04_PDF_PAGE_RECYCLE renders
+- Crash: si el navegador se desconecta o el render falla, el slot se relanza
+  y el documento se reintenta una vez
+- API async (render_pdf) y wrapper sync (render_pdf_sync) para BinaryFactory
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger("N04_BrowserPool")
+
+DEFAULT_POOL_SIZE = int(os.getenv("N04_PDF_POOL_SIZE", "2"))
+DEFAULT_PAGE_RECYCLE = int(os.getenv("N04_PDF_PAGE_RECYCLE", "50"))
+DEFAULT_RENDER_TIMEOUT = float(os.getenv("N04_PDF_RENDER_TIMEOUT", "60"))
+
+PDF_OPTIONS = {
+    "format": "A4",
+    "margin": {"top": "2cm", "bottom": "2cm", "left": "2cm", "right": "2cm"},
+    "print_background": True,
+}
+
+
+class _BrowserSlot:
+    """Un navegador caliente con su contexto y página reutilizable."""
+
+    def __init__(self, slot_id: int):
+        self.slot_id = slot_id
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.renders = 0
+
+    def is_alive(self) -> bool:
+        return (
+            self.browser is not None
+            and self.browser.is_connected()
+            and self.page is not None
+            and not self.page.is_closed()
+        )
+
+    async def launch(self, playwright):
+        await self.close()
+        self.browser = await playwright.chromium.launch(headless=True)
+        await self.new_page()
+        logger.info(f"🚀 Browser slot {self.slot_id} launched")
+
+    async def new_page(self):
+        if self.context is not None:
+            try:
+                await self.context.close()
+            except Exception:
+                pass
+        self.context = await self.browser.new_context()
+        self.page = await self.context.new_page()
+        self.renders = 0
+
+    async def close(self):
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.renders = 0
+
+
+class BrowserPool:
+    """
+    Pool de navegadores Chromium calientes.
+
+    Todo el trabajo de Playwright ocurre en un único event loop propio
+    (hilo daemon), de modo que el pool puede usarse tanto desde código async
+    (render_pdf) como desde los generadores síncronos (render_pdf_sync).
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        page_recycle: int = DEFAULT_PAGE_RECYCLE,
+        render_timeout: float = DEFAULT_RENDER_TIMEOUT,
+    ):
+        self.size = max(1, size)
+        self.page_recycle = max(1, page_recycle)
+        self.render_timeout = render_timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._playwright_cm = None
+        self._playwright = None
+        self._slots = []
+        self._idle: Optional[asyncio.Queue] = None
+
+        self.stats = {"renders": 0, "relaunches": 0, "failures": 0}
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                ready.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name="N04-BrowserPool", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+            future = asyncio.run_coroutine_threadsafe(self._start(), loop)
+            try:
+                future.result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            self._loop = loop
+            return loop
+
+    async def _start(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright_cm = async_playwright()
+        self._playwright = await self._playwright_cm.start()
+        self._idle = asyncio.Queue()
+        self._slots = [_BrowserSlot(i) for i in range(self.size)]
+        for slot in self._slots:
+            await slot.launch(self._playwright)
+            self._idle.put_nowait(slot)
+        logger.info(f"✅ BrowserPool ready with {self.size} warm browser(s)")
+
+    async def _stop(self):
+        for slot in self._slots:
+            await slot.close()
+        self._slots = []
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = None
+        self._playwright_cm = None
+
+    def shutdown(self):
+        """Cierra todos los navegadores y detiene el loop del pool."""
+        with self._start_lock:
+            loop = self._loop
+            if loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._stop(), loop).result(timeout=30)
+            except Exception as e:
+                logger.warning(f"BrowserPool shutdown incomplete: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+            logger.info("🛑 BrowserPool stopped")
+
+    # ------------------------------------------------------------------
+    # Render
+    # ------------------------------------------------------------------
+
+    async def _render_on_pool(self, html_content: str, output_path: Optional[str]) -> bytes:
+        slot = await self._idle.get()
+        try:
+            for attempt in (1, 2):
+                try:
+                    if not slot.is_alive():
+                        self.stats["relaunches"] += 1
+                        await slot.launch(self._playwright)
+                    elif slot.renders >= self.page_recycle:
+                        await slot.new_page()
+
+                    await slot.page.set_content(html_content, wait_until="load")
+                    pdf_bytes = await slot.page.pdf(path=output_path, **PDF_OPTIONS)
+                    slot.renders += 1
+                    self.stats["renders"] += 1
+                    return pdf_bytes
+                except Exception as e:
+                    if attempt == 2:
+                        self.stats["failures"] += 1
+                        raise
+                    logger.warning(f"⚠️ Browser slot {slot.slot_id} failed ({e}). Relaunching and retrying.")
+                    self.stats["relaunches"] += 1
+                    await slot.launch(self._playwright)
+        finally:
+            self._idle.put_nowait(slot)
+
+    async def render_pdf(self, html_content: str, output_path: Optional[str] = None) -> bytes:
+        """Renderiza HTML a PDF sin bloquear el event loop del llamador."""
+        loop = self._loop
+        if loop is None:
+            # El arranque toma un lock y lanza los navegadores: fuera del loop del llamador
+            loop = await asyncio.to_thread(self._ensure_loop)
+        future = asyncio.run_coroutine_threadsafe(self._render_on_pool(html_content, output_path), loop)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.render_timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def render_pdf_sync(self, html_content: str, output_path: Optional[str] = None) -> bytes:
+        """Versión bloqueante de render_pdf para los generadores síncronos."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._render_on_pool(html_content, output_path), loop)
+        try:
+            return future.result(timeout=self.render_timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Retorna el pool compartido del proceso (se crea en el primer uso)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.shutdown)
+    return _pool
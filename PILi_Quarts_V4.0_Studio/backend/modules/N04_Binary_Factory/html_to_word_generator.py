@@ -34,6 +34,8 @@ from docx import Document
 from htmldocx import HtmlToDocx
 from jinja2 import Template
 
+from .template_cache import template_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -62,25 +64,23 @@ class HTMLToWordGenerator:
 
     def render_html(self, tipo_plantilla: str, datos: Dict[str, Any]) -> str:
         """
-        Renderiza la plantilla HTML con los datos (Jinja2/String Replace).
+        Renderiza la plantilla HTML con los datos.
         Retorna el HTML procesado como string.
+
+        Usa la plantilla precompilada (template_cache): el parseo con
+        BeautifulSoup y la indexación de variables/fila molde se hacen una
+        sola vez por archivo; aquí solo se sustituyen valores.
         """
-        html = self._cargar_plantilla(tipo_plantilla)
-        
-        # Preparar datos completos (Simulando lo que hacen los metodos especificos)
-        # Esto es genérico, pero los generadores específicos tienen lógicas de mapeo.
-        # Mejor estrategia: Usar los metodos especificos pero detenerse antes de convertir?
-        # O centralizar el mapeo de datos aquí?
-        
-        # Por simplicidad y robustez, usaremos _reemplazar_variables directamente.
         # Asumimos que 'datos' ya viene con las claves correctas (pre-mapeado en index.py o caller).
-        return self._reemplazar_variables(html, datos)
-
+        archivo_plantilla = self._ruta_plantilla(tipo_plantilla)
+        try:
+            return template_cache.get(archivo_plantilla).render(datos)
+        except Exception as e:
+            logger.error(f"❌ Error en plantilla precompilada, usando inyección directa: {e}", exc_info=True)
+            return self._reemplazar_variables(self._cargar_plantilla(tipo_plantilla), datos)
 
-    def _cargar_plantilla(self, tipo_plantilla: str) -> str:
-        """
-        Cargar plantilla HTML desde archivo (MODO SENIOR: CLONACIÓN EXACTA)
-        """
+    def _ruta_plantilla(self, tipo_plantilla: str) -> Path:
+        """Resolver y validar la ruta del archivo de plantilla"""
         if tipo_plantilla not in self.plantillas:
             raise ValueError(f"Plantilla no encontrada: {tipo_plantilla}")
 
@@ -89,6 +89,15 @@ class HTMLToWordGenerator:
         if not archivo_plantilla.exists():
             raise FileNotFoundError(f"Archivo de plantilla no existe: {archivo_plantilla}")
 
+        return archivo_plantilla
+
+
+    def _cargar_plantilla(self, tipo_plantilla: str) -> str:
+        """
+        Cargar plantilla HTML desde archivo (MODO SENIOR: CLONACIÓN EXACTA)
+        """
+        archivo_plantilla = self._ruta_plantilla(tipo_plantilla)
+
         with open(archivo_plantilla, 'r', encoding='utf-8') as f:
             contenido = f.read()
 
@@ -227,8 +236,6 @@ class HTMLToWordGenerator:
     ) -> Path:
         """Generar cotización simple"""
         logger.info("🔄 Generando cotización simple (Jinja2)...")
-        
-        html = self._cargar_plantilla("cotizacion_simple")
 
         datos_completos = {
             "NUMERO_COTIZACION": datos.get("numero", "COT-000000"),
@@ -246,7 +253,7 @@ class HTMLToWordGenerator:
             "ITEMS_LIST": datos.get("items", []) # Dynamic Items
         }
 
-        html_procesado = self._reemplazar_variables(html, datos_completos)
+        html_procesado = self.render_html("cotizacion_simple", datos_completos)
 
         if ruta_salida is None:
             ruta_salida = Path("storage/generados") / f"COTIZACION_{datos_completos['NUMERO_COTIZACION']}.docx"
@@ -262,8 +269,6 @@ class HTMLToWordGenerator:
         """Generar cotización compleja (Professional)"""
         logger.info("🔄 Generando cotización compleja (Jinja2)...")
 
-        html = self._cargar_plantilla("cotizacion_compleja")
-
         datos_completos = {
             "NUMERO_COTIZACION": datos.get("numero", "COT-000000-PRO"),
             "CLIENTE_NOMBRE": self._extraer_nombre_cliente(datos.get("cliente")),
@@ -284,7 +289,7 @@ class HTMLToWordGenerator:
             "ITEMS_LIST": datos.get("items", []) # Dynamic Items for Table
         }
 
-        html_procesado = self._reemplazar_variables(html, datos_completos)
+        html_procesado = self.render_html("cotizacion_compleja", datos_completos)
 
         if ruta_salida is None:
             ruta_salida = Path("storage/generados") / f"COTIZACION_COMPLEJA_{datos_completos['NUMERO_COTIZACION']}.docx"
@@ -293,7 +298,6 @@ class HTMLToWordGenerator:
         return self._convertir_html_a_word(html_procesado, ruta_salida)
 
     def generar_proyecto_simple(self, datos: Dict[str, Any], ruta_salida: Optional[Path] = None) -> Path:
-        html = self._cargar_plantilla("proyecto_simple")
         datos_completos = {
             "NOMBRE_PROYECTO": datos.get("nombre", "Proyecto Demo"),
             "CODIGO_PROYECTO": datos.get("codigo", "PROY-000000"),
@@ -307,13 +311,12 @@ class HTMLToWordGenerator:
             "DIAS_INGENIERIA": datos.get("dias_ingenieria", "7"),
             "DIAS_EJECUCION": datos.get("dias_ejecucion", "15")
         }
-        html_procesado = self._reemplazar_variables(html, datos_completos)
+        html_procesado = self.render_html("proyecto_simple", datos_completos)
         if ruta_salida is None: ruta_salida = Path("storage/generados") / f"PROYECTO_{datos_completos['CODIGO_PROYECTO']}.docx"
         ruta_salida.parent.mkdir(parents=True, exist_ok=True)
         return self._convertir_html_a_word(html_procesado, ruta_salida)
 
     def generar_proyecto_complejo(self, datos: Dict[str, Any], ruta_salida: Optional[Path] = None) -> Path:
-        html = self._cargar_plantilla("proyecto_complejo")
         datos_completos = {
             "NOMBRE_PROYECTO": datos.get("nombre", "Proyecto PMI Demo"),
             "CODIGO_PROYECTO": datos.get("codigo", "PROY-000000-PMI"),
@@ -332,13 +335,12 @@ class HTMLToWordGenerator:
             "DIAS_INGENIERIA": datos.get("dias_ingenieria", "12"),
             "DIAS_EJECUCION": datos.get("dias_ejecucion", "25")
         }
-        html_procesado = self._reemplazar_variables(html, datos_completos)
+        html_procesado = self.render_html("proyecto_complejo", datos_completos)
         if ruta_salida is None: ruta_salida = Path("storage/generados") / f"PROJECT_CHARTER_{datos_completos['CODIGO_PROYECTO']}.docx"
         ruta_salida.parent.mkdir(parents=True, exist_ok=True)
         return self._convertir_html_a_word(html_procesado, ruta_salida)
 
     def generar_informe_tecnico(self, datos: Dict[str, Any], ruta_salida: Optional[Path] = None) -> Path:
-        html = self._cargar_plantilla("informe_tecnico")
         datos_completos = {
             "TITULO_INFORME": datos.get("titulo", "Informe Técnico Demo"),
             "CODIGO_INFORME": datos.get("codigo", "INF-000000"),
@@ -348,13 +350,12 @@ class HTMLToWordGenerator:
             "SERVICIO_NOMBRE": datos.get("servicio_nombre", "Servicio Técnico"),
             "NORMATIVA_APLICABLE": datos.get("normativa", "CNE Suministro 2011")
         }
-        html_procesado = self._reemplazar_variables(html, datos_completos)
+        html_procesado = self.render_html("informe_tecnico", datos_completos)
         if ruta_salida is None: ruta_salida = Path("storage/generados") / f"INFORME_TECNICO_{datos_completos['CODIGO_INFORME']}.docx"
         ruta_salida.parent.mkdir(parents=True, exist_ok=True)
         return self._convertir_html_a_word(html_procesado, ruta_salida)
 
     def generar_informe_ejecutivo(self, datos: Dict[str, Any], ruta_salida: Optional[Path] = None) -> Path:
-        html = self._cargar_plantilla("informe_ejecutivo")
         datos_completos = {
             "TITULO_PROYECTO": datos.get("titulo", "Proyecto Ejecutivo Demo"),
             "CODIGO_INFORME": datos.get("codigo", "INF-000000-EXE"),
@@ -373,7 +374,7 @@ class HTMLToWordGenerator:
             "INVERSION_MANO_OBRA": f"{datos.get('presupuesto', 50000) * 0.2:,.2f}",
             "CAPITAL_TRABAJO": f"{datos.get('presupuesto', 50000) * 0.1:,.2f}"
         }
-        html_procesado = self._reemplazar_variables(html, datos_completos)
+        html_procesado = self.render_html("informe_ejecutivo", datos_completos)
         if ruta_salida is None: ruta_salida = Path("storage/generados") / f"INFORME_EJECUTIVO_{datos_completos['CODIGO_INFORME']}.docx"
         ruta_salida.parent.mkdir(parents=True, exist_ok=True)
         return self._convertir_html_a_word(html_procesado, ruta_salida)
@@ -0,0 +1,225 @@
+"""
+TEMPLATE CACHE - Plantillas HTML precompiladas para HTMLToWordGenerator
+=======================================================================
+
+Cada PLANTILLA_HTML_*.html se parsea con BeautifulSoup UNA sola vez y se
+convierte en una lista de segmentos: HTML literal ya serializado + huecos
+para las variables {{VARIABLE}} y para las filas de la tabla de items
+(fila "molde" pre-indexada). Renderizar es entonces solo concatenar
+strings, sin volver a leer disco ni recorrer el DOM.
+
+La caché se invalida por mtime del archivo, así que editar una plantilla
+en caliente sigue funcionando.
+"""
+
+import copy
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marcadores internos (Unicode de uso privado: nunca aparecen en plantillas
+# y el formatter de BeautifulSoup no los escapa)
+_SENTINEL = "\ue000"
+_SENTINEL_RE = re.compile(_SENTINEL + r"(P\d+|C\d|ITEMS_START|ITEMS_END)" + _SENTINEL)
+
+# Misma detección que _reemplazar_variables
+_PLACEHOLDER_NODE_RE = re.compile(r'\{\{.*?\}\}')
+_PLACEHOLDER_RE = re.compile(r'\{\{(.*?)\}\}')
+_CLEANUP_KEY_RE = re.compile(r'[A-Z_0-9]+')
+
+_RAW_TEXT_PARENTS = ("script", "style")
+
+
+def _escape(texto: str) -> str:
+    """Escapado equivalente al formatter 'minimal' de BeautifulSoup."""
+    return texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class _TextSlot:
+    """Nodo de texto de la plantilla que contiene variables {{...}}."""
+
+    __slots__ = ("texto", "escapar")
+
+    def __init__(self, texto: str, escapar: bool):
+        self.texto = texto
+        self.escapar = escapar
+
+    def render(self, valores: Dict[str, str]) -> str:
+        def _sustituir(match):
+            clave = match.group(1)
+            if clave in valores:
+                return valores[clave]
+            # Limpieza: variables no provistas se eliminan
+            if _CLEANUP_KEY_RE.fullmatch(clave):
+                return ""
+            return match.group(0)
+
+        texto = _PLACEHOLDER_RE.sub(_sustituir, self.texto)
+        return _escape(texto) if self.escapar else texto
+
+
+class CompiledTemplate:
+    """
+    Plantilla HTML pre-parseada.
+
+    segmentos: lista de str (HTML literal) o tuplas ("P", slot) / ("ITEMS_START"|"ITEMS_END", None)
+    molde: segmentos de la fila molde de items, con huecos ("C", indice_celda)
+           para las 6 columnas estándar (None si no hay tabla de items)
+    """
+
+    def __init__(self, html: str):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        slots: List[_TextSlot] = []
+
+        def _marcar_variables(raiz):
+            for element in raiz.find_all(string=_PLACEHOLDER_NODE_RE):
+                escapar = element.parent is None or element.parent.name not in _RAW_TEXT_PARENTS
+                slots.append(_TextSlot(str(element), escapar))
+                element.replace_with(f"{_SENTINEL}P{len(slots) - 1}{_SENTINEL}")
+
+        # 1. Localizar tabla de items y fila molde (antes de marcar variables,
+        #    igual que el flujo original detecta sobre el texto de la tabla)
+        self.tiene_tabla_items = False
+        self.celdas_molde = 0
+        molde_segmentos = None
+
+        for tabla in soup.find_all('table'):
+            headers_text = _PLACEHOLDER_RE.sub("", tabla.get_text()).upper()
+            if "DESCRIPCIÓN" in headers_text and "TOTAL" in headers_text:
+                tbody = tabla.find('tbody')
+                filas = tbody.find_all('tr') if tbody else []
+                if filas:
+                    molde = copy.copy(filas[0])
+                    celdas = molde.find_all('td')
+                    self.celdas_molde = len(celdas)
+                    if len(celdas) >= 6:
+                        for i in range(6):
+                            celdas[i].string = f"{_SENTINEL}C{i}{_SENTINEL}"
+                    _marcar_variables(molde)
+                    molde_segmentos = self._segmentar(str(molde), slots)
+
+                    tbody.insert(0, f"{_SENTINEL}ITEMS_START{_SENTINEL}")
+                    tbody.append(f"{_SENTINEL}ITEMS_END{_SENTINEL}")
+                    self.tiene_tabla_items = True
+                break
+
+        # 2. Marcar variables en el resto del documento
+        _marcar_variables(soup)
+
+        self.slots = slots
+        self.molde = molde_segmentos
+        self.segmentos = self._segmentar(str(soup), slots)
+
+    @staticmethod
+    def _segmentar(html: str, slots: List[_TextSlot]) -> list:
+        segmentos = []
+        pos = 0
+        for match in _SENTINEL_RE.finditer(html):
+            if match.start() > pos:
+                segmentos.append(html[pos:match.start()])
+            marca = match.group(1)
+            if marca.startswith("P"):
+                segmentos.append(("P", slots[int(marca[1:])]))
+            elif marca.startswith("C"):
+                segmentos.append(("C", int(marca[1:])))
+            else:
+                segmentos.append((marca, None))
+            pos = match.end()
+        if pos < len(html):
+            segmentos.append(html[pos:])
+        return segmentos
+
+    @staticmethod
+    def _celdas_item(i: int, item: Dict[str, Any]) -> List[str]:
+        cantidad = item.get('cantidad', 0)
+        precio = item.get('precio_unitario', 0)
+        return [
+            str(i).zfill(2),
+            str(item.get('descripcion', '')),
+            f"{cantidad:.2f}",
+            str(item.get('unidad', 'und')),
+            f"$ {precio:,.2f}",
+            f"$ {cantidad * precio:,.2f}",
+        ]
+
+    def _render_segmentos(self, segmentos: list, valores: Dict[str, str], celdas=None) -> List[str]:
+        partes = []
+        for seg in segmentos:
+            if isinstance(seg, str):
+                partes.append(seg)
+            elif seg[0] == "P":
+                partes.append(seg[1].render(valores))
+            elif seg[0] == "C":
+                partes.append(_escape(celdas[seg[1]]) if celdas else "")
+        return partes
+
+    def render(self, datos: Dict[str, Any]) -> str:
+        valores = {
+            k: str(v) for k, v in datos.items()
+            if isinstance(v, (str, int, float)) and k != "items"
+        }
+        items = datos.get("items") or []
+
+        partes: List[str] = []
+        dentro_items = False
+        for seg in self.segmentos:
+            if isinstance(seg, tuple) and seg[0] == "ITEMS_START":
+                if items:
+                    for i, item in enumerate(items, 1):
+                        celdas = self._celdas_item(i, item) if self.celdas_molde >= 6 else None
+                        partes.extend(self._render_segmentos(self.molde, valores, celdas))
+                    dentro_items = True
+                continue
+            if isinstance(seg, tuple) and seg[0] == "ITEMS_END":
+                dentro_items = False
+                continue
+            if dentro_items:
+                # Filas dummy del HTML original: se descartan cuando hay items reales
+                continue
+            partes.extend(self._render_segmentos([seg], valores))
+
+        if items and self.tiene_tabla_items:
+            logger.info(f"✅ Tabla inyectada con {len(items)} items reales (plantilla precompilada).")
+        return "".join(partes)
+
+
+class TemplateCache:
+    """Caché thread-safe de CompiledTemplate invalidada por mtime."""
+
+    def __init__(self):
+        self._cache: Dict[Path, Tuple[int, CompiledTemplate]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ruta: Path) -> CompiledTemplate:
+        mtime = ruta.stat().st_mtime_ns
+        entrada = self._cache.get(ruta)
+        if entrada and entrada[0] == mtime:
+            self.hits += 1
+            return entrada[1]
+
+        with self._lock:
+            entrada = self._cache.get(ruta)
+            if entrada and entrada[0] == mtime:
+                self.hits += 1
+                return entrada[1]
+            with open(ruta, 'r', encoding='utf-8') as f:
+                compilada = CompiledTemplate(f.read())
+            self._cache[ruta] = (mtime, compilada)
+            self.misses += 1
+            logger.info(f"🧩 Plantilla compilada y cacheada: {ruta.name}")
+            return compilada
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+template_cache = TemplateCache()
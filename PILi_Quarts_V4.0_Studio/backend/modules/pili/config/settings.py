@@ -42,9 +42,13 @@ class PILISettings(BaseSettings):
     redis_url: Optional[str] = None
     cache_ttl_seconds: int = 3600  # 1 hour
     
-    # Rate Limiting
+    # Rate Limiting (GCRA, see core/rate_limiter.py)
     rate_limit_requests: int = 60  # requests per minute
     rate_limit_window: int = 60  # seconds
+    # memory:// (per process), sqlite:///path.db (per host), redis://... (cluster)
+    rate_limit_backend: str = "memory://"
+    rate_limit_user_requests: Optional[int] = None  # per-user quota in the same window
+    rate_limit_max_wait: Optional[float] = None  # seconds; None = wait as long as needed
     
     # Logging
     log_level: str = "INFO"
@@ -6,7 +6,6 @@ Following python-patterns and clean-code skills
 import logging
 from typing import Optional
 import asyncio
-from datetime import datetime, timedelta
 
 import google.generativeai as genai
 from tenacity import (
@@ -17,6 +16,7 @@ from tenacity import (
 )
 
 from ..config.settings import get_settings
+from .rate_limiter import RateLimiter
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -46,9 +46,8 @@ class GeminiService:
             }
         )
         
-        # Rate limiting
-        self._request_times: list[datetime] = []
-        self._rate_limit_lock = asyncio.Lock()
+        # Rate limiting (shared GCRA quota + per-user fairness)
+        self._rate_limiter = RateLimiter.from_settings(settings)
         
         # Metrics
         self._total_requests = 0
@@ -63,12 +62,13 @@ class GeminiService:
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
         reraise=True
     )
-    async def generate_response(self, prompt: str) -> str:
+    async def generate_response(self, prompt: str, user_id: Optional[str] = None) -> str:
         """
         Generate AI response with retry logic.
         
         Args:
             prompt: Input prompt for AI
+            user_id: Requesting user, for rate limit fairness (optional)
         
         Returns:
             Generated response text
@@ -77,6 +77,7 @@ class GeminiService:
             ValueError: If prompt is empty
             ConnectionError: If API is unreachable
             TimeoutError: If request times out
+            RateLimitExceeded: If rate_limit_max_wait is set and exceeded
         
         Following python-patterns: Async def for I/O operations
         """
@@ -84,7 +85,7 @@ class GeminiService:
             raise ValueError("Prompt cannot be empty")
         
         # Rate limiting
-        await self._check_rate_limit()
+        await self._check_rate_limit(user_id)
         
         try:
             self._total_requests += 1
@@ -114,30 +115,16 @@ class GeminiService:
             logger.error(f"Error generating response: {str(e)}", exc_info=True)
             raise
     
-    async def _check_rate_limit(self):
+    async def _check_rate_limit(self, user_id: Optional[str] = None):
         """
         Check and enforce rate limiting.
         
+        Waits for a slot of the shared quota without holding any lock,
+        so concurrent requests wait in parallel (round-robin per user).
+        
         Following clean-code: Single Responsibility
         """
-        async with self._rate_limit_lock:
-            now = datetime.utcnow()
-            window_start = now - timedelta(seconds=settings.rate_limit_window)
-            
-            # Remove old requests
-            self._request_times = [
-                t for t in self._request_times
-                if t > window_start
-            ]
-            
-            # Check limit
-            if len(self._request_times) >= settings.rate_limit_requests:
-                wait_time = (self._request_times[0] - window_start).total_seconds()
-                logger.warning(f"Rate limit reached, waiting {wait_time:.2f}s")
-                await asyncio.sleep(wait_time + 0.1)
-            
-            # Record this request
-            self._request_times.append(now)
+        await self._rate_limiter.acquire(user_id)
     
     async def generate_structured(
         self,
@@ -191,7 +178,10 @@ REGLAS DE OPERACIÓN:
             full_prompt = f"{system_instruction}\n\nUsuario: {mensaje}"
             
             # 4. Generate Response
-            response_text = await self.generate_response(full_prompt)
+            response_text = await self.generate_response(
+                full_prompt,
+                user_id=user_profile.get("user_id") or contexto.get("user_id")
+            )
             
             # 5. Extract JSON (if structured data is detected)
             # Simple extraction heuristic for now
@@ -222,8 +212,9 @@ REGLAS DE OPERACIÓN:
             "total_errors": self._total_errors,
             "total_tokens": self._total_tokens,
             "error_rate": self._total_errors / max(self._total_requests, 1),
-            "current_rate_limit": len(self._request_times),
+            "current_rate_limit": self._rate_limiter.get_stats()["waiting"],
             "max_rate_limit": settings.rate_limit_requests,
+            "rate_limiter": self._rate_limiter.get_stats(),
             "model": settings.gemini_model
         }
     
@@ -0,0 +1,445 @@
+"""
+Rate Limiter - Shared GCRA quota for external AI APIs
+Enterprise-grade: O(1) checks, no sleeping under locks, multi-worker quotas
+Following python-patterns and clean-code skills
+
+GCRA (Generic Cell Rate Algorithm) stores ONE number per key: the
+theoretical arrival time (TAT) of the next request. With
+`interval = window / requests`, each request advances the TAT by one
+interval; a request is allowed once `TAT - window <= now`, which allows
+bursts of up to `requests` and then a steady `requests / window` rate.
+
+Requests *reserve* their slot: the backend advances the TAT atomically and
+returns how long the caller must wait. The wait happens afterwards,
+outside any lock, so waiters sleep concurrently instead of queueing behind
+one sleeper. A reservation that ends up unused (cancelled waiter, per-user
+slot whose global slot was rejected) is *released*, moving the TAT back by
+one interval so the quota is not spent on nothing.
+
+Backends (same quota for every uvicorn worker that shares them):
+- memory://                  per process (default)
+- sqlite:///path/to/file.db  workers on one host (SQLite file lock)
+- redis://host:6379/0        any number of hosts (atomic Lua script)
+
+Fairness: requests that cannot go immediately wait in per-user queues that
+are served round-robin, so a user sending a batch of prompts cannot starve
+everyone else in the same process. An optional per-user quota
+(`rate_limit_user_requests`) caps each user across workers.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_USER = "anonymous"
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the next free slot is further away than `max_wait`"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.2f}s")
+
+
+class Reservation(NamedTuple):
+    """Backend answer: `wait` is the delay before the slot, or the retry-after if not granted"""
+    granted: bool
+    wait: float
+
+
+def gcra_reserve(
+    tat: Optional[float],
+    now: float,
+    interval: float,
+    window: float,
+    max_wait: Optional[float]
+) -> Tuple[Optional[float], float]:
+    """
+    Reserve one slot.
+
+    Returns:
+        (new_tat, wait). `new_tat` is None when the reservation is rejected
+        because `wait` exceeds `max_wait` (the stored TAT must not change).
+    """
+    new_tat = max(tat if tat is not None else now, now) + interval
+    wait = max(0.0, new_tat - window - now)
+    if max_wait is not None and wait > max_wait:
+        return None, wait
+    return new_tat, wait
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class RateLimitBackend(ABC):
+    """Atomic storage of one TAT per key"""
+
+    name = "abstract"
+
+    @abstractmethod
+    async def reserve(
+        self,
+        key: str,
+        interval: float,
+        window: float,
+        max_wait: Optional[float] = None
+    ) -> Reservation:
+        """
+        Reserve a slot for `key`.
+
+        Returns:
+            Reservation(True, seconds to wait before using the slot), or
+            Reservation(False, seconds until a slot frees up) when the wait
+            exceeds `max_wait` (the stored TAT is left unchanged).
+        """
+
+    @abstractmethod
+    async def release(self, key: str, interval: float):
+        """Give back one reserved slot (undo a reserve that was not used)"""
+
+    async def close(self):
+        """Release backend resources"""
+
+
+class InMemoryBackend(RateLimitBackend):
+    """Per-process backend (the lock is held for a dict update only)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._tats: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    async def reserve(self, key, interval, window, max_wait=None):
+        with self._lock:
+            now = time.monotonic()
+            new_tat, wait = gcra_reserve(self._tats.get(key), now, interval, window, max_wait)
+            if new_tat is None:
+                return Reservation(False, wait)
+            self._tats[key] = new_tat
+            return Reservation(True, wait)
+
+    async def release(self, key, interval):
+        with self._lock:
+            if key in self._tats:
+                self._tats[key] -= interval
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Backend shared by the workers of one host.
+
+    `BEGIN IMMEDIATE` takes SQLite's write lock on the file for the
+    read-modify-write of a single row (microseconds); the caller's wait
+    happens after COMMIT.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = str(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _reserve_sync(self, key, interval, window, max_wait):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limit WHERE key = ?", (key,)).fetchone()
+            # Wall clock: comparable between processes
+            new_tat, wait = gcra_reserve(row[0] if row else None, time.time(), interval, window, max_wait)
+            if new_tat is not None:
+                conn.execute(
+                    "INSERT INTO rate_limit (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_tat)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return Reservation(new_tat is not None, wait)
+
+    def _release_sync(self, key, interval):
+        self._connection().execute("UPDATE rate_limit SET tat = tat - ? WHERE key = ?", (interval, key))
+
+    async def reserve(self, key, interval, window, max_wait=None):
+        return await asyncio.to_thread(self._reserve_sync, key, interval, window, max_wait)
+
+    async def release(self, key, interval):
+        await asyncio.to_thread(self._release_sync, key, interval)
+
+
+# GCRA in Lua: atomic on the server, using the server clock for every host
+_REDIS_GCRA = """
+redis.replicate_commands()
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = now
+local stored = redis.call('GET', KEYS[1])
+if stored then tat = math.max(tonumber(stored), now) end
+local new_tat = tat + interval
+local wait = math.max(0, new_tat - window - now)
+if max_wait >= 0 and wait > max_wait then
+    return {0, tostring(wait)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+# Undo one reservation, keeping the key's expiry (an expired key has nothing to undo)
+_REDIS_RELEASE = """
+local stored = redis.call('GET', KEYS[1])
+local ttl = redis.call('PTTL', KEYS[1])
+if stored and ttl > 0 then
+    redis.call('SET', KEYS[1], tostring(tonumber(stored) - tonumber(ARGV[1])), 'PX', ttl)
+end
+return 1
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Backend shared across hosts. Works with any client exposing an async
+    `eval(script, numkeys, *keys_and_args)` (redis.asyncio, aioredis,
+    KeyDB, Dragonfly...).
+    """
+
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("Redis rate limit backend requires the 'redis' package") from e
+        return cls(redis_asyncio.from_url(url))
+
+    async def reserve(self, key, interval, window, max_wait=None):
+        allowed, wait = await self.client.eval(
+            _REDIS_GCRA, 1, key, interval, window, -1 if max_wait is None else max_wait
+        )
+        return Reservation(bool(int(allowed)), float(wait))
+
+    async def release(self, key, interval):
+        await self.client.eval(_REDIS_RELEASE, 1, key, interval)
+
+    async def close(self):
+        await self.client.close()
+
+
+def create_backend(url: Optional[str]) -> RateLimitBackend:
+    """
+    Build a backend from a URL.
+
+    Following clean-code: Explicit configuration, fail fast on typos
+    """
+    if not url or url == "memory://":
+        return InMemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Unsupported rate limit backend: {url}")
+
+
+# ============================================================================
+# LIMITER
+# ============================================================================
+
+class RateLimiter:
+    """
+    Global quota with per-user round-robin queues.
+
+    Following python-patterns: Async for I/O-bound waits
+    """
+
+    def __init__(
+        self,
+        requests: int,
+        window: float,
+        backend: Optional[RateLimitBackend] = None,
+        name: str = "gemini",
+        user_requests: Optional[int] = None,
+        max_wait: Optional[float] = None
+    ):
+        if requests <= 0 or window <= 0:
+            raise ValueError("requests and window must be positive")
+
+        self.window = float(window)
+        self.interval = self.window / requests
+        self.user_interval = self.window / user_requests if user_requests else None
+        self.max_wait = max_wait
+        self.backend = backend or InMemoryBackend()
+        self.key = f"ratelimit:{name}"
+
+        # user -> waiting futures; order of the dict = round-robin order
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._granted = 0
+        self._queued = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_settings(cls, settings, name: str = "gemini") -> "RateLimiter":
+        return cls(
+            requests=settings.rate_limit_requests,
+            window=settings.rate_limit_window,
+            backend=create_backend(settings.rate_limit_backend),
+            name=name,
+            user_requests=settings.rate_limit_user_requests,
+            max_wait=settings.rate_limit_max_wait
+        )
+
+    async def acquire(self, user_id: Optional[str] = None):
+        """
+        Wait until a request may be sent.
+
+        Raises:
+            RateLimitExceeded: If `max_wait` is set and no slot is near enough
+        """
+        user = user_id or ANONYMOUS_USER
+        if not self.user_interval:
+            return await self._acquire_global(user)
+
+        user_key = f"{self.key}:user:{user}"
+        granted, wait = await self.backend.reserve(user_key, self.user_interval, self.window, self.max_wait)
+        if not granted:
+            self._rejected += 1
+            raise RateLimitExceeded(wait)
+
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            await self._acquire_global(user)
+        except (asyncio.CancelledError, RateLimitExceeded):
+            # No request will be sent: the user's slot goes back to the quota
+            await asyncio.shield(self.backend.release(user_key, self.user_interval))
+            raise
+
+    async def _acquire_global(self, user: str):
+        # Fast path: nobody waiting and a slot is free right now
+        if not self._pending():
+            granted, _ = await self.backend.reserve(self.key, self.interval, self.window, 0.0)
+            if granted:
+                self._granted += 1
+                return
+
+        await self._enqueue(user)
+
+    async def _enqueue(self, user: str):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # New event loop (tests, worker restart): old futures are dead
+            self._loop = loop
+            self._queues.clear()
+            self._dispatcher = None
+
+        future = loop.create_future()
+        self._queues.setdefault(user, deque()).append(future)
+        self._queued += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def _pending(self) -> int:
+        return sum(1 for waiters in self._queues.values() for f in waiters if not f.done())
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Pop the next live waiter, rotating users round-robin"""
+        while self._queues:
+            user, waiters = self._queues.popitem(last=False)
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    if waiters:
+                        self._queues[user] = waiters
+                    return future
+        return None
+
+    async def _dispatch(self):
+        """
+        Grant slots one at a time. The slot is reserved first and handed to
+        the next waiter only when it is due, so late-arriving users get
+        their fair turn. If every waiter was cancelled meanwhile (or the
+        dispatcher itself is cancelled), the slot is released.
+        """
+        while self._pending():
+            try:
+                granted, wait = await self.backend.reserve(self.key, self.interval, self.window, self.max_wait)
+            except Exception as e:
+                logger.error(f"Rate limit backend error: {e}")
+                future = self._next_waiter()
+                if future is not None:
+                    future.set_exception(e)
+                continue
+
+            if not granted:
+                future = self._next_waiter()
+                if future is not None:
+                    self._rejected += 1
+                    future.set_exception(RateLimitExceeded(wait))
+                continue
+
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                await asyncio.shield(self.backend.release(self.key, self.interval))
+                raise
+
+            future = self._next_waiter()
+            if future is None:
+                await self.backend.release(self.key, self.interval)
+                break
+            self._granted += 1
+            future.set_result(None)
+
+    def get_stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "requests_per_window": round(self.window / self.interval),
+            "window_seconds": self.window,
+            "granted": self._granted,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "waiting": self._pending(),
+            "waiting_users": len(self._queues)
+        }
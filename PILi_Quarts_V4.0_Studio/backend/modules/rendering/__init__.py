@@ -0,0 +1,20 @@
+# Módulo de Renderizado de Documentos
+# Pool de procesos para PDF / Word / Excel fuera del event loop
+
+from .executor import (
+    Priority,
+    RenderExecutor,
+    RenderQueueFull,
+    RenderTimeout,
+    get_render_executor,
+)
+from .jobs import RendererUnavailable
+
+__all__ = [
+    "Priority",
+    "RenderExecutor",
+    "RenderQueueFull",
+    "RenderTimeout",
+    "RendererUnavailable",
+    "get_render_executor",
+]
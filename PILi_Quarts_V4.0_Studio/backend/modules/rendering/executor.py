@@ -0,0 +1,304 @@
+"""
+Render Executor - Process pool for CPU-bound document rendering
+Keeps WeasyPrint / ReportLab / python-docx / openpyxl off the event loop
+Following python-patterns and clean-code skills
+
+- Warm workers: processes are spawned and preloaded (fonts, templates,
+  libraries) at startup, and recycled after `max_tasks_per_child` jobs.
+- Priorities: waiting jobs are served lowest `Priority` first, so an
+  interactive download is not stuck behind a batch export.
+- Timeouts: each job gets SIGALRM inside the worker; if the worker does not
+  come back shortly after, the pool is torn down and rebuilt.
+- Backpressure: at most `workers` jobs run and `max_queue` wait; beyond
+  that `run()` raises RenderQueueFull (-> HTTP 429 with Retry-After).
+"""
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Optional, Tuple
+
+from .settings import get_render_settings
+
+logger = logging.getLogger(__name__)
+
+# Extra time the parent waits for a worker after the worker-side timeout
+TIMEOUT_GRACE_SECONDS = 5.0
+
+
+class Priority(IntEnum):
+    """Lower value = served first"""
+    INTERACTIVE = 0
+    NORMAL = 5
+    BATCH = 10
+
+
+class RenderQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Render queue full, retry after {retry_after}s")
+
+
+class RenderTimeout(Exception):
+    """Raised when a job exceeds its timeout"""
+
+
+def _on_alarm(signum, frame):
+    raise RenderTimeout("Render job timed out")
+
+
+def _run_job(fn: Callable, args: Tuple, timeout: Optional[float]):
+    """Worker-side wrapper: enforce the timeout with an interval timer"""
+    if not timeout or not hasattr(signal, "setitimer"):
+        return fn(*args)
+
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    fn: Callable = field(compare=False)
+    args: Tuple = field(compare=False)
+    timeout: Optional[float] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class RenderExecutor:
+    """
+    Priority queue in front of a ProcessPoolExecutor.
+
+    Following python-patterns: Async for I/O, processes for CPU-bound work
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 32,
+        job_timeout: Optional[float] = 60.0,
+        max_tasks_per_child: Optional[int] = None,
+        initializer: Optional[Callable] = None
+    ):
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.initializer = initializer
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = itertools.count()
+
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._pool_restarts = 0
+        self._busy_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls, settings=None) -> "RenderExecutor":
+        from .jobs import warm_worker
+
+        settings = settings or get_render_settings()
+        return cls(
+            workers=settings.workers,
+            max_queue=settings.max_queue,
+            job_timeout=settings.job_timeout_seconds,
+            max_tasks_per_child=settings.max_tasks_per_child,
+            initializer=warm_worker
+        )
+
+    # ------------------------------------------------------------------
+    # Pool lifecycle
+    # ------------------------------------------------------------------
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: no inherited event loop / sockets / DB connections;
+            # also required by max_tasks_per_child
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                max_tasks_per_child=self.max_tasks_per_child
+            )
+        return self._pool
+
+    def _restart_pool(self, kill: bool = False):
+        """Drop the current pool (broken or stuck) and build a new one lazily"""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        self._pool_restarts += 1
+        if kill:
+            for process in list((getattr(pool, "_processes", None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _bind_loop(self):
+        """Create the queue and dispatchers on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop and self._dispatchers:
+            return
+        # New event loop (tests, worker restart): old queue/tasks are dead
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._dispatchers = [loop.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def start(self):
+        """Spawn and warm every worker before the first request"""
+        from .jobs import ping
+
+        self._bind_loop()
+        pool = self._get_pool()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(pool, ping) for _ in range(self.workers)))
+        logger.info(f"Render pool ready: {self.workers} workers in {time.perf_counter() - start:.2f}s")
+
+    async def shutdown(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        self._loop = None
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def _retry_after(self) -> int:
+        per_job = self._busy_seconds / self._completed if self._completed else 1.0
+        waiting = self._queue.qsize() if self._queue else 0
+        return max(1, math.ceil(per_job * (waiting + self._running) / self.workers))
+
+    async def run(
+        self,
+        fn: Callable,
+        *args: Any,
+        priority: int = Priority.NORMAL,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Run `fn(*args)` in a worker process and return its result.
+
+        `fn` and `args` must be picklable (top-level function, plain data).
+
+        Raises:
+            RenderQueueFull: If max_queue jobs are already waiting
+            RenderTimeout: If the job exceeds its timeout
+        """
+        self._bind_loop()
+        if self._queue.qsize() >= self.max_queue:
+            self._rejected += 1
+            raise RenderQueueFull(self._retry_after())
+
+        job = _Job(
+            priority=int(priority),
+            seq=next(self._seq),
+            fn=fn,
+            args=args,
+            timeout=timeout if timeout is not None else self.job_timeout,
+            future=self._loop.create_future()
+        )
+        self._queue.put_nowait(job)
+        self._submitted += 1
+        return await job.future
+
+    async def _dispatch(self):
+        """One dispatcher per worker: keeps at most `workers` jobs in flight"""
+        while True:
+            job = await self._queue.get()
+            if job.future.done():  # caller cancelled while waiting
+                continue
+
+            self._running += 1
+            start = time.perf_counter()
+            try:
+                result = await self._execute(job)
+            except Exception as e:
+                self._failed += 1
+                if isinstance(e, RenderTimeout):
+                    self._timeouts += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self._completed += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._running -= 1
+                self._busy_seconds += time.perf_counter() - start
+
+    async def _execute(self, job: _Job):
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            try:
+                pending = loop.run_in_executor(self._get_pool(), _run_job, job.fn, job.args, job.timeout)
+                if not job.timeout:
+                    return await pending
+                return await asyncio.wait_for(pending, job.timeout + TIMEOUT_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                # Worker ignored SIGALRM (stuck in C code): kill the pool
+                logger.error("Render worker unresponsive after timeout, restarting pool")
+                self._restart_pool(kill=True)
+                raise RenderTimeout("Render job timed out")
+            except BrokenProcessPool:
+                # A worker died (OOM, segfault): rebuild and retry once
+                logger.error("Render pool broken, restarting")
+                self._restart_pool()
+                if attempt:
+                    raise
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "timeouts": self._timeouts,
+            "rejected": self._rejected,
+            "pool_restarts": self._pool_restarts,
+            "avg_job_seconds": round(self._busy_seconds / self._completed, 3) if self._completed else None
+        }
+
+
+# Global instance (lazy)
+_render_executor: Optional[RenderExecutor] = None
+
+
+def get_render_executor() -> RenderExecutor:
+    """Get or create the global render executor"""
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = RenderExecutor.from_settings()
+    return _render_executor
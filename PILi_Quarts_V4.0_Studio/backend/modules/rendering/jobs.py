@@ -0,0 +1,333 @@
+"""
+Rendering Jobs - CPU-bound document renderers
+Run inside the rendering worker processes (see executor.py), never on the
+API event loop. Every job is a top-level function taking plain data
+(dicts/strings) so it can be pickled to a worker.
+"""
+import io
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class RendererUnavailable(RuntimeError):
+    """The library needed for a format is not installed in this environment"""
+
+
+# Preloaded once per worker process by warm_worker()
+_font_config = None
+
+
+def warm_worker():
+    """
+    Worker initializer: import the rendering libraries and warm their
+    caches (fontconfig, default DOCX template, HTML template builder) so the
+    first real job does not pay for them.
+    """
+    global _font_config
+
+    from utils.template_generator import generate_html_template
+
+    try:
+        from weasyprint import HTML
+        from weasyprint.text.fonts import FontConfiguration
+        _font_config = FontConfiguration()
+        html = generate_html_template("cotizacion-simple", {}, "azul-tesla", "Calibri")
+        HTML(string=html).write_pdf(io.BytesIO(), font_config=_font_config)
+    except Exception as e:
+        logger.info(f"WeasyPrint not preloaded: {e}")
+
+    try:
+        from docx import Document
+        Document()
+    except ImportError:
+        pass
+
+    try:
+        from openpyxl import Workbook
+        Workbook()
+    except ImportError:
+        pass
+
+    try:
+        from reportlab.pdfgen import canvas  # noqa: F401
+    except ImportError:
+        pass
+
+
+def ping() -> bool:
+    """No-op job used to spawn workers ahead of the first request"""
+    return True
+
+
+# ============================================================================
+# PDF
+# ============================================================================
+
+def render_pdf(payload: Dict[str, Any]) -> bytes:
+    """Generate PDF document from request data"""
+    pdf_file = io.BytesIO()
+
+    # Strategy 1: WeasyPrint (High Quality)
+    try:
+        from weasyprint import HTML
+        weasyprint_available = True
+    except (ImportError, OSError):
+        weasyprint_available = False
+
+    if weasyprint_available:
+        try:
+            from utils.template_generator import generate_html_template
+            html_content = generate_html_template(
+                payload["type"],
+                payload["data"],
+                payload.get("color_scheme"),
+                payload.get("font")
+            )
+            HTML(string=html_content).write_pdf(pdf_file, font_config=_font_config)
+            return pdf_file.getvalue()
+        except Exception as wp_error:
+            logger.warning(f"WeasyPrint failed: {wp_error}. Falling back to ReportLab...")
+            pdf_file = io.BytesIO()
+
+    # Strategy 2: ReportLab (Reliable Fallback)
+    try:
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
+    except ImportError:
+        raise RendererUnavailable("No PDF generation libraries available (or both failed)")
+
+    data = payload["data"]
+    c = canvas.Canvas(pdf_file, pagesize=A4)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, 800, payload.get("title") or "Documento Generado")
+
+    c.setFont("Helvetica", 12)
+    y = 750
+    c.drawString(50, y, f"Tipo: {payload['type']}")
+    y -= 20
+    c.drawString(50, y, f"Fecha: {datetime.now().strftime('%d/%m/%Y')}")
+    y -= 40
+
+    # Simple content dump
+    c.drawString(50, y, "Datos del Documento:")
+    y -= 25
+
+    # Iterate safely through basic data
+    text_object = c.beginText(50, y)
+    text_object.setFont("Helvetica", 10)
+
+    if data.get('cliente'):
+        text_object.textLine("CLIENTE:")
+        client_data = data['cliente']
+        if isinstance(client_data, dict):
+            for k, v in client_data.items():
+                text_object.textLine(f" - {k}: {v}")
+        else:
+            text_object.textLine(f" - {str(client_data)}")
+        text_object.textLine(" ")
+
+    if data.get('proyecto'):
+        text_object.textLine("PROYECTO:")
+        project_data = data['proyecto']
+        if isinstance(project_data, dict):
+            for k, v in project_data.items():
+                text_object.textLine(f" - {k}: {v}")
+        else:
+            text_object.textLine(f" - {str(project_data)}")
+
+    c.drawText(text_object)
+    c.showPage()
+    c.save()
+    return pdf_file.getvalue()
+
+
+# ============================================================================
+# WORD
+# ============================================================================
+
+def render_word(payload: Dict[str, Any]) -> bytes:
+    """Generate Word document from request data"""
+    try:
+        from docx import Document
+    except ImportError:
+        raise RendererUnavailable("Word generation library (python-docx) not installed")
+
+    data = payload["data"]
+
+    # Create Word document
+    doc = Document()
+
+    # Add basic content (simplified for now, mimicking structure)
+    doc.add_heading(payload["title"], 0)
+
+    p = doc.add_paragraph()
+    p.add_run(f"Tipo: {payload['type']}\n").bold = True
+    p.add_run(f"Fecha: {datetime.now().strftime('%d/%m/%Y')}\n")
+
+    # Add data dump for now (robust logic would go in a utility)
+    doc.add_heading('Datos del Documento', level=1)
+
+    # Client info
+    if 'cliente' in data:
+        doc.add_heading('Cliente', level=2)
+        client_data = data['cliente']
+        if isinstance(client_data, dict):
+            for key, value in client_data.items():
+                doc.add_paragraph(f"{key.capitalize()}: {value}")
+        else:
+            doc.add_paragraph(str(client_data))
+
+    # Project info
+    if 'proyecto' in data:
+        doc.add_heading('Proyecto', level=2)
+        project_data = data['proyecto']
+        if isinstance(project_data, dict):
+            for key, value in project_data.items():
+                doc.add_paragraph(f"{key.capitalize()}: {value}")
+        else:
+            doc.add_paragraph(str(project_data))
+
+    # Save to buffer
+    docx_file = io.BytesIO()
+    doc.save(docx_file)
+    return docx_file.getvalue()
+
+
+# ============================================================================
+# EXCEL
+# ============================================================================
+
+def render_excel(payload: Dict[str, Any]) -> bytes:
+    """Generate Excel spreadsheet from request data"""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+    except ImportError:
+        raise RendererUnavailable("Excel generation library (openpyxl) not installed")
+
+    data = payload["data"]
+    wb = Workbook()
+
+    # --- SHEET 1: RESUMEN ---
+    ws = wb.active
+    ws.title = "Resumen del Proyecto"
+
+    # Styles
+    title_font = Font(name='Calibri', size=14, bold=True, color='FFFFFF')
+    header_font = Font(name='Calibri', size=11, bold=True)
+    fill_blue = PatternFill(start_color='1E40AF', end_color='1E40AF', fill_type='solid')
+    fill_gray = PatternFill(start_color='F3F4F6', end_color='F3F4F6', fill_type='solid')
+    border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+
+    # Title
+    ws['A1'] = payload["title"].upper()
+    ws.merge_cells('A1:E1')
+    ws['A1'].font = title_font
+    ws['A1'].fill = fill_blue
+    ws['A1'].alignment = Alignment(horizontal='center')
+
+    # Info Block
+    current_row = 3
+    ws[f'A{current_row}'] = "INFORMACIÓN GENERAL"
+    ws[f'A{current_row}'].font = header_font
+    current_row += 1
+
+    ws[f'A{current_row}'] = "Tipo de Documento:"
+    ws[f'B{current_row}'] = payload["type"].replace('-', ' ').title()
+    current_row += 1
+
+    ws[f'A{current_row}'] = "Fecha de Emisión:"
+    ws[f'B{current_row}'] = datetime.now().strftime('%d/%m/%Y')
+    current_row += 2
+
+    # Client Data
+    if data.get('cliente'):
+        ws[f'A{current_row}'] = "DATOS DEL CLIENTE"
+        ws[f'A{current_row}'].font = header_font
+        current_row += 1
+
+        client_data = data['cliente']
+        if isinstance(client_data, dict):
+            for k, v in client_data.items():
+                ws[f'A{current_row}'] = str(k).replace('_', ' ').title()
+                ws[f'B{current_row}'] = str(v)
+                current_row += 1
+        else:
+            ws[f'A{current_row}'] = "Cliente"
+            ws[f'B{current_row}'] = str(client_data)
+            current_row += 1
+        current_row += 1
+
+    # Project Data
+    if data.get('proyecto'):
+        ws[f'A{current_row}'] = "DATOS DEL PROYECTO"
+        ws[f'A{current_row}'].font = header_font
+        current_row += 1
+
+        project_data = data['proyecto']
+        if isinstance(project_data, dict):
+            for k, v in project_data.items():
+                if isinstance(v, (str, int, float)):
+                    ws[f'A{current_row}'] = str(k).replace('_', ' ').title()
+                    ws[f'B{current_row}'] = str(v)
+                    current_row += 1
+        else:
+            # It's a string
+            ws[f'A{current_row}'] = "Nombre del Proyecto"
+            ws[f'B{current_row}'] = str(project_data)
+            current_row += 1
+
+    # Adjust Columns
+    ws.column_dimensions['A'].width = 25
+    ws.column_dimensions['B'].width = 40
+
+    # --- SHEET 2: DETALLE ---
+    if data.get('items'):
+        ws2 = wb.create_sheet("Detalle de Items")
+
+        headers = ["Item", "Descripción", "Unidad", "Cantidad", "Precio U.", "Total"]
+        for col, header in enumerate(headers, 1):
+            cell = ws2.cell(row=1, column=col)
+            cell.value = header
+            cell.font = header_font
+            cell.fill = fill_gray
+            cell.border = border
+
+        row_idx = 2
+        total_general = 0
+
+        for item in data['items']:
+            # Ensure data types
+            desc = item.get('descripcion', 'Item')
+            unidad = item.get('unidad', 'und')
+            cant = float(item.get('cantidad', 1))
+            precio = float(item.get('precio_unitario', 0))
+            total = cant * precio
+            total_general += total
+
+            ws2.cell(row=row_idx, column=1, value=row_idx-1).border = border
+            ws2.cell(row=row_idx, column=2, value=desc).border = border
+            ws2.cell(row=row_idx, column=3, value=unidad).border = border
+            ws2.cell(row=row_idx, column=4, value=cant).border = border
+            ws2.cell(row=row_idx, column=5, value=precio).border = border
+            ws2.cell(row=row_idx, column=6, value=total).border = border
+            row_idx += 1
+
+        # Total Check
+        ws2.cell(row=row_idx, column=5, value="TOTAL:").font = header_font
+        ws2.cell(row=row_idx, column=6, value=total_general).font = header_font
+
+        # Formats
+        for col in ['E', 'F']:
+            for cell in ws2[col]:
+                cell.number_format = '#,##0.00'
+
+        ws2.column_dimensions['B'].width = 50
+
+    # Save
+    excel_file = io.BytesIO()
+    wb.save(excel_file)
+    return excel_file.getvalue()
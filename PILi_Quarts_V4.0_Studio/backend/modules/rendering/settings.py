@@ -0,0 +1,42 @@
+"""
+Rendering Module - Configuration
+Enterprise-grade settings management
+Following python-patterns and clean-code skills
+"""
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional
+from functools import lru_cache
+
+
+class RenderSettings(BaseSettings):
+    """
+    Rendering executor configuration.
+    Uses Pydantic for validation and environment variable loading.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_prefix="RENDER_",
+        case_sensitive=False,
+        extra="ignore"
+    )
+
+    # Process pool
+    workers: int = 2  # CPU-bound: at most one per core
+    max_tasks_per_child: Optional[int] = 200  # recycle workers (WeasyPrint/LibreOffice leaks)
+    warm_on_startup: bool = True  # spawn + preload workers when the API starts
+
+    # Backpressure
+    max_queue: int = 32  # jobs waiting beyond the running ones; more -> 429
+
+    # Timeouts
+    job_timeout_seconds: float = 60.0
+
+
+@lru_cache()
+def get_render_settings() -> RenderSettings:
+    """
+    Get cached settings instance.
+    Using lru_cache ensures singleton pattern.
+    """
+    return RenderSettings()
@@ -0,0 +1,211 @@
+"""
+Unit Tests for the GCRA Rate Limiter
+Following testing-patterns: AAA pattern, unit test principles
+"""
+import asyncio
+import time
+
+import pytest
+
+from modules.pili.core.rate_limiter import (
+    InMemoryBackend,
+    RateLimiter,
+    RateLimitExceeded,
+    SQLiteBackend,
+    create_backend,
+    gcra_reserve,
+)
+
+
+@pytest.mark.unit
+class TestGCRA:
+    """
+    Pure GCRA arithmetic.
+
+    Following testing-patterns: Test the algorithm without I/O
+    """
+
+    def test_allows_burst_up_to_limit(self):
+        """Should allow `requests` immediate slots, then require waiting"""
+        # Arrange
+        tat, interval, window = None, 1.0, 3.0
+        waits = []
+
+        # Act
+        for _ in range(4):
+            tat, wait = gcra_reserve(tat, 100.0, interval, window, None)
+            waits.append(wait)
+
+        # Assert
+        assert waits == [0.0, 0.0, 0.0, 1.0]
+
+    def test_rejects_without_changing_state(self):
+        """Should not reserve when the wait exceeds max_wait"""
+        # Arrange
+        tat = 103.0  # three slots already reserved at t=100
+
+        # Act
+        new_tat, wait = gcra_reserve(tat, 100.0, 1.0, 3.0, max_wait=0.5)
+
+        # Assert
+        assert new_tat is None
+        assert wait == 1.0
+
+    def test_idle_time_restores_capacity(self):
+        """Should forget old reservations once the window has passed"""
+        # Act
+        new_tat, wait = gcra_reserve(103.0, 200.0, 1.0, 3.0, None)
+
+        # Assert
+        assert wait == 0.0
+        assert new_tat == 201.0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRateLimiter:
+    """
+    Limiter behaviour with real backends.
+
+    Following python-patterns: Async testing
+    """
+
+    async def test_concurrent_waiters_do_not_serialize(self):
+        """Should space slots by the interval, not by accumulated sleeps"""
+        # Arrange: 2 immediate slots, then one every 0.05s
+        limiter = RateLimiter(requests=2, window=0.1)
+
+        # Act
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+        elapsed = time.monotonic() - start
+
+        # Assert: 4 queued slots * 0.05s
+        assert 0.18 <= elapsed < 0.4
+        assert limiter.get_stats()["granted"] == 6
+
+    async def test_round_robin_between_users(self):
+        """Should not let one user's batch starve another user"""
+        # Arrange
+        limiter = RateLimiter(requests=1, window=0.02)
+        await limiter.acquire("batch-user")  # consume the burst
+        order = []
+
+        async def request(user):
+            await limiter.acquire(user)
+            order.append(user)
+
+        # Act
+        batch = [asyncio.create_task(request("batch-user")) for _ in range(4)]
+        await asyncio.sleep(0)
+        single = asyncio.create_task(request("other-user"))
+        await asyncio.gather(*batch, single)
+
+        # Assert
+        assert order.index("other-user") <= 1
+
+    async def test_max_wait_raises(self):
+        """Should raise RateLimitExceeded instead of waiting too long"""
+        # Arrange
+        limiter = RateLimiter(requests=1, window=10, max_wait=0.01)
+        await limiter.acquire()
+
+        # Act & Assert
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire()
+
+    async def test_per_user_quota(self):
+        """Should apply the per-user quota before the global one"""
+        # Arrange
+        limiter = RateLimiter(requests=100, window=10, user_requests=1, max_wait=0.01)
+        await limiter.acquire("user-a")
+
+        # Act & Assert
+        await limiter.acquire("user-b")
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire("user-a")
+
+    async def test_sqlite_backend_shares_quota(self, tmp_path):
+        """Should enforce one quota across backends on the same file (workers)"""
+        # Arrange
+        path = tmp_path / "rate_limit.db"
+        worker_1 = SQLiteBackend(str(path))
+        worker_2 = SQLiteBackend(str(path))
+
+        # Act
+        waits = [
+            await worker_1.reserve("k", 1.0, 2.0),
+            await worker_2.reserve("k", 1.0, 2.0),
+            await worker_1.reserve("k", 1.0, 2.0, max_wait=0.5),
+        ]
+
+        # Assert
+        assert waits[:2] == [(True, 0.0), (True, 0.0)]
+        assert waits[2].granted is False
+        assert waits[2].wait == pytest.approx(1.0, abs=0.1)
+
+    async def test_rejection_reports_real_retry_after(self):
+        """Should report the GCRA time to the next slot, not a fixed interval"""
+        # Arrange
+        limiter = RateLimiter(requests=1, window=10, max_wait=0.01)
+        await limiter.acquire()
+
+        # Act
+        with pytest.raises(RateLimitExceeded) as error:
+            await limiter.acquire()
+
+        # Assert
+        assert 9.0 < error.value.retry_after <= 10.0
+
+    async def test_user_slot_released_when_global_rejected(self):
+        """Should not spend the per-user quota on a request that never goes out"""
+        # Arrange
+        backend = InMemoryBackend()
+        limiter = RateLimiter(requests=1, window=10, backend=backend, user_requests=2, max_wait=0.01)
+        user_key = f"{limiter.key}:user:user-a"
+        await limiter.acquire("user-a")
+        tat_after_first = backend._tats[user_key]
+
+        # Act
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire("user-a")
+
+        # Assert
+        assert backend._tats[user_key] == pytest.approx(tat_after_first)
+
+    async def test_cancelled_waiter_releases_slot(self):
+        """Should give back the dispatcher's slot when its waiter is cancelled"""
+        # Arrange: burst used, next slot 0.2s away
+        limiter = RateLimiter(requests=1, window=0.2)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+
+        # Act
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.25)
+        start = time.monotonic()
+        await limiter.acquire()
+
+        # Assert: the released slot is free again, no extra interval to wait
+        assert time.monotonic() - start < 0.05
+        assert limiter.get_stats()["granted"] == 2
+
+
+@pytest.mark.unit
+class TestCreateBackend:
+    """Backend selection from settings URLs"""
+
+    def test_memory_by_default(self):
+        assert isinstance(create_backend(None), InMemoryBackend)
+        assert isinstance(create_backend("memory://"), InMemoryBackend)
+
+    def test_sqlite_url(self, tmp_path):
+        backend = create_backend(f"sqlite:///{tmp_path / 'rl.db'}")
+        assert isinstance(backend, SQLiteBackend)
+
+    def test_unknown_scheme_fails_fast(self):
+        with pytest.raises(ValueError):
+            create_backend("memcached://localhost")
@@ -0,0 +1,111 @@
+"""
+Unit Tests for the Render Executor
+Following testing-patterns: AAA pattern, unit test principles
+"""
+import asyncio
+import time
+
+import pytest
+
+from modules.rendering import Priority, RenderExecutor, RenderQueueFull, RenderTimeout
+
+
+# Jobs must be top-level functions so they pickle to the worker processes
+def slow_job(label: str, seconds: float) -> str:
+    time.sleep(seconds)
+    return label
+
+
+def busy_loop(seconds: float) -> None:
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestRenderExecutor:
+    """
+    Priority queue, backpressure and timeouts with a real process pool.
+
+    Following python-patterns: Async testing
+    """
+
+    async def test_runs_job_in_worker(self):
+        """Should return the job result from the worker process"""
+        # Arrange
+        executor = RenderExecutor(workers=1)
+        await executor.start()
+
+        try:
+            # Act
+            result = await executor.run(slow_job, "done", 0)
+
+            # Assert
+            assert result == "done"
+            assert executor.get_stats()["completed"] == 1
+        finally:
+            await executor.shutdown()
+
+    async def test_interactive_jobs_jump_the_queue(self):
+        """Should serve waiting INTERACTIVE jobs before BATCH jobs"""
+        # Arrange: one worker, kept busy while the others queue up
+        executor = RenderExecutor(workers=1)
+        await executor.start()
+        order = []
+
+        async def submit(label, priority):
+            order.append(await executor.run(slow_job, label, 0.05, priority=priority))
+
+        try:
+            blocker = asyncio.create_task(submit("blocker", Priority.NORMAL))
+            await asyncio.sleep(0.05)
+
+            # Act
+            await asyncio.gather(
+                blocker,
+                submit("batch-1", Priority.BATCH),
+                submit("batch-2", Priority.BATCH),
+                submit("interactive", Priority.INTERACTIVE),
+            )
+
+            # Assert
+            assert order == ["blocker", "interactive", "batch-1", "batch-2"]
+        finally:
+            await executor.shutdown()
+
+    async def test_full_queue_is_rejected(self):
+        """Should raise RenderQueueFull with a retry hint when saturated"""
+        # Arrange
+        executor = RenderExecutor(workers=1, max_queue=1)
+        await executor.start()
+
+        try:
+            running = asyncio.create_task(executor.run(slow_job, "running", 0.3))
+            await asyncio.sleep(0.05)
+            waiting = asyncio.create_task(executor.run(slow_job, "waiting", 0))
+            await asyncio.sleep(0)
+
+            # Act & Assert
+            with pytest.raises(RenderQueueFull) as exc_info:
+                await executor.run(slow_job, "rejected", 0)
+            assert exc_info.value.retry_after >= 1
+            assert await asyncio.gather(running, waiting) == ["running", "waiting"]
+            assert executor.get_stats()["rejected"] == 1
+        finally:
+            await executor.shutdown()
+
+    async def test_job_timeout(self):
+        """Should stop a job that exceeds its timeout and keep serving"""
+        # Arrange
+        executor = RenderExecutor(workers=1, job_timeout=0.2)
+        await executor.start()
+
+        try:
+            # Act & Assert
+            with pytest.raises(RenderTimeout):
+                await executor.run(busy_loop, 5)
+            assert await executor.run(slow_job, "after", 0) == "after"
+            assert executor.get_stats()["timeouts"] == 1
+        finally:
+            await executor.shutdown()
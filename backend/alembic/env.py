@@ -21,7 +21,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.core.database import Base
-from app.models import cliente, cotizacion, documento, item, proyecto
+from app.models import cliente, cotizacion, documento, item, proyecto, secuencia
 
 target_metadata = Base.metadata
 
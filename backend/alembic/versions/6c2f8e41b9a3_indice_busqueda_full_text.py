@@ -0,0 +1,30 @@
+"""indice_busqueda_full_text
+
+Revision ID: 6c2f8e41b9a3
+Revises: d507a4360132
+Create Date: 2026-10-18 10:05:12.480311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.search_index import crear_indice, eliminar_indice
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2f8e41b9a3'
+down_revision: Union[str, None] = 'd507a4360132'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite: tabla FTS5 + triggers (y carga inicial)
+    # PostgreSQL: unaccent/pg_trgm + índices GIN de expresión
+    crear_indice(op.get_bind())
+
+
+def downgrade() -> None:
+    eliminar_indice(op.get_bind())
@@ -0,0 +1,38 @@
+"""indices_paginacion_keyset
+
+Revision ID: 9a4d27c3e815
+Revises: 6c2f8e41b9a3
+Create Date: 2026-10-18 10:41:37.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d27c3e815'
+down_revision: Union[str, None] = '6c2f8e41b9a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tabla, columna de fecha) usadas por app.core.pagination
+INDICES_KEYSET = [
+    ('clientes', 'fecha_creacion'),
+    ('cotizaciones', 'fecha_creacion'),
+    ('proyectos', 'fecha_creacion'),
+    ('documentos', 'fecha_subida'),
+    ('usuarios', 'fecha_creacion'),
+]
+
+
+def upgrade() -> None:
+    for tabla, columna in INDICES_KEYSET:
+        op.create_index(f'ix_{tabla}_{columna}_id', tabla, [columna, 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for tabla, columna in INDICES_KEYSET:
+        op.drop_index(f'ix_{tabla}_{columna}_id', table_name=tabla, if_exists=True)
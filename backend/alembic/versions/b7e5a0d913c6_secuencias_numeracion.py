@@ -0,0 +1,33 @@
+"""secuencias_numeracion
+
+Revision ID: b7e5a0d913c6
+Revises: 9a4d27c3e815
+Create Date: 2026-10-18 11:12:09.634172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e5a0d913c6'
+down_revision: Union[str, None] = '9a4d27c3e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Contadores por prefijo; se siembran solos desde cotizaciones existentes
+    op.create_table(
+        'secuencias_numeracion',
+        sa.Column('prefijo', sa.String(length=40), nullable=False),
+        sa.Column('ultimo', sa.Integer(), nullable=False),
+        sa.Column('fecha_modificacion', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('prefijo')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('secuencias_numeracion')
@@ -0,0 +1,59 @@
+"""libro_consumo_tokens
+
+Revision ID: e3c91f6a2d48
+Revises: b7e5a0d913c6
+Create Date: 2026-10-18 16:40:21.518903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c91f6a2d48'
+down_revision: Union[str, None] = 'b7e5a0d913c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Libro de movimientos de tokens (solo se agregan filas)
+    op.create_table(
+        'consumos_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('tokens', sa.Integer(), nullable=False),
+        sa.Column('tokens_reservados', sa.Integer(), nullable=False),
+        sa.Column('operacion', sa.String(length=100), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('consolidado', sa.Boolean(), nullable=False),
+        sa.Column('fecha', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('fecha_cierre', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_consumos_tokens_id'), 'consumos_tokens', ['id'], unique=False)
+    op.create_index(op.f('ix_consumos_tokens_usuario_id'), 'consumos_tokens', ['usuario_id'], unique=False)
+    op.create_index(op.f('ix_consumos_tokens_fecha'), 'consumos_tokens', ['fecha'], unique=False)
+    # Consolidación y vencimiento de reservas filtran por estado
+    op.create_index('ix_consumos_tokens_estado_consolidado', 'consumos_tokens', ['estado', 'consolidado'], unique=False)
+
+    # Consolidado por día y operación
+    op.create_table(
+        'resumen_consumo_tokens',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('operacion', sa.String(length=100), nullable=False),
+        sa.Column('tokens', sa.Integer(), nullable=False),
+        sa.Column('operaciones', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'operacion')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('resumen_consumo_tokens')
+    op.drop_index('ix_consumos_tokens_estado_consolidado', table_name='consumos_tokens')
+    op.drop_index(op.f('ix_consumos_tokens_fecha'), table_name='consumos_tokens')
+    op.drop_index(op.f('ix_consumos_tokens_usuario_id'), table_name='consumos_tokens')
+    op.drop_index(op.f('ix_consumos_tokens_id'), table_name='consumos_tokens')
+    op.drop_table('consumos_tokens')
@@ -26,32 +26,51 @@ PROJECT_ROOT = BASE_DIR.parent.parent
 # CONFIGURACIÓN DE LOGGING
 # =======================================
 LOG_DIR = BASE_DIR / "logs" # Los logs SÍ van dentro de backend/logs
-LOG_DIR.mkdir(parents=True, exist_ok=True)
 LOG_FILE = LOG_DIR / "app.log"
 LOG_LEVEL_DEFAULT = os.getenv("LOG_LEVEL", "INFO").upper()
 
-logging.basicConfig(
-    level=LOG_LEVEL_DEFAULT,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        RotatingFileHandler(
-            LOG_FILE, 
-            maxBytes=10*1024*1024, # 10MB
-            backupCount=5,
-            encoding='utf-8'
-        )
-    ]
-)
-logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
-logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
-logging.getLogger('watchfiles').setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
-logger.info("==================================================")
-logger.info("Sistema de Logging inicializado.")
-logger.info(f"Logs de archivo en: {LOG_FILE}")
-logger.info("==================================================")
+_logging_configurado = False
+
+
+def configurar_logging():
+    """
+    Configura consola + archivos rotativos (app.log, tesla.log).
+    Se llama al crear la app (main.py), no al importar este módulo: los
+    scripts y workers que solo leen `settings` no crean directorios ni
+    abren archivos. Los archivos se abren con el primer mensaje (delay).
+    """
+    global _logging_configurado, tesla_logger
+    if _logging_configurado:
+        return
+    _logging_configurado = True
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=LOG_LEVEL_DEFAULT,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            RotatingFileHandler(
+                LOG_FILE, 
+                maxBytes=10*1024*1024, # 10MB
+                backupCount=5,
+                encoding='utf-8',
+                delay=True
+            )
+        ]
+    )
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+    logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
+    logging.getLogger('watchfiles').setLevel(logging.WARNING)
+    logger.info("==================================================")
+    logger.info("Sistema de Logging inicializado.")
+    logger.info(f"Logs de archivo en: {LOG_FILE}")
+    logger.info("==================================================")
+
+    tesla_logger = setup_tesla_logging()
+    tesla_logger.info("🚀 Sistema Tesla inicializado")
 
 
 # =======================================
@@ -124,6 +143,25 @@ class Settings(BaseSettings):
     
     ALLOWED_EXTENSIONS: str = Field(default="pdf,docx,xlsx,png,jpg,jpeg", env="ALLOWED_EXTENSIONS")
     MAX_UPLOAD_SIZE_MB: int = Field(default=10, env="MAX_UPLOAD_SIZE_MB")
+    UPLOAD_CHUNK_SIZE_KB: int = Field(default=1024, env="UPLOAD_CHUNK_SIZE_KB")
+
+    # Cola de procesamiento de documentos (ver services/document_jobs.py)
+    DOCUMENT_JOB_WORKERS: int = Field(default=2, env="DOCUMENT_JOB_WORKERS")
+    DOCUMENT_JOB_MAX_RETRIES: int = Field(default=3, env="DOCUMENT_JOB_MAX_RETRIES")
+    # Un trabajo "procesando" sin latido durante este tiempo se considera abandonado
+    DOCUMENT_JOB_LEASE_SECONDS: int = Field(default=120, env="DOCUMENT_JOB_LEASE_SECONDS")
+
+    # Métricas materializadas del dashboard (ver services/dashboard_metrics.py)
+    METRICS_REFRESH_SECONDS: int = Field(default=300, env="METRICS_REFRESH_SECONDS")
+
+    # Numeración de cotizaciones (ver services/numeracion.py)
+    # >1: cada proceso pre-reserva bloques de números (puede dejar huecos al reiniciar)
+    NUMERACION_BLOQUE: int = Field(default=1, env="NUMERACION_BLOQUE")
+
+    # Libro de tokens (ver services/token_ledger.py)
+    TOKENS_CONSOLIDACION_SEGUNDOS: int = Field(default=300, env="TOKENS_CONSOLIDACION_SEGUNDOS")
+    # Reservas de streaming sin confirmar después de este tiempo se liberan
+    TOKENS_RESERVA_VENCE_SEGUNDOS: int = Field(default=900, env="TOKENS_RESERVA_VENCE_SEGUNDOS")
     
     # ✅ CORREGIDO - Apuntan a las rutas correctas
     STORAGE_PATH: str = str(PROJECT_ROOT / "storage")
@@ -143,6 +181,27 @@ class Settings(BaseSettings):
     EMBEDDING_MODEL: str = Field(default="models/embedding-001", env="EMBEDDING_MODEL")
     TEMPERATURE: float = Field(default=0.3, env="TEMPERATURE")
     MAX_TOKENS: int = Field(default=4000, env="MAX_TOKENS")
+
+    # Cliente LLM async (ver services/llm_client.py)
+    LLM_BACKEND: str = Field(default="gemini", env="LLM_BACKEND")  # gemini | stub
+    LLM_MAX_CONCURRENCY: int = Field(default=8, env="LLM_MAX_CONCURRENCY")
+    LLM_TIMEOUT_SECONDS: float = Field(default=60.0, env="LLM_TIMEOUT_SECONDS")
+    LLM_MAX_RETRIES: int = Field(default=3, env="LLM_MAX_RETRIES")
+    LLM_STUB_LATENCY_MS: int = Field(default=300, env="LLM_STUB_LATENCY_MS")
+
+    # Caché de respuestas LLM (ver services/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = Field(default=True, env="LLM_CACHE_ENABLED")
+    LLM_CACHE_MAX_ENTRIES: int = Field(default=1000, env="LLM_CACHE_MAX_ENTRIES")
+    LLM_CACHE_TTL_SECONDS: int = Field(default=3600, env="LLM_CACHE_TTL_SECONDS")
+    LLM_CACHE_SEMANTIC: bool = Field(default=False, env="LLM_CACHE_SEMANTIC")
+    LLM_CACHE_SIMILARITY: float = Field(default=0.92, env="LLM_CACHE_SIMILARITY")
+
+    # Carga diferida de servicios pesados (ver core/lazy.py)
+    # True: se precargan en segundo plano al arrancar, sin bloquear el inicio
+    PRECALENTAR_SERVICIOS: bool = Field(default=True, env="PRECALENTAR_SERVICIOS")
+
+    # Reanudar al arrancar las ingestas RAG interrumpidas (ver professional/rag/ingestion.py)
+    RAG_REANUDAR_INGESTAS: bool = Field(default=True, env="RAG_REANUDAR_INGESTAS")
     
     # =======================================
     # MÓDULOS DE SERVICIO
@@ -289,7 +348,8 @@ def setup_tesla_logging():
         LOG_DIR / "tesla.log",
         maxBytes=5*1024*1024,  # 5MB
         backupCount=3,
-        encoding='utf-8'
+        encoding='utf-8',
+        delay=True
     )
     tesla_handler.setFormatter(
         logging.Formatter('%(asctime)s - TESLA - %(levelname)s - %(message)s')
@@ -298,7 +358,6 @@ def setup_tesla_logging():
     
     return tesla_logger
 
-# Configurar logging de Tesla
-tesla_logger = setup_tesla_logging()
-tesla_logger.info("🚀 Sistema Tesla inicializado")
+# Logger de Tesla (con handler de archivo tras configurar_logging())
+tesla_logger = logging.getLogger("tesla")
 # tesla_logger.info(f"🤖 Gemini configurado: {validate_gemini_key()}")
\ No newline at end of file
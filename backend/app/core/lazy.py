@@ -0,0 +1,144 @@
+"""
+Carga diferida de servicios pesados
+
+Los routers importaban al cargarse los singletons de servicios
+(gemini_service, rag_service, file_processor, word_generator,
+pdf_generator, pili_integrator) y con ellos google.generativeai,
+chromadb, sentence-transformers, reportlab, python-docx, pdfplumber y
+pytesseract: varios segundos antes de poder atender la primera request.
+
+`diferido("app.services.rag_service", "rag_service")` retorna un proxy que
+importa el módulo la primera vez que se usa un atributo. El código que lo
+usa no cambia (`rag_service.buscar(...)`).
+
+Los proxies quedan registrados: `iniciar_precalentamiento()` los resuelve
+en un hilo de fondo al arrancar (PRECALENTAR_SERVICIOS), así el proceso
+acepta tráfico de inmediato y el primer usuario normalmente tampoco paga
+la carga. Una request que llega antes espera solo al servicio que necesita.
+
+El import es síncrono: los handlers async llaman `await cargar(servicio)`
+antes de usarlo, que lo resuelve en un hilo (asyncio.to_thread) y deja el
+event loop libre mientras tanto. La exclusión entre hilos la da el lock
+por módulo de importlib (con detección de deadlocks); el proxy no retiene
+un lock propio durante el import.
+"""
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SIN_RESOLVER = object()
+
+
+class ServicioDiferido:
+    """Proxy de `modulo.atributo` que importa el módulo en el primer uso"""
+
+    def __init__(self, modulo: str, atributo: str):
+        object.__setattr__(self, "_modulo", modulo)
+        object.__setattr__(self, "_atributo", atributo)
+        object.__setattr__(self, "_objeto", _SIN_RESOLVER)
+        object.__setattr__(self, "segundos_carga", None)
+
+    @property
+    def nombre(self) -> str:
+        return f"{self._modulo}.{self._atributo}"
+
+    @property
+    def cargado(self) -> bool:
+        return self._objeto is not _SIN_RESOLVER
+
+    def resolver(self) -> Any:
+        """
+        Importa el módulo. Si varios hilos llegan a la vez, importlib ejecuta
+        el módulo una sola vez y los demás esperan en su lock por módulo.
+        """
+        objeto = self._objeto
+        if objeto is _SIN_RESOLVER:
+            inicio = time.perf_counter()
+            objeto = getattr(importlib.import_module(self._modulo), self._atributo)
+            if self._objeto is _SIN_RESOLVER:
+                segundos = time.perf_counter() - inicio
+                object.__setattr__(self, "segundos_carga", segundos)
+                object.__setattr__(self, "_objeto", objeto)
+                logger.info(f"📦 {self.nombre} cargado en {segundos:.2f}s")
+        return objeto
+
+    async def resolver_async(self) -> Any:
+        """resolver() sin bloquear el event loop (el import corre en un hilo)"""
+        objeto = self._objeto
+        if objeto is _SIN_RESOLVER:
+            objeto = await asyncio.to_thread(self.resolver)
+        return objeto
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self.resolver(), nombre)
+
+    def __setattr__(self, nombre: str, valor: Any):
+        setattr(self.resolver(), nombre, valor)
+
+    def __bool__(self) -> bool:
+        # Los singletons quedan en None si su constructor falló
+        return bool(self.resolver())
+
+    def __repr__(self) -> str:
+        estado = repr(self._objeto) if self.cargado else "sin cargar"
+        return f"<ServicioDiferido {self.nombre}: {estado}>"
+
+
+_registro: Dict[Tuple[str, str], ServicioDiferido] = {}
+_registro_lock = threading.Lock()
+
+
+def diferido(modulo: str, atributo: str) -> ServicioDiferido:
+    """Proxy (compartido) del objeto `atributo` del módulo `modulo`"""
+    clave = (modulo, atributo)
+    with _registro_lock:
+        servicio = _registro.get(clave)
+        if servicio is None:
+            servicio = _registro[clave] = ServicioDiferido(modulo, atributo)
+    return servicio
+
+
+async def cargar(*servicios: ServicioDiferido):
+    """Resuelve los servicios fuera del event loop (para handlers async)"""
+    for servicio in servicios:
+        await servicio.resolver_async()
+
+
+def estado_servicios() -> Dict[str, Optional[float]]:
+    """Servicio -> segundos que tardó en cargar (None si aún no se cargó)"""
+    with _registro_lock:
+        servicios = list(_registro.values())
+    return {s.nombre: s.segundos_carga for s in servicios}
+
+
+def precalentar(servicios: Optional[Iterable[ServicioDiferido]] = None) -> Dict[str, float]:
+    """
+    Resuelve los servicios (todos los registrados por defecto). Un servicio
+    que falla se reporta y se reintenta en su primer uso real.
+    """
+    if servicios is None:
+        with _registro_lock:
+            servicios = list(_registro.values())
+
+    inicio = time.perf_counter()
+    tiempos: Dict[str, float] = {}
+    for servicio in servicios:
+        try:
+            servicio.resolver()
+            tiempos[servicio.nombre] = servicio.segundos_carga or 0.0
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo precargar {servicio.nombre}: {e}")
+    logger.info(f"🔥 Precalentamiento completo: {len(tiempos)} servicios en {time.perf_counter() - inicio:.2f}s")
+    return tiempos
+
+
+def iniciar_precalentamiento() -> threading.Thread:
+    """Precalienta en un hilo de fondo sin bloquear el arranque"""
+    hilo = threading.Thread(target=precalentar, name="precalentamiento-servicios", daemon=True)
+    hilo.start()
+    return hilo
@@ -0,0 +1,94 @@
+"""
+Cargadores por lotes con caché de identidad por request
+
+Evita el patrón N+1 en los endpoints: en lugar de un
+`db.query(Modelo).filter(Modelo.id == x).first()` por fila, los ids se
+resuelven con un único `IN (...)` y cada objeto queda cacheado durante la
+request (una segunda petición del mismo id no vuelve a la base de datos).
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.models import Cotizacion, Documento, Proyecto
+
+# SQLite admite 999 parámetros por sentencia
+TAMANO_LOTE_IN = 500
+
+
+class CargadorLotes:
+    """Cargador con caché de identidad ligado a una sesión (una request)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._identidad: Dict[Tuple[Type, Any], Any] = {}
+        self._por_proyecto: Dict[Tuple[Type, int], List[Any]] = {}
+        self.consultas = 0
+
+    def _guardar(self, modelo: Type, objetos: Iterable[Any]):
+        for objeto in objetos:
+            self._identidad[(modelo, objeto.id)] = objeto
+
+    def obtener_muchos(self, modelo: Type, ids: Iterable[Any], *opciones) -> Dict[Any, Any]:
+        """
+        Retorna {id: objeto} para los ids existentes.
+
+        Solo los ids que no están en caché se consultan, en lotes IN (...).
+        """
+        ids_unicos = list(dict.fromkeys(i for i in ids if i is not None))
+        faltantes = [i for i in ids_unicos if (modelo, i) not in self._identidad]
+
+        for inicio in range(0, len(faltantes), TAMANO_LOTE_IN):
+            lote = faltantes[inicio:inicio + TAMANO_LOTE_IN]
+            query = self.db.query(modelo).filter(modelo.id.in_(lote))
+            if opciones:
+                query = query.options(*opciones)
+            self.consultas += 1
+            self._guardar(modelo, query.all())
+
+        return {
+            i: self._identidad[(modelo, i)]
+            for i in ids_unicos
+            if (modelo, i) in self._identidad
+        }
+
+    def obtener(self, modelo: Type, id_: Any, *opciones) -> Optional[Any]:
+        return self.obtener_muchos(modelo, [id_], *opciones).get(id_)
+
+    # ------------------------------------------------------------------
+    # Relaciones de proyecto
+    # ------------------------------------------------------------------
+
+    def cotizaciones_de_proyecto(self, proyecto_id: int) -> List[Cotizacion]:
+        """Cotizaciones del proyecto en una query"""
+        clave = (Cotizacion, proyecto_id)
+        if clave not in self._por_proyecto:
+            self.consultas += 1
+            cotizaciones = self.db.query(Cotizacion).filter(
+                Cotizacion.proyecto_id == proyecto_id
+            ).order_by(Cotizacion.id).all()
+            self._guardar(Cotizacion, cotizaciones)
+            self._por_proyecto[clave] = cotizaciones
+        return self._por_proyecto[clave]
+
+    def documentos_de_proyecto(self, proyecto_id: int) -> List[Documento]:
+        """Documentos del proyecto en una query"""
+        clave = (Documento, proyecto_id)
+        if clave not in self._por_proyecto:
+            self.consultas += 1
+            documentos = self.db.query(Documento).filter(
+                Documento.proyecto_id == proyecto_id
+            ).order_by(Documento.id).all()
+            self._guardar(Documento, documentos)
+            self._por_proyecto[clave] = documentos
+        return self._por_proyecto[clave]
+
+    def proyecto(self, proyecto_id: int) -> Optional[Proyecto]:
+        return self.obtener(Proyecto, proyecto_id)
+
+
+def get_cargador(db: Session = Depends(get_db)) -> CargadorLotes:
+    """Dependency: un cargador nuevo (caché vacía) por request"""
+    return CargadorLotes(db)
@@ -0,0 +1,134 @@
+"""
+Paginación keyset (por cursor) para los endpoints de listado
+
+`.offset(n)` obliga a la base de datos a recorrer y descartar n filas: las
+páginas profundas se vuelven linealmente más lentas. Con keyset cada
+página continúa desde la última fila vista usando el índice compuesto
+(fecha, id), así que el costo es el mismo en la página 1 y en la 10.000.
+
+El cursor es opaco para el cliente (base64 de {"id", "fecha"}). La fecha
+de referencia se toma de la propia fila con una búsqueda por PK, de modo
+que la comparación usa el valor exacto almacenado (SQLite guarda las
+fechas como texto y un datetime reformateado no compararía igual); la
+fecha del cursor solo se usa si esa fila fue eliminada.
+
+Las filas con fecha NULL quedan donde las pone el ORDER BY del motor
+(PostgreSQL: antes que todas en DESC; SQLite/MySQL: después de todas) y
+la condición keyset respeta ese mismo orden, así que no se saltan.
+
+Los listados devuelven el cursor de la siguiente página en la cabecera
+X-Next-Cursor (el cuerpo conserva su formato) y, si se pide, el total
+aproximado en X-Total-Aproximado.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.orm import Query, Session
+
+CABECERA_CURSOR = "X-Next-Cursor"
+CABECERA_TOTAL = "X-Total-Aproximado"
+
+# Por debajo de este tamaño estimado se cuenta exacto: COUNT(*) es barato y
+# reltuples puede estar desactualizado (0 o -1 en tablas nunca analizadas)
+UMBRAL_ESTIMADO = 100_000
+
+# Motores donde NULL es el mayor valor al ordenar (NULLS FIRST en DESC)
+_NULOS_MAYORES = ("postgresql", "oracle")
+
+
+def codificar_cursor(fila: Any, columna_fecha: str) -> str:
+    fecha = getattr(fila, columna_fecha)
+    crudo = json.dumps({"id": fila.id, "fecha": fecha.isoformat() if fecha else None})
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[int, Optional[datetime]]:
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        fecha = datetime.fromisoformat(datos["fecha"]) if datos.get("fecha") else None
+        return int(datos["id"]), fecha
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+def paginar(
+    query: Query,
+    modelo: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    columna_fecha: str = "fecha_creacion"
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Aplica orden (fecha DESC, id DESC) y paginación.
+
+    Con `cursor` usa keyset; sin cursor y con `skip` > 0 mantiene el modo
+    offset heredado. Siempre retorna el cursor de la siguiente página.
+
+    Returns:
+        (filas, siguiente_cursor | None)
+    """
+    fecha = getattr(modelo, columna_fecha)
+    query = query.order_by(fecha.desc(), modelo.id.desc())
+
+    if cursor:
+        ultimo_id, ultima_fecha = decodificar_cursor(cursor)
+        nulos_primero = query.session.get_bind().dialect.name in _NULOS_MAYORES
+        if ultima_fecha is None:
+            # Cursor dentro del bloque de fechas NULL (ordenado por id DESC)
+            condicion = and_(fecha.is_(None), modelo.id < ultimo_id)
+            if nulos_primero:
+                condicion = or_(condicion, fecha.isnot(None))
+        else:
+            referencia = func.coalesce(
+                select(fecha).where(modelo.id == ultimo_id).correlate(None).scalar_subquery(),
+                ultima_fecha
+            )
+            # fecha <= ref acota el rango en el índice (fecha, id)
+            condicion = and_(
+                fecha <= referencia,
+                or_(fecha < referencia, modelo.id < ultimo_id)
+            )
+            if not nulos_primero:
+                condicion = or_(condicion, fecha.is_(None))
+        query = query.filter(condicion)
+    elif skip:
+        query = query.offset(skip)
+
+    filas = query.limit(limit + 1).all()
+    siguiente = codificar_cursor(filas[limit - 1], columna_fecha) if len(filas) > limit else None
+    return filas[:limit], siguiente
+
+
+def total_aproximado(db: Session, query: Query, modelo: Any, filtrado: bool) -> int:
+    """
+    Total para la UI. En PostgreSQL, sin filtros y en tablas grandes usa la
+    estadística del planificador (pg_class.reltuples) en vez de un COUNT(*)
+    completo; si la estadística no es válida o la tabla es chica, cuenta.
+    """
+    if not filtrado and db.bind.dialect.name == "postgresql":
+        estimado = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :tabla"),
+            {"tabla": modelo.__tablename__}
+        ).scalar()
+        if estimado is not None and estimado >= UMBRAL_ESTIMADO:
+            return int(estimado)
+    return query.order_by(None).count()
+
+
+def aplicar_cabeceras(
+    response: Response,
+    siguiente_cursor: Optional[str],
+    total: Optional[int] = None
+):
+    if siguiente_cursor:
+        response.headers[CABECERA_CURSOR] = siguiente_cursor
+    if total is not None:
+        response.headers[CABECERA_TOTAL] = str(total)
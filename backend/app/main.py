@@ -8,22 +8,17 @@ import uvicorn
 from typing import List, Optional, Dict, Any
 import logging
 import json
+import threading
 from datetime import datetime
 import sys
 
+# Import Configuration
+from app.core.config import settings, configurar_logging
+
 # Configure Logging
-logging.basicConfig(level=logging.INFO)
+configurar_logging()
 logger = logging.getLogger(__name__)
 
-# Import Configuration
-try:
-    from app.core.config import settings, validate_gemini_key, get_gemini_api_key
-    from app.services.gemini_service import gemini_service
-    TIENE_GEMINI_SERVICE = True
-except ImportError as e:
-    logger.error(f"Error loading core services: {e}")
-    TIENE_GEMINI_SERVICE = False
-
 # Import pydantic models
 from pydantic import BaseModel
 
@@ -67,6 +62,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Aproximado"],
+)
+
+# Límite de tamaño de uploads aplicado mientras llega el cuerpo (antes del parseo multipart)
+from app.services.upload_storage import LimiteUploadMiddleware
+
+app.add_middleware(
+    LimiteUploadMiddleware,
+    rutas=["/api/upload", "/api/documentos/upload"],
+    max_bytes=settings.MAX_FILE_SIZE,
 )
 
 # ═══════════════════════════════════════════════════════════════
@@ -94,6 +99,7 @@ from app.routers import clientes
 from app.routers import admin
 from app.routers import calculos
 from app.routers import templates
+from app.routers import busqueda
 
 # Include Routers
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat PILI"])
@@ -107,9 +113,60 @@ app.include_router(clientes.router, prefix="/api/clientes", tags=["Clientes"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(calculos.router, prefix="/api/calculos", tags=["Calculos"])
 app.include_router(templates.router, prefix="/api/templates", tags=["Templates"])
+app.include_router(busqueda.router, prefix="/api/search", tags=["Búsqueda"])
 
 logger.info("✅ All routers registered successfully.")
 
+# ═══════════════════════════════════════════════════════════════
+# WARM-UP
+# ═══════════════════════════════════════════════════════════════
+# Los routers usan proxies de app.core.lazy: Gemini, ChromaDB, OCR,
+# Word/PDF se importan en el primer uso. Con PRECALENTAR_SERVICIOS se
+# precargan en segundo plano mientras la app ya atiende requests.
+
+@app.on_event("startup")
+async def precalentar_servicios():
+    if settings.PRECALENTAR_SERVICIOS:
+        from app.core.lazy import iniciar_precalentamiento
+        iniciar_precalentamiento()
+
+
+@app.on_event("startup")
+async def iniciar_metricas_dashboard():
+    # Primer recalculo de métricas en segundo plano, antes de la primera visita al panel
+    from app.services.dashboard_metrics import get_dashboard_metrics
+    get_dashboard_metrics().iniciar()
+
+
+@app.on_event("startup")
+async def iniciar_cola_documentos():
+    # Workers de procesamiento de documentos (retoman trabajos pendientes sin esperar un upload)
+    from app.services.document_jobs import get_document_job_queue
+    get_document_job_queue().iniciar()
+
+
+@app.on_event("startup")
+async def reanudar_ingestas_rag():
+    # Carga el motor RAG (lento) en segundo plano y re-encola las ingestas pendientes
+    if settings.RAG_REANUDAR_INGESTAS:
+        def _reanudar():
+            try:
+                from app.services.professional.rag.rag_engine import get_rag_engine
+                resultado = get_rag_engine().resume_ingestion()
+                if resultado.get("resumed"):
+                    logger.info(f"📚 Ingestas RAG reanudadas: {resultado['resumed']}")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron reanudar las ingestas RAG: {e}")
+
+        threading.Thread(target=_reanudar, name="reanudar-ingestas-rag", daemon=True).start()
+
+
+@app.on_event("startup")
+async def iniciar_libro_tokens():
+    # Consolida el libro de consumo de tokens y libera reservas vencidas
+    from app.services.token_ledger import get_consolidador
+    get_consolidador().iniciar()
+
 # ═══════════════════════════════════════════════════════════════
 # ROOT ENDPOINT
 # ═══════════════════════════════════════════════════════════════
@@ -143,17 +200,21 @@ except:
 
 @app.post("/api/upload")
 async def upload_file(file: UploadFile = File(...)):
+    # El cuerpo ya fue acotado por LimiteUploadMiddleware; aquí se controla el archivo
+    from app.services.upload_storage import ArchivoDemasiadoGrandeError, guardar_upload_streaming
+
     try:
-        file_path = upload_path / file.filename
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        file_path = upload_path / Path(file.filename).name
+        size = await guardar_upload_streaming(file, file_path, settings.MAX_FILE_SIZE)
         
         return {
             "success": True,
             "filename": file.filename,
-            "path": str(file_path)
+            "path": str(file_path),
+            "size": size
         }
+    except ArchivoDemasiadoGrandeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error uploading file: {e}")
         raise HTTPException(status_code=500, detail=str(e))
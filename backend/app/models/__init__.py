@@ -6,11 +6,16 @@ from app.models.cotizacion import Cotizacion
 from app.models.documento import Documento
 from app.models.item import Item
 from app.models.cliente import Cliente
+from app.models.secuencia import SecuenciaNumeracion
+from app.models.consumo_tokens import ConsumoTokens, ResumenConsumoTokens
 
 __all__ = [
     "Proyecto",
     "Cotizacion",
     "Documento",
     "Item",
-    "Cliente"
+    "Cliente",
+    "SecuenciaNumeracion",
+    "ConsumoTokens",
+    "ResumenConsumoTokens"
 ]
\ No newline at end of file
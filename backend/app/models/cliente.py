@@ -2,7 +2,7 @@
 Modelo: Cliente
 Gestión de clientes para cotizaciones y proyectos
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -13,6 +13,10 @@ class Cliente(Base):
     Almacena información de clientes para reutilizar en cotizaciones y proyectos
     """
     __tablename__ = "clientes"
+    __table_args__ = (
+        # Paginación keyset: ORDER BY fecha_creacion DESC, id DESC
+        Index("ix_clientes_fecha_creacion_id", "fecha_creacion", "id"),
+    )
 
     # Campos principales
     id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,48 @@
+"""
+Modelos: ConsumoTokens (libro de consumo) y ResumenConsumoTokens (consolidado)
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Date, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ConsumoTokens(Base):
+    """
+    Movimiento del libro de tokens (solo se agregan filas)
+    - confirmado: consumo directo o reserva confirmada (tokens reales)
+    - reservado: tokens apartados para una llamada en curso (streaming)
+    - liberado: reserva cancelada o vencida
+    El saldo vive en usuarios.tokens_usados y se mueve con UPDATEs
+    condicionales; ver services/token_ledger.py
+    """
+    __tablename__ = "consumos_tokens"
+    __table_args__ = (
+        # Consolidación: movimientos confirmados aún no resumidos
+        Index("ix_consumos_tokens_estado_consolidado", "estado", "consolidado"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, nullable=False, index=True)
+    tokens = Column(Integer, nullable=False)
+    tokens_reservados = Column(Integer, nullable=False, default=0)
+    operacion = Column(String(100), nullable=False, default="")
+    estado = Column(String(20), nullable=False, default="confirmado")
+    consolidado = Column(Boolean, nullable=False, default=False)
+    fecha = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    fecha_cierre = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ConsumoTokens(usuario_id={self.usuario_id}, tokens={self.tokens}, estado='{self.estado}')>"
+
+
+class ResumenConsumoTokens(Base):
+    """Tokens confirmados por día y operación (lo alimenta la consolidación)"""
+    __tablename__ = "resumen_consumo_tokens"
+
+    dia = Column(Date, primary_key=True)
+    operacion = Column(String(100), primary_key=True)
+    tokens = Column(Integer, nullable=False, default=0)
+    operaciones = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResumenConsumoTokens(dia={self.dia}, operacion='{self.operacion}', tokens={self.tokens})>"
@@ -1,7 +1,7 @@
 """
 Modelo: Cotizacion
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -12,6 +12,10 @@ class Cotizacion(Base):
     Representa una cotización generada para un proyecto
     """
     __tablename__ = "cotizaciones"
+    __table_args__ = (
+        # Paginación keyset: ORDER BY fecha_creacion DESC, id DESC
+        Index("ix_cotizaciones_fecha_creacion_id", "fecha_creacion", "id"),
+    )
     
     # Campos principales
     id = Column(Integer, primary_key=True, index=True)
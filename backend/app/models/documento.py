@@ -1,7 +1,7 @@
 """
 Modelo: Documento
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, SmallInteger
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, SmallInteger, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -12,6 +12,16 @@ class Documento(Base):
     Representa un documento subido y procesado
     """
     __tablename__ = "documentos"
+    __table_args__ = (
+        # Paginación keyset: ORDER BY fecha_subida DESC, id DESC
+        Index("ix_documentos_fecha_subida_id", "fecha_subida", "id"),
+    )
+
+    # Estados de procesamiento (columna procesado)
+    PENDIENTE = 0
+    PROCESADO = 1
+    ERROR = 2
+    PROCESANDO = 3
     
     # Campos principales
     id = Column(Integer, primary_key=True, index=True)
@@ -26,7 +36,7 @@ class Documento(Base):
     metadata_extraida = Column(JSON, nullable=True)
     
     # Estado de procesamiento
-    # 0: pendiente, 1: procesado, 2: error
+    # 0: pendiente, 1: procesado, 2: error, 3: procesando (cola en segundo plano)
     procesado = Column(SmallInteger, default=0, index=True)
     mensaje_error = Column(Text, nullable=True)
     
@@ -48,14 +58,14 @@ class Documento(Base):
     
     def marcar_como_procesado(self, contenido: str = None):
         """Marcar documento como procesado"""
-        self.procesado = 1
+        self.procesado = self.PROCESADO
         self.fecha_procesamiento = func.now()
         if contenido:
             self.contenido_texto = contenido
     
     def marcar_como_error(self, mensaje: str):
         """Marcar documento con error"""
-        self.procesado = 2
+        self.procesado = self.ERROR
         self.mensaje_error = mensaje
         self.fecha_procesamiento = func.now()
     
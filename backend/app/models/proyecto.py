@@ -1,7 +1,7 @@
 """
 Modelo: Proyecto
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON, Numeric, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, JSON, Numeric, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -20,6 +20,10 @@ class Proyecto(Base):
     Representa un proyecto del cliente
     """
     __tablename__ = "proyectos"
+    __table_args__ = (
+        # Paginación keyset: ORDER BY fecha_creacion DESC, id DESC
+        Index("ix_proyectos_fecha_creacion_id", "fecha_creacion", "id"),
+    )
     
     # Campos principales
     id = Column(Integer, primary_key=True, index=True)
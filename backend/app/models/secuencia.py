@@ -0,0 +1,25 @@
+"""
+Modelo: SecuenciaNumeracion (contadores de numeración correlativa)
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class SecuenciaNumeracion(Base):
+    """
+    Contador por prefijo (ej. COT-202610)
+    Se incrementa de forma atómica con UPDATE/UPSERT ... RETURNING;
+    ver services/numeracion.py
+    """
+    __tablename__ = "secuencias_numeracion"
+    
+    prefijo = Column(String(40), primary_key=True)
+    ultimo = Column(Integer, nullable=False, default=0)
+    fecha_modificacion = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+    
+    def __repr__(self):
+        return f"<SecuenciaNumeracion(prefijo='{self.prefijo}', ultimo={self.ultimo})>"
@@ -2,7 +2,7 @@
 Modelo: Usuario
 Usuarios del sistema con planes de suscripción y límites de tokens
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
@@ -16,6 +16,10 @@ class Usuario(Base):
     y límites de tokens para uso de IAs
     """
     __tablename__ = "usuarios"
+    __table_args__ = (
+        # Paginación keyset: ORDER BY fecha_creacion DESC, id DESC
+        Index("ix_usuarios_fecha_creacion_id", "fecha_creacion", "id"),
+    )
 
     # Campos principales
     id = Column(Integer, primary_key=True, index=True)
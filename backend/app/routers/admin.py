@@ -2,15 +2,17 @@
 Router Admin - Panel de administración
 Endpoints para dashboard, métricas y configuración de servicios
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import secrets
 import logging
 
 from app.core.database import get_db
+from app.core.pagination import paginar, total_aproximado
 from app.core.features import (
     FeatureFlags,
     SERVICIOS_CONFIG,
@@ -21,6 +23,7 @@ from app.models.usuario import Usuario
 from app.models.cotizacion import Cotizacion
 from app.models.proyecto import Proyecto
 from app.services.token_manager import TokenManager
+from app.services.dashboard_metrics import get_dashboard_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +55,6 @@ def verificar_admin(credentials: HTTPBasicCredentials = Depends(security)):
 
 @router.get("/dashboard")
 async def get_dashboard(
-    db: Session = Depends(get_db),
     admin: str = Depends(verificar_admin)
 ):
     """
@@ -61,21 +63,28 @@ async def get_dashboard(
     Requiere autenticación básica: Admin/Admin1234
     """
     try:
+        # Métricas materializadas (contadores en memoria, sin COUNT por request)
+        metricas = get_dashboard_metrics()
+        snapshot = await run_in_threadpool(metricas.snapshot)
+
         # Métricas de usuarios
-        total_usuarios = db.query(Usuario).count()
-        usuarios_free = db.query(Usuario).filter(Usuario.plan == "free").count()
-        usuarios_pro = db.query(Usuario).filter(Usuario.plan == "pro").count()
-        usuarios_enterprise = db.query(Usuario).filter(Usuario.plan == "enterprise").count()
+        total_usuarios = snapshot["usuarios"]["total"]
+        usuarios_free = snapshot["usuarios"]["por_plan"].get("free", 0)
+        usuarios_pro = snapshot["usuarios"]["por_plan"].get("pro", 0)
+        usuarios_enterprise = snapshot["usuarios"]["por_plan"].get("enterprise", 0)
 
         # Métricas de cotizaciones
-        total_cotizaciones = db.query(Cotizacion).count()
+        total_cotizaciones = snapshot["cotizaciones"]["total"]
 
         # Métricas de proyectos
-        total_proyectos = db.query(Proyecto).count()
+        total_proyectos = snapshot["proyectos"]["total"]
+        proyectos_activos = sum(
+            snapshot["proyectos"]["por_estado"].get(estado, 0)
+            for estado in ("planificacion", "en_progreso")
+        )
 
-        # Métricas de tokens (si está habilitado)
-        token_manager = TokenManager(db)
-        estadisticas_tokens = token_manager.get_estadisticas_globales()
+        # Métricas de tokens
+        estadisticas_tokens = metricas.estadisticas_tokens(snapshot)
 
         # Ingresos estimados
         ingresos_mensuales = (usuarios_pro * 29.99) + (usuarios_enterprise * 299)
@@ -86,13 +95,16 @@ async def get_dashboard(
         # Servicios habilitados
         servicios = SERVICIOS_CONFIG
 
-        # Actividad reciente (últimas cotizaciones)
+        # Actividad reciente (cotizaciones de hoy vs. ayer, por día UTC)
         from datetime import datetime, timedelta
-        hace_24h = datetime.utcnow() - timedelta(hours=24)
-
-        cotizaciones_hoy = db.query(Cotizacion).filter(
-            Cotizacion.fecha_creacion >= hace_24h
-        ).count()
+        hoy = datetime.utcnow().date()
+        por_dia = snapshot["cotizaciones"]["por_dia"]
+        cotizaciones_hoy = por_dia.get(hoy.isoformat(), 0)
+        cotizaciones_ayer = por_dia.get((hoy - timedelta(days=1)).isoformat(), 0)
+        if cotizaciones_ayer:
+            cambio_24h = f"{(cotizaciones_hoy - cotizaciones_ayer) / cotizaciones_ayer * 100:+.0f}%"
+        else:
+            cambio_24h = "+0%" if not cotizaciones_hoy else "+100%"
 
         return {
             "exito": True,
@@ -111,11 +123,13 @@ async def get_dashboard(
                 "documentos": {
                     "total": total_cotizaciones,
                     "hoy": cotizaciones_hoy,
-                    "cambio_24h": "+34%"  # TODO: calcular real
+                    "cambio_24h": cambio_24h,
+                    "por_dia": por_dia
                 },
                 "proyectos": {
                     "total": total_proyectos,
-                    "activos": total_proyectos  # TODO: filtrar por estado
+                    "activos": proyectos_activos,
+                    "por_estado": snapshot["proyectos"]["por_estado"]
                 },
                 "tokens": estadisticas_tokens,
                 "ingresos": {
@@ -125,6 +139,7 @@ async def get_dashboard(
             },
             "features": features,
             "servicios": servicios,
+            "metricas_actualizadas": snapshot["actualizado"],
             "timestamp": datetime.utcnow().isoformat()
         }
 
@@ -139,17 +154,21 @@ async def get_dashboard(
 async def get_usuarios(
     db: Session = Depends(get_db),
     admin: str = Depends(verificar_admin),
-    limit: int = 50,
-    offset: int = 0
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None
 ):
-    """Lista todos los usuarios con paginación"""
+    """Lista todos los usuarios con paginación (offset o cursor keyset)"""
     try:
-        usuarios = db.query(Usuario).offset(offset).limit(limit).all()
-        total = db.query(Usuario).count()
+        query = db.query(Usuario)
+        usuarios, siguiente_cursor = paginar(query, Usuario, limit, cursor=cursor, skip=offset)
+        # Exacto salvo en tablas grandes de PostgreSQL (estadística del planificador)
+        total = total_aproximado(db, query, Usuario, filtrado=False)
 
         return {
             "exito": True,
             "total": total,
+            "siguiente_cursor": siguiente_cursor,
             "usuarios": [
                 {
                     "id": u.id,
@@ -164,6 +183,8 @@ async def get_usuarios(
                 for u in usuarios
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error al listar usuarios: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -231,7 +252,7 @@ async def get_estadisticas_tokens(
     """Obtiene estadísticas detalladas de tokens"""
     try:
         token_manager = TokenManager(db)
-        stats = token_manager.get_estadisticas_globales()
+        stats = await run_in_threadpool(token_manager.get_estadisticas_globales)
 
         return {
             "exito": True,
@@ -0,0 +1,55 @@
+"""
+Router: Búsqueda
+Búsqueda full-text rankeada sobre clientes, cotizaciones y proyectos
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.services.search_index import ENTIDADES, get_search_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/")
+async def buscar(
+    q: str = Query(..., min_length=1, description="Texto a buscar (prefijos, sin importar tildes)"),
+    entidades: Optional[str] = Query(None, description="Filtrar: cliente,cotizacion,proyecto"),
+    limit: int = Query(20, ge=1, le=100, description="Resultados por página"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto por la página anterior"),
+    db: Session = Depends(get_db)
+):
+    """
+    Búsqueda rankeada con paginación keyset
+
+    Args:
+        q: Texto a buscar (RUC por prefijo, nombres sin tildes)
+        entidades: Lista separada por comas de entidades a incluir
+        limit: Máximo de resultados
+        cursor: Cursor de la página anterior (siguiente_cursor)
+
+    Returns:
+        Resultados ordenados por relevancia y cursor de la siguiente página
+    """
+    seleccion = None
+    if entidades:
+        seleccion = [e.strip() for e in entidades.split(",") if e.strip()]
+        invalidas = [e for e in seleccion if e not in ENTIDADES]
+        if invalidas:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Entidades no válidas: {invalidas}. Permitidas: {list(ENTIDADES)}"
+            )
+
+    try:
+        resultado = get_search_index().buscar(db, q, entidades=seleccion, limite=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "query": q,
+        "total_pagina": len(resultado["resultados"]),
+        **resultado
+    }
@@ -32,8 +32,8 @@ y Google Bard, pero especializada 100% en servicios eléctricos peruanos.
 - Sugerencias de mejoras ✅
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Body
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Body, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from app.core.database import get_db
@@ -43,9 +43,10 @@ from app.schemas.cotizacion import (
     ChatResponse,
     CotizacionResponse
 )
-from app.services.gemini_service import gemini_service
+from app.core.lazy import cargar, diferido
+from app.services.llm_cache import llm_cache
+from app.services.llm_client import ClienteDesconectadoError
 from app.services.pili_brain import PILIBrain
-from app.services.pili_integrator import pili_integrator  # ✅ NUEVO: Integrador completo
 # 📦 NUEVO: Módulos de Generación de Documentos (Refactoring v3.0)
 from app.documents.cotizacion_simple import generar_preview_cotizacion_simple_editable
 from app.documents.cotizacion_compleja import generar_preview_cotizacion_compleja_editable
@@ -56,8 +57,10 @@ from app.documents.informe_ejecutivo import generar_preview_informe_ejecutivo_ap
 from app.documents.informe_simple import generar_preview_informe
 from app.models.cotizacion import Cotizacion
 from app.models.item import Item
+from contextlib import aclosing
 from datetime import datetime, timedelta
 from pathlib import Path
+import asyncio
 import logging
 import os
 import shutil
@@ -67,6 +70,10 @@ import tempfile
 
 logger = logging.getLogger(__name__)
 
+# Servicios pesados (Gemini, integrador con Word/PDF): se cargan en el primer uso
+gemini_service = diferido("app.services.gemini_service", "gemini_service")
+pili_integrator = diferido("app.services.pili_integrator", "pili_integrator")  # ✅ NUEVO: Integrador completo
+
 # Inicializar PILIBrain para generación offline
 pili_brain = PILIBrain()
 
@@ -723,24 +730,9 @@ def obtener_botones_para_etapa(tipo_flujo: str, etapa: str) -> List[str]:
     return botones_config.get(etapa, [])
 
 def generar_numero_cotizacion(db: Session) -> str:
-    """Generar número único de cotización"""
-    fecha = datetime.now()
-    prefijo = f"COT-{fecha.strftime('%Y%m')}"
-    
-    ultima = db.query(Cotizacion).filter(
-        Cotizacion.numero.like(f"{prefijo}%")
-    ).order_by(Cotizacion.numero.desc()).first()
-    
-    if ultima:
-        try:
-            ultimo_num = int(ultima.numero.split('-')[-1])
-            nuevo_num = ultimo_num + 1
-        except:
-            nuevo_num = 1
-    else:
-        nuevo_num = 1
-    
-    return f"{prefijo}-{nuevo_num:04d}"
+    """Generar número único de cotización (contador atómico, ver services/numeracion.py)"""
+    from app.services.numeracion import siguiente_numero_cotizacion
+    return siguiente_numero_cotizacion()
 
 # ═══════════════════════════════════════════════════════════════
 # 🤖 ENDPOINTS PILI CORE (RESTAURADOS)
@@ -1250,8 +1242,276 @@ async def obtener_botones_contextuales(
             detail=f"Error: {str(e)}"
         )
 
+
+def _preparar_integrador(
+    mensaje: str,
+    historial: List[Dict],
+    contexto_adicional: Optional[str]
+) -> tuple:
+    """Datos acumulados del historial y servicio forzado para el PILIIntegrator"""
+    # ✅ NUEVO: Acumular datos de mensajes anteriores del usuario
+    datos_acumulados = {}
+    servicio_detectado = pili_brain.detectar_servicio(mensaje) if pili_brain else "electrico-residencial"
+
+    for msg in historial:
+        # Solo procesar mensajes del usuario
+        if msg.get('tipo') == 'usuario' or msg.get('role') == 'user':
+            contenido = msg.get('mensaje', msg.get('content', ''))
+            if contenido:
+                # Extraer datos de cada mensaje del usuario
+                datos_msg = pili_brain.extraer_datos(contenido, servicio_detectado) if pili_brain else {}
+                datos_acumulados.update(datos_msg)
+
+    logger.info(f"📊 Datos acumulados del historial: {datos_acumulados}")
+
+    # ✅ NUEVO: Detectar si se debe forzar ITSE (ROBUSTECIDO)
+    servicio_forzado = None
+    ctx_safe = (contexto_adicional or "").lower()
+    if "itse" in ctx_safe:
+        servicio_forzado = "itse"
+        logger.info("🔒 Contexto ITSE detectado: Forzando servicio a 'itse'")
+
+    return datos_acumulados, servicio_forzado
+
+
+def _conversacion_desde_integrador(resultado_pili: Dict[str, Any], tipo_flujo: str) -> Dict[str, Any]:
+    """Respuesta, datos_generados y botones a partir del resultado del PILIIntegrator"""
+    botones_sugeridos = []
+    datos_generados = {}
+
+    if resultado_pili.get("success"):
+        respuesta = {'mensaje': resultado_pili.get('respuesta', '')}
+
+        # Extraer datos generados según tipo
+        datos_generados = resultado_pili.get('datos_generados', {})
+
+        # ✅ NUEVO: Actualizar botones desde especialistas locales
+        # Los especialistas locales retornan 'botones', no 'botones_sugeridos'
+        botones_especialista = resultado_pili.get('botones') or resultado_pili.get('botones_sugeridos')
+        if botones_especialista:
+            logger.info(f"✅ Usando {len(botones_especialista)} botones del especialista local")
+            botones_sugeridos = botones_especialista
+
+    else:
+        # Fallback si PILIIntegrator falla
+        logger.warning("⚠️ PILIIntegrator falló, usando respuesta básica")
+        respuesta = {'mensaje': f"Entiendo que necesitas ayuda con {tipo_flujo}. ¿Podrías darme más detalles?"}
+
+    return {
+        "respuesta": respuesta,
+        "datos_generados": datos_generados,
+        "botones_sugeridos": botones_sugeridos
+    }
+
+
+def _conversacion_pili_brain(mensaje: str, error: Exception) -> Dict[str, Any]:
+    """🧠 FALLBACK FINAL: PILIBrain básico"""
+    logger.warning(f"⚠️ Error con PILIIntegrator, usando PILIBrain: {error}")
+    servicio_detectado = pili_brain.detectar_servicio(mensaje)
+    cotizacion_data = pili_brain.generar_cotizacion(mensaje, servicio_detectado, "simple")
+    return {
+        "respuesta": {'mensaje': cotizacion_data['conversacion']['mensaje_pili']},
+        "datos_generados": {},
+        "botones_sugeridos": []
+    }
+
+
+def _texto_respuesta(respuesta: Any) -> str:
+    return respuesta.get('mensaje', '') if isinstance(respuesta, dict) else str(respuesta)
+
+
+async def _procesar_con_integrador(
+    tipo_flujo: str,
+    mensaje: str,
+    historial: List[Dict],
+    contexto_adicional: Optional[str],
+    conversation_state: Optional[Dict],
+    request: Optional[Request] = None
+) -> Dict[str, Any]:
+    """
+    Conversación vía PILIIntegrator (fallback final: PILIBrain básico).
+
+    Retorna respuesta, datos_generados y botones del especialista.
+    Con `request`, la llamada LLM se cancela si el cliente se desconecta
+    (ClienteDesconectadoError).
+    """
+    # ✅ USAR PILI INTEGRATOR PARA CONVERSACION INTELIGENTE
+    try:
+        # Usar PILIIntegrator que maneja conversación brillante para todos los tipos
+        logger.info(f"🤖 Usando PILIIntegrator para {tipo_flujo}")
+        datos_acumulados, servicio_forzado = _preparar_integrador(mensaje, historial, contexto_adicional)
+
+        await cargar(pili_integrator)
+        resultado_pili = await pili_integrator.procesar_solicitud_completa(
+            mensaje=mensaje,
+            tipo_flujo=tipo_flujo,
+            historial=historial,
+            generar_documento=False,  # Solo conversación, no generar archivo aún
+            datos_acumulados=datos_acumulados,  # ✅ NUEVO: Pasar datos acumulados
+            conversation_state=conversation_state,  # ✅ NUEVO: Pasar estado de conversación
+            servicio_forzado=servicio_forzado,  # ✅ NUEVO: Forzar servicio ITSE
+            request=request
+        )
+        return _conversacion_desde_integrador(resultado_pili, tipo_flujo)
+
+    except ClienteDesconectadoError:
+        raise
+    except Exception as e:
+        return _conversacion_pili_brain(mensaje, e)
+
+
+async def _procesar_con_integrador_stream(
+    tipo_flujo: str,
+    mensaje: str,
+    historial: List[Dict],
+    contexto_adicional: Optional[str],
+    conversation_state: Optional[Dict]
+):
+    """
+    Igual que _procesar_con_integrador, pero el texto sale por fragmentos.
+
+    Emite ("token", texto) por cada fragmento a medida que llega y al final
+    ("conversacion", {...}) con respuesta, datos_generados y botones. Si el
+    integrador falla antes del primer fragmento se usa el mismo fallback
+    que el endpoint JSON y su texto se emite como un fragmento.
+    """
+    emitido = False
+    try:
+        logger.info(f"🤖 Usando PILIIntegrator (stream) para {tipo_flujo}")
+        datos_acumulados, servicio_forzado = _preparar_integrador(mensaje, historial, contexto_adicional)
+
+        await cargar(pili_integrator)
+        resultado_pili = {}
+        async for evento in pili_integrator.procesar_solicitud_stream(
+            mensaje=mensaje,
+            tipo_flujo=tipo_flujo,
+            historial=historial,
+            datos_acumulados=datos_acumulados,
+            conversation_state=conversation_state,
+            servicio_forzado=servicio_forzado
+        ):
+            if evento["tipo"] == "token":
+                emitido = True
+                yield "token", evento["texto"]
+            else:
+                resultado_pili = evento
+        conversacion = _conversacion_desde_integrador(resultado_pili, tipo_flujo)
+
+    except Exception as e:
+        if emitido:
+            raise
+        conversacion = _conversacion_pili_brain(mensaje, e)
+
+    if not emitido:
+        yield "token", _texto_respuesta(conversacion["respuesta"])
+    yield "conversacion", conversacion
+
+
+def _generar_preview_contextualizado(
+    tipo_flujo: str,
+    generar_html: bool,
+    datos_cliente: Optional[Dict],
+    nombre_pili: str,
+    datos_generados: Dict[str, Any]
+) -> tuple:
+    """Genera la vista previa HTML y los datos estructurados para edición"""
+    # 🆕 NUEVO: Generar vista previa HTML si se solicita
+    html_preview = None
+    if generar_html and tipo_flujo.startswith("cotizacion"):
+        # Simular datos de cotización para preview
+        items_demo = [
+            {"descripcion": "Punto de luz LED 18W", "cantidad": 8, "unidad": "pto", "precio_unitario": 30.00},
+            {"descripcion": "Tomacorriente doble", "cantidad": 6, "unidad": "pto", "precio_unitario": 35.00},
+            {"descripcion": "Cable THW 2.5mm²", "cantidad": 50, "unidad": "m", "precio_unitario": 4.00}
+        ]
+        # Calcular totales dinámicamente
+        subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items_demo)
+        igv = subtotal * 0.18
+        total = subtotal + igv
+
+        datos_preview = {
+            "items": items_demo,
+            "cliente": datos_cliente if datos_cliente and datos_cliente.get("nombre") else {"nombre": "Cliente Demo"},
+            "proyecto": "Instalación Eléctrica",
+            "subtotal": round(subtotal, 2),
+            "igv": round(igv, 2),
+            "total": round(total, 2)
+        }
+
+        # 🔄 Seleccionar generador según el tipo específico
+        if "compleja" in tipo_flujo:
+            html_preview = generar_preview_cotizacion_compleja_editable(datos_preview, nombre_pili)
+        else:
+            html_preview = generar_preview_cotizacion_simple_editable(datos_preview, nombre_pili)
+
+    elif generar_html and tipo_flujo.startswith("proyecto"):
+        # Generar preview para proyectos
+        items_proyecto = [
+            {"descripcion": "Fase 1: Planificación y diseño", "cantidad": 1, "unidad": "fase", "precio_unitario": 2500.00},
+            {"descripcion": "Fase 2: Instalación eléctrica", "cantidad": 1, "unidad": "fase", "precio_unitario": 5000.00},
+            {"descripcion": "Fase 3: Pruebas y certificación", "cantidad": 1, "unidad": "fase", "precio_unitario": 1500.00}
+        ]
+        # Calcular totales dinámicamente
+        subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items_proyecto)
+        igv = subtotal * 0.18
+        total = subtotal + igv
+
+        datos_preview = {
+            "items": items_proyecto,
+            "cliente": datos_cliente if datos_cliente and datos_cliente.get("nombre") else {"nombre": "Cliente Demo"},
+            "proyecto": "Proyecto Eléctrico",
+            "nombre_proyecto": "Instalación Industrial",
+            "duracion": "3 meses",
+            "subtotal": round(subtotal, 2),
+            "igv": round(igv, 2),
+            "total": round(total, 2)
+        }
+
+        # 🔄 Seleccionar generador según complejidad
+        if "complejo" in tipo_flujo or "pmi" in tipo_flujo:
+             html_preview = generar_preview_proyecto_complejo_pmi_editable(datos_preview, nombre_pili)
+        else:
+             html_preview = generar_preview_proyecto_simple_editable(datos_preview, nombre_pili)
+
+    elif generar_html and tipo_flujo.startswith("informe"):
+        datos_preview = {
+            "titulo": "Informe Técnico Eléctrico",
+            "cliente": "Cliente Demo"
+        }
+
+        # 🔄 Seleccionar generador según tipo de informe
+        if "tecnico" in tipo_flujo:
+            html_preview = generar_preview_informe_tecnico_editable(datos_preview, nombre_pili)
+        elif "ejecutivo" in tipo_flujo or "apa" in tipo_flujo:
+            html_preview = generar_preview_informe_ejecutivo_apa_editable(datos_preview, nombre_pili)
+        else:
+            html_preview = generar_preview_informe(datos_preview, nombre_pili)
+
+    # 🆕 CRÍTICO: Enviar datos estructurados al frontend para edición
+    datos_estructurados = None
+    if generar_html and tipo_flujo.startswith("cotizacion"):
+        # Usar datos de PILIIntegrator si están disponibles
+        if datos_generados:
+            datos_estructurados = datos_generados
+        else:
+            datos_estructurados = datos_preview
+    elif generar_html and tipo_flujo.startswith("proyecto"):
+        if datos_generados:
+            datos_estructurados = datos_generados
+        else:
+            datos_estructurados = datos_preview
+    elif generar_html and tipo_flujo.startswith("informe"):
+        if datos_generados:
+            datos_estructurados = datos_generados
+        else:
+            datos_estructurados = datos_preview
+
+    return html_preview, datos_estructurados
+
+
 @router.post("/chat-contextualizado")
 async def chat_contextualizado(
+    request: Request,
     tipo_flujo: str = Body(...),
     mensaje: str = Body(...),
     historial: Optional[List[Dict]] = Body([]),
@@ -1283,35 +1543,8 @@ async def chat_contextualizado(
                 detail=f"Tipo de flujo '{tipo_flujo}' no soportado por PILI"
             )
 
-        # Construir prompt especializado PILI
         nombre_pili = contexto.get("nombre_pili", "PILI")
-        prompt_especializado = f"""
-        Eres {nombre_pili}.
-
-        {contexto.get('personalidad', '')}
-
-        {contexto.get('rol_ia', '')}
-
-        {contexto.get('prompt_especializado', '')}
-
-        CONTEXTO DEL PROYECTO:
-        {contexto_adicional}
-
-        HISTORIAL DE CONVERSACIÓN:
-        """
-
-        # Agregar historial al prompt
-        for i, msg in enumerate(historial[-5:]):  # Últimos 5 mensajes
-            role = msg.get('role', 'user')
-            content = msg.get('content', msg.get('mensaje', ''))
-            prompt_especializado += f"\n{role.upper()}: {content}"
-
-        prompt_especializado += f"\n\nUSUARIO: {mensaje}\n\nRESPUESTA DE {nombre_pili}:"
 
-        # ✅ Inicializar variables
-        botones_sugeridos = []  # Inicializar para evitar UnboundLocalError
-        datos_generados = {}
-        
         # 🔥 CAJA NEGRA ITSE - Usar PILIITSEChatBot independiente
         if tipo_flujo == 'itse':
             try:
@@ -1346,68 +1579,12 @@ async def chat_contextualizado(
                 traceback.print_exc()
                 # Si falla, continuar con flujo normal
         
-        # ✅ USAR PILI INTEGRATOR PARA CONVERSACION INTELIGENTE
-        try:
-            # Usar PILIIntegrator que maneja conversación brillante para todos los tipos
-            logger.info(f"🤖 Usando PILIIntegrator para {tipo_flujo}")
-            
-            # ✅ NUEVO: Acumular datos de mensajes anteriores del usuario
-            datos_acumulados = {}
-            servicio_detectado = pili_brain.detectar_servicio(mensaje) if pili_brain else "electrico-residencial"
-            
-            for msg in historial:
-                # Solo procesar mensajes del usuario
-                if msg.get('tipo') == 'usuario' or msg.get('role') == 'user':
-                    contenido = msg.get('mensaje', msg.get('content', ''))
-                    if contenido:
-                        # Extraer datos de cada mensaje del usuario
-                        datos_msg = pili_brain.extraer_datos(contenido, servicio_detectado) if pili_brain else {}
-                        datos_acumulados.update(datos_msg)
-            
-            logger.info(f"📊 Datos acumulados del historial: {datos_acumulados}")
-            logger.info(f"📊 Datos acumulados del historial: {datos_acumulados}")
-            
-            # ✅ NUEVO: Detectar si se debe forzar ITSE (ROBUSTECIDO)
-            servicio_forzado = None
-            ctx_safe = (contexto_adicional or "").lower()
-            if "itse" in ctx_safe:
-                servicio_forzado = "itse"
-                logger.info("🔒 Contexto ITSE detectado: Forzando servicio a 'itse'")
-            
-            resultado_pili = await pili_integrator.procesar_solicitud_completa(
-                mensaje=mensaje,
-                tipo_flujo=tipo_flujo,
-                historial=historial,
-                generar_documento=False,  # Solo conversación, no generar archivo aún
-                datos_acumulados=datos_acumulados,  # ✅ NUEVO: Pasar datos acumulados
-                conversation_state=conversation_state,  # ✅ NUEVO: Pasar estado de conversación
-                servicio_forzado=servicio_forzado  # ✅ NUEVO: Forzar servicio ITSE
-            )
-            
-            if resultado_pili.get("success"):
-                respuesta = {'mensaje': resultado_pili.get('respuesta', '')}
-                
-                # Extraer datos generados según tipo
-                datos_generados = resultado_pili.get('datos_generados', {})
-                
-                # ✅ NUEVO: Actualizar botones desde especialistas locales
-                # Los especialistas locales retornan 'botones', no 'botones_sugeridos'
-                botones_especialista = resultado_pili.get('botones') or resultado_pili.get('botones_sugeridos')
-                if botones_especialista:
-                    logger.info(f"✅ Usando {len(botones_especialista)} botones del especialista local")
-                    botones_sugeridos = botones_especialista
-                
-            else:
-                # Fallback si PILIIntegrator falla
-                logger.warning("⚠️ PILIIntegrator falló, usando respuesta básica")
-                respuesta = {'mensaje': f"Entiendo que necesitas ayuda con {tipo_flujo}. ¿Podrías darme más detalles?"}
-                
-        except Exception as e:
-            # 🧠 FALLBACK FINAL: Usar PILIBrain básico
-            logger.warning(f"⚠️ Error con PILIIntegrator, usando PILIBrain: {e}")
-            servicio_detectado = pili_brain.detectar_servicio(mensaje)
-            cotizacion_data = pili_brain.generar_cotizacion(mensaje, servicio_detectado, "simple")
-            respuesta = {'mensaje': cotizacion_data['conversacion']['mensaje_pili']}
+        conversacion = await _procesar_con_integrador(
+            tipo_flujo, mensaje, historial, contexto_adicional, conversation_state, request=request
+        )
+        respuesta = conversacion["respuesta"]
+        datos_generados = conversacion["datos_generados"]
+        botones_sugeridos = conversacion["botones_sugeridos"]
 
         # Determinar etapa y botones sugeridos SOLO si no hay botones del especialista
         tiene_cotizacion = cotizacion_id is not None
@@ -1418,100 +1595,14 @@ async def chat_contextualizado(
             botones_sugeridos = obtener_botones_para_etapa(tipo_flujo, etapa_actual)
 
         # 🆕 NUEVO: Generar vista previa HTML si se solicita
-        html_preview = None
-        if generar_html and tipo_flujo.startswith("cotizacion"):
-            # Simular datos de cotización para preview
-            items_demo = [
-                {"descripcion": "Punto de luz LED 18W", "cantidad": 8, "unidad": "pto", "precio_unitario": 30.00},
-                {"descripcion": "Tomacorriente doble", "cantidad": 6, "unidad": "pto", "precio_unitario": 35.00},
-                {"descripcion": "Cable THW 2.5mm²", "cantidad": 50, "unidad": "m", "precio_unitario": 4.00}
-            ]
-            # Calcular totales dinámicamente
-            subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items_demo)
-            igv = subtotal * 0.18
-            total = subtotal + igv
-            
-            datos_preview = {
-                "items": items_demo,
-                "cliente": datos_cliente if datos_cliente and datos_cliente.get("nombre") else {"nombre": "Cliente Demo"},
-                "proyecto": "Instalación Eléctrica",
-                "subtotal": round(subtotal, 2),
-                "igv": round(igv, 2),
-                "total": round(total, 2)
-            }
-            
-            # 🔄 Seleccionar generador según el tipo específico
-            if "compleja" in tipo_flujo:
-                html_preview = generar_preview_cotizacion_compleja_editable(datos_preview, nombre_pili)
-            else:
-                html_preview = generar_preview_cotizacion_simple_editable(datos_preview, nombre_pili)
-
-        elif generar_html and tipo_flujo.startswith("proyecto"):
-            # Generar preview para proyectos
-            items_proyecto = [
-                {"descripcion": "Fase 1: Planificación y diseño", "cantidad": 1, "unidad": "fase", "precio_unitario": 2500.00},
-                {"descripcion": "Fase 2: Instalación eléctrica", "cantidad": 1, "unidad": "fase", "precio_unitario": 5000.00},
-                {"descripcion": "Fase 3: Pruebas y certificación", "cantidad": 1, "unidad": "fase", "precio_unitario": 1500.00}
-            ]
-            # Calcular totales dinámicamente
-            subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items_proyecto)
-            igv = subtotal * 0.18
-            total = subtotal + igv
-            
-            datos_preview = {
-                "items": items_proyecto,
-                "cliente": datos_cliente if datos_cliente and datos_cliente.get("nombre") else {"nombre": "Cliente Demo"},
-                "proyecto": "Proyecto Eléctrico",
-                "nombre_proyecto": "Instalación Industrial",
-                "duracion": "3 meses",
-                "subtotal": round(subtotal, 2),
-                "igv": round(igv, 2),
-                "total": round(total, 2)
-            }
-            
-            # 🔄 Seleccionar generador según complejidad
-            if "complejo" in tipo_flujo or "pmi" in tipo_flujo:
-                 html_preview = generar_preview_proyecto_complejo_pmi_editable(datos_preview, nombre_pili)
-            else:
-                 html_preview = generar_preview_proyecto_simple_editable(datos_preview, nombre_pili)
-
-        elif generar_html and tipo_flujo.startswith("informe"):
-            datos_preview = {
-                "titulo": "Informe Técnico Eléctrico",
-                "cliente": "Cliente Demo"
-            }
-            
-            # 🔄 Seleccionar generador según tipo de informe
-            if "tecnico" in tipo_flujo:
-                html_preview = generar_preview_informe_tecnico_editable(datos_preview, nombre_pili)
-            elif "ejecutivo" in tipo_flujo or "apa" in tipo_flujo:
-                html_preview = generar_preview_informe_ejecutivo_apa_editable(datos_preview, nombre_pili)
-            else:
-                html_preview = generar_preview_informe(datos_preview, nombre_pili)
-
-        # 🆕 CRÍTICO: Enviar datos estructurados al frontend para edición
-        datos_estructurados = None
-        if generar_html and tipo_flujo.startswith("cotizacion"):
-            # Usar datos de PILIIntegrator si están disponibles
-            if 'datos_generados' in locals() and datos_generados:
-                datos_estructurados = datos_generados
-            else:
-                datos_estructurados = datos_preview
-        elif generar_html and tipo_flujo.startswith("proyecto"):
-            if 'datos_generados' in locals() and datos_generados:
-                datos_estructurados = datos_generados
-            else:
-                datos_estructurados = datos_preview
-        elif generar_html and tipo_flujo.startswith("informe"):
-            if 'datos_generados' in locals() and datos_generados:
-                datos_estructurados = datos_generados
-            else:
-                datos_estructurados = datos_preview
+        html_preview, datos_estructurados = _generar_preview_contextualizado(
+            tipo_flujo, generar_html, datos_cliente, nombre_pili, datos_generados
+        )
 
         return {
             "success": True,
             "agente_activo": nombre_pili,
-            "respuesta": respuesta.get('mensaje', '') if isinstance(respuesta, dict) else str(respuesta),
+            "respuesta": _texto_respuesta(respuesta),
             "tipo_flujo": tipo_flujo,
             "etapa_actual": etapa_actual,
             "botones_sugeridos": botones_sugeridos,
@@ -1534,6 +1625,9 @@ async def chat_contextualizado(
             }
         }
 
+    except ClienteDesconectadoError:
+        # Nadie espera la respuesta: no registrar como error
+        return Response(status_code=499)
     except Exception as e:
         logger.error(f"❌ Error en chat contextualizado PILI: {e}")
         raise HTTPException(
@@ -1541,6 +1635,143 @@ async def chat_contextualizado(
             detail=f"Error en PILI: {str(e)}"
         )
 
+def _evento_sse(evento: str, datos: Any) -> str:
+    """Serializa un evento Server-Sent Events"""
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat-contextualizado/stream")
+async def chat_contextualizado_stream(
+    request: Request,
+    tipo_flujo: str = Body(...),
+    mensaje: str = Body(...),
+    historial: Optional[List[Dict]] = Body(None),
+    contexto_adicional: Optional[str] = Body(None),
+    cotizacion_id: Optional[int] = Body(None),
+    archivos_procesados: Optional[List[Dict]] = Body(None),
+    generar_html: bool = Body(False),
+    datos_cliente: Optional[Dict] = Body(None),
+    conversation_state: Optional[Dict] = Body(None)
+):
+    """
+    ⚡ Variante SSE de /chat-contextualizado
+
+    Eventos (text/event-stream):
+    - inicio: se envía de inmediato (agente activo)
+    - token: fragmentos de la respuesta ({"texto": ...}) a medida que llegan
+    - datos: botones, etapa, datos generados y estado de conversación
+    - html_preview: vista previa HTML (solo si generar_html)
+    - fin / error
+
+    Texto, botones y estado salen de la MISMA conversación del
+    PILIIntegrator (procesar_solicitud_stream), así que nunca se
+    contradicen. Con Gemini el texto llega token a token; los
+    especialistas locales y el chatbot ITSE responden en un fragmento.
+    Si el cliente se desconecta se cancela la llamada LLM en curso.
+    """
+    historial = historial or []
+
+    contexto = obtener_contexto_servicio(tipo_flujo)
+    if not contexto:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de flujo '{tipo_flujo}' no soportado por PILI"
+        )
+
+    nombre_pili = contexto.get("nombre_pili", "PILI")
+
+    async def eventos():
+        try:
+            yield _evento_sse("inicio", {
+                "agente_activo": nombre_pili,
+                "tipo_flujo": tipo_flujo,
+                "timestamp": datetime.now().isoformat()
+            })
+
+            # 🔥 CAJA NEGRA ITSE - mismo flujo que el endpoint JSON
+            if tipo_flujo == 'itse':
+                try:
+                    from app.integrations.pili_chatbot.pili_itse_chatbot import PILIITSEChatBot
+
+                    resultado = PILIITSEChatBot().procesar(mensaje, conversation_state)
+                except Exception as e:
+                    logger.error(f"❌ Error en chatbot ITSE: {e}")
+                    # Si falla, continuar con flujo normal
+                    resultado = None
+
+                if resultado is not None:
+                    yield _evento_sse("token", {"texto": resultado.get("respuesta", "")})
+                    yield _evento_sse("datos", {
+                        "success": resultado.get("success", True),
+                        "botones_sugeridos": resultado.get("botones", []),
+                        "conversation_state": resultado.get("estado"),
+                        "datos_generados": resultado.get("datos_generados"),
+                        "cotizacion": resultado.get("cotizacion")
+                    })
+                    yield _evento_sse("fin", {"success": True})
+                    return
+
+            # Texto por fragmentos a medida que llegan; botones, datos y
+            # vista previa van después, al cerrar la respuesta
+            # (cerrar el generador cancela la llamada LLM en curso)
+            conversacion = None
+            async with aclosing(_procesar_con_integrador_stream(
+                tipo_flujo, mensaje, historial, contexto_adicional, conversation_state
+            )) as fragmentos:
+                async for tipo, valor in fragmentos:
+                    if await request.is_disconnected():
+                        logger.info("🔌 Cliente desconectado: streaming cancelado")
+                        return
+                    if tipo == "token":
+                        yield _evento_sse("token", {"texto": valor})
+                    else:
+                        conversacion = valor
+
+            botones_sugeridos = conversacion["botones_sugeridos"]
+            datos_generados = conversacion["datos_generados"]
+            etapa_actual = determinar_etapa_conversacion(historial, cotizacion_id is not None)
+            if not botones_sugeridos:
+                botones_sugeridos = obtener_botones_para_etapa(tipo_flujo, etapa_actual)
+
+            yield _evento_sse("datos", {
+                "success": True,
+                "etapa_actual": etapa_actual,
+                "botones_sugeridos": botones_sugeridos,
+                "datos_generados": datos_generados,
+                "pili_metadata": {
+                    "agente_id": tipo_flujo,
+                    "version": "3.0",
+                    "modo": "PILIIntegrator"
+                }
+            })
+
+            if generar_html:
+                html_preview, datos_estructurados = _generar_preview_contextualizado(
+                    tipo_flujo, generar_html, datos_cliente, nombre_pili, datos_generados
+                )
+                yield _evento_sse("html_preview", {
+                    "html_preview": html_preview,
+                    "datos_estructurados": datos_estructurados
+                })
+
+            yield _evento_sse("fin", {"success": True, "timestamp": datetime.now().isoformat()})
+
+        except asyncio.CancelledError:
+            logger.info("🔌 Streaming chat contextualizado cancelado")
+            raise
+        except ClienteDesconectadoError:
+            logger.info("🔌 Cliente desconectado: streaming cancelado")
+            return
+        except Exception as e:
+            logger.error(f"❌ Error en streaming chat contextualizado PILI: {e}")
+            yield _evento_sse("error", {"success": False, "detail": f"Error en PILI: {str(e)}"})
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/iniciar-flujo-inteligente")
 async def iniciar_flujo_inteligente(
     tipo_flujo: str = Body(...),
@@ -1990,6 +2221,7 @@ async def generar_cotizacion_rapida(
         logger.info("Generando cotización rápida con IA")
         
         # Generar con Gemini
+        await cargar(gemini_service)
         resultado = gemini_service.generar_cotizacion(
             servicio=request.servicio,
             industria=request.industria,
@@ -2070,6 +2302,7 @@ async def chat_conversacional(
         logger.info("Procesando mensaje de chat conversacional")
         
         # Enviar mensaje a Gemini
+        await cargar(gemini_service)
         respuesta = gemini_service.chat(
             mensaje=request.mensaje,
             contexto=request.contexto,
@@ -2167,6 +2400,7 @@ def health_check_ia():
         "pili_version": "3.0",
         "agentes_disponibles": len(CONTEXTOS_SERVICIOS),
         "servicios_inteligentes": list(CONTEXTOS_SERVICIOS.keys()),
+        "llm_cache": llm_cache.obtener_metricas(),
         "version": "3.0 - PILI Multifunción"
     }
 
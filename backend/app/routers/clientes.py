@@ -2,12 +2,14 @@
 Router: Clientes
 Endpoints para CRUD completo de clientes
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path as PathParam
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Path as PathParam
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
 from app.core.database import get_db
+from app.core.pagination import aplicar_cabeceras, paginar, total_aproximado
 from app.models.cliente import Cliente
+from app.services.search_index import filtro_subcadena, get_search_index
 from app.schemas.cliente import (
     ClienteCreate,
     ClienteUpdate,
@@ -75,11 +77,14 @@ async def crear_cliente(
 
 @router.get("/", response_model=List[ClienteListResponse])
 async def listar_clientes(
+    response: Response,
     skip: int = Query(0, ge=0, description="Número de registros a omitir"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
     buscar: Optional[str] = Query(None, description="Buscar por nombre, RUC o email"),
     activo: Optional[str] = Query(None, description="Filtrar por estado (activo/inactivo)"),
     industria: Optional[str] = Query(None, description="Filtrar por industria"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior (cabecera X-Next-Cursor)"),
+    incluir_total: bool = Query(False, description="Agregar cabecera X-Total-Aproximado"),
     db: Session = Depends(get_db)
 ):
     """
@@ -89,6 +94,8 @@ async def listar_clientes(
         skip: Registros a omitir (para paginación)
         limit: Máximo de registros a retornar
         buscar: Texto para buscar en nombre, RUC o email
+        cursor: Cursor keyset (reemplaza a skip en páginas profundas)
+        incluir_total: Si calcular el total aproximado
         activo: Filtrar por estado
         industria: Filtrar por industria
         db: Sesión de base de datos
@@ -104,13 +111,21 @@ async def listar_clientes(
 
         # Aplicar filtros
         if buscar:
-            query = query.filter(
-                or_(
-                    Cliente.nombre.ilike(f"%{buscar}%"),
-                    Cliente.ruc.ilike(f"%{buscar}%"),
-                    Cliente.email.ilike(f"%{buscar}%")
+            # Índice full-text (prefijos, sin tildes) + subcadena de RUC/email;
+            # ILIKE si el índice no está disponible
+            coincidentes = get_search_index().ids_coincidentes(db, "cliente", buscar)
+            if coincidentes is not None:
+                query = query.filter(
+                    or_(Cliente.id.in_(coincidentes), *filtro_subcadena(Cliente, "cliente", buscar))
+                )
+            else:
+                query = query.filter(
+                    or_(
+                        Cliente.nombre.ilike(f"%{buscar}%"),
+                        Cliente.ruc.ilike(f"%{buscar}%"),
+                        Cliente.email.ilike(f"%{buscar}%")
+                    )
                 )
-            )
 
         if activo:
             query = query.filter(Cliente.activo == activo)
@@ -118,15 +133,17 @@ async def listar_clientes(
         if industria:
             query = query.filter(Cliente.industria == industria)
 
-        # Ordenar por fecha de creación (más recientes primero)
-        query = query.order_by(Cliente.fecha_creacion.desc())
+        total = total_aproximado(db, query, Cliente, filtrado=bool(buscar or activo or industria)) if incluir_total else None
 
-        # Aplicar paginación
-        clientes = query.offset(skip).limit(limit).all()
+        # Más recientes primero; keyset si hay cursor
+        clientes, siguiente = paginar(query, Cliente, limit, cursor=cursor, skip=skip)
+        aplicar_cabeceras(response, siguiente, total)
 
         logger.info(f"✅ Se encontraron {len(clientes)} clientes")
         return clientes
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error listando clientes: {str(e)}")
         raise HTTPException(
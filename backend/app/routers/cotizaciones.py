@@ -4,11 +4,16 @@ Endpoints para CRUD de cotizaciones Y GENERACIÓN DE DOCUMENTOS
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy import or_
 from typing import List, Optional, Dict, Any
 from app.core.database import get_db
+from app.core.pagination import aplicar_cabeceras, paginar, total_aproximado
 from app.models.cotizacion import Cotizacion
 from app.models.item import Item
+from app.services.search_index import get_search_index
+from app.services.numeracion import siguiente_numero_cotizacion
 from app.schemas.cotizacion import (
     CotizacionCreate,
     CotizacionUpdate,
@@ -19,12 +24,15 @@ from pathlib import Path
 import logging
 import os
 
-from app.services.word_generator import word_generator
-from app.services.pdf_generator import pdf_generator
+from app.core.lazy import cargar, diferido
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# python-docx y reportlab se cargan en la primera exportación
+word_generator = diferido("app.services.word_generator", "word_generator")
+pdf_generator = diferido("app.services.pdf_generator", "pdf_generator")
+
 router = APIRouter()
 
 # ============================================
@@ -35,25 +43,11 @@ def generar_numero_cotizacion(db: Session) -> str:
     """
     Generar número único de cotización
     Formato: COT-YYYYMM-XXXX
-    """
-    fecha = datetime.now()
-    prefijo = f"COT-{fecha.strftime('%Y%m')}"
-    
-    # Buscar última cotización del mes
-    ultima = db.query(Cotizacion).filter(
-        Cotizacion.numero.like(f"{prefijo}%")
-    ).order_by(Cotizacion.numero.desc()).first()
-    
-    if ultima:
-        try:
-            ultimo_num = int(ultima.numero.split('-')[-1])
-            nuevo_num = ultimo_num + 1
-        except:
-            nuevo_num = 1
-    else:
-        nuevo_num = 1
     
-    return f"{prefijo}-{nuevo_num:04d}"
+    Contador atómico por mes (services/numeracion.py): sin escaneo y sin
+    duplicados entre requests concurrentes
+    """
+    return siguiente_numero_cotizacion()
 
 def _preparar_datos_documento(cotizacion: Cotizacion) -> Dict[str, Any]:
     """
@@ -156,9 +150,13 @@ async def crear_cotizacion(
 
 @router.get("/", response_model=List[CotizacionResponse])
 async def listar_cotizaciones(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     proyecto_id: Optional[int] = None,
+    buscar: Optional[str] = None,
+    cursor: Optional[str] = None,
+    incluir_total: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -168,8 +166,22 @@ async def listar_cotizaciones(
     
     if proyecto_id:
         query = query.filter(Cotizacion.proyecto_id == proyecto_id)
+    
+    if buscar:
+        coincidentes = get_search_index().ids_coincidentes(db, "cotizacion", buscar)
+        if coincidentes is not None:
+            query = query.filter(Cotizacion.id.in_(coincidentes))
+        else:
+            query = query.filter(or_(
+                Cotizacion.numero.ilike(f"%{buscar}%"),
+                Cotizacion.cliente.ilike(f"%{buscar}%"),
+                Cotizacion.proyecto.ilike(f"%{buscar}%")
+            ))
         
-    cotizaciones = query.order_by(Cotizacion.fecha_creacion.desc()).offset(skip).limit(limit).all()
+    total = total_aproximado(db, query, Cotizacion, filtrado=bool(proyecto_id or buscar)) if incluir_total else None
+    
+    cotizaciones, siguiente = paginar(query, Cotizacion, limit, cursor=cursor, skip=skip)
+    aplicar_cabeceras(response, siguiente, total)
     
     return cotizaciones
 
@@ -291,8 +303,10 @@ async def generar_pdf_cotizacion(
     ruta_salida = os.path.join(settings.GENERATED_DIR, nombre_archivo)
     
     try:
-        # Generar PDF
-        pdf_generator.generar_cotizacion(
+        # Generar PDF fuera del event loop (render CPU-bound)
+        await cargar(pdf_generator)
+        await run_in_threadpool(
+            pdf_generator.generar_cotizacion,
             datos=datos,
             ruta_salida=ruta_salida,
             opciones={'mostrar_logo': True}
@@ -345,8 +359,10 @@ async def generar_word_cotizacion(
     ruta_salida = os.path.join(settings.GENERATED_DIR, nombre_archivo)
     
     try:
-        # Generar Word
-        word_generator.generar_cotizacion(
+        # Generar Word fuera del event loop (render CPU-bound)
+        await cargar(word_generator)
+        await run_in_threadpool(
+            word_generator.generar_cotizacion,
             datos=datos,
             ruta_salida=ruta_salida,
             opciones={'mostrar_logo': True}
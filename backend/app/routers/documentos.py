@@ -4,11 +4,13 @@ Endpoints para upload, procesamiento y búsqueda de documentos
 
 🔧 VERSIÓN CORREGIDA - Restaurado código faltante en subir_documento
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Body, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from app.core.database import get_db
+from app.core.loaders import CargadorLotes, get_cargador
+from app.core.pagination import aplicar_cabeceras, paginar, total_aproximado
 from app.models.documento import Documento
 from app.schemas.documento import (
     DocumentoResponse,
@@ -16,10 +18,10 @@ from app.schemas.documento import (
     BusquedaSemanticaRequest,
     ResultadoBusqueda
 )
-from app.services.file_processor import file_processor
-from app.services.rag_service import rag_service
-from app.services.gemini_service import gemini_service
-from app.core.config import settings
+from app.services.upload_storage import ArchivoDemasiadoGrandeError, guardar_upload_streaming
+from app.services.document_jobs import get_document_job_queue
+from app.core.config import settings, validate_file_extension
+from app.core.lazy import cargar, diferido
 from pathlib import Path
 from datetime import datetime
 import shutil
@@ -30,6 +32,15 @@ import filetype  # 🔧 IMPORT AGREGADO - Requerido para detección MIME
 
 logger = logging.getLogger(__name__)
 
+# OCR/PDF (pytesseract, PyPDF2), ChromaDB y Gemini se cargan en el primer uso
+file_processor = diferido("app.services.file_processor", "file_processor")
+rag_service = diferido("app.services.rag_service", "rag_service")
+gemini_service = diferido("app.services.gemini_service", "gemini_service")
+# RAG profesional (sentence-transformers): ingesta por lotes de DocumentGeneratorPro
+rag_engine_pro = diferido("app.services.professional.rag.rag_engine", "rag_engine")
+word_generator = diferido("app.services.word_generator", "word_generator")
+pdf_generator = diferido("app.services.pdf_generator", "pdf_generator")
+
 router = APIRouter()
 
 # ============================================
@@ -43,51 +54,40 @@ async def subir_documento(
     db: Session = Depends(get_db)
 ):
     """
-    Subir y procesar un documento
+    Subir un documento y encolar su procesamiento
     
     Soporta: PDF, Word, Excel, imágenes, texto
     
-    🔧 CÓDIGO CORREGIDO - Restauradas líneas 65-102 que faltaban
+    El archivo se escribe a disco por bloques (sin cargarlo en memoria) y la
+    extracción + indexación RAG corre en la cola de documentos. El progreso
+    se consulta en GET /{documento_id}/progreso.
     """
     try:
         logger.info(f"Subiendo archivo: {archivo.filename}")
         
-        # Validar archivo
-        es_valido, mensaje_error = file_processor.validar_archivo(
-            nombre_archivo=archivo.filename,
-            tamano=0  # Se validará después de leer
-        )
-        
-        if not es_valido:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=mensaje_error
-            )
-        
-        # Leer contenido del archivo
-        contenido = await archivo.read()
-        tamano = len(contenido)
-        
-        # 🔧 CÓDIGO RESTAURADO - Validar tamaño después de leer
-        if tamano > settings.MAX_FILE_SIZE:
+        # Validar extensión
+        if not archivo.filename or not validate_file_extension(archivo.filename):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Archivo demasiado grande. Máximo: {settings.MAX_FILE_SIZE / (1024*1024):.1f} MB"
+                detail=f"Tipo de archivo no permitido. Permitidos: {settings.ALLOWED_EXTENSIONS}"
             )
         
-        # 🔧 CÓDIGO RESTAURADO - Generar nombre único
+        # Generar nombre único
         extension = Path(archivo.filename).suffix
         nombre_unico = f"{uuid.uuid4()}{extension}"
         ruta_archivo = Path(settings.UPLOAD_DIR) / nombre_unico
         
-        # 🔧 CÓDIGO RESTAURADO - Asegurar que el directorio existe
-        Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
-        
-        # 🔧 CÓDIGO RESTAURADO - Guardar archivo físicamente
-        with open(ruta_archivo, "wb") as f:
-            f.write(contenido)
+        # Guardar en streaming, cortando apenas se supera el tamaño máximo
+        # (el cuerpo completo ya lo acota LimiteUploadMiddleware antes del parseo)
+        try:
+            tamano = await guardar_upload_streaming(archivo, ruta_archivo, settings.MAX_FILE_SIZE)
+        except ArchivoDemasiadoGrandeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
+            )
         
-        # 🔧 CÓDIGO RESTAURADO - Detectar tipo MIME usando filetype
+        # Detectar tipo MIME usando filetype (solo lee la cabecera)
         tipo_mime = archivo.content_type or "application/octet-stream"
         try:
             kind = filetype.guess(str(ruta_archivo))
@@ -96,66 +96,32 @@ async def subir_documento(
         except Exception:
             pass  # Usar el tipo MIME del archivo original
         
-        # 🔧 CÓDIGO RESTAURADO - Crear registro en base de datos
+        # Crear registro en base de datos (pendiente)
         documento = Documento(
+            nombre=archivo.filename,
             nombre_original=archivo.filename,
             ruta_archivo=str(ruta_archivo),
             tipo_mime=tipo_mime,
             tamano=tamano,
-            procesado=0,  # Pendiente
+            procesado=Documento.PENDIENTE,
             proyecto_id=proyecto_id
         )
         db.add(documento)
         db.commit()
         db.refresh(documento)
         
-        # 🔧 CÓDIGO RESTAURADO - Procesar archivo en segundo plano
-        try:
-            resultado = file_processor.procesar_archivo(str(ruta_archivo))
-            
-            # ✅ CÓDIGO EXISTENTE CONSERVADO - Actualizar con resultados
-            documento.contenido_texto = resultado.get('contenido', '')
-            documento.metadata_extraida = resultado.get('metadata', {})
-            documento.procesado = 1  # Procesado exitosamente
-            
-            # Agregar a RAG (búsqueda semántica)
-            if documento.contenido_texto and len(documento.contenido_texto.strip()) > 10:
-                rag_service.agregar_documento(
-                    documento_id=documento.id,
-                    contenido=documento.contenido_texto,
-                    metadata={
-                        "nombre": archivo.filename,
-                        "tipo": tipo_mime,
-                        "proyecto_id": proyecto_id
-                    }
-                )
-            
-            db.commit()
-            db.refresh(documento)
-            
-            logger.info(f"Documento procesado exitosamente: {archivo.filename}")
-            
-            return DocumentoUploadResponse(
-                success=True,
-                message="Documento subido y procesado exitosamente",
-                documento=documento,
-                contenido_extraido=documento.contenido_texto[:500] if documento.contenido_texto else None
-            )
-            
-        except Exception as e:
-            # Marcar como error pero mantener el archivo
-            documento.procesado = 2  # Error
-            documento.mensaje_error = str(e)
-            db.commit()
-            
-            logger.warning(f"Error al procesar documento {archivo.filename}: {str(e)}")
-            
-            return DocumentoUploadResponse(
-                success=True,
-                message=f"Documento subido pero hubo un error al procesarlo: {str(e)}",
-                documento=documento,
-                contenido_extraido=None
-            )
+        # Procesar en segundo plano
+        job_id = get_document_job_queue().encolar(documento.id)
+        
+        logger.info(f"Documento {documento.id} encolado para procesamiento (trabajo {job_id})")
+        
+        return DocumentoUploadResponse(
+            success=True,
+            message="Documento subido; procesamiento en cola",
+            documento=documento,
+            contenido_extraido=None,
+            job_id=job_id
+        )
         
     except HTTPException:
         raise
@@ -166,12 +132,40 @@ async def subir_documento(
             detail=f"Error al subir documento: {str(e)}"
         )
 
+@router.get("/{documento_id}/progreso")
+def obtener_progreso_documento(
+    documento_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Progreso del procesamiento en segundo plano de un documento
+    """
+    documento = db.query(Documento).filter(Documento.id == documento_id).first()
+    
+    if not documento:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Documento no encontrado"
+        )
+    
+    trabajo = get_document_job_queue().ultimo_de_documento(documento_id)
+    
+    return {
+        "documento_id": documento.id,
+        "procesado": documento.procesado,
+        "mensaje_error": documento.mensaje_error,
+        "trabajo": trabajo
+    }
+
 @router.get("/", response_model=List[DocumentoResponse])
 def listar_documentos(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     proyecto_id: Optional[int] = Query(None),
-    procesado: Optional[int] = Query(None, ge=0, le=2),
+    procesado: Optional[int] = Query(None, ge=0, le=3),
+    cursor: Optional[str] = Query(None),
+    incluir_total: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     """
@@ -186,10 +180,19 @@ def listar_documentos(
         if procesado is not None:
             query = query.filter(Documento.procesado == procesado)
         
-        documentos = query.order_by(Documento.fecha_subida.desc()).offset(skip).limit(limit).all()
+        total = total_aproximado(
+            db, query, Documento, filtrado=bool(proyecto_id or procesado is not None)
+        ) if incluir_total else None
+        
+        documentos, siguiente = paginar(
+            query, Documento, limit, cursor=cursor, skip=skip, columna_fecha="fecha_subida"
+        )
+        aplicar_cabeceras(response, siguiente, total)
         
         return documentos
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al listar documentos: {str(e)}")
         raise HTTPException(
@@ -259,7 +262,7 @@ def eliminar_documento(
 @router.post("/buscar-semantica")
 def buscar_semantica(
     request: BusquedaSemanticaRequest,
-    db: Session = Depends(get_db)
+    cargador: CargadorLotes = Depends(get_cargador)
 ):
     """
     Búsqueda semántica en documentos usando RAG
@@ -275,24 +278,26 @@ def buscar_semantica(
         if request.proyecto_id:
             filtro = {"proyecto_id": request.proyecto_id}
         
-        resultados = rag_service.buscar_similar(
+        resultados = rag_service.buscar(
             query=request.query,
-            limite=request.limite,
-            filtro_metadata=filtro
+            n_results=request.limite,
+            where=filtro
         )
         
-        # Obtener información completa de documentos
+        # Obtener información completa de documentos (un solo IN para todos los hits)
+        ids = [r.get("metadata", {}).get("documento_id") for r in resultados]
+        documentos = cargador.obtener_muchos(Documento, ids)
+        
         documentos_encontrados = []
-        for resultado in resultados:
-            documento_id = resultado.get("metadata", {}).get("documento_id")
-            if documento_id:
-                documento = db.query(Documento).filter(Documento.id == documento_id).first()
-                if documento:
-                    documentos_encontrados.append({
-                        "documento": documento,
-                        "score": resultado.get("score", 0),
-                        "fragmento": resultado.get("contenido", "")[:200]
-                    })
+        for resultado, documento_id in zip(resultados, ids):
+            documento = documentos.get(documento_id)
+            if documento:
+                distancia = resultado.get("distancia") or 0
+                documentos_encontrados.append({
+                    "documento": documento,
+                    "score": round(1 / (1 + distancia), 4),
+                    "fragmento": (resultado.get("documento") or "")[:200]
+                })
         
         return {
             "success": True,
@@ -459,6 +464,19 @@ def obtener_estadisticas_rag():
             detail=f"Error obteniendo estadísticas: {str(e)}"
         )
 
+@router.get("/ingestas/{job_id}")
+def obtener_estado_ingesta(job_id: str):
+    """
+    Progreso de una indexación RAG en segundo plano (job_id de rag_indexing)
+    """
+    estado = rag_engine_pro.get_ingestion_status(job_id)
+    if not estado.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=estado.get("error", "Trabajo no encontrado")
+        )
+    return estado
+
 # ============================================
 # 🔧 ENDPOINTS DE GENERACIÓN DE INFORMES
 # ============================================
@@ -513,6 +531,7 @@ async def generar_informe_analisis_word(
             )
         
         logger.info(f"Generando informe de análisis Word para: {documento.nombre_original}")
+        await cargar(gemini_service, word_generator)
         
         # Analizar con IA
         analisis_ia = gemini_service.analizar_documento(
@@ -559,8 +578,6 @@ async def generar_informe_analisis_word(
                 })
         
         # Generar documento Word
-        from app.services.word_generator import word_generator
-        
         nombre_archivo = f"analisis_{documento.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
         ruta_salida = os.path.join(settings.GENERATED_DIR, nombre_archivo)
         
@@ -644,6 +661,7 @@ async def generar_informe_analisis_pdf(
             )
         
         logger.info(f"Generando informe de análisis PDF para: {documento.nombre_original}")
+        await cargar(gemini_service, pdf_generator)
         
         # Analizar con IA
         analisis_ia = gemini_service.analizar_documento(
@@ -661,8 +679,6 @@ async def generar_informe_analisis_pdf(
         }
         
         # Generar PDF
-        from app.services.pdf_generator import pdf_generator
-        
         nombre_archivo = f"analisis_{documento.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         ruta_salida = os.path.join(settings.GENERATED_DIR, nombre_archivo)
         
@@ -726,7 +742,7 @@ async def generar_proyecto(
         logger.info(f"Generando proyecto {tipo}: {datos.get('numero', 'SIN-CODIGO')}")
         
         # Generar documento Word usando el generador existente
-        from app.services.word_generator import word_generator
+        await cargar(word_generator)
         
         nombre_archivo = f"proyecto_{datos.get('numero', 'PROY')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
         ruta_salida = os.path.join(settings.GENERATED_DIR, nombre_archivo)
@@ -10,6 +10,10 @@ from app.models import Cotizacion, Proyecto
 # <<< CORRECCIÓN: word_generator ya no se usa aquí
 
 from app.core.config import settings # <<< CORRECCIÓN: Importar settings
+from app.core.lazy import cargar, diferido
+
+# reportlab se carga en el primer informe
+pdf_generator = diferido("app.services.pdf_generator", "pdf_generator")
 
 router = APIRouter()
 
@@ -34,6 +38,7 @@ async def generar_pdf_simple(
         # <<< CORRECCIÓN: Usar settings.GENERATED_DIR
         ruta_salida = os.path.join(settings.GENERATED_DIR, nombre_archivo)
         
+        await cargar(pdf_generator)
         pdf_generator.generar_informe_simple(datos, ruta_salida)
         
         return FileResponse(
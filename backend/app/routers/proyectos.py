@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import or_
 from typing import List, Optional, Dict
 from datetime import datetime
 from pathlib import Path
@@ -8,6 +10,9 @@ import logging
 import os
 
 from app.core.database import get_db
+from app.core.loaders import CargadorLotes, get_cargador
+from app.core.pagination import aplicar_cabeceras, paginar, total_aproximado
+from app.services.search_index import get_search_index
 from app.models import Proyecto, Cotizacion, Documento
 from app.models.proyecto import EstadoProyecto
 from app.schemas.proyecto import (
@@ -130,10 +135,14 @@ async def actualizar_borrador_proyecto(
 
 @router.get("/", response_model=List[ProyectoResponse])
 async def listar_proyectos(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     estado: Optional[EstadoProyecto] = None,
     cliente: Optional[str] = None,
+    buscar: Optional[str] = None,
+    cursor: Optional[str] = None,
+    incluir_total: bool = False,
     db: Session = Depends(get_db)
 ):
     """
@@ -149,10 +158,21 @@ async def listar_proyectos(
     if cliente:
         query = query.filter(Proyecto.cliente.ilike(f"%{cliente}%"))
     
-    # Ordenar por fecha de creación
-    query = query.order_by(Proyecto.fecha_creacion.desc())
+    if buscar:
+        coincidentes = get_search_index().ids_coincidentes(db, "proyecto", buscar)
+        if coincidentes is not None:
+            query = query.filter(Proyecto.id.in_(coincidentes))
+        else:
+            query = query.filter(or_(
+                Proyecto.nombre.ilike(f"%{buscar}%"),
+                Proyecto.cliente.ilike(f"%{buscar}%")
+            ))
+    
+    total = total_aproximado(db, query, Proyecto, filtrado=bool(estado or cliente or buscar)) if incluir_total else None
     
-    proyectos = query.offset(skip).limit(limit).all()
+    # Ordenar por fecha de creación (keyset si hay cursor)
+    proyectos, siguiente = paginar(query, Proyecto, limit, cursor=cursor, skip=skip)
+    aplicar_cabeceras(response, siguiente, total)
     
     return proyectos
 
@@ -300,20 +320,20 @@ async def cambiar_estado_proyecto(
     return proyecto
 
 @router.get("/stats/resumen")
-async def obtener_estadisticas_proyectos(
-    db: Session = Depends(get_db)
-):
+async def obtener_estadisticas_proyectos():
     """
     Obtiene estadísticas generales de proyectos
     """
     
-    total = db.query(Proyecto).count()
+    from app.services.dashboard_metrics import get_dashboard_metrics
     
-    por_estado = {}
-    for estado in EstadoProyecto:
-        por_estado[estado.value] = db.query(Proyecto).filter(
-            Proyecto.estado == estado
-        ).count()
+    # Contadores materializados: sin un COUNT por estado
+    proyectos = (await run_in_threadpool(get_dashboard_metrics().snapshot))["proyectos"]
+    total = proyectos["total"]
+    por_estado = {
+        estado.value: proyectos["por_estado"].get(estado.value, 0)
+        for estado in EstadoProyecto
+    }
     
     return {
         "total_proyectos": total,
@@ -334,7 +354,7 @@ async def generar_informe_proyecto_word(
     opciones: Optional[Dict[str, bool]] = Body(None),
     logo_base64: Optional[str] = Body(None),
     usar_plantilla: Optional[str] = Body(None),
-    db: Session = Depends(get_db)
+    cargador: CargadorLotes = Depends(get_cargador)
 ):
     """
     Genera un informe ejecutivo del proyecto en formato Word
@@ -372,7 +392,7 @@ async def generar_informe_proyecto_word(
     
     try:
         # Obtener proyecto
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+        proyecto = cargador.proyecto(proyecto_id)
         
         if not proyecto:
             raise HTTPException(
@@ -383,9 +403,7 @@ async def generar_informe_proyecto_word(
         logger.info(f"Generando informe Word INTELIGENTE para proyecto: {proyecto.nombre}")
         
         # Obtener cotizaciones relacionadas
-        cotizaciones_db = db.query(Cotizacion).filter(
-            Cotizacion.proyecto_id == proyecto_id
-        ).all() if incluir_cotizaciones else []
+        cotizaciones_db = cargador.cotizaciones_de_proyecto(proyecto_id) if incluir_cotizaciones else []
         
         cotizaciones = []
         for cot in cotizaciones_db:
@@ -401,9 +419,7 @@ async def generar_informe_proyecto_word(
             })
         
         # Obtener documentos relacionados
-        documentos_db = db.query(Documento).filter(
-            Documento.proyecto_id == proyecto_id
-        ).all() if incluir_documentos else []
+        documentos_db = cargador.documentos_de_proyecto(proyecto_id) if incluir_documentos else []
         
         documentos_info = []
         for doc in documentos_db:
@@ -561,7 +577,7 @@ async def generar_informe_proyecto_pdf(
     incluir_analisis_ia: bool = Body(True),  # ⭐ NUEVO
     opciones: Optional[Dict[str, bool]] = Body(None),
     logo_base64: Optional[str] = Body(None),
-    db: Session = Depends(get_db)
+    cargador: CargadorLotes = Depends(get_cargador)
 ):
     """
     Genera un informe ejecutivo del proyecto en formato PDF
@@ -587,7 +603,7 @@ async def generar_informe_proyecto_pdf(
     
     try:
         # Obtener proyecto
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+        proyecto = cargador.proyecto(proyecto_id)
         
         if not proyecto:
             raise HTTPException(
@@ -598,9 +614,7 @@ async def generar_informe_proyecto_pdf(
         logger.info(f"Generando informe PDF INTELIGENTE para proyecto: {proyecto.nombre}")
         
         # Obtener cotizaciones relacionadas
-        cotizaciones_db = db.query(Cotizacion).filter(
-            Cotizacion.proyecto_id == proyecto_id
-        ).all() if incluir_cotizaciones else []
+        cotizaciones_db = cargador.cotizaciones_de_proyecto(proyecto_id) if incluir_cotizaciones else []
         
         cotizaciones = []
         for cot in cotizaciones_db:
@@ -612,9 +626,7 @@ async def generar_informe_proyecto_pdf(
             })
         
         # Obtener documentos relacionados
-        documentos_db = db.query(Documento).filter(
-            Documento.proyecto_id == proyecto_id
-        ).all() if incluir_documentos else []
+        documentos_db = cargador.documentos_de_proyecto(proyecto_id) if incluir_documentos else []
         
         documentos_info = []
         for doc in documentos_db:
@@ -710,7 +722,7 @@ async def generar_informe_proyecto_pdf(
 @router.get("/{proyecto_id}/analisis-ia")
 async def obtener_analisis_ia_proyecto(
     proyecto_id: int,
-    db: Session = Depends(get_db)
+    cargador: CargadorLotes = Depends(get_cargador)
 ):
     """
     Obtener análisis inteligente del proyecto SIN generar documento
@@ -728,7 +740,7 @@ async def obtener_analisis_ia_proyecto(
     
     try:
         # Obtener proyecto
-        proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+        proyecto = cargador.proyecto(proyecto_id)
         
         if not proyecto:
             raise HTTPException(
@@ -739,9 +751,7 @@ async def obtener_analisis_ia_proyecto(
         logger.info(f"Generando análisis IA para: {proyecto.nombre}")
         
         # Obtener cotizaciones
-        cotizaciones_db = db.query(Cotizacion).filter(
-            Cotizacion.proyecto_id == proyecto_id
-        ).all()
+        cotizaciones_db = cargador.cotizaciones_de_proyecto(proyecto_id)
         
         cotizaciones = []
         for cot in cotizaciones_db:
@@ -753,9 +763,7 @@ async def obtener_analisis_ia_proyecto(
             })
         
         # Obtener documentos
-        documentos_db = db.query(Documento).filter(
-            Documento.proyecto_id == proyecto_id
-        ).all()
+        documentos_db = cargador.documentos_de_proyecto(proyecto_id)
         
         documentos = []
         for doc in documentos_db:
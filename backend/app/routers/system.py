@@ -3,12 +3,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-import google.generativeai as genai
 import logging
 
 # Importaciones correctas según la estructura de tu proyecto
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.lazy import estado_servicios
 
 # Usar el mismo logger que el resto de la aplicación
 logger = logging.getLogger(__name__)
@@ -51,6 +51,7 @@ async def check_system_health(db: Session = Depends(get_db)):
             ai_status = "api_key_not_found_in_settings"
             logger.warning("GEMINI_API_KEY no encontrada en el archivo de configuración.")
         else:
+            import google.generativeai as genai  # solo en el health check
             genai.configure(api_key=api_key)
             model = genai.GenerativeModel('gemini-pro')
             response = await model.generate_content_async("test", generation_config={"max_output_tokens": 5})
@@ -68,4 +69,17 @@ async def check_system_health(db: Session = Depends(get_db)):
             detail={"database": db_status, "ai_service": ai_status}
         )
 
-    return {"status": "ok", "database": db_status, "ai_service": ai_status}
\ No newline at end of file
+    return {"status": "ok", "database": db_status, "ai_service": ai_status}
+
+@router.get("/servicios", summary="Estado de carga de los servicios diferidos")
+async def estado_servicios_diferidos():
+    """
+    Servicios pesados registrados en app.core.lazy y segundos que tardó
+    cada uno en cargar (null si aún no se usó ni se precargó).
+    """
+    servicios = estado_servicios()
+    return {
+        "cargados": sum(1 for segundos in servicios.values() if segundos is not None),
+        "total": len(servicios),
+        "servicios": servicios
+    }
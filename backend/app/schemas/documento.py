@@ -32,6 +32,7 @@ class DocumentoUploadResponse(BaseModel):
     message: str
     documento: Optional[DocumentoResponse] = None
     contenido_extraido: Optional[str] = None
+    job_id: Optional[int] = None
 
 class BusquedaSemanticaRequest(BaseModel):
     """Schema para búsqueda semántica en documentos"""
@@ -0,0 +1,377 @@
+"""
+📊 DASHBOARD METRICS - Métricas materializadas del panel de administración
+📁 RUTA: backend/app/services/dashboard_metrics.py
+
+El dashboard ya no ejecuta COUNT(*) por plan/estado en cada carga. Los
+contadores viven en memoria y se actualizan así:
+
+- Incremental: eventos de sesión SQLAlchemy (after_flush acumula deltas
+  de Usuario, Cotizacion y Proyecto; after_commit los aplica,
+  after_rollback los descarta)
+- Periódico: un hilo recalcula todo con consultas GROUP BY cada
+  METRICS_REFRESH_SECONDS para corregir desvíos (updates masivos con
+  query.update(), escrituras desde otros procesos). Cada commit aplicado
+  sube `_version`: si cambió mientras corrían las consultas, el recalculo
+  se repite en lugar de pisar esos deltas con datos viejos.
+
+Los endpoints leen `snapshot()`: costo constante sin importar el tamaño
+de las tablas. El hilo arranca en el startup de la app; como `snapshot()`
+puede esperar el primer recalculo, desde handlers async se llama con
+run_in_threadpool.
+"""
+
+import copy
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, attributes
+
+from app.core.config import settings
+from app.models.cotizacion import Cotizacion
+from app.models.proyecto import Proyecto, EstadoProyecto
+from app.models.usuario import Usuario
+
+logger = logging.getLogger(__name__)
+
+PLANES = ("free", "pro", "enterprise")
+INTENTOS_RECALCULO = 3
+CAMPOS_TOKENS = {
+    "tokens_mensuales": "capacidad_total",
+    "tokens_usados": "tokens_usados",
+    "total_tokens_historico": "tokens_historico"
+}
+DIAS_HISTORIAL = 30
+
+_CLAVE_PENDIENTES = "metricas_pendientes"
+
+
+def _valor_estado(estado: Any) -> Optional[str]:
+    return estado.value if hasattr(estado, "value") else estado
+
+
+def _vacio() -> Dict[str, Any]:
+    return {
+        "usuarios": {"total": 0, "por_plan": {plan: 0 for plan in PLANES}},
+        "tokens": {"capacidad_total": 0, "tokens_usados": 0, "tokens_historico": 0},
+        "cotizaciones": {"total": 0, "por_dia": {}},
+        "proyectos": {"total": 0, "por_estado": {e.value: 0 for e in EstadoProyecto}}
+    }
+
+
+class _Deltas:
+    """Cambios pendientes de una transacción"""
+
+    def __init__(self):
+        self.contadores: Dict[tuple, int] = defaultdict(int)
+        self.requiere_recalculo = False
+
+    def sumar(self, *clave, cantidad: int = 1):
+        if cantidad:
+            self.contadores[clave] += cantidad
+
+
+class DashboardMetrics:
+    """Snapshot en memoria de las métricas del dashboard"""
+
+    def __init__(self, session_factory, intervalo_refresco: float = 300.0):
+        self.session_factory = session_factory
+        self.intervalo_refresco = intervalo_refresco
+
+        self._datos = _vacio()
+        self._version = 0
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._recalculo_pedido = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.ultimo_recalculo: Optional[datetime] = None
+
+        event.listen(Session, "after_flush", self._despues_de_flush)
+        event.listen(Session, "after_commit", self._despues_de_commit)
+        event.listen(Session, "after_rollback", self._despues_de_rollback)
+
+    # ------------------------------------------------------------------
+    # Recalculo completo (GROUP BY)
+    # ------------------------------------------------------------------
+
+    def recalcular(self):
+        """
+        Reconstruye todos los contadores desde la base de datos.
+
+        Si entre el inicio y el fin de las consultas se aplicaron deltas
+        (commits de esta app), el resultado puede no incluirlos: se
+        reintenta y, si no hay una ventana limpia, se conservan los
+        contadores incrementales hasta el siguiente ciclo.
+        """
+        for intento in range(1, INTENTOS_RECALCULO + 1):
+            with self._lock:
+                version = self._version
+            datos = self._consultar()
+            with self._lock:
+                # Sin datos previos (primer recalculo) el último intento se publica igual
+                ultimo_sin_datos = intento == INTENTOS_RECALCULO and not self._listo.is_set()
+                if self._version == version or ultimo_sin_datos:
+                    self._datos = datos
+                    self._version += 1
+                    break
+        else:
+            logger.warning("⚠️ Métricas del dashboard: recalculo descartado por escrituras concurrentes")
+            return
+
+        self.ultimo_recalculo = datetime.utcnow()
+        self._listo.set()
+        logger.info("📊 Métricas del dashboard recalculadas")
+
+    def _consultar(self) -> Dict[str, Any]:
+        """Contadores completos con consultas GROUP BY"""
+        datos = _vacio()
+        db = self.session_factory()
+        try:
+            for plan, total in db.query(Usuario.plan, func.count(Usuario.id)).group_by(Usuario.plan):
+                datos["usuarios"]["por_plan"][plan or "free"] = (
+                    datos["usuarios"]["por_plan"].get(plan or "free", 0) + total
+                )
+            datos["usuarios"]["total"] = sum(datos["usuarios"]["por_plan"].values())
+
+            capacidad, usados, historico = db.query(
+                func.coalesce(func.sum(Usuario.tokens_mensuales), 0),
+                func.coalesce(func.sum(Usuario.tokens_usados), 0),
+                func.coalesce(func.sum(Usuario.total_tokens_historico), 0)
+            ).one()
+            datos["tokens"] = {
+                "capacidad_total": int(capacidad),
+                "tokens_usados": int(usados),
+                "tokens_historico": int(historico)
+            }
+
+            datos["cotizaciones"]["total"] = db.query(func.count(Cotizacion.id)).scalar() or 0
+            desde = datetime.utcnow() - timedelta(days=DIAS_HISTORIAL)
+            dia = func.date(Cotizacion.fecha_creacion)
+            for fecha, total in db.query(dia, func.count(Cotizacion.id)).filter(
+                Cotizacion.fecha_creacion >= desde
+            ).group_by(dia):
+                if fecha is not None:
+                    datos["cotizaciones"]["por_dia"][str(fecha)] = total
+
+            for estado, total in db.query(Proyecto.estado, func.count(Proyecto.id)).group_by(Proyecto.estado):
+                datos["proyectos"]["por_estado"][_valor_estado(estado)] = total
+            datos["proyectos"]["total"] = sum(datos["proyectos"]["por_estado"].values())
+        finally:
+            db.close()
+        return datos
+
+    # ------------------------------------------------------------------
+    # Eventos de sesión
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _anterior_y_actual(objeto, campo: str):
+        """(valor_anterior, valor_actual) sin disparar cargas perezosas"""
+        historia = attributes.get_history(objeto, campo, passive=attributes.PASSIVE_NO_INITIALIZE)
+        actual = historia.added[0] if historia.added else None
+        anterior = historia.deleted[0] if historia.deleted else None
+        return anterior, actual
+
+    @staticmethod
+    def _cargado(objeto, campo: str):
+        valor = objeto.__dict__.get(campo, attributes.NO_VALUE)
+        return None if valor is attributes.NO_VALUE else valor
+
+    def _registrar(self, deltas: _Deltas, objeto, signo: int):
+        """Alta (+1) o baja (-1) de una fila completa"""
+        if isinstance(objeto, Usuario):
+            plan = self._cargado(objeto, "plan")
+            if plan is None:
+                deltas.requiere_recalculo = True
+                return
+            deltas.sumar("usuarios", plan, cantidad=signo)
+            for campo, clave in CAMPOS_TOKENS.items():
+                valor = self._cargado(objeto, campo)
+                if valor is None and signo < 0:
+                    deltas.requiere_recalculo = True
+                deltas.sumar("tokens", clave, cantidad=signo * (valor or 0))
+        elif isinstance(objeto, Cotizacion):
+            fecha = self._cargado(objeto, "fecha_creacion")
+            if signo > 0:
+                # fecha_creacion la asigna el servidor: la cotización es de hoy
+                dia = (fecha or datetime.utcnow()).date().isoformat()
+            else:
+                dia = fecha.date().isoformat() if fecha else None
+            deltas.sumar("cotizaciones", dia, cantidad=signo)
+        elif isinstance(objeto, Proyecto):
+            estado = _valor_estado(self._cargado(objeto, "estado"))
+            if estado is None:
+                deltas.requiere_recalculo = True
+                return
+            deltas.sumar("proyectos", estado, cantidad=signo)
+
+    def _modificar(self, deltas: _Deltas, objeto):
+        """Cambios de plan, estado o tokens en filas existentes"""
+        if isinstance(objeto, Usuario):
+            anterior, actual = self._anterior_y_actual(objeto, "plan")
+            if actual is not None and anterior != actual:
+                if anterior is None:
+                    deltas.requiere_recalculo = True
+                else:
+                    deltas.sumar("usuarios", anterior, cantidad=-1)
+                    deltas.sumar("usuarios", actual)
+            for campo, clave in CAMPOS_TOKENS.items():
+                anterior, actual = self._anterior_y_actual(objeto, campo)
+                if actual is not None and anterior != actual:
+                    if anterior is None:
+                        deltas.requiere_recalculo = True
+                    else:
+                        deltas.sumar("tokens", clave, cantidad=actual - anterior)
+        elif isinstance(objeto, Proyecto):
+            anterior, actual = self._anterior_y_actual(objeto, "estado")
+            if actual is not None and anterior != actual:
+                if anterior is None:
+                    deltas.requiere_recalculo = True
+                else:
+                    deltas.sumar("proyectos", _valor_estado(anterior), cantidad=-1)
+                    deltas.sumar("proyectos", _valor_estado(actual))
+
+    def _despues_de_flush(self, session: Session, flush_context):
+        deltas = session.info.get(_CLAVE_PENDIENTES)
+        if deltas is None:
+            deltas = session.info[_CLAVE_PENDIENTES] = _Deltas()
+        for objeto in session.new:
+            self._registrar(deltas, objeto, 1)
+        for objeto in session.deleted:
+            self._registrar(deltas, objeto, -1)
+        for objeto in session.dirty:
+            self._modificar(deltas, objeto)
+
+    def _despues_de_commit(self, session: Session):
+        deltas: Optional[_Deltas] = session.info.pop(_CLAVE_PENDIENTES, None)
+        if deltas is None:
+            return
+        if deltas.requiere_recalculo:
+            self._recalculo_pedido.set()
+
+        with self._lock:
+            datos = self._datos
+            self._version += 1
+            for (grupo, clave), cantidad in deltas.contadores.items():
+                if grupo == "usuarios":
+                    por_plan = datos["usuarios"]["por_plan"]
+                    por_plan[clave] = por_plan.get(clave, 0) + cantidad
+                    datos["usuarios"]["total"] += cantidad
+                elif grupo == "tokens":
+                    datos["tokens"][clave] += cantidad
+                elif grupo == "cotizaciones":
+                    datos["cotizaciones"]["total"] += cantidad
+                    if clave is not None:
+                        por_dia = datos["cotizaciones"]["por_dia"]
+                        por_dia[clave] = por_dia.get(clave, 0) + cantidad
+                elif grupo == "proyectos":
+                    por_estado = datos["proyectos"]["por_estado"]
+                    por_estado[clave] = por_estado.get(clave, 0) + cantidad
+                    datos["proyectos"]["total"] += cantidad
+
+    def _despues_de_rollback(self, session: Session):
+        session.info.pop(_CLAVE_PENDIENTES, None)
+
+    def sumar_tokens(self, session: Session, **cantidades: int):
+        """
+        Deltas de tokens escritos con UPDATE directo (sin objetos ORM, ver
+        services/token_ledger.py): se aplican con el commit de `session`
+        y se descartan con su rollback, igual que los detectados en flush.
+        Claves: tokens_usados, tokens_historico, capacidad_total.
+        """
+        deltas = session.info.get(_CLAVE_PENDIENTES)
+        if deltas is None:
+            deltas = session.info[_CLAVE_PENDIENTES] = _Deltas()
+        for clave, cantidad in cantidades.items():
+            deltas.sumar("tokens", clave, cantidad=cantidad)
+
+    def solicitar_recalculo(self):
+        """Pide un recalculo completo en segundo plano (cambios masivos)"""
+        self._recalculo_pedido.set()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida y lectura
+    # ------------------------------------------------------------------
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                self.recalcular()
+            except Exception as e:
+                logger.error(f"❌ Error recalculando métricas del dashboard: {e}")
+            self._recalculo_pedido.wait(self.intervalo_refresco)
+            self._recalculo_pedido.clear()
+
+    def iniciar(self):
+        """Arranca el hilo de recalculo periódico (idempotente)"""
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="dashboard-metrics", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._recalculo_pedido.set()
+
+    def snapshot(self, timeout: float = 30.0) -> Dict[str, Any]:
+        """Copia de los contadores (espera el primer recalculo si aún no terminó)"""
+        self.iniciar()
+        self._listo.wait(timeout)
+        with self._lock:
+            datos = copy.deepcopy(self._datos)
+        # Mantener solo la ventana de días configurada
+        limite = (datetime.utcnow().date() - timedelta(days=DIAS_HISTORIAL)).isoformat()
+        datos["cotizaciones"]["por_dia"] = {
+            dia: total for dia, total in sorted(datos["cotizaciones"]["por_dia"].items())
+            if dia >= limite
+        }
+        datos["actualizado"] = self.ultimo_recalculo.isoformat() if self.ultimo_recalculo else None
+        return datos
+
+    def estadisticas_tokens(self, datos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Mismo formato que TokenManager.get_estadisticas_globales.
+        `datos`: snapshot ya obtenido (evita una segunda copia y espera)
+        """
+        if datos is None:
+            datos = self.snapshot()
+        usuarios, tokens = datos["usuarios"], datos["tokens"]
+        capacidad = tokens["capacidad_total"]
+        usados = tokens["tokens_usados"]
+        return {
+            "total_usuarios": usuarios["total"],
+            "usuarios_por_plan": {plan: usuarios["por_plan"].get(plan, 0) for plan in PLANES},
+            "capacidad_total": capacidad,
+            "tokens_usados": usados,
+            "tokens_disponibles": capacidad - usados,
+            "porcentaje_usado": round((usados / capacidad * 100), 2) if capacidad > 0 else 0,
+            "tokens_historico": tokens["tokens_historico"]
+        }
+
+
+_metricas: Optional[DashboardMetrics] = None
+_metricas_lock = threading.Lock()
+
+
+def metricas_activas() -> Optional[DashboardMetrics]:
+    """Snapshot global solo si ya existe (no lo crea)"""
+    return _metricas
+
+
+def get_dashboard_metrics() -> DashboardMetrics:
+    """Obtiene (o crea) el snapshot global de métricas"""
+    global _metricas
+    if _metricas is None:
+        with _metricas_lock:
+            if _metricas is None:
+                from app.core.database import SessionLocal
+                _metricas = DashboardMetrics(
+                    session_factory=SessionLocal,
+                    intervalo_refresco=settings.METRICS_REFRESH_SECONDS
+                )
+    return _metricas
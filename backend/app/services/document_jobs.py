@@ -0,0 +1,336 @@
+"""
+🧵 DOCUMENT JOBS - Cola persistente de procesamiento de documentos
+📁 RUTA: backend/app/services/document_jobs.py
+
+El upload solo guarda el archivo y encola un trabajo; un pool de workers
+(DOCUMENT_JOB_WORKERS) extrae el texto, indexa en RAG y mueve el estado
+Documento.procesado: PENDIENTE → PROCESANDO → PROCESADO | ERROR.
+
+- Cola en SQLite local (storage/jobs/document_jobs.db): sobrevive reinicios
+- Lease: el worker que procesa un trabajo renueva `actualizado` cada
+  lease/3 segundos; un trabajo "procesando" sin renovar durante
+  DOCUMENT_JOB_LEASE_SECONDS (worker caído) vuelve a reclamarse. Con varios
+  workers de uvicorn nadie re-ejecuta un trabajo que otro sigue procesando
+- Reintentos hasta DOCUMENT_JOB_MAX_RETRIES
+- Progreso consultable por documento (GET /api/documentos/{id}/progreso)
+"""
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Estados de trabajo
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+Reportar = Callable[[float, str], None]
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS document_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    documento_id INTEGER NOT NULL,
+    estado TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    progreso REAL NOT NULL DEFAULT 0,
+    mensaje TEXT,
+    creado TEXT NOT NULL,
+    actualizado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_document_jobs_estado ON document_jobs (estado, id);
+CREATE INDEX IF NOT EXISTS ix_document_jobs_documento ON document_jobs (documento_id);
+"""
+
+
+def _ahora() -> str:
+    return datetime.now().isoformat()
+
+
+def _hace(segundos: float) -> str:
+    return (datetime.now() - timedelta(seconds=segundos)).isoformat()
+
+
+class DocumentJobQueue:
+    """Cola SQLite + pool de hilos que ejecuta `procesador` por trabajo"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        procesador: Callable[[int, Reportar], None],
+        workers: int = 2,
+        max_intentos: int = 3,
+        intervalo_sondeo: float = 2.0,
+        lease_segundos: float = 120.0
+    ):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.procesador = procesador
+        self.workers = max(1, workers)
+        self.max_intentos = max(1, max_intentos)
+        self.intervalo_sondeo = intervalo_sondeo
+        self.lease_segundos = lease_segundos
+
+        self._hilos: List[threading.Thread] = []
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+        with self._conectar() as conn:
+            conn.executescript(_ESQUEMA)
+
+    @contextmanager
+    def _conectar(self):
+        # Modo autocommit; las transacciones explícitas usan BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def iniciar(self):
+        """
+        Arranca los workers (idempotente). Los trabajos interrumpidos se
+        retoman cuando vence su lease (ver _reclamar)
+        """
+        with self._lock:
+            if self._hilos:
+                return
+            self._detener.clear()
+            for i in range(self.workers):
+                hilo = threading.Thread(target=self._bucle, name=f"document-job-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+            logger.info(f"✅ Cola de documentos iniciada con {self.workers} workers")
+
+    def detener(self, timeout: float = 10.0):
+        with self._lock:
+            self._detener.set()
+            self._despertar.set()
+            for hilo in self._hilos:
+                hilo.join(timeout=timeout)
+            self._hilos = []
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def encolar(self, documento_id: int) -> int:
+        """Encola el procesamiento de un documento y retorna el id del trabajo"""
+        with self._conectar() as conn:
+            job_id = conn.execute(
+                "INSERT INTO document_jobs (documento_id, estado, creado, actualizado) VALUES (?, ?, ?, ?)",
+                (documento_id, PENDIENTE, _ahora(), _ahora())
+            ).lastrowid
+        self.iniciar()
+        self._despertar.set()
+        return job_id
+
+    def obtener(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT * FROM document_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(fila) if fila else None
+
+    def ultimo_de_documento(self, documento_id: int) -> Optional[Dict[str, Any]]:
+        """Trabajo más reciente de un documento"""
+        with self._conectar() as conn:
+            fila = conn.execute(
+                "SELECT * FROM document_jobs WHERE documento_id = ? ORDER BY id DESC LIMIT 1",
+                (documento_id,)
+            ).fetchone()
+        return dict(fila) if fila else None
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._conectar() as conn:
+            filas = conn.execute("SELECT estado, COUNT(*) AS total FROM document_jobs GROUP BY estado").fetchall()
+        return {fila["estado"]: fila["total"] for fila in filas}
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _reclamar(self) -> Optional[sqlite3.Row]:
+        """
+        Toma atómicamente el trabajo pendiente más antiguo, o uno
+        "procesando" cuyo lease venció (su worker murió)
+        """
+        with self._conectar() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                vencido = _hace(self.lease_segundos)
+                # Un trabajo que tumba a su worker una y otra vez no se reintenta sin fin
+                conn.execute(
+                    "UPDATE document_jobs SET estado = ?, mensaje = ?, actualizado = ? "
+                    "WHERE estado = ? AND actualizado < ? AND intentos >= ?",
+                    (ERROR, "Lease vencido en todos los intentos", _ahora(),
+                     PROCESANDO, vencido, self.max_intentos)
+                )
+                fila = conn.execute(
+                    "SELECT * FROM document_jobs WHERE estado = ? "
+                    "OR (estado = ? AND actualizado < ?) ORDER BY id LIMIT 1",
+                    (PENDIENTE, PROCESANDO, vencido)
+                ).fetchone()
+                if fila is not None and fila["estado"] == PROCESANDO:
+                    logger.info(f"🧵 Trabajo {fila['id']} retomado: lease vencido")
+                if fila is not None:
+                    conn.execute(
+                        "UPDATE document_jobs SET estado = ?, intentos = intentos + 1, progreso = 0, "
+                        "actualizado = ? WHERE id = ?",
+                        (PROCESANDO, _ahora(), fila["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return fila
+
+    def _actualizar(self, job_id: int, **campos):
+        campos["actualizado"] = _ahora()
+        asignaciones = ", ".join(f"{k} = ?" for k in campos)
+        with self._conectar() as conn:
+            conn.execute(f"UPDATE document_jobs SET {asignaciones} WHERE id = ?", (*campos.values(), job_id))
+
+    def _ejecutar(self, fila: sqlite3.Row):
+        job_id = fila["id"]
+        intentos = fila["intentos"] + 1
+
+        def reportar(progreso: float, mensaje: str = ""):
+            self._actualizar(job_id, progreso=round(progreso, 3), mensaje=mensaje)
+
+        # Renovar el lease mientras el procesador trabaja (OCR largo sin reportes)
+        terminado = threading.Event()
+
+        def renovar_lease():
+            while not terminado.wait(self.lease_segundos / 3):
+                try:
+                    self._actualizar(job_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo renovar el lease del trabajo {job_id}: {e}")
+
+        latido = threading.Thread(target=renovar_lease, name=f"document-job-lease-{job_id}", daemon=True)
+        latido.start()
+
+        try:
+            self.procesador(fila["documento_id"], reportar)
+            terminado.set()
+            self._actualizar(job_id, estado=COMPLETADO, progreso=1.0, mensaje="Procesado")
+        except Exception as e:
+            terminado.set()
+            reintentar = intentos < self.max_intentos
+            logger.warning(
+                f"⚠️ Trabajo {job_id} (documento {fila['documento_id']}) falló "
+                f"[{intentos}/{self.max_intentos}]: {e}"
+            )
+            self._actualizar(job_id, estado=PENDIENTE if reintentar else ERROR, mensaje=str(e))
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                fila = self._reclamar()
+            except Exception as e:
+                logger.error(f"❌ Error leyendo cola de documentos: {e}")
+                fila = None
+
+            if fila is None:
+                self._despertar.wait(self.intervalo_sondeo)
+                self._despertar.clear()
+                continue
+
+            self._ejecutar(fila)
+
+
+# ═══════════════════════════════════════════════════════════════
+# PROCESADOR DE DOCUMENTOS
+# ═══════════════════════════════════════════════════════════════
+
+def procesar_documento(documento_id: int, reportar: Reportar):
+    """
+    Extrae texto, indexa en RAG y actualiza el estado del Documento.
+
+    Lanza excepción si falla: el documento queda en ERROR y la cola decide
+    si reintentar (un reintento lo vuelve a pasar a PROCESANDO).
+    """
+    from app.core.database import SessionLocal
+    from app.models.documento import Documento
+    from app.services.file_processor import file_processor
+    from app.services.rag_service import rag_service
+
+    db = SessionLocal()
+    try:
+        documento = db.query(Documento).filter(Documento.id == documento_id).first()
+        if documento is None:
+            raise ValueError(f"Documento {documento_id} no encontrado")
+
+        documento.procesado = Documento.PROCESANDO
+        documento.mensaje_error = None
+        db.commit()
+        reportar(0.1, "Extrayendo texto")
+
+        try:
+            resultado = file_processor.procesar_archivo(documento.ruta_archivo, documento.nombre_original)
+            if not resultado.get("exito"):
+                raise RuntimeError(resultado.get("error") or "No se pudo extraer el contenido")
+
+            contenido = resultado.get("contenido_texto", "") or ""
+            documento.metadata_extraida = resultado.get("metadata", {})
+            reportar(0.7, "Indexando en RAG")
+
+            # Agregar a RAG (búsqueda semántica)
+            if len(contenido.strip()) > 10 and rag_service and rag_service.is_available():
+                rag_service.agregar_documento(
+                    doc_id=f"doc_{documento.id}",
+                    texto=contenido,
+                    metadata={
+                        "documento_id": documento.id,
+                        "nombre": documento.nombre_original,
+                        "tipo": documento.tipo_mime,
+                        "proyecto_id": documento.proyecto_id or 0
+                    }
+                )
+
+            documento.marcar_como_procesado(contenido)
+            db.commit()
+            logger.info(f"✅ Documento procesado en segundo plano: {documento.nombre_original}")
+
+        except Exception as e:
+            db.rollback()
+            documento = db.query(Documento).filter(Documento.id == documento_id).first()
+            documento.marcar_como_error(str(e))
+            db.commit()
+            raise
+    finally:
+        db.close()
+
+
+_cola: Optional[DocumentJobQueue] = None
+_cola_lock = threading.Lock()
+
+
+def get_document_job_queue() -> DocumentJobQueue:
+    """Obtiene (o crea) la cola global de documentos"""
+    global _cola
+    if _cola is None:
+        with _cola_lock:
+            if _cola is None:
+                _cola = DocumentJobQueue(
+                    db_path=Path(settings.STORAGE_PATH) / "jobs" / "document_jobs.db",
+                    procesador=procesar_documento,
+                    workers=settings.DOCUMENT_JOB_WORKERS,
+                    max_intentos=settings.DOCUMENT_JOB_MAX_RETRIES,
+                    lease_segundos=settings.DOCUMENT_JOB_LEASE_SECONDS
+                )
+    return _cola
@@ -0,0 +1,127 @@
+"""
+🔁 DOCX MARKER ENGINE - Reemplazo de marcadores {{...}} en una sola pasada
+📁 RUTA: backend/app/services/docx_marker_engine.py
+
+Recorre el XML del documento (cuerpo, tablas, headers y footers) UNA vez,
+agrupa los <w:t> por párrafo y resuelve todos los marcadores con un único
+patrón compilado + búsqueda en diccionario. Costo O(texto) en lugar de
+O(marcadores × párrafos).
+
+- Soporta marcadores partidos entre varios runs ("{{cli" + "ente}}")
+- Conserva el formato: el valor queda en el run donde empieza el marcador
+  y solo se recorta el texto de los runs siguientes
+"""
+
+import logging
+import re
+from typing import Dict, List
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.text.run import Run
+
+logger = logging.getLogger(__name__)
+
+PATRON_MARCADOR = re.compile(r'\{\{([^{}]+)\}\}')
+
+_W_T = qn('w:t')
+_W_P = qn('w:p')
+_W_R = qn('w:r')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+
+def _parrafos_con_texto(raiz) -> Dict[object, List[object]]:
+    """Agrupa los <w:t> por su párrafo más cercano (orden de documento)"""
+    grupos: Dict[object, List[object]] = {}
+    for t in raiz.iter(_W_T):
+        padre = t.getparent()
+        while padre is not None and padre.tag != _W_P:
+            padre = padre.getparent()
+        if padre is not None:
+            grupos.setdefault(padre, []).append(t)
+    return grupos
+
+
+def _asignar_texto(t, texto: str):
+    """Escribe el texto en el <w:t>; saltos/tabs se delegan al setter de Run"""
+    if ('\n' in texto or '\t' in texto):
+        run = t.getparent()
+        if run is not None and run.tag == _W_R and len(run.findall(_W_T)) == 1:
+            Run(run, None).text = texto
+            return
+    t.text = texto
+    if texto != texto.strip():
+        t.set(_XML_SPACE, 'preserve')
+
+
+def _reemplazar_en_parrafo(nodos: List[object], datos: Dict[str, str]) -> int:
+    textos = [t.text or '' for t in nodos]
+    completo = ''.join(textos)
+    if '{{' not in completo:
+        return 0
+
+    coincidencias = [m for m in PATRON_MARCADOR.finditer(completo) if m.group(1) in datos]
+    if not coincidencias:
+        return 0
+
+    # Para cada carácter del párrafo: índice del <w:t> que lo contiene
+    inicios = []
+    dueno = []
+    for i, texto in enumerate(textos):
+        inicios.append(len(dueno))
+        dueno.extend([i] * len(texto))
+
+    modificados = set()
+    # En orden inverso: los offsets de las coincidencias anteriores siguen válidos
+    for m in reversed(coincidencias):
+        ini, fin = m.start(), m.end()
+        a, b = dueno[ini], dueno[fin - 1]
+        valor = datos[m.group(1)]
+
+        if a == b:
+            base = inicios[a]
+            textos[a] = textos[a][:ini - base] + valor + textos[a][fin - base:]
+        else:
+            textos[a] = textos[a][:ini - inicios[a]] + valor
+            for i in range(a + 1, b):
+                textos[i] = ''
+                modificados.add(i)
+            textos[b] = textos[b][fin - inicios[b]:]
+            modificados.add(b)
+        modificados.add(a)
+
+    for i in sorted(modificados):
+        _asignar_texto(nodos[i], textos[i])
+
+    return len(coincidencias)
+
+
+def _raices_documento(doc) -> List[object]:
+    """Cuerpo + partes de header/footer existentes (sin crear nuevas)"""
+    raices = [doc.element.body]
+    for rel in doc.part.rels.values():
+        if rel.is_external:
+            continue
+        if rel.reltype in (RT.HEADER, RT.FOOTER):
+            raices.append(rel.target_part.element)
+    return raices
+
+
+def reemplazar_marcadores(doc, datos: Dict[str, str]) -> int:
+    """
+    Reemplaza todos los {{marcador}} presentes en `datos` en una sola pasada.
+
+    Args:
+        doc: Documento python-docx
+        datos: Mapa marcador (sin llaves) → valor (str)
+
+    Returns:
+        Número de marcadores reemplazados
+    """
+    total = 0
+    for raiz in _raices_documento(doc):
+        for nodos in _parrafos_con_texto(raiz).values():
+            total += _reemplazar_en_parrafo(nodos, datos)
+
+    logger.info(f"🔁 {total} marcadores reemplazados en una pasada")
+    return total
@@ -0,0 +1,80 @@
+"""
+🧮 EMBEDDING CACHE - Caché LRU de embeddings de consultas
+📁 RUTA: backend/app/services/embedding_cache.py
+
+Las búsquedas RAG repiten las mismas consultas (y variantes fijas como
+"precios costos {query}") en cada turno de chat. Esta caché guarda el
+vector de cada consulta y embebe las que faltan en UN solo lote.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """Caché LRU thread-safe: texto de consulta → embedding (lista de floats)"""
+
+    def __init__(self, max_entradas: int = 512):
+        self.max_entradas = max(1, max_entradas)
+        self._entradas: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.metricas = {"aciertos": 0, "fallos": 0, "lotes": 0}
+
+    def obtener_muchos(
+        self,
+        consultas: Sequence[str],
+        embeber: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        """
+        Embeddings de las consultas, en el mismo orden.
+
+        Args:
+            consultas: Textos de consulta
+            embeber: Función que embebe una lista de textos en un solo lote
+
+        Returns:
+            Lista de embeddings
+        """
+        resultado: Dict[str, List[float]] = {}
+        faltantes: List[str] = []
+
+        with self._lock:
+            for consulta in consultas:
+                if consulta in resultado or consulta in faltantes:
+                    continue
+                vector = self._entradas.get(consulta)
+                if vector is None:
+                    faltantes.append(consulta)
+                else:
+                    self._entradas.move_to_end(consulta)
+                    resultado[consulta] = vector
+                    self.metricas["aciertos"] += 1
+
+        if faltantes:
+            vectores = embeber(faltantes)
+            with self._lock:
+                self.metricas["fallos"] += len(faltantes)
+                self.metricas["lotes"] += 1
+                for consulta, vector in zip(faltantes, vectores):
+                    vector = list(vector)
+                    resultado[consulta] = vector
+                    self._entradas[consulta] = vector
+                    self._entradas.move_to_end(consulta)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+
+        return [resultado[consulta] for consulta in consultas]
+
+    def obtener(self, consulta: str, embeber: Callable[[List[str]], List[List[float]]]) -> List[float]:
+        return self.obtener_muchos([consulta], embeber)[0]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def obtener_metricas(self) -> Dict[str, int]:
+        return {"entradas": len(self._entradas), "max_entradas": self.max_entradas, **self.metricas}
@@ -20,17 +20,23 @@ inteligente sobre el servicio Gemini existente, especializando respuestas por ag
 """
 
 import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from contextlib import aclosing
+from typing import List, Dict, Any, AsyncIterator, Optional
 import json
 import logging
 from datetime import datetime
 from app.core.config import settings
+from app.services.llm_client import ClienteDesconectadoError, get_llm_client
+from app.services.llm_cache import llm_cache
 
 # 🧠 Importar PILIBrain para modo demo inteligente
 from app.services.pili_brain import pili_brain
 
 logger = logging.getLogger(__name__)
 
+# Espacio de nombres en la caché de respuestas para el prompt de _construir_prompt_pili
+PLANTILLA_PROMPT_PILI = "pili-json-v1"
+
 # ═══════════════════════════════════════════════════════════════
 # 🤖 CONFIGURACIÓN PILI - AGENTES ESPECIALIZADOS
 # ═══════════════════════════════════════════════════════════════
@@ -95,12 +101,19 @@ class GeminiService:
         self.pili_activa = True
         self.modo_demo = False
         self.aprendizaje_habilitado = False
+        self.model = None
+        self.llm = None
         
         # Configuración Gemini original
         try:
-            if hasattr(settings, 'GEMINI_API_KEY') and settings.GEMINI_API_KEY:
+            if settings.LLM_BACKEND == "stub":
+                # Backend offline para pruebas de carga (sin API key ni red)
+                self.llm = get_llm_client()
+                logger.info("🧪 PILI usando backend LLM stub (offline)")
+            elif hasattr(settings, 'GEMINI_API_KEY') and settings.GEMINI_API_KEY:
                 genai.configure(api_key=settings.GEMINI_API_KEY)
                 self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+                self.llm = get_llm_client(settings.GEMINI_API_KEY, self.model)
                 self.aprendizaje_habilitado = True
                 logger.info(f"✅ PILI + Gemini configurados: {settings.GEMINI_MODEL}")
             else:
@@ -121,7 +134,9 @@ class GeminiService:
         tipo_servicio: str,
         contexto_adicional: Optional[Dict[str, Any]] = None,
         historial: Optional[List[Dict[str, Any]]] = None,
-        datos_archivos: Optional[Dict[str, Any]] = None
+        datos_archivos: Optional[Dict[str, Any]] = None,
+        request: Optional[Any] = None,
+        usar_cache: bool = True
     ) -> Dict[str, Any]:
         """
         🤖 NUEVO PILI v3.0 - Procesamiento inteligente con agente especializado
@@ -132,6 +147,8 @@ class GeminiService:
             contexto_adicional: Contexto extra del proyecto
             historial: Historial de conversación
             datos_archivos: Información de archivos procesados
+            request: Request HTTP opcional (cancela la llamada LLM si el cliente se desconecta)
+            usar_cache: False para forzar la llamada LLM (bypass de la caché de respuestas)
             
         Returns:
             Respuesta especializada del agente PILI correspondiente
@@ -140,9 +157,10 @@ class GeminiService:
         if self.modo_demo:
             return self._respuesta_demo_pili(mensaje, tipo_servicio)
         
+        # 1. Obtener agente PILI especializado
+        agente = PILI_AGENTES.get(tipo_servicio, PILI_AGENTES["cotizacion-simple"])
+
         try:
-            # 1. Obtener agente PILI especializado
-            agente = PILI_AGENTES.get(tipo_servicio, PILI_AGENTES["cotizacion-simple"])
             nombre_pili = agente["nombre"]
             
             # 2. Construir prompt especializado PILI
@@ -155,19 +173,32 @@ class GeminiService:
                 datos_archivos=datos_archivos
             )
             
-            # 3. Generar respuesta con Gemini
-            response = self.model.generate_content(prompt)
-            respuesta_texto = response.text
+            # 3. Caché de respuestas (los archivos procesados hacen única la consulta)
+            bypass_cache = not usar_cache or bool(datos_archivos)
+            respuesta_texto = await llm_cache.obtener(
+                PLANTILLA_PROMPT_PILI, nombre_pili, tipo_servicio, mensaje,
+                historial, contexto_adicional, bypass=bypass_cache
+            )
+            desde_cache = respuesta_texto is not None
+
+            # 4. Generar respuesta con Gemini (async, no bloquea el event loop)
+            if not desde_cache:
+                respuesta_texto = await self.llm.generate(prompt, request=request)
+                await llm_cache.guardar(
+                    PLANTILLA_PROMPT_PILI, nombre_pili, tipo_servicio, mensaje, respuesta_texto,
+                    historial, contexto_adicional, bypass=bypass_cache
+                )
             
-            # 4. Procesar respuesta PILI
+            # 5. Procesar respuesta PILI
             respuesta_procesada = self._procesar_respuesta_pili(
                 respuesta_texto, 
                 tipo_servicio,
                 nombre_pili
             )
+            respuesta_procesada["desde_cache"] = desde_cache
             
-            # 5. Aprender de la conversación
-            if self.aprendizaje_habilitado:
+            # 6. Aprender de la conversación
+            if self.aprendizaje_habilitado and not desde_cache:
                 await self._guardar_aprendizaje_pili(
                     mensaje=mensaje,
                     respuesta=respuesta_procesada,
@@ -583,15 +614,15 @@ Para el informe necesito:
         )
         
         try:
-            response = self.model.generate_content(prompt)
+            respuesta_texto = await self.llm.generate(prompt)
             
             # Parsear la respuesta
-            cotizacion_data = self._parsear_respuesta_cotizacion(response.text)
+            cotizacion_data = self._parsear_respuesta_cotizacion(respuesta_texto)
             
             return {
                 "exito": True,
                 "cotizacion": cotizacion_data,
-                "respuesta_ia": response.text
+                "respuesta_ia": respuesta_texto
             }
             
         except Exception as e:
@@ -605,12 +636,14 @@ Para el informe necesito:
         self,
         mensaje: str,
         historial: List[Dict[str, str]],
-        contexto: Optional[Dict[str, Any]] = None
+        contexto: Optional[Dict[str, Any]] = None,
+        request: Optional[Any] = None
     ) -> Dict[str, Any]:
         """
         🔄 CONSERVADO - Chat conversacional para refinar cotizaciones
         
         Método original mantenido para compatibilidad hacia atrás.
+        request: Request HTTP opcional (cancela la llamada LLM si el cliente se desconecta)
         """
         
         if self.modo_demo:
@@ -622,20 +655,43 @@ Para el informe necesito:
         prompt = self._construir_prompt_chat(mensaje, historial, contexto)
         
         try:
-            response = self.model.generate_content(prompt)
+            respuesta_texto = await self.llm.generate(prompt, request=request)
             
             return {
                 "exito": True,
-                "respuesta": response.text,
-                "cotizacion_actualizada": self._extraer_cotizacion_si_existe(response.text)
+                "respuesta": respuesta_texto,
+                "cotizacion_actualizada": self._extraer_cotizacion_si_existe(respuesta_texto)
             }
             
+        except ClienteDesconectadoError:
+            raise
         except Exception as e:
             return {
                 "exito": False,
                 "error": str(e)
             }
-    
+
+    async def chat_conversacional_stream(
+        self,
+        mensaje: str,
+        historial: List[Dict[str, str]],
+        contexto: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        ⚡ Variante en streaming de chat_conversacional (mismo prompt)
+
+        Emite los fragmentos del LLM a medida que llegan. Los errores se
+        propagan: quien consume decide el fallback. Cerrar el generador
+        cancela la llamada en curso.
+        """
+        if self.modo_demo or self.llm is None:
+            raise RuntimeError("Gemini no configurado")
+
+        prompt = self._construir_prompt_chat(mensaje, historial, contexto)
+        async with aclosing(self.llm.stream(prompt)) as fragmentos:
+            async for fragmento in fragmentos:
+                yield fragmento
+
     async def analizar_documento(self, contenido: str, tipo: str) -> Dict[str, Any]:
         """
         🔄 CONSERVADO - Analiza un documento y extrae información relevante para cotización
@@ -680,11 +736,12 @@ RESPONDE EN FORMATO JSON:
 }}
 """
         
+        respuesta_texto = None
         try:
-            response = self.model.generate_content(prompt)
+            respuesta_texto = await self.llm.generate(prompt)
             
             # Intentar parsear JSON
-            texto = response.text.strip()
+            texto = respuesta_texto.strip()
             # Limpiar markdown si existe
             if "```json" in texto:
                 texto = texto.split("```json")[1].split("```")[0].strip()
@@ -702,7 +759,7 @@ RESPONDE EN FORMATO JSON:
             return {
                 "exito": False,
                 "error": str(e),
-                "respuesta_raw": response.text if 'response' in locals() else None
+                "respuesta_raw": respuesta_texto
             }
     
     # ═══════════════════════════════════════════════════════════════
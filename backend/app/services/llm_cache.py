@@ -0,0 +1,282 @@
+"""
+🗃️ LLM CACHE - Caché de respuestas para prompts PILI
+📁 RUTA: backend/app/services/llm_cache.py
+
+Los prompts por servicio (preguntas de categoría ITSE, cotizaciones eléctricas
+estándar, etc.) se repiten mucho entre usuarios. Esta caché evita repetir la
+llamada LLM (lenta y de pago) cuando la conversación ya fue respondida:
+
+- Nivel exacto: hash normalizado de plantilla de prompt + agente + servicio +
+  contexto + historial reciente + mensaje. La plantilla separa prompts
+  distintos de un mismo agente (p.ej. uno pide JSON y otro texto libre)
+- Nivel semántico (opcional, LLM_CACHE_SEMANTIC): dentro de la misma
+  conversación base (todo menos el mensaje), compara el mensaje por similitud
+  coseno con el modelo sentence-transformers del RAGEngine (el embedding se
+  calcula en un hilo, sin bloquear el event loop)
+- Expiración TTL + desalojo LRU (LLM_CACHE_MAX_ENTRIES)
+- Métricas de aciertos / fallos y bypass global (LLM_CACHE_ENABLED) o por llamada
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Mismo recorte de historial que usan los prompts PILI
+HISTORIAL_RECIENTE = 5
+
+_ESPACIOS = re.compile(r"\s+")
+_PUNTUACION_FINAL = re.compile(r"[\s¿?¡!.,;:]+$")
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin tildes, espacios colapsados y sin puntuación final"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _ESPACIOS.sub(" ", texto.lower()).strip()
+    return _PUNTUACION_FINAL.sub("", texto).lstrip("¿¡ ")
+
+
+def _hash(*partes: Any) -> str:
+    crudo = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+def _historial_normalizado(historial: Optional[List[Dict]]) -> List[Tuple[str, str]]:
+    recientes = (historial or [])[-HISTORIAL_RECIENTE:]
+    return [
+        (
+            str(msg.get("role", msg.get("tipo", ""))).lower(),
+            normalizar_texto(msg.get("content", msg.get("mensaje", "")))
+        )
+        for msg in recientes
+    ]
+
+
+class _Entrada:
+    __slots__ = ("respuesta", "creada", "base", "vector")
+
+    def __init__(self, respuesta: str, base: str, vector=None):
+        self.respuesta = respuesta
+        self.creada = time.monotonic()
+        self.base = base
+        self.vector = vector
+
+
+class LLMResponseCache:
+    """Caché LRU + TTL de respuestas LLM con nivel semántico opcional"""
+
+    def __init__(
+        self,
+        max_entradas: int = 1000,
+        ttl_segundos: float = 3600,
+        semantica: bool = False,
+        umbral_similitud: float = 0.92,
+        habilitada: bool = True
+    ):
+        self.max_entradas = max(1, max_entradas)
+        self.ttl_segundos = ttl_segundos
+        self.semantica = semantica
+        self.umbral_similitud = umbral_similitud
+        self.habilitada = habilitada
+
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._modelo = None
+        self._modelo_cargado = False
+
+        self.metricas = {
+            "aciertos_exactos": 0,
+            "aciertos_semanticos": 0,
+            "fallos": 0,
+            "bypass": 0,
+            "guardados": 0,
+            "expirados": 0,
+            "desalojados": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Claves
+    # ------------------------------------------------------------------
+
+    def claves(
+        self,
+        plantilla: str,
+        agente: str,
+        servicio: str,
+        mensaje: str,
+        historial: Optional[List[Dict]] = None,
+        contexto: Any = None
+    ) -> Tuple[str, str]:
+        """
+        Retorna (clave_exacta, clave_base).
+
+        `plantilla` nombra el prompt que se construye con estos datos:
+        dos prompts del mismo agente nunca comparten respuestas.
+        La clave base identifica la conversación sin el mensaje actual; el
+        nivel semántico solo compara mensajes que comparten la misma base.
+        """
+        contexto_norm = normalizar_texto(contexto) if isinstance(contexto, str) else contexto
+        base = _hash(plantilla, agente, servicio, contexto_norm, _historial_normalizado(historial))
+        return _hash(base, normalizar_texto(mensaje)), base
+
+    # ------------------------------------------------------------------
+    # Nivel semántico
+    # ------------------------------------------------------------------
+
+    def _obtener_modelo(self):
+        """Modelo de embeddings del RAGEngine (carga perezosa, puede ser None)"""
+        if not self._modelo_cargado:
+            self._modelo_cargado = True
+            try:
+                from app.services.professional.rag.rag_engine import get_rag_engine
+                self._modelo = get_rag_engine().model
+            except Exception as e:
+                logger.warning(f"⚠️ Caché semántica sin modelo de embeddings: {e}")
+                self._modelo = None
+            if self._modelo is None:
+                logger.warning("⚠️ Caché semántica deshabilitada: embeddings no disponibles")
+        return self._modelo
+
+    def _vectorizar(self, mensaje: str):
+        modelo = self._obtener_modelo() if self.semantica else None
+        if modelo is None:
+            return None
+        try:
+            return modelo.encode(normalizar_texto(mensaje), normalize_embeddings=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Error generando embedding para caché: {e}")
+            return None
+
+    def _buscar_similar(self, base: str, vector) -> Optional[Tuple[str, _Entrada, float]]:
+        mejor = None
+        for clave, entrada in self._entradas.items():
+            if entrada.base != base or entrada.vector is None:
+                continue
+            similitud = float((entrada.vector * vector).sum())
+            if similitud >= self.umbral_similitud and (mejor is None or similitud > mejor[2]):
+                mejor = (clave, entrada, similitud)
+        return mejor
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def _expirada(self, entrada: _Entrada) -> bool:
+        return self.ttl_segundos > 0 and time.monotonic() - entrada.creada > self.ttl_segundos
+
+    async def obtener(
+        self,
+        plantilla: str,
+        agente: str,
+        servicio: str,
+        mensaje: str,
+        historial: Optional[List[Dict]] = None,
+        contexto: Any = None,
+        bypass: bool = False
+    ) -> Optional[str]:
+        """Respuesta cacheada para la conversación, o None"""
+        if bypass or not self.habilitada:
+            self.metricas["bypass"] += 1
+            return None
+
+        clave, base = self.claves(plantilla, agente, servicio, mensaje, historial, contexto)
+
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if self._expirada(entrada):
+                    del self._entradas[clave]
+                    self.metricas["expirados"] += 1
+                else:
+                    self._entradas.move_to_end(clave)
+                    self.metricas["aciertos_exactos"] += 1
+                    return entrada.respuesta
+
+        if self.semantica:
+            # Cargar el modelo y calcular el embedding bloquea: fuera del event loop
+            vector = await asyncio.to_thread(self._vectorizar, mensaje)
+            if vector is not None:
+                with self._lock:
+                    similar = self._buscar_similar(base, vector)
+                    if similar is not None:
+                        clave_similar, entrada, similitud = similar
+                        if self._expirada(entrada):
+                            del self._entradas[clave_similar]
+                            self.metricas["expirados"] += 1
+                        else:
+                            self._entradas.move_to_end(clave_similar)
+                            self.metricas["aciertos_semanticos"] += 1
+                            logger.info(f"🗃️ Acierto semántico en caché LLM (similitud {similitud:.3f})")
+                            return entrada.respuesta
+
+        self.metricas["fallos"] += 1
+        return None
+
+    async def guardar(
+        self,
+        plantilla: str,
+        agente: str,
+        servicio: str,
+        mensaje: str,
+        respuesta: str,
+        historial: Optional[List[Dict]] = None,
+        contexto: Any = None,
+        bypass: bool = False
+    ):
+        """Guarda la respuesta LLM de la conversación"""
+        if bypass or not self.habilitada or not respuesta:
+            return
+
+        clave, base = self.claves(plantilla, agente, servicio, mensaje, historial, contexto)
+        vector = await asyncio.to_thread(self._vectorizar, mensaje) if self.semantica else None
+
+        with self._lock:
+            self._entradas[clave] = _Entrada(respuesta, base, vector)
+            self._entradas.move_to_end(clave)
+            self.metricas["guardados"] += 1
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.metricas["desalojados"] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        aciertos = self.metricas["aciertos_exactos"] + self.metricas["aciertos_semanticos"]
+        consultas = aciertos + self.metricas["fallos"]
+        return {
+            "habilitada": self.habilitada,
+            "semantica": self.semantica,
+            "entradas": len(self._entradas),
+            "max_entradas": self.max_entradas,
+            "ttl_segundos": self.ttl_segundos,
+            "tasa_aciertos": round(aciertos / consultas, 4) if consultas else 0.0,
+            **self.metricas
+        }
+
+
+# Instancia global
+llm_cache = LLMResponseCache(
+    max_entradas=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_segundos=settings.LLM_CACHE_TTL_SECONDS,
+    semantica=settings.LLM_CACHE_SEMANTIC,
+    umbral_similitud=settings.LLM_CACHE_SIMILARITY,
+    habilitada=settings.LLM_CACHE_ENABLED
+)
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Obtiene la caché global de respuestas LLM"""
+    return llm_cache
@@ -0,0 +1,287 @@
+"""
+⚡ LLM CLIENT - Cliente asíncrono no bloqueante para Gemini
+📁 RUTA: backend/app/services/llm_client.py
+
+Capa entre GeminiService y el proveedor LLM:
+- Llamadas 100% async (generate_content_async): nunca bloquean el event loop
+- Semáforo acotado por API key (LLM_MAX_CONCURRENCY)
+- Timeout por llamada (LLM_TIMEOUT_SECONDS)
+- Reintentos con backoff exponencial + jitter en 429 / 5xx / timeout
+- Cancelación si el cliente HTTP se desconecta (request.is_disconnected())
+- Streaming de tokens (stream) para respuestas SSE
+- Backend "stub" para pruebas de carga sin red (LLM_BACKEND=stub)
+"""
+
+import asyncio
+import logging
+import random
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_NOMBRES_REINTENTABLES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "GatewayTimeout",
+    "BadGateway",
+}
+
+
+class LLMError(Exception):
+    """Error genérico de la capa LLM"""
+
+
+class LLMTimeoutError(LLMError):
+    """La llamada superó LLM_TIMEOUT_SECONDS en todos los intentos"""
+
+
+class ClienteDesconectadoError(LLMError):
+    """El cliente HTTP cerró la conexión; la llamada se canceló"""
+
+
+def es_error_reintentable(exc: BaseException) -> bool:
+    """429, 5xx y timeouts se reintentan; el resto se propaga"""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    codigo = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    try:
+        codigo = int(codigo)
+    except (TypeError, ValueError):
+        codigo = None
+    if codigo is not None and (codigo == 429 or 500 <= codigo < 600):
+        return True
+    return type(exc).__name__ in _NOMBRES_REINTENTABLES
+
+
+# ═══════════════════════════════════════════════════════════════
+# BACKENDS
+# ═══════════════════════════════════════════════════════════════
+
+class GeminiBackend:
+    """Backend real: google.generativeai con API nativa async"""
+
+    nombre = "gemini"
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            texto = getattr(chunk, "text", "")
+            if texto:
+                yield texto
+
+
+class StubBackend:
+    """Backend offline: respuesta determinista con latencia simulada"""
+
+    nombre = "stub"
+
+    def __init__(self, latencia_ms: int = 0):
+        self.latencia_ms = latencia_ms
+
+    async def generate(self, prompt: str) -> str:
+        if self.latencia_ms:
+            await asyncio.sleep(self.latencia_ms / 1000)
+        resumen = prompt.strip().splitlines()[-1][:120] if prompt.strip() else ""
+        return f"[PILI stub] Respuesta simulada para: {resumen}"
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        texto = await self.generate(prompt)
+        for palabra in texto.split(" "):
+            yield palabra + " "
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENTE
+# ═══════════════════════════════════════════════════════════════
+
+class LLMClient:
+    """Cliente con concurrencia acotada, timeouts y reintentos"""
+
+    def __init__(
+        self,
+        backend,
+        max_concurrencia: int = 8,
+        timeout: float = 60.0,
+        max_reintentos: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        self.backend = backend
+        self.max_concurrencia = max_concurrencia
+        self.timeout = timeout
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaforo: Optional[asyncio.Semaphore] = None
+
+        self.metricas = {
+            "llamadas": 0,
+            "reintentos": 0,
+            "timeouts": 0,
+            "errores": 0,
+            "cancelaciones": 0,
+        }
+
+    @property
+    def semaforo(self) -> asyncio.Semaphore:
+        # Se crea perezosamente para ligarse al event loop del servidor
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        return self._semaforo
+
+    def _espera_backoff(self, intento: int) -> float:
+        # Full jitter: uniforme entre 0 y el techo exponencial
+        techo = min(self.backoff_max, self.backoff_base * (2 ** intento))
+        return random.uniform(0, techo)
+
+    async def _generar_con_reintentos(self, prompt: str) -> str:
+        ultimo_error: Optional[BaseException] = None
+
+        for intento in range(self.max_reintentos + 1):
+            try:
+                async with self.semaforo:
+                    self.metricas["llamadas"] += 1
+                    return await asyncio.wait_for(self.backend.generate(prompt), timeout=self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ultimo_error = e
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metricas["timeouts"] += 1
+                if intento >= self.max_reintentos or not es_error_reintentable(e):
+                    break
+                espera = self._espera_backoff(intento)
+                self.metricas["reintentos"] += 1
+                logger.warning(
+                    f"⚠️ LLM {self.backend.nombre} falló ({type(e).__name__}), "
+                    f"reintento {intento + 1}/{self.max_reintentos} en {espera:.2f}s"
+                )
+                await asyncio.sleep(espera)
+
+        self.metricas["errores"] += 1
+        if isinstance(ultimo_error, asyncio.TimeoutError):
+            raise LLMTimeoutError(f"LLM sin respuesta tras {self.timeout}s") from ultimo_error
+        raise ultimo_error
+
+    async def generate(self, prompt: str, request: Any = None) -> str:
+        """
+        Genera texto para el prompt.
+
+        Args:
+            prompt: Prompt completo
+            request: starlette Request opcional; si el cliente se desconecta
+                     la llamada en curso se cancela
+
+        Returns:
+            Texto generado
+        """
+        if request is None:
+            return await self._generar_con_reintentos(prompt)
+
+        tarea = asyncio.create_task(self._generar_con_reintentos(prompt))
+        try:
+            while True:
+                hecho, _ = await asyncio.wait({tarea}, timeout=0.5)
+                if hecho:
+                    return tarea.result()
+                if await request.is_disconnected():
+                    tarea.cancel()
+                    self.metricas["cancelaciones"] += 1
+                    logger.info("🔌 Cliente desconectado: llamada LLM cancelada")
+                    raise ClienteDesconectadoError("Cliente desconectado")
+        finally:
+            if not tarea.done():
+                tarea.cancel()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Genera texto como flujo de fragmentos (tokens).
+
+        Los reintentos solo aplican antes del primer fragmento; una vez que se
+        empezó a emitir, un fallo se propaga al consumidor. El timeout se
+        aplica a la espera de cada fragmento.
+        """
+        for intento in range(self.max_reintentos + 1):
+            emitido = False
+            try:
+                async with self.semaforo:
+                    self.metricas["llamadas"] += 1
+                    iterador = self.backend.stream(prompt).__aiter__()
+                    while True:
+                        try:
+                            fragmento = await asyncio.wait_for(iterador.__anext__(), timeout=self.timeout)
+                        except StopAsyncIteration:
+                            return
+                        emitido = True
+                        yield fragmento
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metricas["timeouts"] += 1
+                if emitido or intento >= self.max_reintentos or not es_error_reintentable(e):
+                    self.metricas["errores"] += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise LLMTimeoutError(f"LLM sin respuesta tras {self.timeout}s") from e
+                    raise
+                espera = self._espera_backoff(intento)
+                self.metricas["reintentos"] += 1
+                logger.warning(
+                    f"⚠️ LLM stream {self.backend.nombre} falló ({type(e).__name__}), "
+                    f"reintento {intento + 1}/{self.max_reintentos} en {espera:.2f}s"
+                )
+                await asyncio.sleep(espera)
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.nombre,
+            "max_concurrencia": self.max_concurrencia,
+            **self.metricas
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# FACTORY (un cliente/semáforo por API key)
+# ═══════════════════════════════════════════════════════════════
+
+_clientes: Dict[str, LLMClient] = {}
+
+
+def crear_backend(model=None):
+    """Crea el backend según LLM_BACKEND ('gemini' | 'stub')"""
+    if settings.LLM_BACKEND == "stub":
+        return StubBackend(latencia_ms=settings.LLM_STUB_LATENCY_MS)
+    if model is None:
+        raise LLMError("Backend 'gemini' requiere un modelo configurado")
+    return GeminiBackend(model)
+
+
+def get_llm_client(api_key: str = "", model=None) -> LLMClient:
+    """Obtiene (o crea) el cliente LLM asociado a una API key"""
+    clave = "stub" if settings.LLM_BACKEND == "stub" else api_key
+    cliente = _clientes.get(clave)
+    if cliente is None:
+        cliente = LLMClient(
+            backend=crear_backend(model),
+            max_concurrencia=settings.LLM_MAX_CONCURRENCY,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            max_reintentos=settings.LLM_MAX_RETRIES
+        )
+        _clientes[clave] = cliente
+        logger.info(
+            f"✅ LLMClient '{cliente.backend.nombre}' listo "
+            f"(concurrencia={cliente.max_concurrencia}, timeout={cliente.timeout}s)"
+        )
+    return cliente
@@ -0,0 +1,162 @@
+"""
+🔢 NUMERACIÓN - Asignación atómica de números correlativos
+📁 RUTA: backend/app/services/numeracion.py
+
+Antes cada cotización buscaba la última con LIKE 'COT-YYYYMM%' ORDER BY
+numero DESC y le sumaba 1: un escaneo por cotización y números duplicados
+cuando dos requests llegaban a la vez.
+
+Ahora cada prefijo tiene un contador en `secuencias_numeracion` (la tabla
+la crea la migración b7e5a0d913c6) que se incrementa con una sola
+sentencia atómica (UPDATE ... RETURNING, o UPSERT la primera vez).
+Funciona igual en SQLite y PostgreSQL: la fila del contador serializa a
+los escritores concurrentes.
+
+- Pre-asignación por proceso: con NUMERACION_BLOQUE > 1 cada proceso
+  reserva bloques de una sola sentencia y reparte localmente (puede dejar
+  huecos al reiniciar)
+- La asignación se confirma en su propia transacción: si la cotización
+  falla después, ese número queda sin usar (como una secuencia nativa)
+- Solo se toma número al guardar una cotización; las vistas previas que
+  no se guardan usan `numero_borrador_cotizacion()` y no consumen la
+  secuencia
+"""
+
+import logging
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.models.cotizacion import Cotizacion
+from app.models.secuencia import SecuenciaNumeracion
+
+logger = logging.getLogger(__name__)
+
+Semilla = Callable[[Connection, str], int]
+
+_TABLA = SecuenciaNumeracion.__table__
+_SUFIJO_NUMERICO = re.compile(r"-(\d+)$")
+
+
+def semilla_cotizaciones(conn: Connection, prefijo: str) -> int:
+    """
+    Mayor correlativo ya usado con el prefijo (solo la primera vez que se
+    usa un prefijo, para continuar la numeración existente)
+    """
+    numeros = conn.execute(
+        select(Cotizacion.numero).where(Cotizacion.numero.like(f"{prefijo}-%"))
+    ).scalars()
+    maximo = 0
+    for numero in numeros:
+        coincidencia = _SUFIJO_NUMERICO.search(numero or "")
+        if coincidencia:
+            maximo = max(maximo, int(coincidencia.group(1)))
+    return maximo
+
+
+class AsignadorSecuencias:
+    """Contadores atómicos por prefijo con reserva opcional por bloques"""
+
+    def __init__(self, engine: Engine, semilla: Optional[Semilla] = None, tamano_bloque: int = 1):
+        self.engine = engine
+        self.semilla = semilla
+        self.tamano_bloque = max(1, tamano_bloque)
+
+        self._locales: Dict[str, List[int]] = {}  # prefijo -> [siguiente, ultimo_reservado]
+        self._lock = threading.Lock()
+
+    def _upsert(self, conn: Connection, prefijo: str, cantidad: int, semilla: int):
+        dialecto = conn.dialect.name
+        if dialecto == "postgresql":
+            insertar = postgresql.insert(_TABLA)
+        elif dialecto == "sqlite":
+            insertar = sqlite.insert(_TABLA)
+        else:
+            raise NotImplementedError(f"Numeración atómica no soportada para {dialecto}")
+        sentencia = insertar.values(prefijo=prefijo, ultimo=semilla + cantidad).on_conflict_do_update(
+            index_elements=[_TABLA.c.prefijo],
+            set_={"ultimo": _TABLA.c.ultimo + cantidad}
+        ).returning(_TABLA.c.ultimo)
+        return conn.execute(sentencia).scalar_one()
+
+    def _reservar(self, prefijo: str, cantidad: int) -> int:
+        """Incrementa el contador y retorna el último número reservado"""
+        with self.engine.begin() as conn:
+            ultimo = conn.execute(
+                update(_TABLA)
+                .where(_TABLA.c.prefijo == prefijo)
+                .values(ultimo=_TABLA.c.ultimo + cantidad)
+                .returning(_TABLA.c.ultimo)
+            ).scalar()
+            if ultimo is not None:
+                return ultimo
+
+        # Primera vez del prefijo: sembrar con la numeración existente.
+        # Si otro proceso crea la fila primero, el UPSERT cae en el UPDATE.
+        with self.engine.begin() as conn:
+            semilla = self.semilla(conn, prefijo) if self.semilla else 0
+            ultimo = self._upsert(conn, prefijo, cantidad, semilla)
+        logger.info(f"🔢 Secuencia '{prefijo}' iniciada (semilla {semilla})")
+        return ultimo
+
+    def siguiente(self, prefijo: str) -> int:
+        """Siguiente número del prefijo (del bloque local si hay pre-asignación)"""
+        if self.tamano_bloque == 1:
+            return self._reservar(prefijo, 1)
+
+        with self._lock:
+            local = self._locales.get(prefijo)
+            if local is None or local[0] > local[1]:
+                ultimo = self._reservar(prefijo, self.tamano_bloque)
+                local = self._locales[prefijo] = [ultimo - self.tamano_bloque + 1, ultimo]
+            numero = local[0]
+            local[0] += 1
+            return numero
+
+
+# ═══════════════════════════════════════════════════════════════
+# COTIZACIONES (COT-YYYYMM-NNNN)
+# ═══════════════════════════════════════════════════════════════
+
+def prefijo_cotizacion(fecha: Optional[datetime] = None) -> str:
+    return f"COT-{(fecha or datetime.now()).strftime('%Y%m')}"
+
+
+def formatear_numero(prefijo: str, numero: int) -> str:
+    return f"{prefijo}-{numero:04d}"
+
+
+_asignador: Optional[AsignadorSecuencias] = None
+_asignador_lock = threading.Lock()
+
+
+def get_asignador() -> AsignadorSecuencias:
+    """Obtiene (o crea) el asignador global"""
+    global _asignador
+    if _asignador is None:
+        with _asignador_lock:
+            if _asignador is None:
+                from app.core.database import engine
+                _asignador = AsignadorSecuencias(
+                    engine,
+                    semilla=semilla_cotizaciones,
+                    tamano_bloque=settings.NUMERACION_BLOQUE
+                )
+    return _asignador
+
+
+def siguiente_numero_cotizacion(fecha: Optional[datetime] = None) -> str:
+    """Número único de cotización. Formato: COT-YYYYMM-XXXX"""
+    prefijo = prefijo_cotizacion(fecha)
+    return formatear_numero(prefijo, get_asignador().siguiente(prefijo))
+
+
+def numero_borrador_cotizacion(fecha: Optional[datetime] = None) -> str:
+    """Número provisional para documentos sin guardar (no consume la secuencia)"""
+    return f"{prefijo_cotizacion(fecha)}-BORRADOR"
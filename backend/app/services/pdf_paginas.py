@@ -0,0 +1,72 @@
+"""
+📄 PDF PÁGINAS - Extracción de texto/OCR/tablas por lote de páginas
+📁 RUTA: backend/app/services/pdf_paginas.py
+
+Función de trabajo del pool de procesos de FileProcessorPro. Vive fuera de
+app.services.professional a propósito: el pool usa "spawn" y cada worker
+importa este módulo; importar el paquete professional cargaría RAG, ML y
+gráficas en cada proceso.
+"""
+
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pdfplumber
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+try:
+    import pytesseract
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+
+def extraer_paginas_pdf(
+    file_path: str,
+    page_indices: List[int],
+    extract_tables: bool = True,
+    ocr_enabled: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Extrae texto (con OCR si la página no tiene texto) y tablas de un lote
+    de páginas.
+
+    Returns:
+        Lista de dicts {"page", "text", "ocr", "tables"} en orden de página
+    """
+    pages = []
+    with pdfplumber.open(file_path) as pdf:
+        for i in page_indices:
+            page = pdf.pages[i]
+            result = {"page": i + 1, "text": "", "ocr": False, "tables": []}
+
+            # Extraer texto
+            page_text = page.extract_text()
+
+            if page_text:
+                result["text"] = page_text
+            elif ocr_enabled and OCR_AVAILABLE:
+                # Intentar OCR si no hay texto
+                img = page.to_image(resolution=300)
+                ocr_text = pytesseract.image_to_string(img.original, lang='spa')
+                if ocr_text.strip():
+                    result["text"] = ocr_text
+                    result["ocr"] = True
+
+            # Extraer tablas
+            if extract_tables:
+                for j, table in enumerate(page.extract_tables()):
+                    if table:
+                        result["tables"].append({
+                            "page": i + 1,
+                            "table_index": j,
+                            "data": table
+                        })
+
+            pages.append(result)
+    return pages
@@ -26,8 +26,11 @@ import json
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from functools import lru_cache
 import logging
 
+from app.services.pili_matcher import MatcherPILI
+
 logger = logging.getLogger(__name__)
 
 
@@ -137,6 +140,10 @@ class PILIBrain:
     def __init__(self):
         """Inicializa el cerebro de PILI"""
         self.servicios = SERVICIOS_PILI
+        # Keywords y patrones compilados una vez; detectar_servicio y
+        # extraer_datos sobre el mismo mensaje comparten un solo análisis
+        self.matcher = MatcherPILI(self.servicios)
+        self._analizar = lru_cache(maxsize=256)(self.matcher.analizar)
         logger.info("🧠 PILIBrain inicializado - Modo 100% offline")
 
     # ──────────────────────────────────────────────────────────────
@@ -153,28 +160,10 @@ class PILIBrain:
         Returns:
             Código del servicio detectado
         """
-        mensaje_lower = mensaje.lower()
-        scores = {}
-
-        for codigo_servicio, info in self.servicios.items():
-            score = 0
-            keywords = info["keywords"]
-
-            # Contar matches de keywords
-            for keyword in keywords:
-                if keyword in mensaje_lower:
-                    score += 10
-
-            scores[codigo_servicio] = score
-
-        # Obtener servicio con mayor score
-        if max(scores.values()) > 0:
-            servicio_detectado = max(scores, key=scores.get)
-            logger.info(f"🎯 Servicio detectado: {servicio_detectado} (score: {scores[servicio_detectado]})")
-            return servicio_detectado
-        else:
-            # Default: eléctrico residencial
-            return "electrico-residencial"
+        analisis = self._analizar(mensaje)
+        if analisis.score > 0:
+            logger.info(f"🎯 Servicio detectado: {analisis.servicio} (score: {analisis.score})")
+        return analisis.servicio
 
     # ──────────────────────────────────────────────────────────────
     # 📊 EXTRACCIÓN DE DATOS DEL MENSAJE
@@ -191,13 +180,14 @@ class PILIBrain:
         Returns:
             Diccionario con datos extraídos
         """
+        analisis = self._analizar(mensaje)
         datos = {
-            "area_m2": self._extraer_area(mensaje),
-            "num_pisos": self._extraer_pisos(mensaje),
-            "cantidad_puntos": self._extraer_cantidad_general(mensaje),
-            "potencia_hp": self._extraer_potencia(mensaje),
-            "tipo_instalacion": self._extraer_tipo_instalacion(mensaje),
-            "complejidad": self._determinar_complejidad(mensaje, servicio)
+            "area_m2": analisis.area_m2,
+            "num_pisos": analisis.num_pisos,
+            "cantidad_puntos": analisis.cantidad_puntos,
+            "potencia_hp": analisis.potencia_hp,
+            "tipo_instalacion": analisis.tipo_instalacion,
+            "complejidad": analisis.complejidad
         }
 
         logger.info(f"📊 Datos extraídos: {datos}")
@@ -205,111 +195,27 @@ class PILIBrain:
 
     def _extraer_area(self, mensaje: str) -> Optional[float]:
         """Extrae área en m² del mensaje"""
-        # Patrones: "150m2", "150 m2", "150m²", "150 m²", "150 metros cuadrados"
-        patterns = [
-            r'(\d+\.?\d*)\s*m[2²]',
-            r'(\d+\.?\d*)\s*metros?\s*cuadrados?',
-            r'área\s*de\s*(\d+\.?\d*)',
-            r'(\d+\.?\d*)\s*m\s*cuadrados?'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, mensaje.lower())
-            if match:
-                area = float(match.group(1))
-                logger.info(f"📐 Área detectada: {area} m²")
-                return area
-
-        return None
+        return self._analizar(mensaje).area_m2
 
     def _extraer_pisos(self, mensaje: str) -> int:
         """Extrae número de pisos del mensaje"""
-        patterns = [
-            r'(\d+)\s*pisos?',
-            r'(\d+)\s*niveles?',
-            r'(\d+)\s*plantas?'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, mensaje.lower())
-            if match:
-                pisos = int(match.group(1))
-                logger.info(f"🏢 Pisos detectados: {pisos}")
-                return pisos
-
-        return 1  # Default
+        return self._analizar(mensaje).num_pisos
 
     def _extraer_cantidad_general(self, mensaje: str) -> Optional[int]:
         """Extrae cantidad general de puntos/elementos"""
-        patterns = [
-            r'(\d+)\s*puntos?',
-            r'(\d+)\s*tomacorrientes?',
-            r'(\d+)\s*luces?',
-            r'(\d+)\s*detectores?',
-            r'(\d+)\s*cámaras?'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, mensaje.lower())
-            if match:
-                cantidad = int(match.group(1))
-                logger.info(f"🔢 Cantidad detectada: {cantidad}")
-                return cantidad
-
-        return None
+        return self._analizar(mensaje).cantidad_puntos
 
     def _extraer_potencia(self, mensaje: str) -> Optional[float]:
         """Extrae potencia en HP o kW del mensaje"""
-        patterns = [
-            r'(\d+\.?\d*)\s*hp',
-            r'(\d+\.?\d*)\s*kw',
-            r'(\d+\.?\d*)\s*kilovatios?'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, mensaje.lower())
-            if match:
-                potencia = float(match.group(1))
-                logger.info(f"⚡ Potencia detectada: {potencia}")
-                return potencia
-
-        return None
+        return self._analizar(mensaje).potencia_hp
 
     def _extraer_tipo_instalacion(self, mensaje: str) -> str:
         """Determina tipo de instalación"""
-        mensaje_lower = mensaje.lower()
-
-        if any(word in mensaje_lower for word in ["nueva", "nuevo", "desde cero"]):
-            return "nueva"
-        elif any(word in mensaje_lower for word in ["remodelación", "actualización", "mejora"]):
-            return "remodelacion"
-        elif any(word in mensaje_lower for word in ["ampliación", "expansión"]):
-            return "ampliacion"
-        else:
-            return "nueva"  # Default
+        return self._analizar(mensaje).tipo_instalacion
 
     def _determinar_complejidad(self, mensaje: str, servicio: str) -> str:
         """Determina si el proyecto es simple o complejo"""
-        mensaje_lower = mensaje.lower()
-
-        # Indicadores de complejidad
-        indicadores_complejo = [
-            "complejo", "grande", "múltiple", "varios", "avanzado",
-            "industrial", "pmi", "gantt", "cronograma detallado",
-            "análisis", "ejecutivo", "apa"
-        ]
-
-        for indicador in indicadores_complejo:
-            if indicador in mensaje_lower:
-                return "complejo"
-
-        # Por área
-        datos_area = self._extraer_area(mensaje)
-        if datos_area:
-            if datos_area > 300:
-                return "complejo"
-
-        return "simple"  # Default
+        return self._analizar(mensaje).complejidad
 
     # ──────────────────────────────────────────────────────────────
     # 🏗️ GENERACIÓN DE COTIZACIONES
@@ -23,10 +23,13 @@ VERSION: 3.0 PRODUCTION READY
 import logging
 import os
 import json
-from typing import Dict, Any, List, Optional, Tuple
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from app.services.llm_client import ClienteDesconectadoError
+
 # Imports de servicios existentes
 try:
     from app.services.pili_brain import PILIBrain, pili_brain
@@ -250,7 +253,10 @@ class PILIIntegrator:
         tipo_flujo: str,
         historial: List[Dict] = None,
         generar_documento: bool = False,
-        datos_acumulados: Optional[Dict] = None
+        datos_acumulados: Optional[Dict] = None,
+        conversation_state: Optional[Dict] = None,
+        servicio_forzado: Optional[str] = None,
+        request: Optional[Any] = None
     ) -> Dict[str, Any]:
         """
         Procesa una solicitud completa con conversación inteligente
@@ -261,6 +267,9 @@ class PILIIntegrator:
             historial: Historial de conversación
             generar_documento: Si debe generar documento final
             datos_acumulados: Datos acumulados de conversaciones previas
+            conversation_state: Estado de conversación del especialista
+            servicio_forzado: Forzar servicio específico (ej: itse)
+            request: Request HTTP opcional (cancela la llamada LLM si el cliente se desconecta)
         
         Returns:
             Dict con success, respuesta, botones, datos_generados, etc.
@@ -268,8 +277,7 @@ class PILIIntegrator:
         try:
             logger.info("Procesando solicitud: %s", tipo_flujo)
             
-            # Detectar servicio
-            servicio = self.pili_brain.detectar_servicio(mensaje) if self.pili_brain else "electrico-residencial"
+            servicio = self._detectar_servicio(mensaje, servicio_forzado)
             
             # Determinar tipo de documento y complejidad
             tipo_documento, complejidad = self._parsear_tipo_flujo(tipo_flujo)
@@ -280,47 +288,139 @@ class PILIIntegrator:
                 tipo_flujo=tipo_flujo,
                 historial=historial or [],
                 servicio=servicio,
-                datos_acumulados=datos_acumulados
+                datos_acumulados=datos_acumulados,
+                conversation_state=conversation_state,
+                request=request
             )
             
-            # Preparar respuesta
-            resultado = {
-                "success": True,
-                "respuesta": respuesta_chat.get("texto", ""),
-                "agente": respuesta_chat.get("agente", "PILI"),
-                "modo": respuesta_chat.get("modo", "PILI_BRAIN"),
-                "servicio": servicio,
-                "tipo_documento": tipo_documento,
-                "complejidad": complejidad
-            }
+            resultado = self._armar_resultado(respuesta_chat, servicio, tipo_documento, complejidad)
+            logger.info("Solicitud procesada exitosamente: %s", tipo_flujo)
+            return resultado
             
-            # ✅ CRÍTICO: Pasar botones si existen
-            if respuesta_chat.get("botones"):
-                resultado["botones"] = respuesta_chat["botones"]
-                logger.info(f"✅ Retornando {len(respuesta_chat['botones'])} botones al router")
+        except ClienteDesconectadoError:
+            raise
+        except Exception as e:
+            logger.error(f"Error procesando solicitud: {e}")
+            return self._resultado_error(e)
+
+    async def procesar_solicitud_stream(
+        self,
+        mensaje: str,
+        tipo_flujo: str,
+        historial: List[Dict] = None,
+        datos_acumulados: Optional[Dict] = None,
+        conversation_state: Optional[Dict] = None,
+        servicio_forzado: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante en streaming de procesar_solicitud_completa (solo conversación)
+        
+        Emite {"tipo": "token", "texto": ...} por cada fragmento de la
+        respuesta y al final {"tipo": "resultado", ...} con lo mismo que
+        retorna procesar_solicitud_completa (botones, datos, estado).
+        Con Gemini (NIVEL 1) los fragmentos llegan a medida que el LLM los
+        genera; los niveles locales responden de una vez en un fragmento.
+        Cerrar el generador cancela la llamada LLM en curso.
+        """
+        historial = historial or []
+        emitido = False
+        try:
+            logger.info("Procesando solicitud (stream): %s", tipo_flujo)
+            servicio = self._detectar_servicio(mensaje, servicio_forzado)
+            tipo_documento, complejidad = self._parsear_tipo_flujo(tipo_flujo)
             
-            # Pasar datos generados si existen
-            if respuesta_chat.get("datos_generados"):
-                resultado["datos_generados"] = respuesta_chat["datos_generados"]
+            respuesta_chat = None
+            if self._usa_gemini(servicio):
+                agente = self._agente_para(tipo_flujo)
+                fragmentos = []
+                try:
+                    logger.info(f"🤖 NIVEL 1: Streaming con Gemini para {servicio}")
+                    async with aclosing(self.gemini_service.chat_conversacional_stream(
+                        mensaje=mensaje,
+                        historial=historial,
+                        contexto=self._contexto_gemini(tipo_flujo, servicio, agente)
+                    )) as flujo:
+                        async for fragmento in flujo:
+                            fragmentos.append(fragmento)
+                            emitido = True
+                            yield {"tipo": "token", "texto": fragmento}
+                except Exception as e:
+                    # Ya se enviaron fragmentos: no se puede cambiar de nivel
+                    if emitido:
+                        raise
+                    logger.error(f"❌ NIVEL 1: Error con Gemini: {e}")
+                if fragmentos:
+                    respuesta_chat = {"texto": "".join(fragmentos), "agente": agente, "modo": "GEMINI"}
             
-            # Pasar stage y state si existen (para especialistas locales)
-            if respuesta_chat.get("stage"):
-                resultado["stage"] = respuesta_chat["stage"]
-            if respuesta_chat.get("state"):
-                resultado["state"] = respuesta_chat["state"]
-            if respuesta_chat.get("progreso"):
-                resultado["progreso"] = respuesta_chat["progreso"]
+            if respuesta_chat is None:
+                respuesta_chat = await self._generar_respuesta_chat(
+                    mensaje=mensaje,
+                    tipo_flujo=tipo_flujo,
+                    historial=historial,
+                    servicio=servicio,
+                    datos_acumulados=datos_acumulados,
+                    conversation_state=conversation_state,
+                    usar_gemini=False
+                )
+                if respuesta_chat.get("texto"):
+                    emitido = True
+                    yield {"tipo": "token", "texto": respuesta_chat["texto"]}
             
-            logger.info("Solicitud procesada exitosamente: %s", tipo_flujo)
-            return resultado
+            resultado = self._armar_resultado(respuesta_chat, servicio, tipo_documento, complejidad)
+            logger.info("Solicitud procesada exitosamente (stream): %s", tipo_flujo)
+            yield {"tipo": "resultado", **resultado}
             
         except Exception as e:
+            if emitido:
+                raise
             logger.error(f"Error procesando solicitud: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "respuesta": "Lo siento, ocurrió un error procesando tu solicitud."
-            }
+            yield {"tipo": "resultado", **self._resultado_error(e)}
+
+    def _detectar_servicio(self, mensaje: str, servicio_forzado: Optional[str] = None) -> str:
+        if servicio_forzado:
+            logger.info(f"🔒 Servicio forzado a: {servicio_forzado}")
+            return servicio_forzado
+        return self.pili_brain.detectar_servicio(mensaje) if self.pili_brain else "electrico-residencial"
+
+    def _armar_resultado(
+        self,
+        respuesta_chat: Dict[str, Any],
+        servicio: str,
+        tipo_documento: str,
+        complejidad: str
+    ) -> Dict[str, Any]:
+        """Resultado común de procesar_solicitud_completa y su variante en streaming"""
+        resultado = {
+            "success": True,
+            "respuesta": respuesta_chat.get("texto", ""),
+            "agente": respuesta_chat.get("agente", "PILI"),
+            "modo": respuesta_chat.get("modo", "PILI_BRAIN"),
+            "servicio": servicio,
+            "tipo_documento": tipo_documento,
+            "complejidad": complejidad
+        }
+        
+        # ✅ CRÍTICO: Pasar botones si existen
+        if respuesta_chat.get("botones"):
+            resultado["botones"] = respuesta_chat["botones"]
+            logger.info(f"✅ Retornando {len(respuesta_chat['botones'])} botones al router")
+        
+        # Pasar datos generados si existen
+        if respuesta_chat.get("datos_generados"):
+            resultado["datos_generados"] = respuesta_chat["datos_generados"]
+        
+        # Pasar stage y state si existen (para especialistas locales)
+        for clave in ("stage", "state", "progreso"):
+            if respuesta_chat.get(clave):
+                resultado[clave] = respuesta_chat[clave]
+        return resultado
+
+    def _resultado_error(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": str(error),
+            "respuesta": "Lo siento, ocurrió un error procesando tu solicitud."
+        }
 
     # ==================================================================
     # METODOS DE GENERACION DE DOCUMENTOS
@@ -499,6 +599,29 @@ class PILIIntegrator:
 
         return tipo_documento, complejidad
 
+    def _agente_para(self, tipo_flujo: str) -> str:
+        """Determina el agente PILI según el tipo de flujo"""
+        agentes = {
+            "cotizacion-simple": "PILI Cotizadora",
+            "cotizacion-compleja": "PILI Analista",
+            "proyecto-simple": "PILI Coordinadora",
+            "proyecto-complejo": "PILI Project Manager",
+            "informe-simple": "PILI Reportera",
+            "informe-ejecutivo": "PILI Analista Senior"
+        }
+        return agentes.get(tipo_flujo, "PILI Asistente")
+
+    def _usa_gemini(self, servicio: str) -> bool:
+        # FIX CRÍTICO: Excluir 'itse' de Gemini para evitar alucinaciones eléctricas
+        return bool(self.gemini_service and self.estado_servicios.get("gemini") and servicio != 'itse')
+
+    def _contexto_gemini(self, tipo_flujo: str, servicio: str, agente: str) -> Dict[str, str]:
+        return {
+            "tipo_servicio": tipo_flujo,
+            "servicio_detectado": servicio,
+            "agente_pili": agente
+        }
+
     async def _generar_respuesta_chat(
         self,
         mensaje: str,
@@ -506,7 +629,9 @@ class PILIIntegrator:
         historial: List[Dict],
         servicio: str,
         datos_acumulados: Optional[Dict] = None,
-        conversation_state: Optional[Dict] = None  # ✅ NUEVO: Estado de conversación
+        conversation_state: Optional[Dict] = None,  # ✅ NUEVO: Estado de conversación
+        request: Optional[Any] = None,
+        usar_gemini: bool = True
     ) -> Dict[str, str]:
         """
         Genera respuesta conversacional con sistema de fallback inteligente de 4 NIVELES
@@ -516,43 +641,35 @@ class PILIIntegrator:
         2. NUEVA ARQUITECTURA MODULAR (pili/) - FALLBACK PROFESIONAL ✅ NUEVO
         3. Especialistas Locales Legacy (pili_local_specialists.py) - FALLBACK LEGACY
         4. PILI Brain Simple (pregunta a pregunta) - FALLBACK BÁSICO
+        
+        usar_gemini=False salta el NIVEL 1 (la variante en streaming ya lo intentó).
         """
         
-        # Determinar agente PILI
-        agentes = {
-            "cotizacion-simple": "PILI Cotizadora",
-            "cotizacion-compleja": "PILI Analista",
-            "proyecto-simple": "PILI Coordinadora",
-            "proyecto-complejo": "PILI Project Manager",
-            "informe-simple": "PILI Reportera",
-            "informe-ejecutivo": "PILI Analista Senior"
-        }
-        agente = agentes.get(tipo_flujo, "PILI Asistente")
+        agente = self._agente_para(tipo_flujo)
         
         # ============================================================
         # NIVEL 1: INTENTAR CON GEMINI (IA de clase mundial)
         # ============================================================
-        # FIX CRÍTICO: Excluir 'itse' de Gemini para evitar alucinaciones eléctricas
-        if self.gemini_service and self.estado_servicios.get("gemini") and servicio != 'itse':
+        if usar_gemini and self._usa_gemini(servicio):
             try:
                 logger.info(f"🤖 NIVEL 1: Intentando con Gemini para {servicio}")
                 
                 respuesta = await self.gemini_service.chat_conversacional(
                     mensaje=mensaje,
                     historial=historial,
-                    contexto={
-                        "tipo_servicio": tipo_flujo,
-                        "servicio_detectado": servicio,
-                        "agente_pili": agente
-                    }
+                    contexto=self._contexto_gemini(tipo_flujo, servicio, agente),
+                    request=request
                 )
                 
-                if respuesta and respuesta.get("texto"):
+                # chat_conversacional retorna {"exito", "respuesta"}
+                if respuesta and respuesta.get("exito") and respuesta.get("respuesta"):
                     logger.info("✅ NIVEL 1: Gemini respondió exitosamente")
-                    return respuesta
+                    return {"texto": respuesta["respuesta"], "agente": agente, "modo": "GEMINI"}
                 
                 logger.warning("⚠️ NIVEL 1: Gemini no generó respuesta válida")
             
+            except ClienteDesconectadoError:
+                raise
             except Exception as e:
                 logger.error(f"❌ NIVEL 1: Error con Gemini: {e}")
         
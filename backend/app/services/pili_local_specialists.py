@@ -29,839 +29,231 @@ SERVICIOS IMPLEMENTADOS (10/10):
 9. 📄 Expedientes Técnicos - 5 etapas
 10. 💧 Saneamiento - 6 etapas
 
-VERSION: 2.0 PROFESSIONAL - Código de Alta Gama
+MOTOR DE ETAPAS (v2.1):
+- Etapas, validaciones, botones y knowledge base de cada servicio en
+  pili_local_config/<servicio>.yaml (versionado), leídos al primer uso
+- Cada grafo se compila una vez en tablas de transición (dict lookup por mensaje)
+- Las subclases solo aportan fórmulas de cotización y cálculos de contexto
+- Toda respuesta que se usa como clave de la knowledge base es una etapa
+  `buttons` (valores cerrados; `alias` y `mayusculas` normalizan lo que se
+  escribe a mano, `mensaje_error` repite la pregunta si no es una opción)
+- Una instancia por servicio, reutilizada entre requests
+
+VERSION: 2.1 PROFESSIONAL - Código de Alta Gama
 AUTOR: Tesla Electricidad - PILI AI Team
 FECHA: 2025-12-26
 """
 
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from datetime import datetime
 import logging
 import re
 import math
+import threading
+
+import yaml
 
 logger = logging.getLogger(__name__)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-# 💰 KNOWLEDGE BASES PROFESIONALES - Base de Conocimiento Completa
+# 💰 KNOWLEDGE BASES + GRAFOS DE ETAPAS - Datos versionados (YAML)
 # ══════════════════════════════════════════════════════════════════════════════
+#
+# Cada servicio vive en pili_local_config/<servicio>.yaml con su grafo de
+# etapas (mensajes, botones, validaciones y transiciones) y su knowledge base
+# (precios, tipos, normativa). Los YAML se leen al primer uso del servicio,
+# no al importar el módulo, y se compilan una sola vez en tablas de
+# transición: despachar un mensaje es una búsqueda en diccionario.
 
-KNOWLEDGE_BASE = {
-    # ──────────────────────────────────────────────────────────────────────────
-    # ⚡ ELECTRICIDAD - Instalaciones Eléctricas Profesionales
-    # ──────────────────────────────────────────────────────────────────────────
-    "electricidad": {
-        "tipos": {
-            "RESIDENCIAL": {
-                "nombre": "Instalación Eléctrica Residencial",
-                "descripcion": "Viviendas unifamiliares y multifamiliares hasta 200m²",
-                "precios": {
-                    "punto_luz_empotrado": 80,
-                    "punto_luz_adosado": 65,
-                    "tomacorriente_doble": 60,
-                    "tomacorriente_simple": 45,
-                    "interruptor_simple": 35,
-                    "interruptor_doble": 50,
-                    "interruptor_triple": 65,
-                    "tablero_monofasico": 800,
-                    "tablero_trifasico": 1200,
-                    "cable_thw_2_5mm": 2.5,
-                    "cable_thw_4mm": 3.8,
-                    "cable_thw_6mm": 5.5,
-                    "tuberia_pvc_3_4": 1.2,
-                    "tuberia_pvc_1": 1.8,
-                    "caja_octogonal": 3.5,
-                    "caja_rectangular": 4.0,
-                    "pozo_tierra": 1760
-                },
-                "reglas": {
-                    "area_max": 200,
-                    "pisos_max": 2,
-                    "puntos_por_m2": 0.15,
-                    "tomas_por_m2": 0.10,
-                    "potencia_estimada_w_m2": 50
-                },
-                "normativa": "CNE Suministro 2011 - Sección 050",
-                "tiempo_estimado": "5-7 días hábiles",
-                "garantia": "1 año"
-            },
-            "COMERCIAL": {
-                "nombre": "Instalación Eléctrica Comercial",
-                "descripcion": "Locales comerciales, oficinas, tiendas 50-1000m²",
-                "precios": {
-                    "punto_luz_empotrado": 95,
-                    "punto_luz_led_panel": 110,
-                    "tomacorriente_doble": 75,
-                    "tomacorriente_estabilizado": 95,
-                    "interruptor_simple": 45,
-                    "interruptor_doble": 60,
-                    "tablero_trifasico": 1500,
-                    "tablero_industrial": 2200,
-                    "cable_thw_2_5mm": 3.2,
-                    "cable_thw_4mm": 4.5,
-                    "cable_thw_6mm": 6.8,
-                    "tuberia_pvc_3_4": 1.5,
-                    "tuberia_pvc_1": 2.2,
-                    "caja_octogonal": 4.0,
-                    "pozo_tierra": 1960
-                },
-                "reglas": {
-                    "area_min": 50,
-                    "area_max": 1000,
-                    "puntos_por_m2": 0.12,
-                    "tomas_por_m2": 0.15,
-                    "potencia_estimada_w_m2": 80
-                },
-                "normativa": "CNE Suministro 2011 - Sección 050 + 060",
-                "tiempo_estimado": "7-10 días hábiles",
-                "garantia": "1 año"
-            },
-            "INDUSTRIAL": {
-                "nombre": "Instalación Eléctrica Industrial",
-                "descripcion": "Plantas industriales, fábricas, talleres >200m²",
-                "precios": {
-                    "punto_luz_industrial": 120,
-                    "luminaria_led_industrial": 280,
-                    "tomacorriente_industrial": 95,
-                    "tomacorriente_trifasico": 150,
-                    "tablero_industrial": 2800,
-                    "tablero_fuerza": 3500,
-                    "cable_thw_6mm": 6.5,
-                    "cable_thw_10mm": 10.5,
-                    "cable_thw_16mm": 16.8,
-                    "tuberia_pvc_1": 2.0,
-                    "tuberia_pvc_1_5": 3.2,
-                    "canaleta_metalica": 12.5,
-                    "pozo_tierra_industrial": 2500
-                },
-                "reglas": {
-                    "area_min": 200,
-                    "potencia_min_kw": 50,
-                    "puntos_por_m2": 0.08,
-                    "tomas_por_m2": 0.12,
-                    "potencia_estimada_w_m2": 150
-                },
-                "normativa": "CNE Suministro + CNE Utilización + NTP 370.252",
-                "tiempo_estimado": "15-20 días hábiles",
-                "garantia": "2 años"
-            }
-        },
-        "etapas": ["initial", "area", "pisos", "puntos_luz", "tomacorrientes", "tableros", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 📋 ITSE - Certificaciones Técnicas de Seguridad
-    # ──────────────────────────────────────────────────────────────────────────
-    "itse": {
-        "categorias": {
-            "SALUD": {
-                "tipos": ["Hospital", "Clínica", "Centro Médico", "Consultorio", "Laboratorio Clínico"],
-                "riesgo_default": "ALTO",
-                "reglas": "Más de 500m² o 2+ pisos = MUY ALTO",
-                "icon": "🏥"
-            },
-            "EDUCACION": {
-                "tipos": ["Colegio", "Universidad", "Instituto", "Academia", "Guardería", "CEBA"],
-                "riesgo_default": "MEDIO",
-                "reglas": "Más de 1000m² o 3+ pisos = ALTO",
-                "icon": "🎓"
-            },
-            "HOSPEDAJE": {
-                "tipos": ["Hotel", "Hostal", "Residencia", "Apart-hotel", "Albergue"],
-                "riesgo_default": "MEDIO",
-                "reglas": "Más de 20 habitaciones o 3+ pisos = ALTO",
-                "icon": "🏨"
-            },
-            "COMERCIO": {
-                "tipos": ["Tienda", "Supermercado", "Centro Comercial", "Galería", "Bodega"],
-                "riesgo_default": "MEDIO",
-                "reglas": "Más de 500m² = ALTO",
-                "icon": "🏪"
-            },
-            "RESTAURANTE": {
-                "tipos": ["Restaurante", "Cafetería", "Bar", "Discoteca", "Pub"],
-                "riesgo_default": "MEDIO",
-                "reglas": "Con GLP o >100 personas = ALTO",
-                "icon": "🍽️"
-            },
-            "OFICINA": {
-                "tipos": ["Oficina", "Estudio", "Coworking", "Consultorio"],
-                "riesgo_default": "BAJO",
-                "reglas": "Más de 500m² = MEDIO",
-                "icon": "🏢"
-            },
-            "INDUSTRIAL": {
-                "tipos": ["Fábrica", "Taller", "Almacén", "Planta Industrial", "Depósito"],
-                "riesgo_default": "ALTO",
-                "reglas": "Materiales peligrosos = MUY ALTO",
-                "icon": "🏭"
-            },
-            "ENCUENTRO": {
-                "tipos": ["Auditorio", "Cine", "Teatro", "Iglesia", "Gimnasio", "Estadio"],
-                "riesgo_default": "ALTO",
-                "reglas": "Más de 100 personas = MUY ALTO",
-                "icon": "🎭"
-            }
-        },
-        "precios_municipales": {
-            "BAJO": {"precio": 168.30, "renovacion": 90.30, "dias": 7, "descripcion": "Riesgo Bajo"},
-            "MEDIO": {"precio": 208.60, "renovacion": 109.40, "dias": 7, "descripcion": "Riesgo Medio"},
-            "ALTO": {"precio": 703.00, "renovacion": 417.40, "dias": 7, "descripcion": "Riesgo Alto"},
-            "MUY_ALTO": {"precio": 1084.60, "renovacion": 629.20, "dias": 7, "descripcion": "Riesgo Muy Alto"}
-        },
-        "precios_tesla": {
-            "BAJO": {"min": 300, "max": 500, "incluye": "Evaluación + Planos básicos"},
-            "MEDIO": {"min": 450, "max": 650, "incluye": "Evaluación + Planos + Memoria"},
-            "ALTO": {"min": 800, "max": 1200, "incluye": "Evaluación + Planos + Memoria + Seguimiento"},
-            "MUY_ALTO": {"min": 1200, "max": 1800, "incluye": "Evaluación completa + Planos + Memoria + Gestión total"}
-        },
-        "normativa": "D.S. 002-2018-PCM - Reglamento de Inspecciones Técnicas",
-        "etapas": ["initial", "tipo_especifico", "area", "pisos", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 🔌 PUESTA A TIERRA - Sistemas de Protección Eléctrica
-    # ──────────────────────────────────────────────────────────────────────────
-    "pozo-tierra": {
-        "tipos_suelo": {
-            "ARCILLOSO": {
-                "nombre": "Suelo Arcilloso",
-                "resistividad": 50,
-                "factor_correccion": 1.0,
-                "descripcion": "Suelo húmedo, buena conductividad"
-            },
-            "ARENOSO": {
-                "nombre": "Suelo Arenoso",
-                "resistividad": 200,
-                "factor_correccion": 1.5,
-                "descripcion": "Suelo seco, conductividad media"
-            },
-            "ROCOSO": {
-                "nombre": "Suelo Rocoso",
-                "resistividad": 1000,
-                "factor_correccion": 2.0,
-                "descripcion": "Suelo muy seco, baja conductividad"
-            },
-            "MIXTO": {
-                "nombre": "Suelo Mixto",
-                "resistividad": 300,
-                "factor_correccion": 1.3,
-                "descripcion": "Combinación de tipos de suelo"
-            }
-        },
-        "precios": {
-            "pozo_completo_basico": 1760,
-            "pozo_completo_profesional": 2200,
-            "varilla_copperweld_2_4m": 85,
-            "varilla_copperweld_3m": 110,
-            "cable_desnudo_cu_25mm": 12,
-            "cable_desnudo_cu_35mm": 16,
-            "bentonita_saco_25kg": 45,
-            "thor_gel_saco": 120,
-            "sal_industrial_saco": 15,
-            "carbon_vegetal_saco": 25,
-            "conector_cadweld": 35,
-            "caja_registro": 180,
-            "medicion_telurometro": 250
-        },
-        "normativa": "CNE Suministro 2011 - Sección 250 + IEEE Std 142",
-        "resistencia_objetivo_residencial": 25,
-        "resistencia_objetivo_comercial": 10,
-        "resistencia_objetivo_industrial": 5,
-        "etapas": ["initial", "tipo_suelo", "potencia", "area", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 🔥 CONTRAINCENDIOS - Sistemas de Detección y Extinción
-    # ──────────────────────────────────────────────────────────────────────────
-    "contraincendios": {
-        "sistemas": {
-            "DETECCION": {
-                "nombre": "Sistema de Detección de Incendios",
-                "descripcion": "Detectores, central, sirenas y pulsadores",
-                "precios": {
-                    "detector_humo_optico": 85,
-                    "detector_humo_ionico": 95,
-                    "detector_calor_termico": 95,
-                    "detector_llama": 180,
-                    "pulsador_manual": 65,
-                    "central_deteccion_4zonas": 1200,
-                    "central_deteccion_8zonas": 1800,
-                    "sirena_interior": 120,
-                    "sirena_exterior": 180,
-                    "luz_estrobo": 95,
-                    "cable_deteccion_2x18": 1.8
-                },
-                "cobertura_detector_m2": 80,
-                "normativa": "NFPA 72"
-            },
-            "EXTINCION": {
-                "nombre": "Sistema de Extinción de Incendios",
-                "descripcion": "Extintores, gabinetes, rociadores y bombas",
-                "precios": {
-                    "extintor_pqs_6kg": 85,
-                    "extintor_pqs_12kg": 120,
-                    "extintor_co2_6kg": 180,
-                    "extintor_agua_10lt": 95,
-                    "gabinete_manguera_30m": 450,
-                    "gabinete_manguera_45m": 550,
-                    "rociador_sprinkler": 35,
-                    "tuberia_sprinkler_1": 8.5,
-                    "bomba_contraincendios_10hp": 3500,
-                    "bomba_contraincendios_15hp": 4500,
-                    "tanque_reserva_5000lt": 2800,
-                    "valvula_check": 280
-                },
-                "area_por_extintor_m2": 200,
-                "normativa": "NFPA 13, NFPA 10, NFPA 20"
-            },
-            "COMPLETO": {
-                "nombre": "Sistema Completo (Detección + Extinción)",
-                "descripcion": "Sistema integrado de protección",
-                "descuento_porcentaje": 10
-            }
-        },
-        "normativa_general": "NFPA 1, NFPA 13, NFPA 72, NFPA 20",
-        "etapas": ["initial", "tipo_sistema", "area", "pisos", "nivel_riesgo", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 🏠 DOMÓTICA - Automatización Inteligente
-    # ──────────────────────────────────────────────────────────────────────────
-    "domotica": {
-        "niveles": {
-            "BASICO": {
-                "nombre": "Domótica Básica",
-                "descripcion": "Control de iluminación y persianas",
-                "dispositivos": ["Interruptores inteligentes", "Sensores de movimiento", "Control de persianas"],
-                "precio_m2": 45
-            },
-            "INTERMEDIO": {
-                "nombre": "Domótica Intermedia",
-                "descripcion": "Control de iluminación, clima y seguridad",
-                "dispositivos": ["Todo lo básico", "Termostatos", "Cámaras IP", "Cerraduras inteligentes"],
-                "precio_m2": 85
-            },
-            "AVANZADO": {
-                "nombre": "Domótica Avanzada",
-                "descripcion": "Sistema completo integrado",
-                "dispositivos": ["Todo lo intermedio", "Control de audio/video", "Riego automático", "Alarma"],
-                "precio_m2": 150
-            }
-        },
-        "precios": {
-            "interruptor_inteligente_wifi": 120,
-            "interruptor_inteligente_zigbee": 95,
-            "sensor_movimiento": 80,
-            "sensor_puerta_ventana": 65,
-            "camara_ip_interior": 350,
-            "camara_ip_exterior": 450,
-            "central_domotica_basica": 1500,
-            "central_domotica_avanzada": 2800,
-            "actuador_cortina": 180,
-            "termostato_inteligente": 280,
-            "cerradura_inteligente": 450,
-            "hub_zigbee": 85,
-            "hub_zwave": 120
-        },
-        "protocolos": ["WiFi", "Zigbee", "Z-Wave", "KNX", "Matter"],
-        "normativa": "KNX/EIB, Z-Wave Alliance, Zigbee Alliance",
-        "etapas": ["initial", "nivel", "area", "dispositivos", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 📹 CCTV - Videovigilancia Profesional
-    # ──────────────────────────────────────────────────────────────────────────
-    "cctv": {
-        "tipos_camara": {
-            "ANALOGICA": {
-                "nombre": "Cámaras Analógicas HD",
-                "descripcion": "Tecnología AHD/TVI/CVI",
-                "precios": {
-                    "camara_2mp_domo": 250,
-                    "camara_2mp_bala": 280,
-                    "camara_4mp_domo": 350,
-                    "camara_4mp_bala": 380,
-                    "camara_5mp_domo": 420,
-                    "camara_5mp_bala": 450
-                },
-                "grabador": "DVR",
-                "cable": "Coaxial RG59"
-            },
-            "IP": {
-                "nombre": "Cámaras IP (Red)",
-                "descripcion": "Tecnología IP PoE",
-                "precios": {
-                    "camara_2mp_domo": 350,
-                    "camara_2mp_bala": 380,
-                    "camara_4mp_domo": 450,
-                    "camara_4mp_bala": 480,
-                    "camara_8mp_domo": 650,
-                    "camara_8mp_bala": 680,
-                    "camara_ptz_2mp": 850,
-                    "camara_ptz_4mp": 1200
-                },
-                "grabador": "NVR",
-                "cable": "UTP Cat6"
-            }
-        },
-        "precios_accesorios": {
-            "dvr_4ch": 450,
-            "dvr_8ch": 800,
-            "dvr_16ch": 1200,
-            "nvr_4ch_poe": 650,
-            "nvr_8ch_poe": 1200,
-            "nvr_16ch_poe": 1800,
-            "disco_1tb_purple": 180,
-            "disco_2tb_purple": 280,
-            "disco_4tb_purple": 450,
-            "cable_coaxial_rg59_metro": 1.5,
-            "cable_utp_cat6_metro": 1.2,
-            "fuente_12v_5a": 35,
-            "fuente_12v_10a": 55,
-            "switch_poe_8p": 280,
-            "switch_poe_16p": 550,
-            "monitor_led_24": 450
-        },
-        "dias_grabacion": [7, 15, 30, 60, 90],
-        "normativa": "Ley 29733 - Protección de Datos Personales",
-        "etapas": ["initial", "tipo_camara", "num_camaras", "resolucion", "almacenamiento", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 🌐 REDES - Cableado Estructurado
-    # ──────────────────────────────────────────────────────────────────────────
-    "redes": {
-        "tipos_cable": {
-            "CAT5E": {
-                "nombre": "Cable UTP Cat5e",
-                "velocidad": "1 Gbps",
-                "distancia_max": "100m",
-                "precio_metro": 0.8,
-                "aplicacion": "Redes básicas, internet"
-            },
-            "CAT6": {
-                "nombre": "Cable UTP Cat6",
-                "velocidad": "10 Gbps (55m)",
-                "distancia_max": "100m",
-                "precio_metro": 1.2,
-                "aplicacion": "Redes empresariales"
-            },
-            "CAT6A": {
-                "nombre": "Cable UTP Cat6a",
-                "velocidad": "10 Gbps (100m)",
-                "distancia_max": "100m",
-                "precio_metro": 1.8,
-                "aplicacion": "Redes de alto rendimiento"
-            },
-            "FIBRA": {
-                "nombre": "Fibra Óptica Monomodo",
-                "velocidad": "100 Gbps",
-                "distancia_max": "10km+",
-                "precio_metro": 2.5,
-                "aplicacion": "Backbone, larga distancia"
-            }
-        },
-        "precios_componentes": {
-            "punto_red_completo": 45,
-            "faceplate_doble": 12,
-            "jack_rj45_cat6": 8,
-            "patch_cord_1m": 8,
-            "patch_cord_3m": 12,
-            "access_point_ac": 280,
-            "access_point_ax": 450,
-            "switch_8p_gigabit": 180,
-            "switch_24p_gigabit": 450,
-            "switch_48p_gigabit": 850,
-            "rack_6u": 350,
-            "rack_12u": 550,
-            "rack_24u": 850,
-            "patch_panel_24p": 85,
-            "patch_panel_48p": 150,
-            "organizador_cables": 35,
-            "bandeja_rack": 45
-        },
-        "normativa": "TIA/EIA 568, ISO/IEC 11801",
-        "etapas": ["initial", "tipo_cable", "area", "puntos", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # ⚙️ AUTOMATIZACIÓN INDUSTRIAL - PLCs y Control de Procesos
-    # ──────────────────────────────────────────────────────────────────────────
-    "automatizacion-industrial": {
-        "tipos_plc": {
-            "BASICO": {
-                "nombre": "PLC Básico (Micro)",
-                "descripcion": "Hasta 32 I/O, procesos simples",
-                "precio": 1200,
-                "entradas_max": 16,
-                "salidas_max": 16,
-                "marcas": ["Siemens S7-1200", "Allen Bradley Micro800"]
-            },
-            "INTERMEDIO": {
-                "nombre": "PLC Intermedio (Compacto)",
-                "descripcion": "Hasta 128 I/O, procesos medios",
-                "precio": 2800,
-                "entradas_max": 64,
-                "salidas_max": 64,
-                "marcas": ["Siemens S7-1500", "Allen Bradley CompactLogix"]
-            },
-            "AVANZADO": {
-                "nombre": "PLC Avanzado (Modular)",
-                "descripcion": "I/O ilimitadas, procesos complejos",
-                "precio": 5500,
-                "entradas_max": 512,
-                "salidas_max": 512,
-                "marcas": ["Siemens S7-1500 Advanced", "Allen Bradley ControlLogix"]
-            }
-        },
-        "precios_componentes": {
-            "hmi_7inch_basico": 650,
-            "hmi_10inch_avanzado": 950,
-            "hmi_15inch_industrial": 1500,
-            "variador_frecuencia_1hp": 450,
-            "variador_frecuencia_5hp": 850,
-            "variador_frecuencia_10hp": 1500,
-            "sensor_inductivo": 45,
-            "sensor_capacitivo": 55,
-            "sensor_fotoelectrico": 85,
-            "sensor_ultrasonico": 120,
-            "contactor_16a": 35,
-            "contactor_32a": 55,
-            "rele_termico": 45,
-            "guardamotor": 65,
-            "botonera_completa": 85,
-            "luz_torre_3_colores": 95,
-            "encoder_incremental": 180,
-            "modulo_entrada_digital": 280,
-            "modulo_salida_rele": 320
-        },
-        "normativa": "IEC 61131-3, NFPA 79",
-        "etapas": ["initial", "tipo_plc", "entradas", "salidas", "hmi", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 📄 EXPEDIENTES TÉCNICOS - Documentación Profesional
-    # ──────────────────────────────────────────────────────────────────────────
-    "expedientes": {
-        "tipos_proyecto": {
-            "ELECTRICO": {
-                "nombre": "Expediente Técnico Eléctrico",
-                "precio_base": 1500,
-                "precio_por_m2": 3.5,
-                "tiempo": "10-15 días hábiles",
-                "incluye": [
-                    "Memoria descriptiva",
-                    "Especificaciones técnicas",
-                    "Planos eléctricos (plantas, detalles, diagramas)",
-                    "Metrados y presupuesto",
-                    "Análisis de precios unitarios",
-                    "Cálculos justificatorios",
-                    "Cronograma de obra"
-                ]
-            },
-            "SANITARIO": {
-                "nombre": "Expediente Técnico Sanitario",
-                "precio_base": 1200,
-                "precio_por_m2": 2.8,
-                "tiempo": "8-12 días hábiles",
-                "incluye": [
-                    "Memoria descriptiva",
-                    "Especificaciones técnicas",
-                    "Planos sanitarios (agua, desagüe, drenaje)",
-                    "Metrados y presupuesto",
-                    "Análisis de precios unitarios",
-                    "Cálculos hidráulicos",
-                    "Cronograma de obra"
-                ]
-            },
-            "ESTRUCTURAL": {
-                "nombre": "Expediente Técnico Estructural",
-                "precio_base": 2000,
-                "precio_por_m2": 4.5,
-                "tiempo": "15-20 días hábiles",
-                "incluye": [
-                    "Memoria de cálculo estructural",
-                    "Especificaciones técnicas",
-                    "Planos estructurales (cimentación, columnas, vigas, losas)",
-                    "Metrados y presupuesto",
-                    "Análisis de precios unitarios",
-                    "Estudio de mecánica de suelos",
-                    "Cronograma de obra"
-                ]
-            },
-            "ARQUITECTURA": {
-                "nombre": "Expediente Técnico Arquitectónico",
-                "precio_base": 1800,
-                "precio_por_m2": 4.0,
-                "tiempo": "12-18 días hábiles",
-                "incluye": [
-                    "Memoria descriptiva",
-                    "Especificaciones técnicas",
-                    "Planos arquitectónicos (plantas, cortes, elevaciones, detalles)",
-                    "Metrados y presupuesto",
-                    "Análisis de precios unitarios",
-                    "Renders 3D",
-                    "Cronograma de obra"
-                ]
-            }
-        },
-        "complejidad": {
-            "SIMPLE": {"factor": 1.0, "descripcion": "Proyecto estándar sin complicaciones"},
-            "MEDIA": {"factor": 1.3, "descripcion": "Proyecto con algunas particularidades"},
-            "ALTA": {"factor": 1.6, "descripcion": "Proyecto complejo con múltiples desafíos"}
-        },
-        "normativa": "RNE (Reglamento Nacional de Edificaciones)",
-        "etapas": ["initial", "tipo_proyecto", "area", "complejidad", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 💧 SANEAMIENTO - Sistemas de Agua y Desagüe
-    # ──────────────────────────────────────────────────────────────────────────
-    "saneamiento": {
-        "sistemas": {
-            "AGUA_FRIA": {
-                "nombre": "Sistema de Agua Fría",
-                "precios": {
-                    "punto_agua_fria": 55,
-                    "tuberia_pvc_1_2": 2.5,
-                    "tuberia_pvc_3_4": 3.5,
-                    "tuberia_pvc_1": 5.0,
-                    "codo_pvc": 1.5,
-                    "tee_pvc": 2.0,
-                    "valvula_compuerta_1_2": 25,
-                    "valvula_compuerta_3_4": 35
-                }
-            },
-            "AGUA_CALIENTE": {
-                "nombre": "Sistema de Agua Caliente",
-                "precios": {
-                    "punto_agua_caliente": 75,
-                    "tuberia_cpvc_1_2": 4.5,
-                    "tuberia_cpvc_3_4": 6.0,
-                    "terma_electrica_50lt": 450,
-                    "terma_electrica_80lt": 650,
-                    "terma_gas_10lt": 550,
-                    "calentador_solar": 1800
-                }
-            },
-            "DESAGUE": {
-                "nombre": "Sistema de Desagüe",
-                "precios": {
-                    "punto_desague": 45,
-                    "tuberia_pvc_2": 3.5,
-                    "tuberia_pvc_4": 5.5,
-                    "tuberia_pvc_6": 12.0,
-                    "codo_pvc_2": 2.5,
-                    "codo_pvc_4": 4.0,
-                    "yee_pvc_2": 3.5,
-                    "yee_pvc_4": 5.5,
-                    "registro_bronce_2": 35,
-                    "registro_bronce_4": 55,
-                    "sumidero_2": 25,
-                    "caja_registro_12x24": 85
-                }
-            },
-            "ALMACENAMIENTO": {
-                "nombre": "Tanques y Bombeo",
-                "precios": {
-                    "tanque_elevado_600lt": 650,
-                    "tanque_elevado_1100lt": 850,
-                    "tanque_elevado_2500lt": 1500,
-                    "cisterna_2500lt": 1800,
-                    "cisterna_5000lt": 2500,
-                    "cisterna_10000lt": 4500,
-                    "bomba_agua_1_2hp": 450,
-                    "bomba_agua_1hp": 650,
-                    "bomba_agua_2hp": 950,
-                    "hidroneumatico_24lt": 350,
-                    "hidroneumatico_50lt": 550
-                }
-            }
-        },
-        "normativa": "RNE IS.010 (Instalaciones Sanitarias), IS.020 (Tanques Sépticos)",
-        "etapas": ["initial", "tipo_sistema", "area", "banos", "puntos", "quotation"]
-    },
-    
-    # ──────────────────────────────────────────────────────────────────────────
-    # 📋 ITSE - Certificado de Inspección Técnica de Seguridad en Edificaciones
-    # ──────────────────────────────────────────────────────────────────────────
-    "itse": {
-        "categorias": {
-            "SALUD": {
-                "nombre": "Establecimientos de Salud",
-                "tipos": [
-                    "Hospital",
-                    "Clínica",
-                    "Centro de Salud",
-                    "Posta Médica",
-                    "Consultorio Médico",
-                    "Laboratorio Clínico",
-                    "Centro de Diagnóstico"
-                ],
-                "riesgo_base": "ALTO"
-            },
-            "EDUCACION": {
-                "nombre": "Centros Educativos",
-                "tipos": [
-                    "Universidad",
-                    "Instituto",
-                    "Colegio",
-                    "Escuela",
-                    "Centro de Idiomas",
-                    "Academia",
-                    "Guardería/Nido"
-                ],
-                "riesgo_base": "ALTO"
-            },
-            "HOSPEDAJE": {
-                "nombre": "Establecimientos de Hospedaje",
-                "tipos": [
-                    "Hotel 5 Estrellas",
-                    "Hotel 4 Estrellas",
-                    "Hotel 3 Estrellas",
-                    "Hostal",
-                    "Albergue",
-                    "Casa de Huéspedes"
-                ],
-                "riesgo_base": "MEDIO"
-            },
-            "COMERCIO": {
-                "nombre": "Locales Comerciales",
-                "tipos": [
-                    "Centro Comercial",
-                    "Supermercado",
-                    "Tienda por Departamentos",
-                    "Tienda Retail",
-                    "Galería Comercial",
-                    "Mercado",
-                    "Bodega"
-                ],
-                "riesgo_base": "MEDIO"
-            },
-            "RESTAURANTE": {
-                "nombre": "Establecimientos de Alimentación",
-                "tipos": [
-                    "Restaurante",
-                    "Cafetería",
-                    "Fast Food",
-                    "Bar",
-                    "Discoteca",
-                    "Pub",
-                    "Panadería"
-                ],
-                "riesgo_base": "MEDIO"
-            },
-            "OFICINA": {
-                "nombre": "Oficinas Administrativas",
-                "tipos": [
-                    "Edificio de Oficinas",
-                    "Oficina Corporativa",
-                    "Coworking",
-                    "Consultorio Profesional",
-                    "Estudio",
-                    "Agencia"
-                ],
-                "riesgo_base": "BAJO"
-            },
-            "INDUSTRIAL": {
-                "nombre": "Establecimientos Industriales",
-                "tipos": [
-                    "Fábrica",
-                    "Planta Industrial",
-                    "Taller Industrial",
-                    "Almacén Industrial",
-                    "Centro de Distribución",
-                    "Depósito"
-                ],
-                "riesgo_base": "ALTO"
-            },
-            "ENCUENTRO": {
-                "nombre": "Centros de Reunión",
-                "tipos": [
-                    "Auditorio",
-                    "Teatro",
-                    "Cine",
-                    "Centro de Convenciones",
-                    "Sala de Eventos",
-                    "Gimnasio",
-                    "Iglesia/Templo"
-                ],
-                "riesgo_base": "ALTO"
-            }
-        },
-        
-        # 💰 PRECIOS OFICIALES TUPA HUANCAYO 2025
-        "precios_tupa": {
-            "BAJO": {
-                "hasta_100m2": 245.50,
-                "100_500m2": 368.30,
-                "500_1000m2": 491.00,
-                "mas_1000m2": 613.80
-            },
-            "MEDIO": {
-                "hasta_100m2": 368.30,
-                "100_500m2": 491.00,
-                "500_1000m2": 613.80,
-                "mas_1000m2": 736.50
-            },
-            "ALTO": {
-                "hasta_100m2": 491.00,
-                "100_500m2": 613.80,
-                "500_1000m2": 736.50,
-                "mas_1000m2": 859.30
-            },
-            "MUY_ALTO": {
-                "hasta_100m2": 613.80,
-                "100_500m2": 736.50,
-                "500_1000m2": 859.30,
-                "mas_1000m2": 982.00
-            }
-        },
-
-        # ✅ Precios simplificados para cálculos rápidos
-        "precios_municipales": {
-            "BAJO": {"precio": 368.30, "renovacion": 90.30, "dias": 7, "descripcion": "Riesgo Bajo"},
-            "MEDIO": {"precio": 491.00, "renovacion": 109.40, "dias": 7, "descripcion": "Riesgo Medio"},
-            "ALTO": {"precio": 613.80, "renovacion": 417.40, "dias": 7, "descripcion": "Riesgo Alto"},
-            "MUY_ALTO": {"precio": 736.50, "renovacion": 629.20, "dias": 7, "descripcion": "Riesgo Muy Alto"}
-        },
-
-        "precios_tesla": {
-            "BAJO": {"min": 300, "max": 500, "incluye": "Evaluación + Planos básicos + Gestión"},
-            "MEDIO": {"min": 450, "max": 650, "incluye": "Evaluación + Planos + Memoria + Gestión"},
-            "ALTO": {"min": 600, "max": 850, "incluye": "Evaluación completa + Expediente técnico + Gestión"},
-            "MUY_ALTO": {"min": 800, "max": 1200, "incluye": "Evaluación integral + Expediente + Protocolo + Gestión"}
-        },
-
-        "normativa": "Ley N° 28976 - Reglamento de Inspecciones Técnicas de Seguridad en Edificaciones",
-        "etapas": ["initial", "categoria", "tipo_especifico", "area", "pisos", "quotation"]
+DIRECTORIO_CONFIG = Path(__file__).parent / "pili_local_config"
+
+# libyaml si está disponible (parseo en C)
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def servicios_configurados() -> List[str]:
+    """Servicios con archivo de configuración (sin parsearlos)"""
+    return sorted(ruta.stem for ruta in DIRECTORIO_CONFIG.glob("*.yaml"))
+
+
+@lru_cache(maxsize=None)
+def cargar_configuracion(service_type: str) -> Optional[Dict]:
+    """Lee (una sola vez) el YAML del servicio"""
+    ruta = DIRECTORIO_CONFIG / f"{service_type}.yaml"
+    if not ruta.exists():
+        return None
+
+    with open(ruta, "r", encoding="utf-8") as f:
+        config = yaml.load(f, Loader=_YamlLoader)
+
+    logger.info(f"📚 Configuración local cargada: {service_type} v{config.get('version')}")
+    return config
+
+
+def cargar_knowledge_base() -> Dict[str, Dict]:
+    """Knowledge base de todos los servicios, indexada por servicio"""
+    return {
+        servicio: cargar_configuracion(servicio).get("knowledge_base", {})
+        for servicio in servicios_configurados()
     }
 
 
-}
+def __getattr__(nombre: str):
+    # KNOWLEDGE_BASE se arma solo si alguien lo pide (ya no al importar)
+    if nombre == "KNOWLEDGE_BASE":
+        return cargar_knowledge_base()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+class _Contexto(dict):
+    """Variables de plantilla; una variable ausente se muestra vacía"""
+
+    def __missing__(self, clave):
+        return ""
 
 
-# 
-#  CLASE BASE - LocalSpecialist
-# 
+def _resolver_ruta(ruta: str, raices: Dict[str, Any]) -> Any:
+    """Resuelve 'kb.tipos' o 'info.tipos' sobre las raíces dadas"""
+    raiz, *claves = ruta.split(".")
+    valor = raices.get(raiz, {})
+    for clave in claves:
+        valor = valor.get(clave, {}) if isinstance(valor, dict) else {}
+    return valor
+
+
+@dataclass
+class Etapa:
+    """Etapa compilada del grafo de conversación"""
+    id: str
+    type: str
+    progress: Optional[int] = None
+    campo: Optional[str] = None
+    next: Optional[str] = None
+    mensaje: str = ""
+    mensaje_error: str = ""
+    botones: List[Dict] = field(default_factory=list)
+    botones_desde: Optional[Dict] = None
+    valores: FrozenSet[str] = frozenset()
+    alias: Dict[str, str] = field(default_factory=dict)
+    data_source: Optional[str] = None
+    descripciones: Dict[str, str] = field(default_factory=dict)
+    validacion: Dict[str, Any] = field(default_factory=dict)
+    datos_generados: Dict[str, str] = field(default_factory=dict)
+    contexto: Optional[str] = None
+    cotizacion: Optional[str] = None
+    desde_inicio: bool = False
+    en_cualquier_etapa: bool = False
+    mayusculas: bool = False
+
+    @classmethod
+    def desde_config(cls, definicion: Dict, kb: Dict) -> "Etapa":
+        definicion = dict(definicion)
+        en_cualquier_etapa = definicion.pop("global", False)
+        etapa = cls(en_cualquier_etapa=en_cualquier_etapa, **definicion)
+
+        # Sin lista explícita, los valores válidos son las claves del data_source
+        valores = definicion.get("valores")
+        if valores is None and etapa.data_source:
+            valores = list(_resolver_ruta(etapa.data_source, {"kb": kb}))
+        etapa.valores = frozenset(valores or ())
+        return etapa
+
+
+class GrafoEtapas:
+    """Grafo de etapas de un servicio compilado en tablas de transición"""
+
+    TIPOS = ("welcome", "buttons", "input_number", "input_text", "quotation")
+
+    def __init__(self, config: Dict):
+        self.version = config.get("version", "")
+        self.kb = config.get("knowledge_base", {})
+        self.etapas: Dict[str, Etapa] = {}
+
+        # valor de botón -> etapa que lo atiende
+        self.atajos_inicio: Dict[str, Etapa] = {}   # solo desde 'initial'
+        self.atajos_globales: Dict[str, Etapa] = {}  # desde cualquier etapa
+        # etapa -> etapa que la pregunta (sus botones se repiten si el valor no es válido)
+        self.preguntas: Dict[str, Etapa] = {}
+
+        for definicion in config.get("etapas", []):
+            etapa = Etapa.desde_config(definicion, self.kb)
+            if etapa.type not in self.TIPOS:
+                raise ValueError(f"Etapa '{etapa.id}' con tipo desconocido: {etapa.type}")
+            self.etapas[etapa.id] = etapa
+
+            if etapa.en_cualquier_etapa:
+                self.atajos_globales.update(dict.fromkeys(etapa.valores, etapa))
+            elif etapa.desde_inicio:
+                self.atajos_inicio.update(dict.fromkeys(etapa.valores, etapa))
+
+        for etapa in self.etapas.values():
+            if etapa.next and etapa.next not in self.etapas:
+                raise ValueError(f"Etapa '{etapa.id}' apunta a una etapa inexistente: {etapa.next}")
+            if etapa.next:
+                self.preguntas.setdefault(etapa.next, etapa)
+
+        self.total = config.get("total_etapas") or len(self.etapas)
+        self.progresos = {
+            etapa.id: f"{etapa.progress}/{self.total}"
+            for etapa in self.etapas.values()
+            if etapa.progress
+        }
+
+    def resolver(self, stage: str, message: str) -> Optional[Etapa]:
+        """Etapa que atiende el mensaje en la etapa actual"""
+        if self.atajos_globales:
+            etapa = self.atajos_globales.get(message.upper().strip())
+            if etapa:
+                return etapa
+        if stage == "initial":
+            etapa = self.atajos_inicio.get(message)
+            if etapa:
+                return etapa
+        return self.etapas.get(stage)
+
+
+@lru_cache(maxsize=None)
+def obtener_grafo(service_type: str) -> Optional[GrafoEtapas]:
+    """Grafo compilado del servicio (compilado una sola vez por proceso)"""
+    config = cargar_configuracion(service_type)
+    return GrafoEtapas(config) if config else None
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# 🎯 CLASE BASE - LocalSpecialist
+# ══════════════════════════════════════════════════════════════════════════════
 
 class LocalSpecialist:
-    '''
+    """
     Clase base para todos los especialistas locales
-    Implementa patrn de conversacin por etapas profesional
-    '''
-    
+    Recorre el grafo de etapas del servicio; las subclases solo aportan
+    las fórmulas de cotización y los cálculos de contexto que nombra el YAML.
+
+    Una instancia se reutiliza entre requests: el estado de la conversación
+    es por hilo y se recibe en cada process_message.
+    """
+
     def __init__(self, service_type: str):
         self.service_type = service_type
-        self.kb = KNOWLEDGE_BASE.get(service_type, {})
-        self.conversation_state = {
-            'stage': 'initial',
-            'data': {},
-            'history': []
-        }
-    
+        self.grafo = obtener_grafo(service_type)
+        self.kb = self.grafo.kb if self.grafo else {}
+        self._local = threading.local()
+
+    @property
+    def conversation_state(self) -> Dict:
+        estado = getattr(self._local, "estado", None)
+        if estado is None:
+            estado = self._local.estado = {'stage': 'initial', 'data': {}, 'history': []}
+        return estado
+
+    @conversation_state.setter
+    def conversation_state(self, estado: Dict):
+        self._local.estado = estado
+
     def process_message(self, message: str, state: Optional[Dict] = None) -> Dict:
         # Inicializar estado si es None o vacío
         if state is None or not isinstance(state, dict):
@@ -870,7 +262,7 @@ class LocalSpecialist:
                 'data': {},
                 'history': []
             }
-        
+
         # Asegurar que tiene las claves necesarias
         if 'stage' not in state:
             state['stage'] = 'initial'
@@ -878,14 +270,18 @@ class LocalSpecialist:
             state['data'] = {}
         if 'history' not in state:
             state['history'] = []
-        
+
         # Actualizar el estado de conversación
         self.conversation_state = state
-        
-        method_name = f'_process_{self.service_type.replace("-", "_")}'
-        method = getattr(self, method_name, self._process_generic)
-        
-        return method(message)
+
+        if self.grafo is None:
+            return self._process_generic(message)
+
+        etapa = self.grafo.resolver(state['stage'], message)
+        if etapa is None:
+            return self._process_generic(message)
+
+        return self._MANEJADORES[etapa.type](self, etapa, message)
 
     def _process_generic(self, message: str) -> Dict:
         return {
@@ -893,7 +289,141 @@ class LocalSpecialist:
             'stage': 'error',
             'state': self.conversation_state
         }
-    
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Manejadores por tipo de etapa
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _etapa_bienvenida(self, etapa: Etapa, message: str) -> Dict:
+        contexto = self._contexto(etapa)
+        return self._respuesta(
+            etapa.mensaje.format_map(contexto),
+            etapa.id,
+            self.grafo.progresos.get(etapa.id),
+            self._botones(etapa, contexto)
+        )
+
+    def _etapa_opcion(self, etapa: Etapa, message: str) -> Dict:
+        valor = message.upper().strip() if etapa.mayusculas else message
+        valor = etapa.alias.get(valor, valor)
+        if valor not in etapa.valores:
+            if etapa.mensaje_error:
+                # Texto libre que no es una opción: se repite la pregunta con sus botones
+                pregunta = self.grafo.preguntas.get(etapa.id, etapa)
+                return self._respuesta(
+                    etapa.mensaje_error,
+                    etapa.id,
+                    self.grafo.progresos.get(etapa.id),
+                    self._botones(pregunta, _Contexto(info={}))
+                )
+            return self._etapa_bienvenida(self.grafo.etapas["initial"], message)
+
+        info = {}
+        if etapa.data_source:
+            info = _resolver_ruta(etapa.data_source, {"kb": self.kb}).get(valor, {})
+        return self._avanzar(etapa, valor, info)
+
+    def _etapa_numero(self, etapa: Etapa, message: str) -> Dict:
+        validacion = etapa.validacion
+        es_valido, valor, error = self._validar_numero(
+            message,
+            validacion.get("type", "entero"),
+            validacion.get("min", 0),
+            validacion.get("max")
+        )
+        if not es_valido:
+            return self._respuesta(
+                etapa.mensaje_error.format_map(_Contexto(error=error)),
+                etapa.id,
+                self.grafo.progresos.get(etapa.id)
+            )
+        return self._avanzar(etapa, valor)
+
+    def _etapa_texto(self, etapa: Etapa, message: str) -> Dict:
+        return self._avanzar(etapa, message)
+
+    def _etapa_cierre(self, etapa: Etapa, message: str) -> Dict:
+        if message == "GENERAR":
+            return self._respuesta(etapa.mensaje, "complete", self.grafo.progresos.get(etapa.id))
+        if message == "RESTART":
+            return self.process_message("", {"stage": "initial", "data": {}, "history": []})
+        return self._process_generic(message)
+
+    _MANEJADORES = {
+        "welcome": _etapa_bienvenida,
+        "buttons": _etapa_opcion,
+        "input_number": _etapa_numero,
+        "input_text": _etapa_texto,
+        "quotation": _etapa_cierre,
+    }
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Utilidades del motor
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _avanzar(self, etapa: Etapa, valor: Any, info: Optional[Dict] = None) -> Dict:
+        """Guarda el valor, pasa a la siguiente etapa y arma la respuesta"""
+        self.conversation_state["data"][etapa.campo] = valor
+        self.conversation_state["stage"] = etapa.next
+
+        if etapa.cotizacion:
+            return getattr(self, etapa.cotizacion)()
+
+        contexto = self._contexto(etapa, valor, info)
+        return self._respuesta(
+            etapa.mensaje.format_map(contexto),
+            etapa.next,
+            self.grafo.progresos.get(etapa.next),
+            self._botones(etapa, contexto),
+            {clave: contexto[variable] for clave, variable in etapa.datos_generados.items()}
+        )
+
+    def _contexto(self, etapa: Etapa, valor: Any = None, info: Optional[Dict] = None) -> _Contexto:
+        info = info or {}
+        contexto = _Contexto(self.conversation_state["data"])
+        contexto.update(valor=valor, info=info)
+        contexto["descripcion"] = etapa.descripciones.get(valor) or info.get("nombre", valor)
+        if etapa.contexto:
+            contexto.update(getattr(self, etapa.contexto)(valor, info))
+        return contexto
+
+    def _botones(self, etapa: Etapa, contexto: _Contexto) -> List[Dict]:
+        if etapa.botones_desde:
+            origen = _resolver_ruta(etapa.botones_desde["data_source"], {"kb": self.kb, "info": contexto["info"]})
+            if isinstance(origen, dict):
+                plantilla = etapa.botones_desde.get("text", "{nombre}")
+                return [
+                    {"text": plantilla.format_map(_Contexto({"nombre": clave}, **info)), "value": clave}
+                    for clave, info in origen.items()
+                ]
+            return [{"text": opcion, "value": opcion} for opcion in origen]
+
+        data = self.conversation_state["data"]
+        return [
+            {"text": boton["text"], "value": boton["value"]}
+            for boton in etapa.botones
+            if all(data.get(campo) == esperado for campo, esperado in boton.get("si", {}).items())
+        ]
+
+    def _respuesta(
+        self,
+        texto: str,
+        stage: str,
+        progreso: Optional[str] = None,
+        botones: Optional[List[Dict]] = None,
+        datos_generados: Optional[Dict] = None
+    ) -> Dict:
+        respuesta = {"texto": texto}
+        if botones:
+            respuesta["botones"] = botones
+        respuesta["stage"] = stage
+        respuesta["state"] = self.conversation_state
+        if datos_generados:
+            respuesta["datos_generados"] = datos_generados
+        if progreso:
+            respuesta["progreso"] = progreso
+        return respuesta
+
     def _validar_numero(self, valor: str, tipo: str = 'entero', min_val: float = 0, max_val: float = None) -> Tuple[bool, Optional[float], str]:
         try:
             valor_limpio = valor.strip().replace(',', '.')
@@ -907,7 +437,7 @@ class LocalSpecialist:
             return True, num, ''
         except ValueError:
             return False, None, 'Por favor ingresa un nmero vlido'
-    
+
     def _calcular_progreso(self) -> str:
         etapas = self.kb.get('etapas', [])
         stage_actual = self.conversation_state['stage']
@@ -925,182 +455,6 @@ class LocalSpecialist:
 class ElectricidadSpecialist(LocalSpecialist):
     """Especialista en instalaciones eléctricas profesionales"""
     
-    def _process_electricidad(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Instalaciones Eléctricas de **Tesla Electricidad**.
-
-🎯 Te ayudo a cotizar tu proyecto eléctrico con:
-✅ Precios según CNE 2011
-✅ Cálculo automático de materiales
-✅ Cotización profesional en minutos
-
-**¿Qué tipo de instalación necesitas?**""",
-                "botones": [
-                    {"text": "🏠 Residencial", "value": "RESIDENCIAL"},
-                    {"text": "🏢 Comercial", "value": "COMERCIAL"},
-                    {"text": "🏭 Industrial", "value": "INDUSTRIAL"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/7"
-            }
-        
-        elif stage == "tipo" or (stage == "initial" and message in ["RESIDENCIAL", "COMERCIAL", "INDUSTRIAL"]):
-            data["tipo"] = message
-            self.conversation_state["stage"] = "area"
-            tipo_info = self.kb["tipos"][message]
-            
-            return {
-
-
-                "texto": f"""Perfecto, instalación **{tipo_info["nombre"]}**. 
-
-📋 **Normativa:** {tipo_info["normativa"]}
-⏱️ **Tiempo:** {tipo_info["tiempo_estimado"]}
-
-📏 **¿Cuál es el área total del proyecto en m²?**
-
-_Escribe el número (ejemplo: 120)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "2/7"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 10000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m² (ejemplo: 120)",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "2/7"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "pisos"
-            
-            return {
-                "texto": f"""✅ Área: **{area} m²**
-
-🏢 **¿Cuántos pisos tiene el proyecto?**
-
-_Escribe el número (ejemplo: 2)_""",
-                "stage": "pisos",
-                "state": self.conversation_state,
-                "datos_generados": {"area_m2": area},
-                "progreso": "3/7"
-            }
-        
-        elif stage == "pisos":
-            es_valido, pisos, error = self._validar_numero(message, "entero", 0, 50)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de pisos (ejemplo: 2)",
-                    "stage": "pisos",
-                    "state": self.conversation_state,
-                    "progreso": "3/7"
-                }
-            
-            data["pisos"] = pisos
-            self.conversation_state["stage"] = "puntos_luz"
-            
-            return {
-                "texto": f"""✅ Pisos: **{pisos}**
-
-💡 **¿Cuántos puntos de luz necesitas?**
-
-_Escribe el número (ejemplo: 25)_""",
-                "stage": "puntos_luz",
-                "state": self.conversation_state,
-                "progreso": "4/7"
-            }
-        
-        elif stage == "puntos_luz":
-            es_valido, puntos, error = self._validar_numero(message, "entero", 0, 500)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de puntos de luz (ejemplo: 25)",
-                    "stage": "puntos_luz",
-                    "state": self.conversation_state,
-                    "progreso": "4/7"
-                }
-            
-            data["puntos_luz"] = puntos
-            self.conversation_state["stage"] = "tomacorrientes"
-            
-            return {
-                "texto": f"""✅ Puntos de luz: **{puntos}**
-
-🔌 **¿Cuántos tomacorrientes?**
-
-_Escribe el número (ejemplo: 15)_""",
-                "stage": "tomacorrientes",
-                "state": self.conversation_state,
-                "progreso": "5/7"
-            }
-        
-        elif stage == "tomacorrientes":
-            es_valido, tomas, error = self._validar_numero(message, "entero", 0, 500)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de tomacorrientes (ejemplo: 15)",
-                    "stage": "tomacorrientes",
-                    "state": self.conversation_state,
-                    "progreso": "5/7"
-                }
-            
-            data["tomacorrientes"] = tomas
-            self.conversation_state["stage"] = "tableros"
-            
-            return {
-                "texto": f"""✅ Tomacorrientes: **{tomas}**
-
-⚡ **¿Cuántos tableros eléctricos?**
-
-_Escribe el número (ejemplo: 2)_""",
-                "stage": "tableros",
-                "state": self.conversation_state,
-                "progreso": "6/7"
-            }
-        
-        elif stage == "tableros":
-            es_valido, tableros, error = self._validar_numero(message, "entero", 0, 20)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de tableros (ejemplo: 2)",
-                    "stage": "tableros",
-                    "state": self.conversation_state,
-                    "progreso": "6/7"
-                }
-            
-            data["tableros"] = tableros
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_electricidad()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista para generar. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "7/7"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_electricidad("")
-        
-        return self._process_generic(message)
-    
     def _generar_cotizacion_electricidad(self) -> Dict:
         data = self.conversation_state["data"]
         tipo = data["tipo"]
@@ -1111,46 +465,28 @@ _Escribe el número (ejemplo: 2)_""",
         tableros = data["tableros"]
         
         precios = self.kb["tipos"][tipo]["precios"]
-        
-        items = []
-        
-        items.append({
-            "descripcion": f"Puntos de luz empotrados ({puntos} und)",
-            "cantidad": puntos,
-            "precio_unitario": precios["punto_luz_empotrado"],
-            "total": puntos * precios["punto_luz_empotrado"]
-        })
-        
-        items.append({
-            "descripcion": f"Tomacorrientes dobles ({tomas} und)",
-            "cantidad": tomas,
-            "precio_unitario": precios["tomacorriente_doble"],
-            "total": tomas * precios["tomacorriente_doble"]
-        })
-        
-        precio_tablero = precios.get("tablero_trifasico", precios.get("tablero_industrial", 1200))
-        items.append({
-            "descripcion": f"Tableros eléctricos ({tableros} und)",
-            "cantidad": tableros,
-            "precio_unitario": precio_tablero,
-            "total": tableros * precio_tablero
-        })
+        # Cada tipo nombra sus propias claves de precio (INDUSTRIAL no usa empotrados)
+        partidas = self.kb["tipos"][tipo]["partidas"]
         
         cable_metros = area * 1.5 * pisos
-        items.append({
-            "descripcion": f"Cable THW 2.5mm² ({cable_metros:.0f}m)",
-            "cantidad": cable_metros,
-            "precio_unitario": precios["cable_thw_2_5mm"],
-            "total": cable_metros * precios["cable_thw_2_5mm"]
-        })
-        
         tuberia_metros = area * 1.2 * pisos
-        items.append({
-            "descripcion": f"Tubería PVC 3/4\" ({tuberia_metros:.0f}m)",
-            "cantidad": tuberia_metros,
-            "precio_unitario": precios["tuberia_pvc_3_4"],
-            "total": tuberia_metros * precios["tuberia_pvc_3_4"]
-        })
+        cantidades = [
+            ("punto_luz", puntos, f"{puntos} und"),
+            ("tomacorriente", tomas, f"{tomas} und"),
+            ("tablero", tableros, f"{tableros} und"),
+            ("cable", cable_metros, f"{cable_metros:.0f}m"),
+            ("tuberia", tuberia_metros, f"{tuberia_metros:.0f}m"),
+        ]
+        
+        items = []
+        for partida, cantidad, detalle in cantidades:
+            precio = precios[partidas[partida]["precio"]]
+            items.append({
+                "descripcion": f"{partidas[partida]['descripcion']} ({detalle})",
+                "cantidad": cantidad,
+                "precio_unitario": precio,
+                "total": cantidad * precio
+            })
         
         subtotal = sum(item["total"] for item in items)
         igv = subtotal * 0.18
@@ -1215,363 +551,133 @@ IGV (18%): S/ {igv:.2f}
 # 📋 ITSE SPECIALIST
 # ══════════════════════════════════════════════════════════════════════════════
 
-class ITSESpecialist(LocalSpecialist):
-    """Especialista en certificaciones ITSE profesionales"""
-    
-    def _process_itse(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        # 🔥 CRÍTICO: Detectar selección de categoría PRIMERO (antes de verificar stage)
-        message_upper = message.upper().strip()
-        if message_upper in self.kb["categorias"].keys():
-            # Usuario seleccionó una categoría válida
-            data["categoria"] = message_upper
-            self.conversation_state["stage"] = "tipo_especifico"
-            tipos = self.kb["categorias"][message_upper]["tipos"]
-            
-            return {
-                "texto": f"""Perfecto, sector **{self.kb["categorias"][message_upper]["nombre"]}**. 
-
-¿Qué tipo específico es tu establecimiento?""",
-                "botones": [{"text": t, "value": t} for t in tipos],
-                "stage": "tipo_especifico",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-        
-        # Si no es una categoría, procesar según el stage actual
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en certificados ITSE de **Tesla Electricidad**.
-
-🎯 Te ayudo a obtener tu certificado ITSE con:
-✅ Visita técnica GRATUITA
-✅ Precios oficiales TUPA Huancayo
-✅ Trámite 100% gestionado
-✅ Entrega en 7 días hábiles
-
-**Selecciona tu tipo de establecimiento:**""",
-                "botones": [
-                    {"text": "🏥 Salud", "value": "SALUD"},
-                    {"text": "🎓 Educación", "value": "EDUCACION"},
-                    {"text": "🏨 Hospedaje", "value": "HOSPEDAJE"},
-                    {"text": "🏪 Comercio", "value": "COMERCIO"},
-                    {"text": "🍽️ Restaurante", "value": "RESTAURANTE"},
-                    {"text": "🏢 Oficina", "value": "OFICINA"},
-                    {"text": "🏭 Industrial", "value": "INDUSTRIAL"},
-                    {"text": "🎭 Encuentro", "value": "ENCUENTRO"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/5"
-            }
-        
-        elif stage == "categoria" or (stage == "initial" and message in self.kb["categorias"].keys()):
-            data["categoria"] = message
-            self.conversation_state["stage"] = "tipo_especifico"
-            tipos = self.kb["categorias"][message]["tipos"]
-            
-            return {
-                "texto": f"""Perfecto, sector **{message}**. ¿Qué tipo específico es?""",
-                "botones": [{"text": t, "value": t} for t in tipos],
-                "stage": "tipo_especifico",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-        
-        elif stage == "tipo_especifico":
-            data["tipo_especifico"] = message
-            self.conversation_state["stage"] = "area"
-            
-            return {
-                "texto": f"""Entendido, es un **{message}**. 
-
-¿Cuál es el área total en m²?
-
-_Escribe el número (ejemplo: 150)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "3/5"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 50000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "3/5"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "pisos"
-            
-            return {
-                "texto": f"""📐 Área: **{area} m²**
-
-¿Cuántos pisos tiene el establecimiento?
-
-_Escribe el número (ejemplo: 2)_""",
-                "stage": "pisos",
-                "state": self.conversation_state,
-                "progreso": "4/5"
-            }
-        
-        elif stage == "pisos":
-            es_valido, pisos, error = self._validar_numero(message, "entero", 0, 50)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de pisos",
-                    "stage": "pisos",
-                    "state": self.conversation_state,
-                    "progreso": "4/5"
-                }
-            
-            data["pisos"] = pisos
-            self.conversation_state["stage"] = "quotation"
-            
-            riesgo = self._calcular_riesgo(data["categoria"], data["area"], pisos)
-            data["riesgo"] = riesgo
-            
-            return self._generar_cotizacion_itse(riesgo)
-        
-        elif stage == "quotation":
-            if message == "AGENDAR":
-                return {
-                    "texto": "✅ Excelente! Para agendar tu visita técnica GRATUITA, contacta:\n\n📞 WhatsApp: 906 315 961\n📧 Email: ingenieria.teslaelectricidad@gmail.com",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "5/5"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_itse("")
-        
-        return self._process_generic(message)
-    
-    def _calcular_riesgo(self, categoria: str, area: float, pisos: int) -> str:
-        if categoria == "SALUD":
-            return "MUY_ALTO" if area > 500 or pisos >= 2 else "ALTO"
-        elif categoria == "EDUCACION":
-            return "ALTO" if area > 1000 or pisos >= 3 else "MEDIO"
-        elif categoria == "HOSPEDAJE":
-            return "ALTO" if area > 500 or pisos >= 3 else "MEDIO"
-        elif categoria == "COMERCIO":
-            return "ALTO" if area > 500 else "MEDIO"
-        elif categoria == "RESTAURANTE":
-            return "ALTO" if area > 300 else "MEDIO"
-        elif categoria == "OFICINA":
-            return "MEDIO" if area > 500 else "BAJO"
-        elif categoria == "INDUSTRIAL":
-            return "ALTO"
-        elif categoria == "ENCUENTRO":
-            return "MUY_ALTO" if area > 500 else "ALTO"
-        return self.kb["categorias"][categoria]["riesgo_default"]
-    
-    def _generar_cotizacion_itse(self, riesgo: str) -> Dict:
-        data = self.conversation_state["data"]
-        categoria = data.get("categoria", "COMERCIO")
-        area = data.get("area", 0)
-        pisos = data.get("pisos", 1)
-
-        municipal = self.kb["precios_municipales"][riesgo]
-        tesla = self.kb["precios_tesla"][riesgo]
-
-        # Usar precio promedio Tesla para la cotización
-        precio_tesla = (tesla["min"] + tesla["max"]) / 2
-
-        # ✅ GENERAR ITEMS en formato tabla "Detalle de la Cotización"
-        items = []
+class ITSESpecialist(LocalSpecialist):
+    """Especialista en Certificados ITSE"""
 
-        items.append({
-            "descripcion": f"Certificado ITSE - Nivel {riesgo.replace('_', ' ')}",
-            "cantidad": 1,
-            "unidad": "servicio",
-            "precio_unitario": municipal["precio"]
-        })
+    def _generar_cotizacion_itse(self) -> Dict:
+        data = self.conversation_state["data"]
 
-        items.append({
-            "descripcion": f"Servicio técnico profesional - {tesla['incluye']}",
-            "cantidad": 1,
-            "unidad": "servicio",
-            "precio_unitario": precio_tesla
-        })
+        # CALCULAR RIESGO Y PRECIO
+        riesgo, razon = self._calcular_riesgo(data)
+        cotizacion = self._calcular_cotizacion(riesgo)
 
-        items.append({
-            "descripcion": "Visita técnica gratuita",
-            "cantidad": 1,
-            "unidad": "servicio",
-            "precio_unitario": 0
-        })
+        # Guardar resultados
+        data["riesgo"] = riesgo
+        data["cotizacion"] = cotizacion
 
-        # Calcular totales
-        subtotal = sum(item["cantidad"] * item["precio_unitario"] for item in items)
-        igv = subtotal * 0.18
-        total = subtotal + igv
+        # Mapeo de riesgo a clave de precios municipales
+        riesgo_key = riesgo  # BAJO, MEDIO, ALTO, MUY_ALTO
+        precios_muni = self.kb["precios_municipales"].get(riesgo_key, {})
+        precios_tesla = self.kb["precios_tesla"].get(riesgo_key, {})
 
-        total_min = municipal["precio"] + tesla["min"]
-        total_max = municipal["precio"] + tesla["max"]
+        total_min = precios_muni.get("precio", 0) + precios_tesla.get("min", 0)
+        total_max = precios_muni.get("precio", 0) + precios_tesla.get("max", 0)
 
-        texto = f"""📊 **COTIZACIÓN ITSE - NIVEL {riesgo.replace('_', ' ')}**
+        return {
+            "texto": f"""📊 **COTIZACIÓN ITSE - RIESGO {riesgo}**
 
-━━━━━━━━━━━━━━━━━━━━━━━
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 **💰 COSTOS DESGLOSADOS:**
 
 🏛️ **Derecho Municipal (TUPA):**
-└ S/ {municipal["precio"]:.2f}
+└ S/ {precios_muni.get('precio', 0):.2f} ({precios_muni.get('descripcion', '')})
 
 ⚡ **Servicio Técnico TESLA:**
-└ S/ {tesla["min"]} - {tesla["max"]}
-└ {tesla["incluye"]}
+└ S/ {precios_tesla.get('min', 0)} - {precios_tesla.get('max', 0)}
+└ Incluye: {precios_tesla.get('incluye', '')}
 
-━━━━━━━━━━━━━━━━━━━━━━━
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 **📈 TOTAL ESTIMADO:**
-**S/ {total_min:.2f} - {total_max:.2f}** (sin IGV)
-**S/ {total:.2f}** (con IGV 18%)
-━━━━━━━━━━━━━━━━━━━━━━━
+**S/ {total_min:.2f} - {total_max:.2f}**
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-⏱️ **Tiempo:** {municipal["dias"]} días hábiles
+⏱️ **Tiempo:** {precios_muni.get('dias', 7)} días hábiles
 🎁 **Visita técnica:** GRATUITA
 ✅ **Garantía:** 100% aprobación
 
-¿Qué deseas hacer?"""
-
-        return {
-            "texto": texto,
+¿Qué deseas hacer?""",
             "botones": [
                 {"text": "📅 Agendar visita", "value": "AGENDAR"},
                 {"text": "🔄 Nueva consulta", "value": "RESTART"}
             ],
-            "stage": "quotation",
+            "stage": "completed",
             "state": self.conversation_state,
+            "progreso": "5/5",
+            # ✅ DATOS_GENERADOS en formato tabla "Detalle de la Cotización"
             "datos_generados": {
                 "proyecto": {
-                    "nombre": f"Certificado ITSE - {categoria}",
-                    "area_m2": area,
-                    "pisos": pisos,
+                    "nombre": f"Certificado ITSE - {data.get('categoria', 'COMERCIO')}",
+                    "area_m2": data.get("area", 0),
+                    "pisos": data.get("pisos", 1),
                     "nivel_riesgo": riesgo
                 },
-                "items": items,
-                "subtotal": subtotal,
-                "igv": igv,
-                "total": total
-            },
-            "progreso": "5/5"
+                "items": [
+                    {
+                        "descripcion": f"Certificado ITSE - Nivel {riesgo}",
+                        "cantidad": 1,
+                        "unidad": "servicio",
+                        "precio_unitario": precios_muni.get('precio', 0)
+                    },
+                    {
+                        "descripcion": f"Servicio técnico profesional - {precios_tesla.get('incluye', 'Gestión completa')}",
+                        "cantidad": 1,
+                        "unidad": "servicio",
+                        "precio_unitario": (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2
+                    },
+                    {
+                        "descripcion": "Visita técnica gratuita",
+                        "cantidad": 1,
+                        "unidad": "servicio",
+                        "precio_unitario": 0
+                    }
+                ],
+                "subtotal": precios_muni.get('precio', 0) + (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2,
+                "igv": (precios_muni.get('precio', 0) + (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2) * 0.18,
+                "total": (precios_muni.get('precio', 0) + (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2) * 1.18
+            }
         }
 
+    def _calcular_riesgo(self, data: Dict) -> Tuple[str, str]:
+        """Calcula el riesgo basado en categoría, área y pisos"""
+        categoria = data.get("categoria", "")
+        area = float(data.get("area", 0))
+        pisos = int(data.get("pisos", 1))
 
-# ══════════════════════════════════════════════════════════════════════════════
-# 🔌 POZO TIERRA, 🔥 CONTRAINCENDIOS, 🏠 DOMÓTICA, 📹 CCTV, 🌐 REDES
-# ⚙️ AUTOMATIZACIÓN, 📄 EXPEDIENTES, 💧 SANEAMIENTO SPECIALISTS
-# ══════════════════════════════════════════════════════════════════════════════
-# Nota: Implementaciones simplificadas - se pueden expandir según necesidad
+        info_cat = self.kb["categorias"].get(categoria, {})
+        riesgo = info_cat.get("riesgo_default", "MEDIO")
+        razon = "Riesgo estándar para la categoría"
 
-class PozoTierraSpecialist(LocalSpecialist):
-    """Especialista en sistemas de puesta a tierra profesionales"""
-    
-    def _process_pozo_tierra(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Sistemas de Puesta a Tierra de **Tesla Electricidad**.
-
-🎯 Te ayudo con:
-✅ Diseño según CNE Sección 250
-✅ Cálculo de resistencia
-✅ Materiales certificados
-✅ Medición con telurómetro
-
-**¿Qué tipo de suelo tienes?**""",
-                "botones": [
-                    {"text": "🟤 Arcilloso", "value": "ARCILLOSO"},
-                    {"text": "🟡 Arenoso", "value": "ARENOSO"},
-                    {"text": "⚫ Rocoso", "value": "ROCOSO"},
-                    {"text": "🔵 Mixto", "value": "MIXTO"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/5"
-            }
-        
-        elif stage == "tipo_suelo" or (stage == "initial" and message in self.kb["tipos_suelo"].keys()):
-            data["tipo_suelo"] = message
-            self.conversation_state["stage"] = "potencia"
-            suelo_info = self.kb["tipos_suelo"][message]
-            
-            return {
-                "texto": f"""Perfecto, suelo **{suelo_info["nombre"]}**.
+        # Aplicar reglas específicas (versión simplificada de la lógica completa)
+        reglas_texto = info_cat.get("reglas", "")
 
-📊 Resistividad: {suelo_info["resistividad"]} Ω·m
-⚙️ Factor de corrección: {suelo_info["factor_correccion"]}
+        # Lógica hardcodeada crítica para asegurar precisión
+        if categoria == "SALUD":
+            if area > 500 or pisos >= 2:
+                return "MUY_ALTO", "Salud > 500m2 o 2+ pisos"
+            return "ALTO", "Establecimiento de Salud"
 
-⚡ **¿Cuál es la potencia instalada en kW?**
+        elif categoria == "EDUCACION":
+            if area > 1000 or pisos >= 3:
+                return "ALTO", "Educación > 1000m2 o 3+ pisos"
+            return "MEDIO", "Centro educativo estándar"
 
-_Escribe el número (ejemplo: 50)_""",
-                "stage": "potencia",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-        
-        elif stage == "potencia":
-            es_valido, potencia, error = self._validar_numero(message, "decimal", 0, 1000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa la potencia en kW",
-                    "stage": "potencia",
-                    "state": self.conversation_state,
-                    "progreso": "2/5"
-                }
-            
-            data["potencia"] = potencia
-            self.conversation_state["stage"] = "area"
-            
-            return {
-                "texto": f"""✅ Potencia: **{potencia} kW**
+        elif categoria == "COMERCIO":
+            if area > 500:
+                return "ALTO", "Comercio > 500m2"
+            return "MEDIO", "Comercio estándar"
 
-📏 **¿Cuál es el área del terreno en m²?**
+        elif categoria == "INDUSTRIAL":
+            return "ALTO", "Industrial siempre es alto riesgo mínimo"
 
-_Escribe el número (ejemplo: 200)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "3/5"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 10000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "3/5"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_pozo()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "5/5"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_pozo_tierra("")
-        
-        return self._process_generic(message)
+        return riesgo, razon
+
+    def _calcular_cotizacion(self, riesgo: str) -> Dict:
+        """Retorna estructura de cotización dummy"""
+        return {"riesgo": riesgo}
+
+
+class PozoTierraSpecialist(LocalSpecialist):
+    """Especialista en sistemas de puesta a tierra profesionales"""
     
     def _generar_cotizacion_pozo(self) -> Dict:
         data = self.conversation_state["data"]
@@ -1710,123 +816,6 @@ IGV (18%): S/ {igv:.2f}
 class ContraincendiosSpecialist(LocalSpecialist):
     """Especialista en sistemas contraincendios profesionales"""
     
-    def _process_contraincendios(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Sistemas Contraincendios de **Tesla Electricidad**.
-
-🎯 Te ayudo con:
-✅ Sistemas según NFPA
-✅ Detección y extinción
-✅ Certificación completa
-
-**¿Qué sistema necesitas?**""",
-                "botones": [
-                    {"text": "🔔 Detección", "value": "DETECCION"},
-                    {"text": "🧯 Extinción", "value": "EXTINCION"},
-                    {"text": "🔥 Completo", "value": "COMPLETO"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/6"
-            }
-        
-        elif stage == "tipo_sistema" or (stage == "initial" and message in ["DETECCION", "EXTINCION", "COMPLETO"]):
-            data["tipo_sistema"] = message
-            self.conversation_state["stage"] = "area"
-            
-            if message == "COMPLETO":
-                desc = "Sistema Completo (Detección + Extinción)"
-            else:
-                desc = self.kb["sistemas"][message]["nombre"]
-            
-            return {
-                "texto": f"""Perfecto, **{desc}**.
-
-📏 **¿Cuál es el área total a proteger en m²?**
-
-_Escribe el número (ejemplo: 300)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "2/6"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 50000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "2/6"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "pisos"
-            
-            return {
-                "texto": f"""✅ Área: **{area} m²**
-
-🏢 **¿Cuántos pisos tiene el edificio?**
-
-_Escribe el número (ejemplo: 3)_""",
-                "stage": "pisos",
-                "state": self.conversation_state,
-                "progreso": "3/6"
-            }
-        
-        elif stage == "pisos":
-            es_valido, pisos, error = self._validar_numero(message, "entero", 0, 50)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de pisos",
-                    "stage": "pisos",
-                    "state": self.conversation_state,
-                    "progreso": "3/6"
-                }
-            
-            data["pisos"] = pisos
-            self.conversation_state["stage"] = "nivel_riesgo"
-            
-            return {
-                "texto": f"""✅ Pisos: **{pisos}**
-
-⚠️ **¿Cuál es el nivel de riesgo del establecimiento?**""",
-                "botones": [
-                    {"text": "🟢 Bajo", "value": "BAJO"},
-                    {"text": "🟡 Medio", "value": "MEDIO"},
-                    {"text": "🟠 Alto", "value": "ALTO"}
-                ],
-                "stage": "nivel_riesgo",
-                "state": self.conversation_state,
-                "progreso": "4/6"
-            }
-        
-        elif stage == "nivel_riesgo":
-            data["nivel_riesgo"] = message
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_contraincendios()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "6/6"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_contraincendios("")
-        
-        return self._process_generic(message)
-    
     def _generar_cotizacion_contraincendios(self) -> Dict:
         data = self.conversation_state["data"]
         tipo_sistema = data["tipo_sistema"]
@@ -1972,108 +961,9 @@ IGV (18%): S/ {igv:.2f}
 class DomoticaSpecialist(LocalSpecialist):
     """Especialista en domótica y automatización del hogar"""
     
-    def _process_domotica(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Domótica de **Tesla Electricidad**.
-
-🎯 Automatiza tu hogar/negocio con:
-✅ Control de iluminación
-✅ Climatización inteligente
-✅ Seguridad integrada
-✅ Ahorro energético
-
-**¿Qué nivel de domótica necesitas?**""",
-                "botones": [
-                    {"text": "🟢 Básico", "value": "BASICO"},
-                    {"text": "🟡 Intermedio", "value": "INTERMEDIO"},
-                    {"text": "🔴 Avanzado", "value": "AVANZADO"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/5"
-            }
-        
-        elif stage == "nivel" or (stage == "initial" and message in ["BASICO", "INTERMEDIO", "AVANZADO"]):
-            data["nivel"] = message
-            self.conversation_state["stage"] = "area"
-            nivel_info = self.kb["niveles"][message]
-            
-            return {
-                "texto": f"""Perfecto, **{nivel_info["nombre"]}**.
-
-📋 {nivel_info["descripcion"]}
-💰 Precio estimado: S/ {nivel_info["precio_m2"]}/m²
-
-📏 **¿Cuál es el área a automatizar en m²?**
-
-_Escribe el número (ejemplo: 150)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 5000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "2/5"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "dispositivos"
-            
-            nivel = data["nivel"]
-            precio_estimado = area * self.kb["niveles"][nivel]["precio_m2"]
-            
-            return {
-                "texto": f"""✅ Área: **{area} m²**
-💰 Estimado base: **S/ {precio_estimado:,.2f}**
-
-🔢 **¿Cuántos dispositivos aproximadamente?**
-
-_Escribe el número (ejemplo: 20)_""",
-                "stage": "dispositivos",
-                "state": self.conversation_state,
-                "progreso": "3/5"
-            }
-        
-        elif stage == "dispositivos":
-            es_valido, dispositivos, error = self._validar_numero(message, "entero", 0, 200)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de dispositivos",
-                    "stage": "dispositivos",
-                    "state": self.conversation_state,
-                    "progreso": "3/5"
-                }
-            
-            data["dispositivos"] = dispositivos
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_domotica()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "5/5"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_domotica("")
-        
-        return self._process_generic(message)
+    def _contexto_precio_estimado(self, valor, info: Dict) -> Dict:
+        nivel = self.conversation_state["data"]["nivel"]
+        return {"precio_estimado": valor * self.kb["niveles"][nivel]["precio_m2"]}
     
     def _generar_cotizacion_domotica(self) -> Dict:
         data = self.conversation_state["data"]
@@ -2192,116 +1082,26 @@ IGV (18%): S/ {igv:.2f}
 class CCTVSpecialist(LocalSpecialist):
     """Especialista en sistemas de videovigilancia CCTV"""
     
-    def _process_cctv(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en CCTV de **Tesla Electricidad**.
-
-🎯 Protege tu propiedad con:
-✅ Cámaras HD/Full HD/4K
-✅ Grabación continua
-✅ Acceso remoto 24/7
-✅ Visión nocturna
-
-**¿Qué tipo de cámaras prefieres?**""",
-                "botones": [
-                    {"text": "📺 Analógicas HD", "value": "ANALOGICA"},
-                    {"text": "🌐 IP (Red)", "value": "IP"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/6"
-            }
-        
-        elif stage == "tipo_camara" or (stage == "initial" and message in ["ANALOGICA", "IP"]):
-            data["tipo_camara"] = message
-            self.conversation_state["stage"] = "num_camaras"
-            tipo_info = self.kb["tipos_camara"][message]
-            
-            return {
-                "texto": f"""Perfecto, **{tipo_info["nombre"]}**.
-
-📋 Tecnología: {tipo_info["descripcion"]}
-📹 Grabador: {tipo_info["grabador"]}
-🔌 Cable: {tipo_info["cable"]}
-
-📹 **¿Cuántas cámaras necesitas?**
-
-_Escribe el número (ejemplo: 8)_""",
-                "stage": "num_camaras",
-                "state": self.conversation_state,
-                "progreso": "2/6"
-            }
-        
-        elif stage == "num_camaras":
-            es_valido, num_camaras, error = self._validar_numero(message, "entero", 1, 64)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de cámaras (1-64)",
-                    "stage": "num_camaras",
-                    "state": self.conversation_state,
-                    "progreso": "2/6"
-                }
-            
-            data["num_camaras"] = num_camaras
-            self.conversation_state["stage"] = "resolucion"
-            
-            return {
-                "texto": f"""✅ Cámaras: **{num_camaras}**
-
-📺 **¿Qué resolución deseas?**""",
-                "botones": [
-                    {"text": "📹 2MP (1080p)", "value": "2MP"},
-                    {"text": "📹 4MP (2K)", "value": "4MP"},
-                    {"text": "📹 8MP (4K)", "value": "8MP"} if data["tipo_camara"] == "IP" else None
-                ],
-                "stage": "resolucion",
-                "state": self.conversation_state,
-                "progreso": "3/6"
-            }
-        
-        elif stage == "resolucion":
-            data["resolucion"] = message
-            self.conversation_state["stage"] = "almacenamiento"
-            
-            return {
-                "texto": f"""✅ Resolución: **{message}**
-
-💾 **¿Cuántos días de grabación necesitas?**""",
-                "botones": [
-                    {"text": "7 días", "value": "7"},
-                    {"text": "15 días", "value": "15"},
-                    {"text": "30 días", "value": "30"},
-                    {"text": "60 días", "value": "60"}
-                ],
-                "stage": "almacenamiento",
-                "state": self.conversation_state,
-                "progreso": "4/6"
-            }
-        
-        elif stage == "almacenamiento":
-            data["dias_grabacion"] = int(message)
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_cctv()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "6/6"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_cctv("")
-        
-        return self._process_generic(message)
+    @staticmethod
+    def _resolucion_disponible(precios_cam: Dict, resolucion: str) -> str:
+        """Resolución pedida o la mayor que el tipo de cámara ofrece por debajo"""
+        ofrecidas = sorted(
+            int(m.group(1)) for m in (re.match(r"camara_(\d+)mp_domo$", k) for k in precios_cam) if m
+        )
+        pedida = int(resolucion.rstrip("MP"))
+        return f"{max([mp for mp in ofrecidas if mp <= pedida] or ofrecidas[:1])}MP"
+    
+    @staticmethod
+    def _discos_necesarios(precios_acc: Dict, tb_necesarios: int) -> Tuple[int, int]:
+        """(capacidad en TB, cantidad): el disco más chico que alcanza, o varios del mayor"""
+        capacidades = sorted(
+            int(m.group(1)) for m in (re.match(r"disco_(\d+)tb_purple$", k) for k in precios_acc) if m
+        )
+        for capacidad in capacidades:
+            if capacidad >= tb_necesarios:
+                return capacidad, 1
+        mayor = capacidades[-1]
+        return mayor, math.ceil(tb_necesarios / mayor)
     
     def _generar_cotizacion_cctv(self) -> Dict:
         data = self.conversation_state["data"]
@@ -2316,7 +1116,8 @@ _Escribe el número (ejemplo: 8)_""",
         
         items = []
         
-        # Cámaras
+        # Cámaras (si el tipo no ofrece la resolución, la mayor disponible por debajo)
+        resolucion = self._resolucion_disponible(precios_cam, resolucion)
         precio_camara = precios_cam[f"camara_{resolucion.lower()}_domo"]
         items.append({
             "descripcion": f"Cámaras {tipo_camara} {resolucion} ({num_camaras} und)",
@@ -2336,15 +1137,16 @@ _Escribe el número (ejemplo: 8)_""",
         })
         
         # Disco duro
-        gb_por_dia_por_camara = {"2MP": 20, "4MP": 40, "8MP": 80}[resolucion]
+        gb_por_dia_por_camara = {"2MP": 20, "4MP": 40, "5MP": 50, "8MP": 80}[resolucion]
         gb_total = gb_por_dia_por_camara * num_camaras * dias
-        tb_necesarios = max(1, int(gb_total / 1000))
-        disco = f"disco_{min(4, tb_necesarios)}tb_purple"
+        tb_necesarios = max(1, math.ceil(gb_total / 1000))
+        capacidad, discos = self._discos_necesarios(precios_acc, tb_necesarios)
+        disco = f"disco_{capacidad}tb_purple"
         items.append({
-            "descripcion": f"Disco duro {min(4, tb_necesarios)}TB Purple (1 und)",
-            "cantidad": 1,
+            "descripcion": f"Disco duro {capacidad}TB Purple ({discos} und)",
+            "cantidad": discos,
             "precio_unitario": precios_acc[disco],
-            "total": precios_acc[disco]
+            "total": discos * precios_acc[disco]
         })
         
         # Cable
@@ -2435,107 +1237,6 @@ IGV (18%): S/ {igv:.2f}
 class RedesSpecialist(LocalSpecialist):
     """Especialista en cableado estructurado y redes profesionales"""
     
-    def _process_redes(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Redes y Cableado Estructurado de **Tesla Electricidad**.
-
-🎯 Conecta tu empresa con:
-✅ Cableado certificado TIA/EIA
-✅ Velocidades hasta 10 Gbps
-✅ WiFi empresarial
-✅ Garantía 25 años
-
-**¿Qué tipo de cableado necesitas?**""",
-                "botones": [
-                    {"text": "📶 Cat5e (1 Gbps)", "value": "CAT5E"},
-                    {"text": "🚀 Cat6 (10 Gbps)", "value": "CAT6"},
-                    {"text": "⚡ Cat6a (10 Gbps+)", "value": "CAT6A"},
-                    {"text": "💎 Fibra Óptica", "value": "FIBRA"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/5"
-            }
-        
-        elif stage == "tipo_cable" or (stage == "initial" and message in ["CAT5E", "CAT6", "CAT6A", "FIBRA"]):
-            data["tipo_cable"] = message
-            self.conversation_state["stage"] = "area"
-            cable_info = self.kb["tipos_cable"][message]
-            
-            return {
-                "texto": f"""Perfecto, **{cable_info["nombre"]}**.
-
-⚡ Velocidad: {cable_info["velocidad"]}
-📏 Distancia máx: {cable_info["distancia_max"]}
-💼 Aplicación: {cable_info["aplicacion"]}
-
-📏 **¿Cuál es el área total a cablear en m²?**
-
-_Escribe el número (ejemplo: 500)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 10000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "2/5"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "puntos"
-            
-            return {
-                "texto": f"""✅ Área: **{area} m²**
-
-🔌 **¿Cuántos puntos de red necesitas?**
-
-_Escribe el número (ejemplo: 24)_""",
-                "stage": "puntos",
-                "state": self.conversation_state,
-                "progreso": "3/5"
-            }
-        
-        elif stage == "puntos":
-            es_valido, puntos, error = self._validar_numero(message, "entero", 0, 500)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de puntos de red",
-                    "stage": "puntos",
-                    "state": self.conversation_state,
-                    "progreso": "3/5"
-                }
-            
-            data["puntos"] = puntos
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_redes()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "5/5"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_redes("")
-        
-        return self._process_generic(message)
-    
     def _generar_cotizacion_redes(self) -> Dict:
         data = self.conversation_state["data"]
         tipo_cable = data["tipo_cable"]
@@ -2670,124 +1371,8 @@ IGV (18%): S/ {igv:.2f}
 class AutomatizacionSpecialist(LocalSpecialist):
     """Especialista en automatización industrial con PLCs"""
     
-    def _process_automatizacion_industrial(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Automatización Industrial de **Tesla Electricidad**.
-
-🎯 Automatiza tu proceso con:
-✅ PLCs Siemens/Allen Bradley
-✅ HMI táctil
-✅ Variadores de frecuencia
-✅ Programación incluida
-
-**¿Qué tipo de PLC necesitas?**""",
-                "botones": [
-                    {"text": "🟢 Básico (hasta 32 I/O)", "value": "BASICO"},
-                    {"text": "🟡 Intermedio (hasta 128 I/O)", "value": "INTERMEDIO"},
-                    {"text": "🔴 Avanzado (512+ I/O)", "value": "AVANZADO"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/6"
-            }
-        
-        elif stage == "tipo_plc" or (stage == "initial" and message in ["BASICO", "INTERMEDIO", "AVANZADO"]):
-            data["tipo_plc"] = message
-            self.conversation_state["stage"] = "entradas"
-            plc_info = self.kb["tipos_plc"][message]
-            
-            return {
-                "texto": f"""Perfecto, **{plc_info["nombre"]}**.
-
-📋 {plc_info["descripcion"]}
-💰 Precio base: S/ {plc_info["precio"]:,.2f}
-🏭 Marcas: {', '.join(plc_info["marcas"])}
-
-🔢 **¿Cuántas entradas digitales necesitas?**
-
-_Escribe el número (ejemplo: 16)_""",
-                "stage": "entradas",
-                "state": self.conversation_state,
-                "progreso": "2/6"
-            }
-        
-        elif stage == "entradas":
-            es_valido, entradas, error = self._validar_numero(message, "entero", 0, 512)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de entradas",
-                    "stage": "entradas",
-                    "state": self.conversation_state,
-                    "progreso": "2/6"
-                }
-            
-            data["entradas"] = entradas
-            self.conversation_state["stage"] = "salidas"
-            
-            return {
-                "texto": f"""✅ Entradas: **{entradas}**
-
-🔢 **¿Cuántas salidas digitales necesitas?**
-
-_Escribe el número (ejemplo: 12)_""",
-                "stage": "salidas",
-                "state": self.conversation_state,
-                "progreso": "3/6"
-            }
-        
-        elif stage == "salidas":
-            es_valido, salidas, error = self._validar_numero(message, "entero", 0, 512)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de salidas",
-                    "stage": "salidas",
-                    "state": self.conversation_state,
-                    "progreso": "3/6"
-                }
-            
-            data["salidas"] = salidas
-            self.conversation_state["stage"] = "hmi"
-            
-            return {
-                "texto": f"""✅ Salidas: **{salidas}**
-
-📺 **¿Necesitas pantalla HMI?**""",
-                "botones": [
-                    {"text": "📱 7 pulgadas", "value": "7"},
-                    {"text": "📺 10 pulgadas", "value": "10"},
-                    {"text": "🖥️ 15 pulgadas", "value": "15"},
-                    {"text": "❌ No necesito", "value": "NO"}
-                ],
-                "stage": "hmi",
-                "state": self.conversation_state,
-                "progreso": "4/6"
-            }
-        
-        elif stage == "hmi":
-            data["hmi"] = message
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_automatizacion()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "6/6"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_automatizacion_industrial("")
-        
-        return self._process_generic(message)
+    def _contexto_marcas(self, valor, info: Dict) -> Dict:
+        return {"marcas": ", ".join(info["marcas"])}
     
     def _generar_cotizacion_automatizacion(self) -> Dict:
         data = self.conversation_state["data"]
@@ -2822,7 +1407,7 @@ _Escribe el número (ejemplo: 12)_""",
         
         # HMI
         if hmi_size != "NO":
-            hmi_key = f"hmi_{hmi_size}inch_{'avanzado' if tipo_plc == 'AVANZADO' else 'basico'}"
+            hmi_key = self.kb["hmi_por_tamano"][hmi_size]
             items.append({
                 "descripcion": f"HMI {hmi_size} pulgadas (1 und)",
                 "cantidad": 1,
@@ -2906,112 +1491,20 @@ IGV (18%): S/ {igv:.2f}
                     "entradas": entradas,
                     "salidas": salidas
                 },
-                "items": items,
-                "subtotal": subtotal,
-                "igv": igv,
-                "total": total
-            },
-            "progreso": "6/6"
-        }
-
-
-class ExpedientesSpecialist(LocalSpecialist):
-    """Especialista en expedientes técnicos profesionales"""
-    
-    def _process_expedientes(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-        
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Expedientes Técnicos de **Tesla Electricidad**.
-
-🎯 Elaboramos expedientes según RNE:
-✅ Memoria descriptiva
-✅ Planos profesionales
-✅ Metrados y presupuesto
-✅ Cronograma de obra
-
-**¿Qué tipo de expediente necesitas?**""",
-                "botones": [
-                    {"text": "⚡ Eléctrico", "value": "ELECTRICO"},
-                    {"text": "💧 Sanitario", "value": "SANITARIO"},
-                    {"text": "🏗️ Estructural", "value": "ESTRUCTURAL"},
-                    {"text": "🏛️ Arquitectónico", "value": "ARQUITECTURA"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/5"
-            }
-        
-        elif stage == "tipo_proyecto" or (stage == "initial" and message in ["ELECTRICO", "SANITARIO", "ESTRUCTURAL", "ARQUITECTURA"]):
-            data["tipo_proyecto"] = message
-            self.conversation_state["stage"] = "area"
-            proyecto_info = self.kb["tipos_proyecto"][message]
-            
-            return {
-                "texto": f"""Perfecto, **{proyecto_info["nombre"]}**.
-
-📋 Incluye:
-""" + "\n".join([f"✅ {item}" for item in proyecto_info["incluye"][:4]]) + f"""
-
-⏱️ Tiempo: {proyecto_info["tiempo"]}
+                "items": items,
+                "subtotal": subtotal,
+                "igv": igv,
+                "total": total
+            },
+            "progreso": "6/6"
+        }
 
-📏 **¿Cuál es el área del proyecto en m²?**
 
-_Escribe el número (ejemplo: 300)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-        
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 50000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "2/5"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "complejidad"
-            
-            return {
-                "texto": f"""✅ Área: **{area} m²**
-
-⚙️ **¿Cuál es la complejidad del proyecto?**""",
-                "botones": [
-                    {"text": "🟢 Simple", "value": "SIMPLE"},
-                    {"text": "🟡 Media", "value": "MEDIA"},
-                    {"text": "🔴 Alta", "value": "ALTA"}
-                ],
-                "stage": "complejidad",
-                "state": self.conversation_state,
-                "progreso": "3/5"
-            }
-        
-        elif stage == "complejidad":
-            data["complejidad"] = message
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_expedientes()
-        
-        elif stage == "quotation":
-            if message == "GENERAR":
-                return {
-                    "texto": "✅ Cotización lista. Haz clic en 'Descargar Word' o 'Descargar PDF'.",
-                    "stage": "complete",
-                    "state": self.conversation_state,
-                    "progreso": "5/5"
-                }
-            elif message == "RESTART":
-                self.conversation_state = {"stage": "initial", "data": {}, "history": []}
-                return self._process_expedientes("")
-        
-        return self._process_generic(message)
+class ExpedientesSpecialist(LocalSpecialist):
+    """Especialista en expedientes técnicos profesionales"""
+    
+    def _contexto_incluye(self, valor, info: Dict) -> Dict:
+        return {"incluye": "\n".join(f"✅ {item}" for item in info["incluye"][:4])}
     
     def _generar_cotizacion_expedientes(self) -> Dict:
         data = self.conversation_state["data"]
@@ -3096,120 +1589,161 @@ IGV (18%): S/ {igv:.2f}
 class SaneamientoSpecialist(LocalSpecialist):
     """Especialista en sistemas de agua y desagüe"""
     
-    def _process_saneamiento(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
+    def _generar_cotizacion_saneamiento(self) -> Dict:
         data = self.conversation_state["data"]
+        tipo = data["tipo_sistema"]
+        area = data["area"]
+        banos = data["banos"]
+        adicionales = data["puntos_adicionales"]
         
-        if stage == "initial":
-            return {
-                "texto": """¡Hola! 👋 Soy **PILI**, especialista en Saneamiento de **Tesla Electricidad**.
-
-🎯 Instalamos sistemas según RNE:
-✅ Agua fría y caliente
-✅ Desagüe y ventilación
-✅ Tanques y bombeo
-✅ Certificación sanitaria
-
-**¿Qué sistema necesitas?**""",
-                "botones": [
-                    {"text": "💧 Agua Fría", "value": "AGUA_FRIA"},
-                    {"text": "🔥 Agua Caliente", "value": "AGUA_CALIENTE"},
-                    {"text": "🚽 Desagüe", "value": "DESAGUE"},
-                    {"text": "🏗️ Completo", "value": "COMPLETO"}
-                ],
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/6"
-            }
+        sistemas = self.kb["sistemas"]
+        agua = sistemas["AGUA_FRIA"]["precios"]
+        caliente = sistemas["AGUA_CALIENTE"]["precios"]
+        desague = sistemas["DESAGUE"]["precios"]
+        almacenamiento = sistemas["ALMACENAMIENTO"]["precios"]
         
-        elif stage == "tipo_sistema" or (stage == "initial" and message in ["AGUA_FRIA", "AGUA_CALIENTE", "DESAGUE", "COMPLETO"]):
-            data["tipo_sistema"] = message
-            self.conversation_state["stage"] = "area"
-            
-            if message == "COMPLETO":
-                desc = "Sistema Completo (Agua + Desagüe + Tanques)"
-            else:
-                desc = self.kb["sistemas"][message]["nombre"]
-            
-            return {
-                "texto": f"""Perfecto, **{desc}**.
-
-📏 **¿Cuál es el área total en m²?**
-
-_Escribe el número (ejemplo: 150)_""",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "2/6"
-            }
+        # Promedio 3 aparatos por baño (inodoro, lavatorio, ducha)
+        puntos = banos * 3 + adicionales
+        metros_tuberia = round(area * 0.6)
         
-        elif stage == "area":
-            es_valido, area, error = self._validar_numero(message, "decimal", 0, 5000)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el área en m²",
-                    "stage": "area",
-                    "state": self.conversation_state,
-                    "progreso": "2/6"
-                }
-            
-            data["area"] = area
-            self.conversation_state["stage"] = "banos"
-            
-            return {
-                "texto": f"""✅ Área: **{area} m²**
+        items = []
+        
+        if tipo in ("AGUA_FRIA", "COMPLETO"):
+            items.append({
+                "descripcion": f"Puntos de agua fría ({puntos} und)",
+                "cantidad": puntos,
+                "precio_unitario": agua["punto_agua_fria"],
+                "total": puntos * agua["punto_agua_fria"]
+            })
+            items.append({
+                "descripcion": f"Tubería PVC 3/4\" ({metros_tuberia}m)",
+                "cantidad": metros_tuberia,
+                "precio_unitario": agua["tuberia_pvc_3_4"],
+                "total": metros_tuberia * agua["tuberia_pvc_3_4"]
+            })
+            items.append({
+                "descripcion": "Válvula compuerta 3/4\" (1 und)",
+                "cantidad": 1,
+                "precio_unitario": agua["valvula_compuerta_3_4"],
+                "total": agua["valvula_compuerta_3_4"]
+            })
+        
+        if tipo == "AGUA_CALIENTE":
+            items.append({
+                "descripcion": f"Puntos de agua caliente ({puntos} und)",
+                "cantidad": puntos,
+                "precio_unitario": caliente["punto_agua_caliente"],
+                "total": puntos * caliente["punto_agua_caliente"]
+            })
+            items.append({
+                "descripcion": f"Tubería CPVC 1/2\" ({metros_tuberia}m)",
+                "cantidad": metros_tuberia,
+                "precio_unitario": caliente["tuberia_cpvc_1_2"],
+                "total": metros_tuberia * caliente["tuberia_cpvc_1_2"]
+            })
+            terma = "terma_electrica_50lt" if banos <= 2 else "terma_electrica_80lt"
+            items.append({
+                "descripcion": f"Terma eléctrica {terma.split('_')[-1].upper()} (1 und)",
+                "cantidad": 1,
+                "precio_unitario": caliente[terma],
+                "total": caliente[terma]
+            })
+        
+        if tipo in ("DESAGUE", "COMPLETO"):
+            items.append({
+                "descripcion": f"Puntos de desagüe ({puntos} und)",
+                "cantidad": puntos,
+                "precio_unitario": desague["punto_desague"],
+                "total": puntos * desague["punto_desague"]
+            })
+            items.append({
+                "descripcion": f"Tubería PVC 4\" ({metros_tuberia}m)",
+                "cantidad": metros_tuberia,
+                "precio_unitario": desague["tuberia_pvc_4"],
+                "total": metros_tuberia * desague["tuberia_pvc_4"]
+            })
+            cajas = max(1, math.ceil(area / 100))
+            items.append({
+                "descripcion": f"Caja de registro 12x24 ({cajas} und)",
+                "cantidad": cajas,
+                "precio_unitario": desague["caja_registro_12x24"],
+                "total": cajas * desague["caja_registro_12x24"]
+            })
+        
+        if tipo == "COMPLETO":
+            tanque = "tanque_elevado_1100lt" if banos <= 3 else "tanque_elevado_2500lt"
+            items.append({
+                "descripcion": f"Tanque elevado {tanque.split('_')[-1].upper()} (1 und)",
+                "cantidad": 1,
+                "precio_unitario": almacenamiento[tanque],
+                "total": almacenamiento[tanque]
+            })
+            bomba = "bomba_agua_1_2hp" if banos <= 3 else "bomba_agua_1hp"
+            items.append({
+                "descripcion": f"Electrobomba {'1/2' if bomba.endswith('1_2hp') else '1'} HP (1 und)",
+                "cantidad": 1,
+                "precio_unitario": almacenamiento[bomba],
+                "total": almacenamiento[bomba]
+            })
+        
+        subtotal = sum(item["total"] for item in items)
+        igv = subtotal * 0.18
+        total = subtotal + igv
+        
+        nombre = "Sistema Completo" if tipo == "COMPLETO" else sistemas[tipo]["nombre"]
+        
+        texto = f"""📊 **COTIZACIÓN SANEAMIENTO**
 
-🚽 **¿Cuántos baños tiene?**
+━━━━━━━━━━━━━━━━━━━━━━━
+**📋 DATOS DEL PROYECTO:**
 
-_Escribe el número (ejemplo: 3)_""",
-                "stage": "banos",
-                "state": self.conversation_state,
-                "progreso": "3/6"
-            }
-        
-        elif stage == "banos":
-            es_valido, banos, error = self._validar_numero(message, "entero", 0, 50)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de baños",
-                    "stage": "banos",
-                    "state": self.conversation_state,
-                    "progreso": "3/6"
-                }
-            
-            data["banos"] = banos
-            self.conversation_state["stage"] = "puntos"
-            
-            return {
-                "texto": f"""✅ Baños: **{banos}**
+💧 Sistema: {nombre}
+📏 Área: {area} m²
+🚽 Baños: {banos}
+🔢 Puntos adicionales: {adicionales}
 
-🔢 **¿Cuántos puntos de agua adicionales?**
-_(Cocina, lavandería, jardín, etc.)_
+━━━━━━━━━━━━━━━━━━━━━━━
+**💰 ITEMS CALCULADOS:**
 
-_Escribe el número (ejemplo: 5)_""",
-                "stage": "puntos",
-                "state": self.conversation_state,
-                "progreso": "4/6"
-            }
+"""
+        for i, item in enumerate(items, 1):
+            texto += f"{i}. {item['descripcion']}\n   └ S/ {item['total']:.2f}\n\n"
         
-        elif stage == "puntos":
-            es_valido, puntos, error = self._validar_numero(message, "entero", 0, 100)
-            
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}\n\nPor favor ingresa el número de puntos adicionales",
-                    "stage": "puntos",
-                    "state": self.conversation_state,
-                    "progreso": "4/6"
-                }
-            
-            data["puntos_adicionales"] = puntos
-            self.conversation_state["stage"] = "quotation"
-            
-            return self._generar_cotizacion_saneamiento()
+        texto += f"""━━━━━━━━━━━━━━━━━━━━━━━
+**📈 TOTALES:**
+
+Subtotal: S/ {subtotal:.2f}
+IGV (18%): S/ {igv:.2f}
+**TOTAL: S/ {total:.2f}**
+━━━━━━━━━━━━━━━━━━━━━━━
 
+✅ Incluye: Materiales + Instalación + Prueba hidráulica
+📋 Normativa: {self.kb["normativa"]}
 
+¿Deseas generar el documento?"""
+        
+        return {
+            "texto": texto,
+            "botones": [
+                {"text": "📄 Generar Cotización", "value": "GENERAR"},
+                {"text": "🔄 Nueva consulta", "value": "RESTART"}
+            ],
+            "stage": "quotation",
+            "state": self.conversation_state,
+            "datos_generados": {
+                "proyecto": {
+                    "nombre": nombre,
+                    "area_m2": area,
+                    "banos": banos
+                },
+                "items": items,
+                "subtotal": subtotal,
+                "igv": igv,
+                "total": total
+            },
+            "progreso": "6/6"
+        }
+    
 # ══════════════════════════════════════════════════════════════════════════════
 # 🛠️ FUNCIONES AUXILIARES GLOBALES
 # ══════════════════════════════════════════════════════════════════════════════
@@ -3559,324 +2093,16 @@ EMOJIS = {
 }
 
 # Versión del sistema
-VERSION_PILI_SPECIALISTS = "2.0.0"
-FECHA_VERSION = "2025-12-26"
+VERSION_PILI_SPECIALISTS = "2.1.0"
+FECHA_VERSION = "2026-10-18"
 AUTOR = "Tesla Electricidad - PILI AI Team"
 
 # Logging configuration
 logger.info(f"PILI Local Specialists v{VERSION_PILI_SPECIALISTS} inicializado")
-logger.info(f"Servicios disponibles: {len(KNOWLEDGE_BASE)}")
+logger.info(f"Servicios disponibles: {len(servicios_configurados())}")
 logger.info(f"Fecha de versión: {FECHA_VERSION}")
 
 
-# ══════════════════════════════════════════════════════════════════════════════
-# 🔚 FIN DEL ARCHIVO
-# ══════════════════════════════════════════════════════════════════════════════
-
-
-# 
-#  FACTORY PATTERN
-# 
-
-class LocalSpecialistFactory:
-    '''Factory para crear especialistas locales segn tipo de servicio'''
-    
-    _specialists = {
-        'electricidad': ElectricidadSpecialist,
-        'itse': ITSESpecialist,
-        'pozo-tierra': PozoTierraSpecialist,
-        'contraincendios': ContraincendiosSpecialist,
-        'domotica': DomoticaSpecialist,
-        'cctv': CCTVSpecialist,
-        'redes': RedesSpecialist,
-        'automatizacion-industrial': AutomatizacionSpecialist,
-        'expedientes': ExpedientesSpecialist,
-        'saneamiento': SaneamientoSpecialist
-    }
-    
-    @classmethod
-    def create(cls, service_type: str) -> LocalSpecialist:
-        '''Crea especialista local segn tipo de servicio'''
-        specialist_class = cls._specialists.get(service_type)
-        if not specialist_class:
-            logger.warning(f'Servicio no soportado: {service_type}, usando genrico')
-            return LocalSpecialist(service_type)
-        return specialist_class(service_type)
-    
-    @classmethod
-    def get_available_services(cls) -> List[str]:
-        '''Retorna lista de servicios disponibles'''
-        return list(cls._specialists.keys())
-
-
-# 
-#  FUNCIN PRINCIPAL
-# 
-
-def process_with_local_specialist(
-    service_type: str,
-    message: str,
-    conversation_state: Optional[Dict] = None
-) -> Dict:
-    '''
-    Procesa mensaje con especialista local (FALLBACK PROFESIONAL)
-    
-    Args:
-        service_type: Tipo de servicio (electricidad, itse, etc.)
-        message: Mensaje del usuario
-        conversation_state: Estado de conversacin (opcional)
-    
-    Returns:
-        {
-            'texto': str,
-            'botones': List[Dict],
-            'stage': str,
-            'state': Dict,
-            'datos_generados': Dict,
-            'progreso': str
-        }
-    '''
-    try:
-        specialist = LocalSpecialistFactory.create(service_type)
-        response = specialist.process_message(message, conversation_state)
-        
-        logger.info(f' Procesado con especialista local: {service_type}')
-        return response
-        
-    except Exception as e:
-        logger.error(f' Error en especialista local: {e}')
-        return {
-            'texto': 'Lo siento, ocurri un error. Por favor intenta de nuevo o contacta soporte.',
-            'stage': 'error',
-            'state': conversation_state or {}
-        }
-
-
-# ══════════════════════════════════════════════════════════════════════════════
-# 📋 ITSE SPECIALIST
-# ══════════════════════════════════════════════════════════════════════════════
-
-class ITSESpecialist(LocalSpecialist):
-    """Especialista en Certificados ITSE"""
-    
-    def _process_itse(self, message: str) -> Dict:
-        stage = self.conversation_state["stage"]
-        data = self.conversation_state["data"]
-
-        # 🔥 DETECTAR CATEGORÍA PRIMERO (antes de stage=="initial")
-        message_upper = message.upper().strip()
-        if message_upper in self.kb.get("categorias", {}).keys():
-            # Usuario seleccionó categoría válida
-            data["categoria"] = message_upper
-            categoria_info = self.kb["categorias"][message_upper]
-            tipos = categoria_info.get("tipos", [])
-            botones = [{"text": t, "value": t} for t in tipos]
-
-            self.conversation_state["stage"] = "tipo_especifico"
-
-            return {
-                "texto": f"Perfecto, sector **{categoria_info['nombre']}**. ¿Qué tipo específico es?",
-                "botones": botones,
-                "stage": "tipo_especifico",
-                "state": self.conversation_state,
-                "progreso": "2/5"
-            }
-
-        # 1. ETAPA INICIAL: Mostrar Categorías
-        if stage == "initial":
-            categorias = self.kb.get("categorias", {})
-            botones = []
-
-            for key, info in categorias.items():
-                botones.append({
-                    "text": f"{info.get('icon', '')} {info.get('nombre', key)}",
-                    "value": key
-                })
-
-            return {
-                "texto": """¡Hola! 👋 Soy **Pili**, tu especialista en certificados ITSE de **Tesla Electricidad - Huancayo**.
-
-🎯 Te ayudo a obtener tu certificado ITSE con:
-✅ Visita técnica GRATUITA
-✅ Precios oficiales TUPA Huancayo
-✅ Trámite 100% gestionado
-
-Selecciona tu tipo de establecimiento:""",
-                "botones": botones,
-                "stage": "initial",
-                "state": self.conversation_state,
-                "progreso": "1/5"
-            }
-
-        # 2. TIPO ESPECÍFICO -> PREGUNTAR ÁREA
-        elif stage == "tipo_especifico":
-            # Guardar tipo específico
-            data["tipo_especifico"] = message
-
-            self.conversation_state["stage"] = "area"
-
-            return {
-                "texto": f"Entendido, es un **{message}**.\n\n¿Cuál es el área total en m²?\n_(Escribe solo el número, ej: 150)_",
-                "stage": "area",
-                "state": self.conversation_state,
-                "progreso": "3/5"
-            }
-
-        # 3. ÁREA -> PREGUNTAR PISOS
-        elif stage == "area":
-            # Validar área
-            es_valido, area, error = self._validar_numero(message, 'float', 10, 10000)
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}. Por favor ingresa un área válida (ej: 120).",
-                    "stage": "area",
-                    "state": self.conversation_state
-                }
-
-            data["area"] = area
-            self.conversation_state["stage"] = "pisos"
-
-            return {
-                "texto": f"📐 Área: **{area} m²**\n\n¿Cuántos pisos tiene el establecimiento?",
-                "stage": "pisos",
-                "state": self.conversation_state,
-                "progreso": "4/5"
-            }
-
-        # 4. PISOS -> GENERAR COTIZACIÓN
-        elif stage == "pisos":
-            # Validar pisos
-            es_valido, pisos, error = self._validar_numero(message, 'entero', 1, 50)
-            if not es_valido:
-                return {
-                    "texto": f"❌ {error}. Por favor ingresa un número de pisos válido.",
-                    "stage": "pisos",
-                    "state": self.conversation_state
-                }
-
-            data["pisos"] = pisos
-            self.conversation_state["stage"] = "quotation"
-            
-            # CALCULAR RIESGO Y PRECIO
-            riesgo, razon = self._calcular_riesgo(data)
-            cotizacion = self._calcular_cotizacion(riesgo)
-            
-            # Guardar resultados
-            data["riesgo"] = riesgo
-            data["cotizacion"] = cotizacion
-            
-            # Mapeo de riesgo a clave de precios municipales
-            riesgo_key = riesgo  # BAJO, MEDIO, ALTO, MUY_ALTO
-            precios_muni = self.kb["precios_municipales"].get(riesgo_key, {})
-            precios_tesla = self.kb["precios_tesla"].get(riesgo_key, {})
-            
-            total_min = precios_muni.get("precio", 0) + precios_tesla.get("min", 0)
-            total_max = precios_muni.get("precio", 0) + precios_tesla.get("max", 0)
-            
-            return {
-                "texto": f"""📊 **COTIZACIÓN ITSE - RIESGO {riesgo}**
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-**💰 COSTOS DESGLOSADOS:**
-
-🏛️ **Derecho Municipal (TUPA):**
-└ S/ {precios_muni.get('precio', 0):.2f} ({precios_muni.get('descripcion', '')})
-
-⚡ **Servicio Técnico TESLA:**
-└ S/ {precios_tesla.get('min', 0)} - {precios_tesla.get('max', 0)}
-└ Incluye: {precios_tesla.get('incluye', '')}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-**📈 TOTAL ESTIMADO:**
-**S/ {total_min:.2f} - {total_max:.2f}**
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-⏱️ **Tiempo:** {precios_muni.get('dias', 7)} días hábiles
-🎁 **Visita técnica:** GRATUITA
-✅ **Garantía:** 100% aprobación
-
-¿Qué deseas hacer?""",
-                "botones": [
-                    {"text": "📅 Agendar visita", "value": "AGENDAR"},
-                    {"text": "🔄 Nueva consulta", "value": "RESTART"}
-                ],
-                "stage": "completed",
-                "state": self.conversation_state,
-                "progreso": "5/5",
-                # ✅ DATOS_GENERADOS en formato tabla "Detalle de la Cotización"
-                "datos_generados": {
-                    "proyecto": {
-                        "nombre": f"Certificado ITSE - {data.get('categoria', 'COMERCIO')}",
-                        "area_m2": data.get("area", 0),
-                        "pisos": data.get("pisos", 1),
-                        "nivel_riesgo": riesgo
-                    },
-                    "items": [
-                        {
-                            "descripcion": f"Certificado ITSE - Nivel {riesgo}",
-                            "cantidad": 1,
-                            "unidad": "servicio",
-                            "precio_unitario": precios_muni.get('precio', 0)
-                        },
-                        {
-                            "descripcion": f"Servicio técnico profesional - {precios_tesla.get('incluye', 'Gestión completa')}",
-                            "cantidad": 1,
-                            "unidad": "servicio",
-                            "precio_unitario": (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2
-                        },
-                        {
-                            "descripcion": "Visita técnica gratuita",
-                            "cantidad": 1,
-                            "unidad": "servicio",
-                            "precio_unitario": 0
-                        }
-                    ],
-                    "subtotal": precios_muni.get('precio', 0) + (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2,
-                    "igv": (precios_muni.get('precio', 0) + (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2) * 0.18,
-                    "total": (precios_muni.get('precio', 0) + (precios_tesla.get('min', 0) + precios_tesla.get('max', 0)) / 2) * 1.18
-                }
-            }
-            
-        return self._process_generic(message)
-
-    def _calcular_riesgo(self, data: Dict) -> Tuple[str, str]:
-        """Calcula el riesgo basado en categoría, área y pisos"""
-        categoria = data.get("categoria", "")
-        area = float(data.get("area", 0))
-        pisos = int(data.get("pisos", 1))
-        
-        info_cat = self.kb["categorias"].get(categoria, {})
-        riesgo = info_cat.get("riesgo_default", "MEDIO")
-        razon = "Riesgo estándar para la categoría"
-        
-        # Aplicar reglas específicas (versión simplificada de la lógica completa)
-        reglas_texto = info_cat.get("reglas", "")
-        
-        # Lógica hardcodeada crítica para asegurar precisión
-        if categoria == "SALUD":
-            if area > 500 or pisos >= 2:
-                return "MUY_ALTO", "Salud > 500m2 o 2+ pisos"
-            return "ALTO", "Establecimiento de Salud"
-            
-        elif categoria == "EDUCACION":
-            if area > 1000 or pisos >= 3:
-                return "ALTO", "Educación > 1000m2 o 3+ pisos"
-            return "MEDIO", "Centro educativo estándar"
-            
-        elif categoria == "COMERCIO":
-            if area > 500:
-                return "ALTO", "Comercio > 500m2"
-            return "MEDIO", "Comercio estándar"
-            
-        elif categoria == "INDUSTRIAL":
-            return "ALTO", "Industrial siempre es alto riesgo mínimo"
-            
-        return riesgo, razon
-
-    def _calcular_cotizacion(self, riesgo: str) -> Dict:
-        """Retorna estructura de cotización dummy"""
-        return {"riesgo": riesgo}
-
 # ══════════════════════════════════════════════════════════════════════════════
 # 🏭 FACTORY PATTERN
 # ══════════════════════════════════════════════════════════════════════════════
@@ -3897,14 +2123,25 @@ class LocalSpecialistFactory:
         "saneamiento": SaneamientoSpecialist
     }
     
+    # Una instancia por servicio: el estado viaja en cada mensaje
+    _instancias: Dict[str, LocalSpecialist] = {}
+    _lock = threading.Lock()
+
     @classmethod
     def create(cls, service_type: str) -> LocalSpecialist:
-        """Crea especialista local segun tipo de servicio"""
+        """Especialista local del servicio (reutilizado entre requests)"""
         specialist_class = cls._specialists.get(service_type)
         if not specialist_class:
             logger.warning(f"Servicio no soportado: {service_type}, usando generico")
             return LocalSpecialist(service_type)
-        return specialist_class(service_type)
+
+        especialista = cls._instancias.get(service_type)
+        if especialista is None:
+            with cls._lock:
+                especialista = cls._instancias.get(service_type)
+                if especialista is None:
+                    especialista = cls._instancias[service_type] = specialist_class(service_type)
+        return especialista
     
     @classmethod
     def get_available_services(cls) -> List[str]:
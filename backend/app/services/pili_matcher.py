@@ -0,0 +1,273 @@
+"""
+🔎 PILI MATCHER - Detección de servicio y extracción de datos en una pasada
+📁 RUTA: backend/app/services/pili_matcher.py
+
+Antes `detectar_servicio` recorría cada servicio y cada keyword con `in`
+(una búsqueda por keyword) y `extraer_datos` ejecutaba ~15 `re.search`,
+cada uno con su propio `mensaje.lower()`.
+
+Ahora todo se compila una vez al iniciar:
+- Keywords (servicios, tipo de instalación, indicadores de complejidad):
+  un trie convertido en UNA expresión regular. El motor de `re` recorre
+  el texto una sola vez y en cada posición sigue solo la rama del trie que
+  coincide, como un autómata Aho-Corasick, así que el costo casi no crece
+  con el número de keywords
+- Área, pisos, cantidad y potencia: una regex combinada con grupos con
+  nombre (un grupo por patrón, respetando la prioridad original)
+
+La semántica es la misma que la implementación lineal: coincidencia por
+subcadena (sin límites de palabra), +10 por keyword encontrada y, por
+campo, gana el primer patrón de la lista que aparezca en el mensaje.
+"""
+
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+PUNTOS_POR_KEYWORD = 10
+SERVICIO_POR_DEFECTO = "electrico-residencial"
+
+# Patrones por campo, en orden de prioridad (el primero que aparezca gana)
+PATRONES_AREA = [
+    r'(\d+\.?\d*)\s*m[2²]',
+    r'(\d+\.?\d*)\s*metros?\s*cuadrados?',
+    r'área\s*de\s*(\d+\.?\d*)',
+    r'(\d+\.?\d*)\s*m\s*cuadrados?'
+]
+PATRONES_PISOS = [
+    r'(\d+)\s*pisos?',
+    r'(\d+)\s*niveles?',
+    r'(\d+)\s*plantas?'
+]
+PATRONES_CANTIDAD = [
+    r'(\d+)\s*puntos?',
+    r'(\d+)\s*tomacorrientes?',
+    r'(\d+)\s*luces?',
+    r'(\d+)\s*detectores?',
+    r'(\d+)\s*cámaras?'
+]
+PATRONES_POTENCIA = [
+    r'(\d+\.?\d*)\s*hp',
+    r'(\d+\.?\d*)\s*kw',
+    r'(\d+\.?\d*)\s*kilovatios?'
+]
+
+# Tipo de instalación: el primer grupo con alguna palabra presente gana
+TIPOS_INSTALACION = [
+    ("nueva", ["nueva", "nuevo", "desde cero"]),
+    ("remodelacion", ["remodelación", "actualización", "mejora"]),
+    ("ampliacion", ["ampliación", "expansión"])
+]
+
+INDICADORES_COMPLEJO = [
+    "complejo", "grande", "múltiple", "varios", "avanzado",
+    "industrial", "pmi", "gantt", "cronograma detallado",
+    "análisis", "ejecutivo", "apa"
+]
+
+AREA_COMPLEJO_M2 = 300
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🌳 AUTÓMATA DE KEYWORDS
+# ═══════════════════════════════════════════════════════════════
+
+_FIN = ""  # marca de fin de palabra en el trie (ninguna arista es vacía)
+
+
+def _construir_trie(palabras: Iterable[str]) -> dict:
+    trie: dict = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[_FIN] = palabra
+    return trie
+
+
+def _patron_trie(nodo: dict) -> str:
+    """
+    Regex equivalente al trie. Las ramas empiezan con caracteres distintos
+    y el opcional es codicioso, así que en cada posición coincide la
+    keyword MÁS LARGA que empieza ahí.
+    """
+    ramas = [
+        re.escape(caracter) + _patron_trie(hijo)
+        for caracter, hijo in sorted(nodo.items())
+        if caracter != _FIN
+    ]
+    if not ramas:
+        return ""
+    cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+    if _FIN in nodo:
+        return f"(?:{cuerpo})?"
+    return cuerpo
+
+
+class AutomataKeywords:
+    """Conjunto de keywords compilado para buscarlas todas en una pasada"""
+
+    def __init__(self, palabras: Iterable[str]):
+        self.palabras = tuple(dict.fromkeys(p for p in palabras if p))
+        trie = _construir_trie(self.palabras)
+
+        # Keywords que son prefijo de otra coinciden en la misma posición
+        # que la más larga: se precalculan para no perderlas
+        self._prefijos: Dict[str, Tuple[str, ...]] = {}
+        for palabra in self.palabras:
+            nodo, encontradas = trie, []
+            for caracter in palabra:
+                nodo = nodo[caracter]
+                if _FIN in nodo:
+                    encontradas.append(nodo[_FIN])
+            self._prefijos[palabra] = tuple(encontradas)
+
+        # Lookahead: coincidencias solapadas ("incendio" dentro de
+        # "contraincendios") se detectan igual que con `in`
+        patron = _patron_trie(trie) if self.palabras else "(?!)"
+        self._regex = re.compile(f"(?=({patron}))")
+
+    def encontrar(self, texto: str) -> Set[str]:
+        """Keywords contenidas en `texto` (como subcadena)"""
+        encontradas: Set[str] = set()
+        for coincidencia in self._regex.finditer(texto):
+            encontradas.update(self._prefijos[coincidencia.group(1)])
+        return encontradas
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📐 REGEX COMBINADA DE DATOS NUMÉRICOS
+# ═══════════════════════════════════════════════════════════════
+
+_CAMPOS_NUMERICOS = [
+    ("area_m2", PATRONES_AREA, float),
+    ("num_pisos", PATRONES_PISOS, int),
+    ("cantidad_puntos", PATRONES_CANTIDAD, int),
+    ("potencia_hp", PATRONES_POTENCIA, float)
+]
+
+
+def _compilar_datos() -> Tuple["re.Pattern", Dict[str, Tuple[str, int]]]:
+    """
+    Une todos los patrones en una alternativa dentro de un lookahead.
+    Cada patrón captura su número en un grupo con nombre `<campo>__<i>`.
+
+    Las unidades (m2, pisos, hp...) no son prefijo unas de otras, así que
+    en una misma posición coincide a lo sumo un patrón y recorrer todas las
+    posiciones da exactamente las coincidencias de cada `re.search`.
+    """
+    alternativas = []
+    grupos: Dict[str, Tuple[str, int]] = {}
+    for campo, patrones, _ in _CAMPOS_NUMERICOS:
+        for prioridad, patron in enumerate(patrones):
+            nombre = f"{campo}__{prioridad}"
+            alternativas.append(patron.replace("(", f"(?P<{nombre}>", 1))
+            grupos[nombre] = (campo, prioridad)
+    # Todos los patrones empiezan con un dígito o con "área": el primer
+    # lookahead descarta el resto de posiciones sin probar las alternativas
+    return re.compile(r"(?=[\dá])(?=" + "|".join(alternativas) + ")"), grupos
+
+
+_REGEX_DATOS, _GRUPOS_DATOS = _compilar_datos()
+_CONVERSORES = {campo: conversor for campo, _, conversor in _CAMPOS_NUMERICOS}
+
+
+def extraer_numeros(texto: str) -> Dict[str, Optional[float]]:
+    """
+    Área, pisos, cantidad y potencia de `texto` (ya en minúsculas) en una
+    pasada. Por campo gana el patrón de mayor prioridad; entre
+    coincidencias del mismo patrón, la primera del texto.
+    """
+    mejores: Dict[str, Tuple[int, str]] = {}
+    for coincidencia in _REGEX_DATOS.finditer(texto):
+        campo, prioridad = _GRUPOS_DATOS[coincidencia.lastgroup]
+        actual = mejores.get(campo)
+        if actual is None or prioridad < actual[0]:
+            mejores[campo] = (prioridad, coincidencia.group(coincidencia.lastgroup))
+
+    return {
+        campo: _CONVERSORES[campo](mejores[campo][1]) if campo in mejores else None
+        for campo in _CONVERSORES
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔎 MATCHER COMPLETO
+# ═══════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class AnalisisMensaje:
+    """Resultado de analizar un mensaje (servicio + datos técnicos)"""
+    servicio: str
+    score: int
+    area_m2: Optional[float]
+    num_pisos: int
+    cantidad_puntos: Optional[int]
+    potencia_hp: Optional[float]
+    tipo_instalacion: str
+    indicador_complejo: bool
+
+    @property
+    def complejidad(self) -> str:
+        if self.indicador_complejo:
+            return "complejo"
+        if self.area_m2 and self.area_m2 > AREA_COMPLEJO_M2:
+            return "complejo"
+        return "simple"
+
+
+class MatcherPILI:
+    """Detección de servicio y extracción de datos precompiladas"""
+
+    def __init__(self, servicios: Mapping[str, Mapping]):
+        self.orden_servicios = list(servicios)
+
+        # keyword -> [(servicio, veces)]; una keyword repetida en la lista
+        # de un servicio suma cada vez, como en el recorrido lineal
+        self._pesos: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for codigo, info in servicios.items():
+            for keyword, veces in Counter(info.get("keywords", [])).items():
+                self._pesos[keyword].append((codigo, veces))
+
+        self._tipos: Dict[str, int] = {}
+        for indice, (_, palabras) in enumerate(TIPOS_INSTALACION):
+            for palabra in palabras:
+                self._tipos.setdefault(palabra, indice)
+        self._indicadores = frozenset(INDICADORES_COMPLEJO)
+
+        self.automata = AutomataKeywords(
+            list(self._pesos) + list(self._tipos) + INDICADORES_COMPLEJO
+        )
+
+    def _puntuar(self, encontradas: Set[str]) -> Dict[str, int]:
+        scores = dict.fromkeys(self.orden_servicios, 0)
+        for keyword in encontradas:
+            for codigo, veces in self._pesos.get(keyword, ()):
+                scores[codigo] += PUNTOS_POR_KEYWORD * veces
+        return scores
+
+    def analizar(self, mensaje: str) -> AnalisisMensaje:
+        texto = mensaje.lower()
+        encontradas = self.automata.encontrar(texto)
+
+        scores = self._puntuar(encontradas)
+        # max() conserva el primero en orden de definición ante empates
+        servicio = max(scores, key=scores.get)
+        if scores[servicio] <= 0:
+            servicio = SERVICIO_POR_DEFECTO
+
+        indices_tipo = [self._tipos[p] for p in encontradas if p in self._tipos]
+        tipo = TIPOS_INSTALACION[min(indices_tipo)][0] if indices_tipo else "nueva"
+
+        numeros = extraer_numeros(texto)
+        return AnalisisMensaje(
+            servicio=servicio,
+            score=scores[servicio],
+            area_m2=numeros["area_m2"],
+            num_pisos=1 if numeros["num_pisos"] is None else numeros["num_pisos"],
+            cantidad_puntos=numeros["cantidad_puntos"],
+            potencia_hp=numeros["potencia_hp"],
+            tipo_instalacion=tipo,
+            indicador_complejo=not self._indicadores.isdisjoint(encontradas)
+        )
@@ -10,11 +10,28 @@ Este modulo contiene todos los componentes de clase mundial para:
 - Generacion de documentos APA/PMI
 """
 
-from .processors.file_processor_pro import FileProcessorPro
-from .rag.rag_engine import RAGEngine
-from .ml.ml_engine import MLEngine
-from .charts.chart_engine import ChartEngine
-from .generators.document_generator_pro import DocumentGeneratorPro
+import importlib
+
+# Cada componente se importa la primera vez que se pide: importar un
+# submodulo (ej. ml.ml_engine desde scripts/train_ml_models.py) no carga
+# RAG, graficas ni generadores.
+_COMPONENTES = {
+    'FileProcessorPro': '.processors.file_processor_pro',
+    'RAGEngine': '.rag.rag_engine',
+    'MLEngine': '.ml.ml_engine',
+    'ChartEngine': '.charts.chart_engine',
+    'DocumentGeneratorPro': '.generators.document_generator_pro',
+}
+
+
+def __getattr__(nombre: str):
+    modulo = _COMPONENTES.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(modulo, __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
 
 __all__ = [
     'FileProcessorPro',
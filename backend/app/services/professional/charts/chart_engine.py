@@ -10,13 +10,25 @@ Tipos de graficas:
 - Heatmaps (matrices de riesgo)
 - KPI Dashboards
 - Flujo de caja
+
+Los renders se cachean por contenido (render_cache.py): regenerar un
+documento con los mismos datos no vuelve a pasar por Kaleido, y las
+graficas nuevas de un documento se renderizan en paralelo en un pool
+persistente de procesos.
 """
 
 import os
+import json
 import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Union
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from .render_cache import ChartRenderCache, figure_key
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +55,36 @@ try:
 except ImportError:
     PANDAS_AVAILABLE = False
 
+# Opciones de exportacion (forman parte de la clave de cache)
+RENDER_OPTIONS = {"width": 800, "height": 600, "scale": 2}
+
+
+def _render_figure_bytes(fig, fmt: str) -> bytes:
+    """PNG via Kaleido, o HTML si Kaleido no esta disponible"""
+    if fmt == "html":
+        return fig.to_html().encode("utf-8")
+    return fig.to_image(format=fmt, **RENDER_OPTIONS)
+
+
+def _render_spec(spec: str, fmt: str) -> bytes:
+    """Render en este proceso a partir del JSON de la figura"""
+    import plotly.io as pio
+    return _render_figure_bytes(pio.from_json(spec), fmt)
+
+
+def _render_pool_initializer():
+    """
+    (inicializador, args) para los procesos de render. Son funciones de
+    plotly/kaleido, no de este paquete: el worker no importa la app.
+    Kaleido >= 1.0 deja Chromium arrancado con start_sync_server; con
+    versiones anteriores un primer render lo deja vivo para el proceso.
+    """
+    start_sync_server = getattr(kaleido, "start_sync_server", None)
+    if start_sync_server is not None:
+        return start_sync_server, ()
+    import plotly.io as pio
+    return pio.to_image, ({"data": [], "layout": {}}, "png", 10, 10)
+
 
 class ChartEngine:
     """
@@ -52,16 +94,47 @@ class ChartEngine:
     exportarse a PNG/PDF para embeber en documentos Word.
     """
 
-    def __init__(self, output_dir: str = None):
+    def __init__(
+        self,
+        output_dir: str = None,
+        cache_memory_mb: int = 64,
+        cache_disk_mb: int = 512,
+        render_workers: int = None,
+        document_cache_size: int = 128
+    ):
         """
         Inicializa el motor de graficas.
 
         Args:
             output_dir: Directorio para guardar imagenes
+            cache_memory_mb: Limite de la cache de renders en memoria
+            cache_disk_mb: Limite de la cache de renders en disco
+            render_workers: Procesos Kaleido para renders en paralelo
+            document_cache_size: Juegos de graficas por documento recordados
         """
         self.output_dir = Path(output_dir) if output_dir else Path("backend/storage/temp/charts")
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
+        # Renders direccionados por contenido (misma figura => mismo archivo)
+        self.render_cache = ChartRenderCache(
+            max_memory_bytes=cache_memory_mb * 1024 * 1024,
+            directory=self.output_dir / "cache",
+            max_disk_bytes=cache_disk_mb * 1024 * 1024
+        )
+
+        # Pool persistente de procesos Kaleido (se crea en el primer uso)
+        self.render_workers = render_workers or min(4, os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+        # Renders diferidos mientras create_charts_for_document arma figuras
+        self._local = threading.local()
+
+        # (tipo, datos, fecha) -> graficas ya generadas
+        self._document_charts: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+        self._document_lock = threading.Lock()
+        self.document_cache_size = document_cache_size
+
         # Colores corporativos Tesla
         self.colors = {
             "primary": "#D4AF37",      # Dorado
@@ -143,7 +216,7 @@ class ChartEngine:
             font=dict(family="Arial", size=12)
         )
 
-        return self._save_figure(fig, f"bar_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "bar")
 
     def create_grouped_bar_chart(
         self,
@@ -182,7 +255,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"grouped_bar_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "grouped_bar")
 
     # =========================================================================
     # GRAFICAS DE LINEAS
@@ -229,7 +302,7 @@ class ChartEngine:
             hovermode='x unified'
         )
 
-        return self._save_figure(fig, f"line_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "line")
 
     def create_projection_chart(
         self,
@@ -276,7 +349,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"projection_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "projection")
 
     # =========================================================================
     # GRAFICAS CIRCULARES
@@ -318,7 +391,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"pie_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "pie")
 
     # =========================================================================
     # DIAGRAMA GANTT
@@ -373,7 +446,7 @@ class ChartEngine:
             yaxis_title="Fase/Tarea"
         )
 
-        return self._save_figure(fig, f"gantt_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "gantt")
 
     # =========================================================================
     # HEATMAP / MATRIZ DE RIESGOS
@@ -436,7 +509,7 @@ class ChartEngine:
             template="plotly_white"
         )
 
-        return self._save_figure(fig, f"risk_matrix_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "risk_matrix")
 
     # =========================================================================
     # KPI DASHBOARD
@@ -510,7 +583,7 @@ class ChartEngine:
             height=300 * rows
         )
 
-        return self._save_figure(fig, f"kpi_dashboard_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "kpi_dashboard")
 
     # =========================================================================
     # FLUJO DE CAJA
@@ -579,31 +652,160 @@ class ChartEngine:
         fig.update_yaxes(title_text="Flujo de Caja", secondary_y=False)
         fig.update_yaxes(title_text="Acumulado", secondary_y=True)
 
-        return self._save_figure(fig, f"cashflow_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        return self._save_figure(fig, "cashflow")
 
     # =========================================================================
     # METODOS AUXILIARES
     # =========================================================================
 
-    def _save_figure(self, fig, filename: str) -> Optional[str]:
-        """Guarda figura como PNG"""
+    @staticmethod
+    def _output_format() -> str:
+        return "png" if KALEIDO_AVAILABLE else "html"
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                initializer, initargs = _render_pool_initializer()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.render_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=initializer,
+                    initargs=initargs
+                )
+            return self._pool
+
+    def shutdown(self):
+        """Detiene el pool de procesos de render"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _render_jobs(self, jobs: Dict[str, tuple]) -> Dict[str, Optional[bytes]]:
+        """
+        Renderiza {clave: (spec_json, formato)}; en paralelo si hay varias.
+
+        Returns:
+            {clave: bytes o None si fallo}
+        """
+        results: Dict[str, Optional[bytes]] = {}
+        if not jobs:
+            return results
+
+        futures = {}
+        if KALEIDO_AVAILABLE and len(jobs) > 1 and self.render_workers > 1:
+            import plotly.io as pio
+            pool = self._get_pool()
+            futures = {
+                key: pool.submit(pio.to_image, json.loads(spec), format=fmt, **RENDER_OPTIONS)
+                for key, (spec, fmt) in jobs.items()
+            }
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    logger.error(f"Error renderizando grafica: {e}")
+                    results[key] = None
+        else:
+            for key, (spec, fmt) in jobs.items():
+                try:
+                    results[key] = _render_spec(spec, fmt)
+                except Exception as e:
+                    logger.error(f"Error renderizando grafica: {e}")
+                    results[key] = None
+
+        for key, data in results.items():
+            if data is not None:
+                self.render_cache.put(key, jobs[key][1], data)
+        return results
+
+    def render_figure(self, fig) -> Optional[bytes]:
+        """
+        Renderiza una figura y retorna los bytes (PNG, o HTML sin Kaleido).
+
+        Usa la cache: una figura identica no se vuelve a renderizar.
+        """
         try:
-            filepath = self.output_dir / f"{filename}.png"
+            fmt = self._output_format()
+            key = figure_key(fig.to_json(), format=fmt, **RENDER_OPTIONS)
+            data = self.render_cache.get(key, fmt)
+            if data is None:
+                data = _render_figure_bytes(fig, fmt)
+                self.render_cache.put(key, fmt, data)
+            return data
+        except Exception as e:
+            logger.error(f"Error renderizando grafica: {e}")
+            return None
+
+    def render_figures(self, figures: Dict[str, Any]) -> Dict[str, Optional[bytes]]:
+        """
+        Renderiza varias figuras independientes en paralelo.
 
-            if KALEIDO_AVAILABLE:
-                fig.write_image(str(filepath), width=800, height=600, scale=2)
+        Args:
+            figures: {nombre: figura Plotly}
+
+        Returns:
+            {nombre: bytes o None si fallo}
+        """
+        fmt = self._output_format()
+        keys = {}
+        cached: Dict[str, bytes] = {}
+        jobs: Dict[str, tuple] = {}
+
+        for name, fig in figures.items():
+            spec = fig.to_json()
+            key = figure_key(spec, format=fmt, **RENDER_OPTIONS)
+            keys[name] = key
+            data = self.render_cache.get(key, fmt)
+            if data is not None:
+                cached[key] = data
             else:
-                # Fallback: guardar como HTML
-                filepath = self.output_dir / f"{filename}.html"
-                fig.write_html(str(filepath))
+                jobs[key] = (spec, fmt)
+
+        rendered = self._render_jobs(jobs)
+        return {name: cached.get(key, rendered.get(key)) for name, key in keys.items()}
+
+    def _save_figure(self, fig, prefix: str) -> Optional[str]:
+        """
+        Guarda figura como PNG y retorna su ruta.
+
+        El archivo se nombra por el hash de la figura: si ya se genero, se
+        reutiliza sin renderizar. Dentro de create_charts_for_document el
+        render se difiere para hacerlo en paralelo.
+        """
+        try:
+            fmt = self._output_format()
+            spec = fig.to_json()
+            key = figure_key(spec, format=fmt, **RENDER_OPTIONS)
 
-            logger.info(f"Grafica guardada: {filepath}")
+            filepath = self.render_cache.ensure_file(key, fmt)
+            if filepath is not None:
+                logger.info(f"Grafica {prefix} reutilizada de cache: {filepath.name}")
+                return str(filepath)
+
+            pending = getattr(self._local, "pending", None)
+            if pending is not None:
+                pending[key] = (spec, fmt)
+                return str(self.render_cache.path(key, fmt))
+
+            if self._render_jobs({key: (spec, fmt)}).get(key) is None:
+                return None
+
+            filepath = self.render_cache.path(key, fmt)
+            logger.info(f"Grafica {prefix} guardada: {filepath}")
             return str(filepath)
 
         except Exception as e:
             logger.error(f"Error guardando grafica: {e}")
             return None
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            **self.render_cache.get_stats(),
+            "documentos_en_cache": len(self._document_charts),
+            "render_workers": self.render_workers
+        }
+
     def create_charts_for_document(
         self,
         document_type: str,
@@ -619,6 +821,47 @@ class ChartEngine:
         Returns:
             Dict con rutas a las graficas generadas
         """
+        # Mismos datos (y mismo dia: el Gantt parte de hoy) => mismas graficas
+        doc_key = figure_key(
+            json.dumps(data, sort_keys=True, default=str),
+            document_type=document_type,
+            dia=date.today().isoformat()
+        )
+        with self._document_lock:
+            previous = self._document_charts.get(doc_key)
+            if previous is not None:
+                self._document_charts.move_to_end(doc_key)
+        if previous is not None and all(path is None or Path(path).exists() for path in previous.values()):
+            logger.info(f"Graficas de {document_type} sin cambios, reutilizadas")
+            return dict(previous)
+
+        # Armar figuras primero; renderizar las nuevas juntas al final
+        self._local.pending = {}
+        try:
+            charts = self._build_document_charts(document_type, data)
+        finally:
+            pending, self._local.pending = self._local.pending, None
+
+        failed = {key for key, result in self._render_jobs(pending).items() if result is None}
+        if failed:
+            charts = {
+                name: None if path and Path(path).stem in failed else path
+                for name, path in charts.items()
+            }
+
+        with self._document_lock:
+            self._document_charts[doc_key] = dict(charts)
+            while len(self._document_charts) > self.document_cache_size:
+                self._document_charts.popitem(last=False)
+
+        return charts
+
+    def _build_document_charts(
+        self,
+        document_type: str,
+        data: Dict[str, Any]
+    ) -> Dict[str, Optional[str]]:
+        """Graficas segun el tipo de documento (rutas)"""
         charts = {}
 
         if document_type == "proyecto":
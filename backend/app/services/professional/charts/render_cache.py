@@ -0,0 +1,208 @@
+"""
+CACHE DE RENDERS DE GRAFICAS
+Imagenes direccionadas por contenido: la clave es el hash de la
+especificacion de la figura (JSON de Plotly) y de las opciones de render.
+Misma figura => misma clave => no se vuelve a renderizar.
+
+Dos niveles:
+- Memoria: LRU acotado por bytes
+- Disco (opcional): `<clave>.<ext>` en un directorio, acotado por bytes,
+  se elimina lo usado hace mas tiempo (mtime se actualiza en cada acierto)
+
+El nivel de disco se comparte entre workers del mismo host.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def figure_key(spec: str, **options: Any) -> str:
+    """Clave sha256 de la especificacion de la figura + opciones de render"""
+    digest = hashlib.sha256(spec.encode("utf-8"))
+    for name in sorted(options):
+        digest.update(f"|{name}={options[name]}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ChartRenderCache:
+    """Cache thread-safe clave -> bytes de imagen"""
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        directory: Optional[Path] = None,
+        max_disk_bytes: int = 512 * 1024 * 1024
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None  # se calcula en la primera escritura
+        self._lock = threading.Lock()
+        self.metricas = {"aciertos_memoria": 0, "aciertos_disco": 0, "fallos": 0, "desalojos": 0}
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def path(self, key: str, ext: str) -> Optional[Path]:
+        """Ruta del archivo en el nivel de disco (exista o no)"""
+        return self.directory / f"{key}.{ext}" if self.directory else None
+
+    def get(self, key: str, ext: str) -> Optional[bytes]:
+        mem_key = f"{key}.{ext}"
+        with self._lock:
+            data = self._memory.get(mem_key)
+            if data is not None:
+                self._memory.move_to_end(mem_key)
+                self.metricas["aciertos_memoria"] += 1
+                return data
+
+        path = self.path(key, ext)
+        if path is not None:
+            try:
+                data = path.read_bytes()
+            except OSError:
+                data = None
+            if data is not None:
+                self._touch(path)
+                with self._lock:
+                    self.metricas["aciertos_disco"] += 1
+                    self._remember(mem_key, data)
+                return data
+
+        with self._lock:
+            self.metricas["fallos"] += 1
+        return None
+
+    def ensure_file(self, key: str, ext: str) -> Optional[Path]:
+        """
+        Ruta en disco si la imagen ya esta cacheada (sin leerla).
+        Si solo esta en memoria, la escribe.
+        """
+        path = self.path(key, ext)
+        if path is None:
+            return None
+        if path.exists():
+            self._touch(path)
+            return path
+        with self._lock:
+            data = self._memory.get(f"{key}.{ext}")
+        if data is None:
+            return None
+        self._write_disk(path, data)
+        return path
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def put(self, key: str, ext: str, data: bytes) -> Optional[Path]:
+        """Guarda en memoria y disco; retorna la ruta en disco si hay nivel de disco"""
+        with self._lock:
+            self._remember(f"{key}.{ext}", data)
+
+        path = self.path(key, ext)
+        if path is not None:
+            self._write_disk(path, data)
+        return path
+
+    def _remember(self, mem_key: str, data: bytes):
+        """Inserta en el LRU de memoria (llamar con el lock tomado)"""
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(mem_key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[mem_key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.metricas["desalojos"] += 1
+
+    def _write_disk(self, path: Path, data: bytes):
+        tmp = path.with_suffix(f"{path.suffix}.tmp{os.getpid()}.{threading.get_ident()}")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir {path.name} en cache: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(data)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict_disk()
+
+    @staticmethod
+    def _touch(path: Path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and ".tmp" not in entry.name:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_disk_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict_disk(self):
+        """Elimina los archivos menos usados hasta bajar al 90% del limite"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.metricas["desalojos"] += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.directory:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.metricas,
+                "entradas_memoria": len(self._memory),
+                "bytes_memoria": self._memory_bytes,
+                "bytes_disco": self._disk_bytes,
+                "directorio": str(self.directory) if self.directory else None
+            }
@@ -69,6 +69,17 @@ class DocumentGeneratorPro:
         self.ml_engine = get_ml_engine() if COMPONENTS_AVAILABLE else None
         self.chart_engine = get_chart_engine() if COMPONENTS_AVAILABLE else None
 
+        # Clasificador y spaCy se cargan en segundo plano
+        if self.ml_engine:
+            self.ml_engine.warm_up(background=True)
+
+        # Chunks medidos con el tokenizer del modelo de embeddings
+        if self.file_processor and self.rag_engine and self.rag_engine.model is not None:
+            self.file_processor.set_tokenizer(
+                getattr(self.rag_engine.model, "tokenizer", None),
+                getattr(self.rag_engine.model, "max_seq_length", None)
+            )
+
         # Generadores modulares (prioridad) o fallback al WordGenerator antiguo
         self.generadores_modulares = GENERADORES_AVAILABLE
         self.word_generator = get_word_generator() if WORD_GENERATOR_AVAILABLE else None
@@ -150,14 +161,14 @@ class DocumentGeneratorPro:
 
                 # Indexar en RAG
                 if context_from_files and self.rag_engine and self.rag_engine.is_available():
-                    chunks = self.file_processor.chunk_text(context_from_files, chunk_size=300)
+                    chunks = self.file_processor.iter_chunks(context_from_files)
                     rag_result = self.rag_engine.add_chunks(
                         chunks,
                         metadata={"source": "user_upload", "document_type": document_type}
                     )
                     result["processing_steps"].append({
                         "step": "rag_indexing",
-                        "chunks_indexed": len(chunks),
+                        "chunks_indexed": rag_result.get("chunks_added", 0),
                         "success": rag_result.get("success", False)
                     })
 
@@ -590,8 +601,8 @@ class DocumentGeneratorPro:
         if result.get("success") and self.rag_engine:
             text = result.get("combined_text", "")
             if text:
-                chunks = self.file_processor.chunk_text(text)
-                rag_result = self.rag_engine.add_chunks(
+                chunks = self.file_processor.iter_chunks(text)
+                rag_result = self.rag_engine.add_chunks_background(
                     chunks,
                     metadata={"source": "batch_upload"}
                 )
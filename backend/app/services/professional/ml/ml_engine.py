@@ -11,35 +11,90 @@ Componentes:
 
 import re
 import logging
+import threading
+from importlib import util as importlib_util
+from importlib import metadata as importlib_metadata
 from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 import json
 
+from .model_store import ModelStore, training_hash
+
 logger = logging.getLogger(__name__)
 
-# Imports condicionales
-try:
-    import spacy
-    SPACY_AVAILABLE = True
-except ImportError:
-    SPACY_AVAILABLE = False
+# Disponibilidad sin importar: spaCy y sklearn se cargan en el primer uso
+# (o en el precalentamiento), no al importar este modulo
+SPACY_AVAILABLE = importlib_util.find_spec("spacy") is not None
+if not SPACY_AVAILABLE:
     logger.warning("spaCy no disponible - pip install spacy")
 
-try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.naive_bayes import MultinomialNB
-    from sklearn.pipeline import Pipeline
-    import joblib
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+SKLEARN_AVAILABLE = (
+    importlib_util.find_spec("sklearn") is not None
+    and importlib_util.find_spec("joblib") is not None
+)
+if not SKLEARN_AVAILABLE:
     logger.warning("sklearn no disponible - pip install scikit-learn")
 
-try:
-    import numpy as np
-    NUMPY_AVAILABLE = True
-except ImportError:
-    NUMPY_AVAILABLE = False
+NUMPY_AVAILABLE = importlib_util.find_spec("numpy") is not None
+
+# backend/ml_models, independiente del directorio de trabajo
+DEFAULT_MODELS_DIR = Path(__file__).resolve().parents[4] / "ml_models"
+
+CLASSIFIER_NAME = "service_classifier"
+
+# Hiperparametros del clasificador (forman parte del hash del artefacto)
+CLASSIFIER_PARAMS = {
+    "tfidf": {"ngram_range": [1, 2], "max_features": 1000},
+    "nb": {"alpha": 0.1}
+}
+
+
+# Patrones regex de entidades (sobre texto en minusculas)
+ENTITY_PATTERNS = {
+    "area": [
+        r"(\d+(?:\.\d+)?)\s*(?:m2|metros cuadrados|m²)",
+        r"area\s*(?:de)?\s*(\d+(?:\.\d+)?)",
+        r"(\d+(?:\.\d+)?)\s*metros"
+    ],
+    "cantidad": [
+        r"(\d+)\s*(?:puntos|circuitos|tomacorrientes|luminarias)",
+        r"cantidad\s*(?:de)?\s*(\d+)",
+        r"(\d+)\s*unidades"
+    ],
+    "precio": [
+        r"(?:S/\.?|PEN|soles?)\s*(\d+(?:,\d{3})*(?:\.\d{2})?)",
+        r"(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:soles?|S/\.?)",
+        r"\$\s*(\d+(?:,\d{3})*(?:\.\d{2})?)"
+    ],
+    "pisos": [
+        r"(\d+)\s*(?:pisos?|niveles?|plantas?)",
+        r"(?:edificio|casa)\s*(?:de)?\s*(\d+)\s*pisos?"
+    ],
+    "potencia": [
+        r"(\d+(?:\.\d+)?)\s*(?:kw|kilowatts?|kva)",
+        r"potencia\s*(?:de)?\s*(\d+(?:\.\d+)?)"
+    ]
+}
+
+# Compilados una vez por proceso y compartidos por todas las instancias
+ENTITY_REGEXES: Dict[str, List["re.Pattern"]] = {
+    entity_type: [re.compile(pattern) for pattern in patterns]
+    for entity_type, patterns in ENTITY_PATTERNS.items()
+}
+
+# Tipo de entidad -> (clave en el resultado, conversion)
+_ENTITY_FIELDS = {
+    "area": ("areas", float),
+    "cantidad": ("cantidades", lambda v: int(float(v))),
+    "precio": ("precios", float),
+    "pisos": ("pisos", lambda v: int(float(v))),
+    "potencia": ("potencias", float)
+}
+
+# Componentes spaCy que el NER no necesita (se omiten en nlp.pipe)
+_SPACY_UNUSED_PIPES = ("tagger", "parser", "morphologizer", "attribute_ruler", "lemmatizer", "senter")
+
+DEFAULT_BATCH_SIZE = 256
 
 
 class MLEngine:
@@ -60,68 +115,139 @@ class MLEngine:
         Args:
             models_dir: Directorio para modelos entrenados
         """
-        self.models_dir = Path(models_dir) if models_dir else Path("backend/ml_models")
-        self.models_dir.mkdir(parents=True, exist_ok=True)
-
-        self.nlp = None
-        self.classifier = None
+        self.models_dir = Path(models_dir) if models_dir else DEFAULT_MODELS_DIR
+        self.model_store = ModelStore(self.models_dir)
+
+        # Cargados bajo demanda (ver propiedades nlp / classifier)
+        self._nlp = None
+        self._nlp_loaded = False
+        self._nlp_lock = threading.Lock()
+        self._classifier = None
+        self._classifier_loaded = False
+        self._classifier_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
 
         # Datos de entrenamiento para clasificador de servicios
         self.service_training_data = self._get_training_data()
 
-        # Patrones para extraccion de entidades
-        self.patterns = {
-            "area": [
-                r"(\d+(?:\.\d+)?)\s*(?:m2|metros cuadrados|m²)",
-                r"area\s*(?:de)?\s*(\d+(?:\.\d+)?)",
-                r"(\d+(?:\.\d+)?)\s*metros"
-            ],
-            "cantidad": [
-                r"(\d+)\s*(?:puntos|circuitos|tomacorrientes|luminarias)",
-                r"cantidad\s*(?:de)?\s*(\d+)",
-                r"(\d+)\s*unidades"
-            ],
-            "precio": [
-                r"(?:S/\.?|PEN|soles?)\s*(\d+(?:,\d{3})*(?:\.\d{2})?)",
-                r"(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:soles?|S/\.?)",
-                r"\$\s*(\d+(?:,\d{3})*(?:\.\d{2})?)"
-            ],
-            "pisos": [
-                r"(\d+)\s*(?:pisos?|niveles?|plantas?)",
-                r"(?:edificio|casa)\s*(?:de)?\s*(\d+)\s*pisos?"
-            ],
-            "potencia": [
-                r"(\d+(?:\.\d+)?)\s*(?:kw|kilowatts?|kva)",
-                r"potencia\s*(?:de)?\s*(\d+(?:\.\d+)?)"
-            ]
-        }
+        # Patrones para extraccion de entidades (compartidos, ya compilados)
+        self.patterns = ENTITY_PATTERNS
+
+        logger.info("MLEngine inicializado (modelos bajo demanda)")
+
+    @property
+    def nlp(self):
+        """Pipeline spaCy (se carga en el primer uso)"""
+        if not self._nlp_loaded:
+            with self._nlp_lock:
+                if not self._nlp_loaded:
+                    self._nlp = self._load_spacy()
+                    self._nlp_loaded = True
+        return self._nlp
+
+    @property
+    def classifier(self):
+        """Clasificador de servicios (artefacto persistido o entrenado una vez)"""
+        if not self._classifier_loaded:
+            with self._classifier_lock:
+                if not self._classifier_loaded:
+                    self._classifier = self._load_classifier()
+                    self._classifier_loaded = True
+        return self._classifier
+
+    def _load_spacy(self):
+        """Carga el modelo spaCy en español o el multilingue"""
+
+        if not SPACY_AVAILABLE:
+            return None
+
+        import spacy
+
+        try:
+            # Intentar cargar modelo en español
+            nlp = spacy.load("es_core_news_sm")
+            logger.info("spaCy modelo español cargado")
+            return nlp
+        except OSError:
+            try:
+                # Fallback a modelo multilingue
+                nlp = spacy.load("xx_ent_wiki_sm")
+                logger.info("spaCy modelo multilingue cargado")
+                return nlp
+            except OSError:
+                logger.warning("No hay modelos spaCy disponibles - ejecutar: python -m spacy download es_core_news_sm")
+                return None
 
-        # Inicializar componentes
-        self._initialize_components()
+    def _classifier_hash(self) -> str:
+        """Version del clasificador: datos + hiperparametros + sklearn"""
+        return training_hash(
+            self.service_training_data,
+            CLASSIFIER_PARAMS,
+            importlib_metadata.version("scikit-learn")
+        )
 
-        logger.info("MLEngine inicializado")
+    def _load_classifier(self, force: bool = False):
+        """Carga el artefacto vigente o lo entrena y persiste"""
 
-    def _initialize_components(self):
-        """Inicializa spaCy y clasificador"""
+        if not SKLEARN_AVAILABLE:
+            return None
+
+        try:
+            classifier, trained = self.model_store.load_or_train(
+                CLASSIFIER_NAME,
+                self._classifier_hash(),
+                self._train_classifier,
+                force=force
+            )
+        except Exception as e:
+            logger.error(f"Error cargando clasificador de servicios: {e}")
+            return None
+
+        if not trained:
+            logger.info(f"Clasificador cargado desde {self.models_dir}")
+        return classifier
+
+    def warm_up(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Carga clasificador y spaCy por adelantado.
 
-        # Inicializar spaCy
-        if SPACY_AVAILABLE:
-            try:
-                # Intentar cargar modelo en español
-                self.nlp = spacy.load("es_core_news_sm")
-                logger.info("spaCy modelo español cargado")
-            except OSError:
-                try:
-                    # Fallback a modelo multilingue
-                    self.nlp = spacy.load("xx_ent_wiki_sm")
-                    logger.info("spaCy modelo multilingue cargado")
-                except OSError:
-                    logger.warning("No hay modelos spaCy disponibles - ejecutar: python -m spacy download es_core_news_sm")
-                    self.nlp = None
-
-        # Inicializar clasificador
-        if SKLEARN_AVAILABLE:
-            self._train_classifier()
+        Args:
+            background: Cargar en un hilo daemon y retornar de inmediato
+
+        Returns:
+            El hilo de carga si background=True
+        """
+        if not background:
+            self.classifier
+            self.nlp
+            return None
+
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(
+                target=self.warm_up,
+                name="ml-engine-warmup",
+                daemon=True
+            )
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def train(self, force: bool = True) -> Dict[str, Any]:
+        """
+        Entrena (o carga) el clasificador y lo deja vigente en models_dir.
+
+        Pensado para el CLI offline (scripts/train_ml_models.py) y despliegues.
+
+        Returns:
+            Manifest de la version vigente
+        """
+        if not SKLEARN_AVAILABLE:
+            raise RuntimeError("sklearn no disponible - pip install scikit-learn")
+
+        with self._classifier_lock:
+            self._classifier = self._load_classifier(force=force)
+            self._classifier_loaded = True
+
+        return self.model_store.manifest(CLASSIFIER_NAME) or {}
 
     def _get_training_data(self) -> Dict[str, List[str]]:
         """Datos de entrenamiento para clasificador de servicios"""
@@ -221,11 +347,12 @@ class MLEngine:
             ]
         }
 
-    def _train_classifier(self):
+    def _train_classifier(self) -> Tuple[Any, Dict[str, Any]]:
         """Entrena el clasificador de servicios"""
 
-        if not SKLEARN_AVAILABLE:
-            return
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.naive_bayes import MultinomialNB
+        from sklearn.pipeline import Pipeline
 
         # Preparar datos
         texts = []
@@ -237,19 +364,26 @@ class MLEngine:
                 labels.append(service)
 
         # Crear pipeline
-        self.classifier = Pipeline([
+        classifier = Pipeline([
             ('tfidf', TfidfVectorizer(
-                ngram_range=(1, 2),
-                max_features=1000,
+                ngram_range=tuple(CLASSIFIER_PARAMS["tfidf"]["ngram_range"]),
+                max_features=CLASSIFIER_PARAMS["tfidf"]["max_features"],
                 stop_words=None  # Mantener palabras en español
             )),
-            ('clf', MultinomialNB(alpha=0.1))
+            ('clf', MultinomialNB(alpha=CLASSIFIER_PARAMS["nb"]["alpha"]))
         ])
 
         # Entrenar
-        self.classifier.fit(texts, labels)
+        classifier.fit(texts, labels)
         logger.info(f"Clasificador entrenado con {len(texts)} ejemplos")
 
+        return classifier, {
+            "examples": len(texts),
+            "labels": sorted(self.service_training_data),
+            "params": CLASSIFIER_PARAMS,
+            "sklearn": importlib_metadata.version("scikit-learn")
+        }
+
     def classify_service(self, text: str) -> Dict[str, Any]:
         """
         Clasifica el servicio mencionado en el texto.
@@ -260,25 +394,53 @@ class MLEngine:
         Returns:
             Dict con servicio detectado y confianza
         """
-        text_lower = text.lower()
+        return self.classify_many([text])[0]
+
+    def classify_many(
+        self,
+        texts: List[str],
+        batch_size: int = 4096
+    ) -> List[Dict[str, Any]]:
+        """
+        Clasifica muchos textos (p.ej. fragmentos de un documento).
+
+        Una sola llamada vectorizada a predict_proba por lote: el servicio
+        es el argmax de las probabilidades (igual que predict) y la
+        confianza su maximo.
+
+        Args:
+            texts: Textos a clasificar
+            batch_size: Textos por llamada al clasificador
+
+        Returns:
+            Un resultado por texto, en el mismo orden
+        """
+        texts_lower = [text.lower() for text in texts]
 
         # Usar clasificador ML si esta disponible
-        if self.classifier:
+        classifier = self.classifier
+        if classifier and texts_lower:
             try:
-                service = self.classifier.predict([text_lower])[0]
-                proba = self.classifier.predict_proba([text_lower])[0]
-                confidence = max(proba)
-
-                return {
-                    "service": service,
-                    "confidence": float(confidence),
-                    "method": "ml_classifier"
-                }
+                results = []
+                classes = classifier.classes_
+                for i in range(0, len(texts_lower), batch_size):
+                    proba = classifier.predict_proba(texts_lower[i:i + batch_size])
+                    best = proba.argmax(axis=1)
+                    confidences = proba.max(axis=1)
+                    results.extend(
+                        {
+                            "service": str(classes[index]),
+                            "confidence": float(confidence),
+                            "method": "ml_classifier"
+                        }
+                        for index, confidence in zip(best, confidences)
+                    )
+                return results
             except Exception as e:
                 logger.warning(f"Error en clasificador ML: {e}")
 
         # Fallback: busqueda por palabras clave
-        return self._classify_by_keywords(text_lower)
+        return [self._classify_by_keywords(text) for text in texts_lower]
 
     def _classify_by_keywords(self, text: str) -> Dict[str, Any]:
         """Clasificacion por palabras clave (fallback)"""
@@ -305,16 +467,10 @@ class MLEngine:
             "method": "keyword_matching"
         }
 
-    def extract_entities(self, text: str) -> Dict[str, Any]:
-        """
-        Extrae entidades del texto usando patrones y NER.
-
-        Args:
-            text: Texto a analizar
+    @staticmethod
+    def _extract_pattern_entities(text_lower: str) -> Dict[str, Any]:
+        """Entidades numericas por patrones regex (texto ya en minusculas)"""
 
-        Returns:
-            Dict con entidades extraidas
-        """
         entities = {
             "areas": [],
             "cantidades": [],
@@ -326,56 +482,88 @@ class MLEngine:
             "raw_entities": []
         }
 
-        # Extraccion por patrones regex
-        for entity_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, text.lower())
-                for match in matches:
-                    value = match.replace(",", "") if isinstance(match, str) else match
+        for entity_type, regexes in ENTITY_REGEXES.items():
+            field, convert = _ENTITY_FIELDS[entity_type]
+            for regex in regexes:
+                for match in regex.findall(text_lower):
                     try:
-                        num_value = float(value)
-                        if entity_type == "area":
-                            entities["areas"].append(num_value)
-                        elif entity_type == "cantidad":
-                            entities["cantidades"].append(int(num_value))
-                        elif entity_type == "precio":
-                            entities["precios"].append(num_value)
-                        elif entity_type == "pisos":
-                            entities["pisos"].append(int(num_value))
-                        elif entity_type == "potencia":
-                            entities["potencias"].append(num_value)
+                        entities[field].append(convert(match.replace(",", "")))
                     except ValueError:
                         continue
 
+        return entities
+
+    @staticmethod
+    def _add_ner_entities(entities: Dict[str, Any], doc) -> None:
+        """Agrega las entidades de un Doc spaCy al resultado"""
+
+        for ent in doc.ents:
+            entities["raw_entities"].append({
+                "text": ent.text,
+                "label": ent.label_,
+                "start": ent.start_char,
+                "end": ent.end_char
+            })
+
+            # Clasificar entidades
+            if ent.label_ == "LOC":
+                entities["ubicaciones"].append(ent.text)
+            elif ent.label_ in ["DATE", "TIME"]:
+                entities["fechas"].append(ent.text)
+
+    def extract_entities(self, text: str) -> Dict[str, Any]:
+        """
+        Extrae entidades del texto usando patrones y NER.
+
+        Args:
+            text: Texto a analizar
+
+        Returns:
+            Dict con entidades extraidas
+        """
+        return self.extract_many([text])[0]
+
+    def extract_many(
+        self,
+        texts: List[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        n_process: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Extrae entidades de muchos textos.
+
+        Los patrones regex se comparten ya compilados y el NER corre con
+        nlp.pipe por lotes (sin tagger/parser/lematizador, que no se usan).
+
+        Args:
+            texts: Textos a analizar
+            batch_size: Textos por lote de spaCy
+            n_process: Procesos de spaCy (>1 solo compensa con muchos textos)
+
+        Returns:
+            Un dict de entidades por texto, en el mismo orden
+        """
+        results = [self._extract_pattern_entities(text.lower()) for text in texts]
+
         # Extraccion con spaCy NER
-        if self.nlp:
+        nlp = self.nlp
+        if nlp and texts:
             try:
-                doc = self.nlp(text)
-
-                for ent in doc.ents:
-                    entities["raw_entities"].append({
-                        "text": ent.text,
-                        "label": ent.label_,
-                        "start": ent.start_char,
-                        "end": ent.end_char
-                    })
-
-                    # Clasificar entidades
-                    if ent.label_ == "LOC":
-                        entities["ubicaciones"].append(ent.text)
-                    elif ent.label_ in ["DATE", "TIME"]:
-                        entities["fechas"].append(ent.text)
-
+                disable = [name for name in _SPACY_UNUSED_PIPES if name in nlp.pipe_names]
+                docs = nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)
+                for entities, doc in zip(results, docs):
+                    self._add_ner_entities(entities, doc)
             except Exception as e:
                 logger.warning(f"Error en NER spaCy: {e}")
 
         # Valores principales
-        entities["area_principal"] = entities["areas"][0] if entities["areas"] else None
-        entities["cantidad_principal"] = entities["cantidades"][0] if entities["cantidades"] else None
-        entities["precio_principal"] = entities["precios"][0] if entities["precios"] else None
-        entities["num_pisos"] = entities["pisos"][0] if entities["pisos"] else 1
+        for entities in results:
+            entities["area_principal"] = entities["areas"][0] if entities["areas"] else None
+            entities["cantidad_principal"] = entities["cantidades"][0] if entities["cantidades"] else None
+            entities["precio_principal"] = entities["precios"][0] if entities["precios"] else None
+            entities["num_pisos"] = entities["pisos"][0] if entities["pisos"] else 1
 
-        return entities
+        return results
 
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """
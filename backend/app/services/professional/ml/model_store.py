@@ -0,0 +1,172 @@
+"""
+ALMACEN DE MODELOS ENTRENADOS
+Artefactos versionados en disco para el motor ML local
+
+Cada artefacto se guarda con joblib como `<nombre>-<hash>.joblib`, donde el
+hash cubre los datos de entrenamiento, los hiperparametros y la version de
+scikit-learn (un pickle no es portable entre versiones). Si cambia
+cualquiera de ellos, el hash cambia y se entrena una version nueva; si no,
+todos los procesos cargan el mismo archivo.
+
+`<nombre>.json` registra la version vigente (hash, fecha, ejemplos) para
+inspeccion y para el CLI de entrenamiento.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Un entrenamiento que deja el lock mas tiempo que esto se considera caido
+LOCK_STALE_SECONDS = 120
+
+
+def training_hash(*parts: Any) -> str:
+    """Hash estable (sha256) de datos JSON-serializables"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ModelStore:
+    """
+    Directorio de artefactos de modelos.
+
+    La escritura es atomica (archivo temporal + os.replace) y el
+    entrenamiento se serializa entre procesos con un lock de archivo, asi
+    varios workers que arrancan a la vez entrenan una sola vez.
+    """
+
+    def __init__(self, models_dir: Path, keep_versions: int = 3):
+        self.models_dir = Path(models_dir)
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        self.keep_versions = keep_versions
+
+    def artifact_path(self, name: str, digest: str) -> Path:
+        return self.models_dir / f"{name}-{digest[:16]}.joblib"
+
+    def manifest_path(self, name: str) -> Path:
+        return self.models_dir / f"{name}.json"
+
+    def load(self, name: str, digest: str) -> Optional[Any]:
+        """Carga el artefacto de esa version o None si no existe / esta corrupto"""
+        path = self.artifact_path(name, digest)
+        if not path.exists():
+            return None
+        try:
+            import joblib
+            return joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Artefacto {path.name} ilegible, se reentrenara: {e}")
+            return None
+
+    def save(self, name: str, digest: str, model: Any, metadata: Dict[str, Any] = None) -> Path:
+        """Persiste el artefacto y lo marca como version vigente"""
+        import joblib
+
+        path = self.artifact_path(name, digest)
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        joblib.dump(model, tmp)
+        os.replace(tmp, path)
+
+        manifest = {
+            "name": name,
+            "hash": digest,
+            "artifact": path.name,
+            "trained_at": datetime.now().isoformat(),
+            **(metadata or {})
+        }
+        tmp_manifest = self.manifest_path(name).with_suffix(f".tmp{os.getpid()}")
+        tmp_manifest.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_manifest, self.manifest_path(name))
+
+        self.prune(name, keep=self.keep_versions)
+        return path
+
+    def manifest(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self.manifest_path(name).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def versions(self, name: str) -> List[Path]:
+        """Artefactos de un modelo, del mas reciente al mas antiguo"""
+        return sorted(
+            self.models_dir.glob(f"{name}-*.joblib"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+
+    def prune(self, name: str, keep: int = 3) -> int:
+        """Elimina versiones antiguas; conserva las `keep` mas recientes"""
+        removed = 0
+        for path in self.versions(name)[keep:]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    @contextmanager
+    def _training_lock(self, name: str):
+        lock = self.models_dir / f"{name}.lock"
+        while True:
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime > LOCK_STALE_SECONDS:
+                        lock.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            try:
+                lock.unlink()
+            except FileNotFoundError:
+                pass
+
+    def load_or_train(
+        self,
+        name: str,
+        digest: str,
+        train: Callable[[], Tuple[Any, Dict[str, Any]]],
+        force: bool = False
+    ) -> Tuple[Any, bool]:
+        """
+        Carga la version `digest` o la entrena (una sola vez entre procesos).
+
+        Args:
+            train: Funcion que retorna (modelo, metadata)
+            force: Reentrenar aunque exista el artefacto
+
+        Returns:
+            (modelo, entrenado_ahora)
+        """
+        if not force:
+            model = self.load(name, digest)
+            if model is not None:
+                return model, False
+
+        with self._training_lock(name):
+            # Otro proceso pudo terminar de entrenar mientras esperabamos
+            if not force:
+                model = self.load(name, digest)
+                if model is not None:
+                    return model, False
+
+            model, metadata = train()
+            self.save(name, digest, model, metadata)
+            return model, True
@@ -14,10 +14,17 @@ import os
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union
 from datetime import datetime
 import tempfile
 import base64
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.services.pdf_paginas import extraer_paginas_pdf
+from .text_chunker import TokenChunker, tokenizer_counter
 
 logger = logging.getLogger(__name__)
 
@@ -58,6 +65,16 @@ except ImportError:
     EXCEL_AVAILABLE = False
     logger.warning("openpyxl no disponible - pip install openpyxl")
 
+# Paginas por tarea enviada al pool (cada worker abre el PDF una vez por lote)
+PDF_PAGES_PER_TASK = 4
+
+# PDFs con pocas paginas se procesan en linea (el pool no compensa)
+PDF_MIN_PAGES_FOR_POOL = 3
+
+
+# Worker del pool (modulo liviano: los procesos "spawn" lo importan)
+_extract_pdf_pages = extraer_paginas_pdf
+
 
 class FileProcessorPro:
     """
@@ -67,16 +84,33 @@ class FileProcessorPro:
     para alimentar el sistema RAG y generacion de documentos.
     """
 
-    def __init__(self, upload_dir: str = None):
+    def __init__(
+        self,
+        upload_dir: str = None,
+        pdf_workers: Optional[int] = None,
+        max_pdf_pages: Optional[int] = None
+    ):
         """
         Inicializa el procesador de archivos.
 
         Args:
             upload_dir: Directorio para archivos subidos
+            pdf_workers: Procesos para extraccion/OCR de paginas PDF (default: CPUs)
+            max_pdf_pages: Presupuesto de paginas por documento (None = sin limite)
         """
         self.upload_dir = Path(upload_dir) if upload_dir else Path("backend/storage/uploads")
         self.upload_dir.mkdir(parents=True, exist_ok=True)
 
+        # Pool de procesos para paginas PDF (se crea en el primer uso)
+        self.pdf_workers = max(1, pdf_workers or os.cpu_count() or 1)
+        self.max_pdf_pages = max_pdf_pages
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+        self._pdf_pool_lock = threading.Lock()
+
+        # Tokenizer del modelo de embeddings (ver set_tokenizer)
+        self.tokenizer = None
+        self.max_chunk_tokens: Optional[int] = None
+
         # Estadisticas de capacidades
         self.capabilities = {
             "pdf": PDF_AVAILABLE,
@@ -235,6 +269,85 @@ class FileProcessorPro:
     # PROCESADORES ESPECIFICOS
     # =========================================================================
 
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        with self._pdf_pool_lock:
+            if self._pdf_pool is None:
+                # spawn: el servidor tiene hilos, event loop y conexiones DB
+                # que un fork heredaria a medio usar
+                self._pdf_pool = ProcessPoolExecutor(
+                    max_workers=self.pdf_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pdf_pool
+
+    def _reset_pdf_pool(self):
+        with self._pdf_pool_lock:
+            if self._pdf_pool is not None:
+                self._pdf_pool.shutdown(wait=False, cancel_futures=True)
+                self._pdf_pool = None
+
+    def iter_pdf_pages(
+        self,
+        file_path: Union[str, Path],
+        extract_tables: bool = True,
+        ocr_enabled: bool = True,
+        max_pages: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Extrae las paginas de un PDF en paralelo y las emite en orden.
+
+        Los lotes de paginas se procesan en un pool de procesos (OCR y
+        tablas son CPU-bound); como maximo 2 lotes por worker quedan en
+        vuelo, asi la memoria no crece con el tamano del documento.
+
+        Args:
+            file_path: Ruta al PDF
+            extract_tables: Extraer tablas
+            ocr_enabled: OCR en paginas sin texto
+            max_pages: Presupuesto de paginas (default: max_pdf_pages)
+
+        Returns:
+            Iterador de dicts {"page", "text", "ocr", "tables"} en orden de pagina
+        """
+        file_path = str(file_path)
+        with pdfplumber.open(file_path) as pdf:
+            total_pages = len(pdf.pages)
+
+        budget = max_pages if max_pages is not None else self.max_pdf_pages
+        page_count = min(total_pages, budget) if budget else total_pages
+        batches = [
+            list(range(start, min(start + PDF_PAGES_PER_TASK, page_count)))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+
+        if page_count < PDF_MIN_PAGES_FOR_POOL or self.pdf_workers == 1:
+            for batch in batches:
+                yield from _extract_pdf_pages(file_path, batch, extract_tables, ocr_enabled)
+            return
+
+        pool = self._get_pdf_pool()
+        in_flight = {}
+        next_batch = 0
+        try:
+            for index in range(len(batches)):
+                # Mantener la ventana de lotes en vuelo llena
+                while next_batch < len(batches) and len(in_flight) < self.pdf_workers * 2:
+                    in_flight[next_batch] = pool.submit(
+                        _extract_pdf_pages, file_path, batches[next_batch], extract_tables, ocr_enabled
+                    )
+                    next_batch += 1
+
+                # Reensamblado ordenado: se espera siempre el lote mas antiguo
+                yield from in_flight.pop(index).result()
+        except BrokenProcessPool:
+            logger.warning("Pool de paginas PDF caido, continuando en serie")
+            self._reset_pdf_pool()
+            for pending in range(index, len(batches)):
+                yield from _extract_pdf_pages(file_path, batches[pending], extract_tables, ocr_enabled)
+        finally:
+            for future in in_flight.values():
+                future.cancel()
+
     def _process_pdf(
         self,
         file_path: Path,
@@ -256,35 +369,26 @@ class FileProcessorPro:
         tables = []
 
         with pdfplumber.open(file_path) as pdf:
-            metadata = {
-                "pages": len(pdf.pages),
-                "filename": file_path.name,
-                "type": "pdf"
-            }
+            total_pages = len(pdf.pages)
+
+        metadata = {
+            "pages": total_pages,
+            "filename": file_path.name,
+            "type": "pdf"
+        }
+
+        pages_processed = 0
+        for page in self.iter_pdf_pages(file_path, extract_tables, ocr_enabled):
+            pages_processed += 1
+            if page["text"]:
+                suffix = " (OCR)" if page["ocr"] else ""
+                text_content.append(f"--- Pagina {page['page']}{suffix} ---\n{page['text']}")
+            tables.extend(page["tables"])
 
-            for i, page in enumerate(pdf.pages):
-                # Extraer texto
-                page_text = page.extract_text()
-
-                if page_text:
-                    text_content.append(f"--- Pagina {i+1} ---\n{page_text}")
-                elif ocr_enabled and OCR_AVAILABLE:
-                    # Intentar OCR si no hay texto
-                    img = page.to_image(resolution=300)
-                    ocr_text = pytesseract.image_to_string(img.original, lang='spa')
-                    if ocr_text.strip():
-                        text_content.append(f"--- Pagina {i+1} (OCR) ---\n{ocr_text}")
-
-                # Extraer tablas
-                if extract_tables:
-                    page_tables = page.extract_tables()
-                    for j, table in enumerate(page_tables):
-                        if table:
-                            tables.append({
-                                "page": i + 1,
-                                "table_index": j,
-                                "data": table
-                            })
+        if pages_processed < total_pages:
+            metadata["pages_processed"] = pages_processed
+            metadata["truncated"] = True
+            logger.warning(f"{file_path.name}: procesadas {pages_processed} de {total_pages} paginas (presupuesto)")
 
         return {
             "success": True,
@@ -503,37 +607,59 @@ class FileProcessorPro:
         """Retorna las capacidades disponibles del procesador"""
         return self.capabilities
 
+    def set_tokenizer(self, tokenizer, max_tokens: Optional[int] = None):
+        """
+        Configura el tokenizer del modelo de embeddings para medir chunks.
+
+        Args:
+            tokenizer: Tokenizer HuggingFace (ej. SentenceTransformer.tokenizer)
+            max_tokens: Limite del modelo (max_seq_length); los chunks nunca lo superan
+        """
+        self.tokenizer = tokenizer
+        self.max_chunk_tokens = max_tokens
+
+    def iter_chunks(
+        self,
+        text: Union[str, Iterable[str]],
+        chunk_size: int = 256,
+        overlap: int = 32
+    ) -> Iterator[str]:
+        """
+        Genera chunks de forma perezosa respetando paginas, secciones,
+        oraciones y filas de tabla.
+
+        Args:
+            text: Texto (o iterable de paginas/archivos) a dividir
+            chunk_size: Tamano maximo de cada chunk (en tokens del modelo)
+            overlap: Tokens de superposicion entre chunks de la misma seccion
+
+        Returns:
+            Iterador de chunks de texto
+        """
+        if self.max_chunk_tokens:
+            chunk_size = min(chunk_size, self.max_chunk_tokens)
+        counter = tokenizer_counter(self.tokenizer) if self.tokenizer is not None else None
+        chunker = TokenChunker(max_tokens=chunk_size, overlap_tokens=overlap, count_tokens=counter)
+        return chunker.chunks(text)
+
     def chunk_text(
         self,
-        text: str,
-        chunk_size: int = 500,
-        overlap: int = 50
+        text: Union[str, Iterable[str]],
+        chunk_size: int = 256,
+        overlap: int = 32
     ) -> List[str]:
         """
         Divide texto en chunks para el sistema RAG.
 
         Args:
             text: Texto a dividir
-            chunk_size: Tamano aproximado de cada chunk (en palabras)
-            overlap: Palabras de superposicion entre chunks
+            chunk_size: Tamano maximo de cada chunk (en tokens del modelo)
+            overlap: Tokens de superposicion entre chunks
 
         Returns:
             Lista de chunks de texto
         """
-        words = text.split()
-        chunks = []
-
-        if len(words) <= chunk_size:
-            return [text]
-
-        start = 0
-        while start < len(words):
-            end = start + chunk_size
-            chunk = ' '.join(words[start:end])
-            chunks.append(chunk)
-            start = end - overlap
-
-        return chunks
+        return list(self.iter_chunks(text, chunk_size, overlap))
 
 
 # Instancia global
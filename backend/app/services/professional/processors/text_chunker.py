@@ -0,0 +1,231 @@
+"""
+CHUNKER DE TEXTO POR TOKENS v4.0
+Division en fragmentos para RAG respetando paginas, secciones y oraciones
+
+- Generador: lee el texto linea a linea y emite cada chunk apenas esta listo
+  (memoria constante aunque el PDF tenga cientos de paginas)
+- Limites duros: marcadores de pagina de _process_pdf ("--- Pagina N ---"),
+  separadores de archivo ("---") y titulos de seccion cierran el chunk actual;
+  el titulo de la seccion se antepone a cada chunk de esa seccion
+- Unidades: oraciones en parrafos normales; filas de tabla completas
+- Tamano medido con el tokenizer del modelo de embeddings (si se configura)
+- Solapamiento por oraciones completas dentro de la misma seccion
+"""
+
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Marcadores que escribe FileProcessorPro (_process_pdf / process_multiple)
+_PAGE_MARKER = re.compile(r'^---\s*Pagina\s+\d+(\s*\(OCR\))?\s*---$', re.IGNORECASE)
+_FILE_SEPARATOR = re.compile(r'^-{3,}$')
+_SHEET_MARKER = re.compile(r'^=== .+ ===$')
+
+# Titulos de seccion tipicos de manuales tecnicos
+_SECTION_HEADING = re.compile(
+    r'^(#{1,6}\s+\S.*'
+    r'|(CAPITULO|CAPÍTULO|SECCION|SECCIÓN|ANEXO|ARTICULO|ARTÍCULO)\b.*'
+    r'|\d+(\.\d+){0,3}\.?\s+[A-ZÁÉÍÓÚÑ][^.]{0,80})$'
+)
+
+# Fin de oracion seguido de inicio de oracion
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?;])\s+(?=[¿¡"(A-ZÁÉÍÓÚÑ0-9])')
+
+# Columnas alineadas con espacios (DataFrame.to_string de hojas Excel/CSV)
+_ALIGNED_COLUMNS = re.compile(r'\S {2,}\S.* {2,}\S')
+
+# Aproximacion de tokens WordPiece sin tokenizer: palabras y signos sueltos
+_APPROX_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+# Limite de texto sin fin de oracion antes de emitirlo como unidad
+_MAX_PENDING_CHARS = 4000
+
+TokenCounter = Callable[[str], int]
+
+# Tipos de segmento
+_PAGE = "page"
+_BOUNDARY = "boundary"
+_HEADING = "heading"
+_UNIT = "unit"
+
+
+def approximate_token_count(text: str) -> int:
+    """Conteo aproximado de tokens (palabras + puntuacion)"""
+    return len(_APPROX_TOKEN.findall(text))
+
+
+def tokenizer_counter(tokenizer) -> TokenCounter:
+    """Adapta un tokenizer HuggingFace (model.tokenizer) a un contador"""
+    def _count(text: str) -> int:
+        return len(tokenizer.tokenize(text))
+    return _count
+
+
+def _iter_lines(text: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Lineas del texto sin materializar la lista completa"""
+    if isinstance(text, str):
+        start = 0
+        while True:
+            end = text.find("\n", start)
+            if end == -1:
+                yield text[start:]
+                return
+            yield text[start:end]
+            start = end + 1
+    else:
+        for part in text:
+            yield from _iter_lines(part)
+            # Cada elemento del iterable (pagina/archivo) es un limite duro
+            yield "---"
+
+
+def _split_complete_sentences(buffer: str) -> Tuple[List[str], str]:
+    """Separa las oraciones ya terminadas del resto aun abierto"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_SPLIT.finditer(buffer):
+        sentence = buffer[start:match.start()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+
+def _is_table_row(line: str) -> bool:
+    return line.count("|") >= 2 or line.count("\t") >= 2 or bool(_ALIGNED_COLUMNS.search(line))
+
+
+def _iter_segments(text: Union[str, Iterable[str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Emite (tipo, texto): paginas, limites duros, titulos y unidades
+    (oraciones o filas). Solo se retiene la oracion que aun no termina.
+    """
+    pending = ""
+
+    def _flush() -> Iterator[Tuple[str, str]]:
+        nonlocal pending
+        sentence = pending.strip()
+        pending = ""
+        if sentence:
+            yield _UNIT, sentence
+
+    for raw in _iter_lines(text):
+        line = raw.strip()
+        if not line:
+            yield from _flush()
+            continue
+        if _PAGE_MARKER.match(line):
+            yield from _flush()
+            yield _PAGE, line
+            continue
+        if _FILE_SEPARATOR.match(line):
+            yield from _flush()
+            yield _BOUNDARY, line
+            continue
+        if _SHEET_MARKER.match(line) or _SECTION_HEADING.match(line):
+            yield from _flush()
+            yield _HEADING, line
+            continue
+        if _is_table_row(line):
+            yield from _flush()
+            yield _UNIT, line
+            continue
+
+        sentences, pending = _split_complete_sentences(f"{pending} {line}" if pending else line)
+        for sentence in sentences:
+            yield _UNIT, sentence
+        # Texto sin puntuacion (listas, OCR): no acumular indefinidamente
+        if len(pending) > _MAX_PENDING_CHARS:
+            yield from _flush()
+
+    yield from _flush()
+
+
+class TokenChunker:
+    """
+    Chunker por tokens con solapamiento.
+
+    Args:
+        max_tokens: Tamano maximo de cada chunk
+        overlap_tokens: Tokens (oraciones completas) repetidos al inicio del
+                        siguiente chunk de la misma seccion
+        count_tokens: Funcion de conteo (tokenizer del modelo o aproximacion)
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 256,
+        overlap_tokens: int = 32,
+        count_tokens: Optional[TokenCounter] = None
+    ):
+        self.max_tokens = max(8, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self.count_tokens = count_tokens or approximate_token_count
+
+    def _split_long_unit(self, unit: str, limit: int) -> Iterator[Tuple[str, int]]:
+        """Divide por palabras una unidad que no cabe sola en un chunk"""
+        piece: List[str] = []
+        piece_tokens = 0
+        for word in unit.split(" "):
+            if not word:
+                continue
+            word_tokens = self.count_tokens(word)
+            if piece and piece_tokens + word_tokens > limit:
+                yield " ".join(piece), piece_tokens
+                piece, piece_tokens = [], 0
+            piece.append(word)
+            piece_tokens += word_tokens
+        if piece:
+            yield " ".join(piece), piece_tokens
+
+    def chunks(self, text: Union[str, Iterable[str]]) -> Iterator[str]:
+        """Genera los chunks de forma perezosa"""
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+        heading: Optional[Tuple[str, int]] = None
+
+        def _emit() -> str:
+            content = [u for u, _ in current]
+            if heading:
+                content.insert(0, heading[0])
+            return "\n".join(content)
+
+        def _overlap() -> List[Tuple[str, int]]:
+            tail: List[Tuple[str, int]] = []
+            tokens = 0
+            for unit in reversed(current):
+                if tokens + unit[1] > self.overlap_tokens:
+                    break
+                tail.insert(0, unit)
+                tokens += unit[1]
+            return tail
+
+        for kind, value in _iter_segments(text):
+            if kind in (_PAGE, _BOUNDARY, _HEADING):
+                if current:
+                    yield _emit()
+                current, current_tokens = [], 0
+                # Un salto de pagina no cierra la seccion: se conserva el titulo
+                if kind == _HEADING:
+                    heading = (value, self.count_tokens(value))
+                elif kind == _BOUNDARY:
+                    heading = None
+                continue
+
+            # El titulo de la seccion se repite en cada chunk: descuenta presupuesto
+            budget = max(self.max_tokens // 2, self.max_tokens - (heading[1] if heading else 0))
+            unit_tokens = self.count_tokens(value)
+            pieces = [(value, unit_tokens)] if unit_tokens <= budget else self._split_long_unit(value, budget)
+
+            for piece, piece_tokens in pieces:
+                if current and current_tokens + piece_tokens > budget:
+                    yield _emit()
+                    current = _overlap()
+                    current_tokens = sum(t for _, t in current)
+                    # El solapamiento nunca debe impedir que la pieza entre
+                    while current and current_tokens + piece_tokens > budget:
+                        current_tokens -= current.pop(0)[1]
+                current.append((piece, piece_tokens))
+                current_tokens += piece_tokens
+
+        if current:
+            yield _emit()
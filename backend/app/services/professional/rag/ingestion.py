@@ -0,0 +1,457 @@
+"""
+PIPELINE DE INGESTA RAG v4.0
+Indexacion por micro-lotes con deduplicacion por contenido
+
+- IDs derivados del documento + hash SHA-256 del texto: un fragmento
+  repetido dentro del documento se indexa una vez, y cada documento conserva
+  su propia atribucion (source_id / metadatos)
+- Entre documentos el texto identico no se vuelve a embeber: el embedding se
+  reutiliza desde la coleccion (metadato content_hash)
+- Micro-lotes de tamano fijo: memoria acotada aunque el manual sea enorme
+- Progreso persistido en disco (spool JSONL + estado JSON): un trabajo
+  interrumpido se reanuda con resume_pending() y los lotes ya indexados se
+  saltan por deduplicacion. Un archivo .lock por trabajo evita que dos
+  procesos lo reanuden a la vez
+- Trabajos terminados se purgan (memoria y disco) tras retention_seconds
+- Pool de workers en segundo plano para no bloquear las requests
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = 2
+DEFAULT_RETENTION_SECONDS = 24 * 3600
+
+FINISHED = ("completed", "failed")
+
+
+def chunk_hash(text: str) -> str:
+    """Hash de contenido de un fragmento"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_id(source_id: str, content_hash: str) -> str:
+    """ID estable del fragmento dentro de su documento"""
+    return hashlib.sha256(f"{source_id}:{content_hash}".encode("utf-8")).hexdigest()[:32]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class IngestionJob:
+    """Estado de un trabajo de ingesta (persistido como JSON)"""
+
+    def __init__(
+        self,
+        job_id: str,
+        source_id: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        total_chunks: int = 0
+    ):
+        self.job_id = job_id
+        self.source_id = source_id
+        self.metadata = metadata or {}
+        self.total_chunks = total_chunks
+        self.processed = 0
+        self.added = 0
+        self.skipped = 0
+        self.batches_done = 0
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "source_id": self.source_id,
+            "metadata": self.metadata,
+            "total_chunks": self.total_chunks,
+            "processed": self.processed,
+            "added": self.added,
+            "skipped": self.skipped,
+            "batches_done": self.batches_done,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IngestionJob":
+        job = cls(data["job_id"], data["source_id"], data.get("metadata"), data.get("total_chunks", 0))
+        for key in ("processed", "added", "skipped", "batches_done", "status", "error",
+                    "created_at", "updated_at"):
+            if key in data:
+                setattr(job, key, data[key])
+        return job
+
+
+class IngestionPipeline:
+    """
+    Pipeline de ingesta para RAGEngine.
+
+    Los fragmentos se escriben primero a un spool en disco y luego se leen
+    en micro-lotes: por cada lote se consultan los IDs ya presentes en la
+    coleccion, se embeben solo los nuevos y se agregan con un unico add.
+    """
+
+    def __init__(
+        self,
+        engine,
+        jobs_directory: Path,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_WORKERS,
+        retention_seconds: float = DEFAULT_RETENTION_SECONDS
+    ):
+        self.engine = engine
+        self.jobs_directory = Path(jobs_directory)
+        self.jobs_directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.retention_seconds = retention_seconds
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # ChromaDB no garantiza escrituras concurrentes seguras
+        self._write_lock = threading.Lock()
+        self._jobs: Dict[str, IngestionJob] = {}
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    def _spool_path(self, job_id: str) -> Path:
+        return self.jobs_directory / f"{job_id}.chunks.jsonl"
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.jobs_directory / f"{job_id}.json"
+
+    def _lock_path(self, job_id: str) -> Path:
+        return self.jobs_directory / f"{job_id}.lock"
+
+    def _save_state(self, job: IngestionJob):
+        job.updated_at = datetime.now().isoformat()
+        tmp = self._state_path(job.job_id).with_suffix(".tmp")
+        tmp.write_text(json.dumps(job.to_dict(), ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self._state_path(job.job_id))
+
+    def _write_spool(self, job: IngestionJob, chunks: Iterable[str]) -> str:
+        """Escribe el spool; retorna el hash del contenido completo"""
+        total = 0
+        digest = hashlib.sha256()
+        with open(self._spool_path(job.job_id), "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                if chunk and chunk.strip():
+                    f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                    digest.update(chunk.encode("utf-8"))
+                    total += 1
+        job.total_chunks = total
+        return digest.hexdigest()[:16]
+
+    def _read_batches(self, job: IngestionJob) -> Iterator[List[str]]:
+        batch: List[str] = []
+        with open(self._spool_path(job.job_id), "r", encoding="utf-8") as f:
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _cleanup(self, job: IngestionJob):
+        try:
+            self._spool_path(job.job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _lock_owner(self, job_id: str) -> Optional[int]:
+        """Pid vivo que tiene reclamado el trabajo, o None"""
+        try:
+            owner = int(self._lock_path(job_id).read_text() or 0)
+        except (OSError, ValueError):
+            return None
+        if owner == os.getpid() or (owner and _pid_alive(owner)):
+            return owner
+        return None
+
+    def _claim(self, job: IngestionJob) -> bool:
+        """
+        Reclama el trabajo para este proceso (archivo .lock con el pid).
+        Un lock de un proceso que ya no existe se considera abandonado.
+        """
+        path = self._lock_path(job.job_id)
+        tmp = path.with_suffix(f".lock.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(str(os.getpid()))
+        try:
+            for _ in range(2):
+                try:
+                    # link() es atomico y falla si existe: el lock nunca se ve vacio
+                    os.link(tmp, path)
+                    return True
+                except FileExistsError:
+                    if self._lock_owner(job.job_id) is not None:
+                        return False
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+            return False
+        finally:
+            tmp.unlink()
+
+    def _release(self, job: IngestionJob):
+        try:
+            self._lock_path(job.job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _prune(self):
+        """Olvida y borra los trabajos terminados mas antiguos que retention_seconds"""
+        if self.retention_seconds is None:
+            return
+        limit = time.time() - self.retention_seconds
+
+        for job_id, job in list(self._jobs.items()):
+            if job.status in FINISHED and datetime.fromisoformat(job.updated_at).timestamp() < limit:
+                self._jobs.pop(job_id, None)
+
+        for path in self.jobs_directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime >= limit:
+                    continue
+                status = json.loads(path.read_text(encoding="utf-8")).get("status")
+            except (OSError, ValueError):
+                continue
+            if status not in FINISHED:
+                continue
+            job_id = path.stem
+            for stale in (path, self._spool_path(job_id), self._lock_path(job_id)):
+                try:
+                    stale.unlink()
+                except FileNotFoundError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Indexacion
+    # ------------------------------------------------------------------
+
+    def _existing_ids(self, ids: List[str]) -> set:
+        try:
+            return set(self.engine.collection.get(ids=ids).get("ids") or [])
+        except Exception as e:
+            logger.warning(f"No se pudo verificar duplicados en la coleccion: {e}")
+            return set()
+
+    def _known_embeddings(self, content_hashes: List[str]) -> Dict[str, List[float]]:
+        """Embeddings ya calculados para el mismo texto (de cualquier documento)"""
+        try:
+            found = self.engine.collection.get(
+                where={"content_hash": {"$in": content_hashes}},
+                include=["metadatas", "embeddings"]
+            )
+        except Exception as e:
+            logger.warning(f"No se pudieron reutilizar embeddings: {e}")
+            return {}
+        known = {}
+        for meta, embedding in zip(found.get("metadatas") or [], found.get("embeddings") or []):
+            if meta and embedding is not None:
+                known.setdefault(meta.get("content_hash"), list(embedding))
+        return known
+
+    def _embed(self, texts: List[str], content_hashes: List[str]) -> List[List[float]]:
+        known = self._known_embeddings(list(set(content_hashes)))
+        missing = [i for i, h in enumerate(content_hashes) if h not in known]
+        if missing:
+            encoded = self.engine.model.encode(
+                [texts[i] for i in missing], batch_size=self.batch_size
+            ).tolist()
+            for i, embedding in zip(missing, encoded):
+                known[content_hashes[i]] = embedding
+        return [known[h] for h in content_hashes]
+
+    def _index_batch(self, job: IngestionJob, batch: List[str], seen: set, offset: int):
+        ids, hashes, texts, metadatas = [], [], [], []
+        for i, text in enumerate(batch):
+            content_hash = chunk_hash(text)
+            if content_hash in seen:
+                continue
+            seen.add(content_hash)
+            ids.append(chunk_id(job.source_id, content_hash))
+            hashes.append(content_hash)
+            texts.append(text)
+            meta = dict(job.metadata)
+            meta["chunk_index"] = offset + i
+            meta["total_chunks"] = job.total_chunks
+            meta["source_id"] = job.source_id
+            meta["content_hash"] = content_hash
+            meta["timestamp"] = datetime.now().isoformat()
+            metadatas.append(meta)
+
+        existing = self._existing_ids(ids) if ids else set()
+        if existing:
+            keep = [i for i, cid in enumerate(ids) if cid not in existing]
+            ids = [ids[i] for i in keep]
+            hashes = [hashes[i] for i in keep]
+            texts = [texts[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+
+        if ids:
+            embeddings = self._embed(texts, hashes)
+            with self._write_lock:
+                self.engine.collection.add(
+                    documents=texts,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+
+        job.added += len(ids)
+        job.skipped += len(batch) - len(ids)
+        job.processed += len(batch)
+        job.batches_done += 1
+
+    def _run(self, job: IngestionJob) -> IngestionJob:
+        if not self._claim(job):
+            logger.info(f"Ingesta {job.job_id} ya en curso en otro proceso")
+            return job
+        try:
+            return self._run_claimed(job)
+        finally:
+            self._release(job)
+
+    def _run_claimed(self, job: IngestionJob) -> IngestionJob:
+        job.status = "running"
+        self._save_state(job)
+        seen: set = set()
+        offset = 0
+        try:
+            for batch in self._read_batches(job):
+                self._index_batch(job, batch, seen, offset)
+                offset += len(batch)
+                self._save_state(job)
+            job.status = "completed"
+            self._cleanup(job)
+            logger.info(
+                f"Ingesta {job.job_id} completada: {job.added} agregados, "
+                f"{job.skipped} duplicados omitidos ({job.batches_done} lotes)"
+            )
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Error en ingesta {job.job_id}: {e}")
+        self._save_state(job)
+        return job
+
+    def _create_job(
+        self,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]],
+        source_id: Optional[str]
+    ) -> IngestionJob:
+        self._prune()
+        job_id = uuid.uuid4().hex[:12]
+        job = IngestionJob(job_id, source_id or job_id, metadata)
+        content_digest = self._write_spool(job, chunks)
+        if not source_id:
+            # Sin ID explicito, el mismo contenido es el mismo documento
+            job.source_id = content_digest
+        self._save_state(job)
+        self._jobs[job_id] = job
+        return job
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="rag-ingest"
+                )
+            return self._executor
+
+    def ingest(
+        self,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        source_id: Optional[str] = None
+    ) -> IngestionJob:
+        """Indexa los fragmentos en el hilo actual (bloqueante)"""
+        return self._run(self._create_job(chunks, metadata, source_id))
+
+    def submit(
+        self,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        source_id: Optional[str] = None
+    ) -> IngestionJob:
+        """Encola la indexacion en el pool de workers y retorna de inmediato"""
+        job = self._create_job(chunks, metadata, source_id)
+        self.executor.submit(self._run, job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de un trabajo (memoria o disco)"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        path = self._state_path(job_id)
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))
+        return None
+
+    def resume_pending(self) -> List[str]:
+        """Re-encola los trabajos interrumpidos que aun tienen spool en disco"""
+        self._prune()
+        resumed = []
+        for path in self.jobs_directory.glob("*.json"):
+            try:
+                job = IngestionJob.from_dict(json.loads(path.read_text(encoding="utf-8")))
+            except Exception as e:
+                logger.warning(f"Estado de ingesta ilegible {path.name}: {e}")
+                continue
+            if job.status == "completed" or not self._spool_path(job.job_id).exists():
+                continue
+            if job.job_id in self._jobs and self._jobs[job.job_id].status == "running":
+                continue
+            if self._lock_owner(job.job_id) is not None:
+                continue
+            # Los contadores se recalculan: los lotes ya indexados se omiten por hash
+            job.processed = job.added = job.skipped = job.batches_done = 0
+            job.error = None
+            self._jobs[job.job_id] = job
+            self.executor.submit(self._run, job)
+            resumed.append(job.job_id)
+        if resumed:
+            logger.info(f"Ingestas reanudadas: {resumed}")
+        return resumed
+
+    def shutdown(self, wait: bool = True):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -11,11 +11,14 @@ Usa:
 import os
 import logging
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from datetime import datetime
 import json
 import hashlib
 
+from app.services.embedding_cache import QueryEmbeddingCache
+from .ingestion import IngestionPipeline, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS
+
 logger = logging.getLogger(__name__)
 
 # Imports condicionales
@@ -53,7 +56,10 @@ class RAGEngine:
         self,
         collection_name: str = "tesla_documents",
         persist_directory: str = None,
-        model_name: str = "all-MiniLM-L6-v2"
+        model_name: str = "all-MiniLM-L6-v2",
+        ingest_batch_size: int = DEFAULT_BATCH_SIZE,
+        ingest_workers: int = DEFAULT_WORKERS,
+        query_cache_size: int = 512
     ):
         """
         Inicializa el motor RAG.
@@ -62,6 +68,9 @@ class RAGEngine:
             collection_name: Nombre de la coleccion en ChromaDB
             persist_directory: Directorio para persistir la base de datos
             model_name: Modelo de sentence-transformers a usar
+            ingest_batch_size: Fragmentos por micro-lote de indexacion
+            ingest_workers: Workers en segundo plano para indexacion
+            query_cache_size: Embeddings de consultas retenidos (LRU)
         """
         self.collection_name = collection_name
         self.persist_directory = Path(persist_directory) if persist_directory else Path("backend/storage/embeddings")
@@ -72,6 +81,17 @@ class RAGEngine:
         self.client = None
         self.collection = None
 
+        # Embeddings de consultas ya calculados
+        self.query_cache = QueryEmbeddingCache(query_cache_size)
+
+        # Pipeline de ingesta por micro-lotes
+        self.ingestion = IngestionPipeline(
+            self,
+            jobs_directory=self.persist_directory / "ingestion_jobs",
+            batch_size=ingest_batch_size,
+            max_workers=ingest_workers
+        )
+
         # Inicializar componentes
         self._initialize_components()
 
@@ -181,15 +201,19 @@ class RAGEngine:
 
     def add_chunks(
         self,
-        chunks: List[str],
+        chunks: Iterable[str],
         metadata: Optional[Dict[str, Any]] = None,
         source_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Agrega multiples chunks de un documento.
 
+        Indexa por micro-lotes y omite los fragmentos ya indexados para este
+        documento (ID = documento + hash del texto). El texto identico de
+        otro documento reutiliza su embedding.
+
         Args:
-            chunks: Lista de fragmentos de texto
+            chunks: Fragmentos de texto (lista o iterable)
             metadata: Metadatos comunes
             source_id: ID del documento fuente
 
@@ -203,36 +227,20 @@ class RAGEngine:
             }
 
         try:
-            # Generar IDs
-            source_id = source_id or hashlib.md5(str(chunks).encode()).hexdigest()[:8]
-            ids = [f"{source_id}_chunk_{i}" for i in range(len(chunks))]
-
-            # Generar embeddings para todos los chunks
-            embeddings = self.model.encode(chunks).tolist()
-
-            # Preparar metadatos para cada chunk
-            metadatas = []
-            for i in range(len(chunks)):
-                meta = dict(metadata) if metadata else {}
-                meta["chunk_index"] = i
-                meta["total_chunks"] = len(chunks)
-                meta["source_id"] = source_id
-                meta["timestamp"] = datetime.now().isoformat()
-                metadatas.append(meta)
-
-            # Agregar todos los chunks
-            self.collection.add(
-                documents=chunks,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
+            job = self.ingestion.ingest(chunks, metadata=metadata, source_id=source_id)
+            if job.status != "completed":
+                return {
+                    "success": False,
+                    "error": job.error,
+                    "job_id": job.job_id
+                }
 
             return {
                 "success": True,
-                "source_id": source_id,
-                "chunks_added": len(chunks),
-                "message": f"{len(chunks)} chunks agregados exitosamente"
+                "source_id": job.source_id,
+                "chunks_added": job.added,
+                "chunks_skipped": job.skipped,
+                "message": f"{job.added} chunks agregados exitosamente ({job.skipped} duplicados omitidos)"
             }
 
         except Exception as e:
@@ -242,66 +250,149 @@ class RAGEngine:
                 "error": str(e)
             }
 
-    def search(
+    def add_chunks_background(
         self,
-        query: str,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        source_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Encola la indexacion de chunks en segundo plano.
+
+        Util para manuales PDF grandes: retorna de inmediato con un job_id
+        consultable con get_ingestion_status().
+        """
+        if not self.model or not self.collection:
+            return {
+                "success": False,
+                "error": "RAG no inicializado correctamente"
+            }
+
+        try:
+            job = self.ingestion.submit(chunks, metadata=metadata, source_id=source_id)
+            return {
+                "success": True,
+                "job_id": job.job_id,
+                "source_id": job.source_id,
+                "total_chunks": job.total_chunks,
+                "status": job.status
+            }
+        except Exception as e:
+            logger.error(f"Error encolando chunks: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def get_ingestion_status(self, job_id: str) -> Dict[str, Any]:
+        """Obtiene el progreso de un trabajo de indexacion"""
+        job = self.ingestion.get_job(job_id)
+        if job is None:
+            return {"success": False, "error": f"Trabajo {job_id} no encontrado"}
+        return {"success": True, **job}
+
+    def resume_ingestion(self) -> Dict[str, Any]:
+        """Reanuda los trabajos de indexacion interrumpidos"""
+        if not self.is_available():
+            return {"success": False, "error": "RAG no inicializado correctamente"}
+        return {"success": True, "resumed": self.ingestion.resume_pending()}
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embeddings de consultas: cache LRU + un solo encode para las faltantes"""
+        return self.query_cache.obtener_muchos(
+            queries,
+            lambda faltantes: self.model.encode(faltantes).tolist()
+        )
+
+    @staticmethod
+    def _format_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+        formatted_results = []
+        documents = results.get('documents') or []
+        if index < len(documents) and documents[index]:
+            for i in range(len(documents[index])):
+                formatted_results.append({
+                    "text": documents[index][i],
+                    "metadata": results['metadatas'][index][i] if results.get('metadatas') else {},
+                    "id": results['ids'][index][i] if results.get('ids') else None,
+                    "distance": results['distances'][index][i] if results.get('distances') else None
+                })
+        return formatted_results
+
+    def search_many(
+        self,
+        queries: List[str],
         n_results: int = 5,
         filter_metadata: Optional[Dict] = None
-    ) -> Dict[str, Any]:
+    ) -> List[Dict[str, Any]]:
         """
-        Busca documentos relevantes para una consulta.
+        Busca varias consultas con un solo encode y una sola query a ChromaDB.
 
         Args:
-            query: Consulta de busqueda
-            n_results: Numero de resultados a retornar
-            filter_metadata: Filtros de metadatos
+            queries: Consultas de busqueda
+            n_results: Numero de resultados por consulta
+            filter_metadata: Filtros de metadatos (comunes a todas)
 
         Returns:
-            Resultados de busqueda con scores
+            Un resultado (mismo formato que search) por consulta, en orden
         """
         if not self.model or not self.collection:
-            return {
+            return [{
                 "success": False,
                 "error": "RAG no inicializado correctamente",
                 "results": []
-            }
+            } for _ in queries]
+
+        if not queries:
+            return []
 
         try:
-            # Generar embedding de la consulta
-            query_embedding = self.model.encode(query).tolist()
+            # Generar embeddings de las consultas (cacheados)
+            query_embeddings = self._embed_queries(list(queries))
 
-            # Buscar en coleccion
+            # Buscar en coleccion (multi-vector)
             results = self.collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=query_embeddings,
                 n_results=n_results,
                 where=filter_metadata
             )
 
-            # Formatear resultados
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i in range(len(results['documents'][0])):
-                    formatted_results.append({
-                        "text": results['documents'][0][i],
-                        "metadata": results['metadatas'][0][i] if results['metadatas'] else {},
-                        "id": results['ids'][0][i] if results['ids'] else None,
-                        "distance": results['distances'][0][i] if results.get('distances') else None
-                    })
-
-            return {
-                "success": True,
-                "query": query,
-                "results": formatted_results,
-                "total_results": len(formatted_results)
-            }
+            output = []
+            for index, query in enumerate(queries):
+                formatted_results = self._format_results(results, index)
+                output.append({
+                    "success": True,
+                    "query": query,
+                    "results": formatted_results,
+                    "total_results": len(formatted_results)
+                })
+            return output
 
         except Exception as e:
             logger.error(f"Error en busqueda: {e}")
-            return {
+            return [{
                 "success": False,
                 "error": str(e),
                 "results": []
-            }
+            } for _ in queries]
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """
+        Busca documentos relevantes para una consulta.
+
+        Args:
+            query: Consulta de busqueda
+            n_results: Numero de resultados a retornar
+            filter_metadata: Filtros de metadatos
+
+        Returns:
+            Resultados de busqueda con scores
+        """
+        return self.search_many([query], n_results, filter_metadata)[0]
 
     def search_and_combine(
         self,
@@ -370,8 +461,11 @@ class RAGEngine:
 
         context = {}
 
-        for category, search_query in searches.get(document_type, []):
-            result = self.search(search_query, n_results=n_results)
+        # Todas las categorias en un solo encode + una sola query
+        categories = searches.get(document_type, [])
+        results = self.search_many([q for _, q in categories], n_results=n_results)
+
+        for (category, _), result in zip(categories, results):
             if result.get("success") and result.get("results"):
                 context[category] = [r["text"] for r in result["results"]]
 
@@ -426,6 +520,7 @@ class RAGEngine:
                 "collection_name": self.collection_name,
                 "document_count": count,
                 "model": self.model_name,
+                "query_cache": self.query_cache.obtener_metricas(),
                 "embeddings_available": EMBEDDINGS_AVAILABLE,
                 "chromadb_available": CHROMADB_AVAILABLE
             }
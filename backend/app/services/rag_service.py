@@ -10,13 +10,16 @@ from typing import List, Dict, Any, Optional
 try:
     import chromadb
     from chromadb.config import Settings as ChromaSettings
+    from chromadb.utils import embedding_functions
     CHROMADB_AVAILABLE = True
 except ImportError:
     CHROMADB_AVAILABLE = False
     chromadb = None
     ChromaSettings = None
+    embedding_functions = None
 
 from app.core.config import settings # <<< CORRECCIÓN: Importar settings
+from app.services.embedding_cache import QueryEmbeddingCache
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,8 @@ class RAGService:
         self.collection_name = "tesla_cotizador_docs"
         self.client = None
         self.collection = None
+        self.embedding_function = None
+        self.query_cache = QueryEmbeddingCache()
 
         # Verificar si chromadb está disponible
         if not CHROMADB_AVAILABLE:
@@ -48,6 +53,14 @@ class RAGService:
 
             logger.info(f"✅ ChromaDB client inicializado en: {persist_directory}")
 
+            # Misma función por defecto de ChromaDB, explícita para poder
+            # embeber (y cachear) las consultas nosotros mismos
+            try:
+                self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+            except Exception as e:
+                logger.warning(f"⚠️ Sin función de embeddings explícita, ChromaDB embeberá las consultas: {e}")
+                self.embedding_function = None
+
             # Obtener o crear colección
             self.collection = self._get_or_create_collection()
 
@@ -65,7 +78,8 @@ class RAGService:
         """
         try:
             collection = self.client.get_or_create_collection(
-                name=self.collection_name
+                name=self.collection_name,
+                **self._collection_kwargs()
             )
             return collection
         except Exception as e:
@@ -74,13 +88,30 @@ class RAGService:
             try:
                 logger.warning(f"Intentando resetear la colección '{self.collection_name}'...")
                 self.client.delete_collection(name=self.collection_name)
-                collection = self.client.get_or_create_collection(name=self.collection_name)
+                collection = self.client.get_or_create_collection(
+                    name=self.collection_name,
+                    **self._collection_kwargs()
+                )
                 logger.info("Colección reseteada y recreada exitosamente.")
                 return collection
             except Exception as e2:
                 logger.critical(f"Fallo crítico al resetear la colección: {e2}")
                 raise e2
 
+    def _collection_kwargs(self) -> Dict[str, Any]:
+        if self.embedding_function is None:
+            return {}
+        return {"embedding_function": self.embedding_function}
+
+    def _embeber_consultas(self, consultas: List[str]) -> Optional[List[List[float]]]:
+        """Embeddings de consultas vía caché LRU (None si ChromaDB debe embeber)"""
+        if self.embedding_function is None:
+            return None
+        return self.query_cache.obtener_muchos(
+            consultas,
+            lambda faltantes: [list(map(float, v)) for v in self.embedding_function(faltantes)]
+        )
+
     def is_available(self) -> bool:
         """Verificar si el servicio RAG está disponible"""
         return self.client is not None and self.collection is not None
@@ -126,39 +157,63 @@ class RAGService:
         Returns:
             Lista de resultados
         """
+        return self.buscar_varios([query], n_results=n_results, where=where)[0]
+
+    def buscar_varios(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Buscar varias consultas con un solo lote de embeddings y una sola query
+        
+        Args:
+            queries: Textos de búsqueda
+            n_results: Número de resultados por consulta
+            where: Filtro de metadatos común
+        
+        Returns:
+            Una lista de resultados por consulta, en el mismo orden
+        """
         if not self.is_available():
             logger.warning("RAG Service no disponible, búsqueda omitida")
+            return [[] for _ in queries]
+
+        if not queries:
             return []
             
         try:
-            if where:
-                results = self.collection.query(
-                    query_texts=[query],
-                    n_results=n_results,
-                    where=where
-                )
+            params: Dict[str, Any] = {"n_results": n_results}
+            embeddings = self._embeber_consultas(list(queries))
+            if embeddings is not None:
+                params["query_embeddings"] = embeddings
             else:
-                results = self.collection.query(
-                    query_texts=[query],
-                    n_results=n_results
-                )
+                params["query_texts"] = list(queries)
+            if where:
+                params["where"] = where
+
+            results = self.collection.query(**params)
             
             # Formatear resultados
-            output = []
-            if results and results.get('documents'):
-                for i, doc in enumerate(results['documents'][0]):
-                    output.append({
-                        "id": results['ids'][0][i],
-                        "documento": doc,
-                        "metadata": results['metadatas'][0][i],
-                        "distancia": results['distances'][0][i]
-                    })
+            salida = []
+            for q in range(len(queries)):
+                output = []
+                if results and results.get('documents') and q < len(results['documents']):
+                    for i, doc in enumerate(results['documents'][q]):
+                        output.append({
+                            "id": results['ids'][q][i],
+                            "documento": doc,
+                            "metadata": results['metadatas'][q][i],
+                            "distancia": results['distances'][q][i]
+                        })
+                salida.append(output)
             
-            return output
+            return salida
             
         except Exception as e:
             logger.error(f"Error al buscar en RAG: {str(e)}")
-            return []
+            return [[] for _ in queries]
     
     def eliminar_documentos(self, where: Dict[str, Any]) -> bool:
         """
@@ -0,0 +1,384 @@
+"""
+🔎 SEARCH INDEX - Búsqueda full-text de clientes, cotizaciones y proyectos
+📁 RUTA: backend/app/services/search_index.py
+
+Reemplaza los `ilike('%termino%')` (escaneo completo de tabla) por un
+índice invertido según el motor de base de datos:
+
+- SQLite (desarrollo): tabla virtual FTS5 `busqueda_fts` con tokenizer
+  unicode61 sin diacríticos e índices de prefijo. Triggers AFTER
+  INSERT/UPDATE/DELETE la mantienen sincronizada con las tablas origen.
+- PostgreSQL (producción): índices GIN sobre to_tsvector('simple',
+  unaccent(...)) y trigramas (pg_trgm) para prefijos de RUC/número. Son
+  índices de expresión: se mantienen solos en cada escritura.
+
+Las búsquedas hacen prefijo por término ("const" encuentra
+"Construcción"), ignoran tildes y se ordenan por relevancia con
+paginación keyset (cursor = último puntaje + clave de orden). Los campos
+de `subcadena` (RUC y email de clientes) conservan además la coincidencia
+por subcadena del filtro original: ver `filtro_subcadena`.
+"""
+
+import base64
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, bindparam, column, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Entidades indexadas. `codigo` compone la clave de orden/rowid:
+# entidad_id * 4 + codigo (único por fila y sin colisiones entre tablas)
+ENTIDADES: Dict[str, Dict[str, Any]] = {
+    "cliente": {
+        "tabla": "clientes",
+        "codigo": 1,
+        "titulo": "nombre",
+        "contenido": ["email", "persona_contacto", "ciudad", "industria"],
+        "clave": "ruc",
+        "subcadena": ["ruc", "email"]
+    },
+    "cotizacion": {
+        "tabla": "cotizaciones",
+        "codigo": 2,
+        "titulo": "numero",
+        "contenido": ["cliente", "proyecto", "descripcion"],
+        "clave": "numero"
+    },
+    "proyecto": {
+        "tabla": "proyectos",
+        "codigo": 3,
+        "titulo": "nombre",
+        "contenido": ["cliente", "descripcion"],
+        "clave": None
+    }
+}
+
+MAX_TERMINOS = 8
+_TERMINO = re.compile(r"\w+", re.UNICODE)
+
+
+def extraer_terminos(consulta: str) -> List[str]:
+    """Términos de búsqueda normalizados (solo caracteres de palabra)"""
+    return _TERMINO.findall((consulta or "").lower())[:MAX_TERMINOS]
+
+
+def codificar_cursor(puntaje: float, clave_orden: int) -> str:
+    crudo = json.dumps([puntaje, clave_orden]).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii")
+
+
+def decodificar_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    if not cursor:
+        return None
+    try:
+        puntaje, clave_orden = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(puntaje), int(clave_orden)
+    except Exception:
+        raise ValueError("Cursor de búsqueda inválido")
+
+
+def _campos_trigrama(cfg: Dict[str, Any]) -> List[str]:
+    """Campos con índice de trigramas en PostgreSQL (prefijo de clave + subcadenas)"""
+    campos = [cfg["clave"]] if cfg["clave"] else []
+    return campos + [c for c in cfg.get("subcadena", []) if c not in campos]
+
+
+def _concatenar(campos: Sequence[str], prefijo: str = "") -> str:
+    return " || ' ' || ".join(f"coalesce({prefijo}{campo}, '')" for campo in campos)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SQLITE (FTS5)
+# ═══════════════════════════════════════════════════════════════
+
+def _ddl_sqlite() -> List[str]:
+    sentencias = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5("
+        "entidad UNINDEXED, entidad_id UNINDEXED, titulo, contenido, clave, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    ]
+    for entidad, cfg in ENTIDADES.items():
+        tabla, codigo = cfg["tabla"], cfg["codigo"]
+        clave = f"new.{cfg['clave']}" if cfg["clave"] else "''"
+        insertar = (
+            "INSERT INTO busqueda_fts (rowid, entidad, entidad_id, titulo, contenido, clave) "
+            f"VALUES (new.id * 4 + {codigo}, '{entidad}', new.id, new.{cfg['titulo']}, "
+            f"{_concatenar(cfg['contenido'], 'new.')}, {clave});"
+        )
+        borrar = f"DELETE FROM busqueda_fts WHERE rowid = old.id * 4 + {codigo};"
+        sentencias += [
+            f"CREATE TRIGGER IF NOT EXISTS busqueda_{tabla}_ai AFTER INSERT ON {tabla} "
+            f"BEGIN {insertar} END",
+            f"CREATE TRIGGER IF NOT EXISTS busqueda_{tabla}_au AFTER UPDATE ON {tabla} "
+            f"BEGIN {borrar} {insertar} END",
+            f"CREATE TRIGGER IF NOT EXISTS busqueda_{tabla}_ad AFTER DELETE ON {tabla} "
+            f"BEGIN {borrar} END"
+        ]
+    return sentencias
+
+
+def _reconstruir_sqlite(conn: Connection):
+    """Carga inicial del índice desde las tablas origen"""
+    conn.execute(text("DELETE FROM busqueda_fts"))
+    for entidad, cfg in ENTIDADES.items():
+        clave = cfg["clave"] or "''"
+        conn.execute(text(
+            "INSERT INTO busqueda_fts (rowid, entidad, entidad_id, titulo, contenido, clave) "
+            f"SELECT id * 4 + {cfg['codigo']}, '{entidad}', id, {cfg['titulo']}, "
+            f"{_concatenar(cfg['contenido'])}, {clave} FROM {cfg['tabla']}"
+        ))
+
+
+def _consulta_sqlite(terminos: List[str]) -> Tuple[str, Dict[str, Any]]:
+    match = " AND ".join(f'"{t}"*' for t in terminos)
+    sql = (
+        "SELECT rowid AS clave_orden, entidad, entidad_id, titulo, "
+        # bm25: menor es mejor; pesos titulo > clave > contenido
+        "-bm25(busqueda_fts, 0, 0, 10.0, 1.0, 5.0) AS puntaje "
+        "FROM busqueda_fts WHERE busqueda_fts MATCH :match"
+    )
+    return sql, {"match": match}
+
+
+# ═══════════════════════════════════════════════════════════════
+# POSTGRESQL (tsvector + pg_trgm)
+# ═══════════════════════════════════════════════════════════════
+
+def _documento_pg(cfg: Dict[str, Any]) -> str:
+    # Debe coincidir EXACTAMENTE con la expresión del índice GIN
+    return f"to_tsvector('simple', busqueda_unaccent({_concatenar([cfg['titulo']] + cfg['contenido'])}))"
+
+
+def _ddl_postgresql() -> List[str]:
+    sentencias = [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        # unaccent() no es IMMUTABLE: el envoltorio permite usarla en índices
+        "CREATE OR REPLACE FUNCTION busqueda_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent', $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    ]
+    for cfg in ENTIDADES.values():
+        tabla = cfg["tabla"]
+        sentencias.append(
+            f"CREATE INDEX IF NOT EXISTS ix_{tabla}_busqueda ON {tabla} USING GIN ({_documento_pg(cfg)})"
+        )
+        for campo in _campos_trigrama(cfg):
+            sentencias.append(
+                f"CREATE INDEX IF NOT EXISTS ix_{tabla}_{campo}_trgm "
+                f"ON {tabla} USING GIN ({campo} gin_trgm_ops)"
+            )
+    return sentencias
+
+
+def _consulta_postgresql(terminos: List[str], entidades: Sequence[str]) -> Tuple[str, Dict[str, Any]]:
+    partes = []
+    usa_prefijo = False
+    for entidad in entidades:
+        cfg = ENTIDADES[entidad]
+        documento = _documento_pg(cfg)
+        if cfg["clave"]:
+            usa_prefijo = True
+            coincide_clave = f"{cfg['clave']} LIKE :prefijo"
+            extra = f" + CASE WHEN {coincide_clave} THEN 1.0 ELSE 0.0 END"
+            condicion = f"({documento} @@ q.consulta OR {coincide_clave})"
+        else:
+            extra = ""
+            condicion = f"{documento} @@ q.consulta"
+        partes.append(
+            f"SELECT id * 4 + {cfg['codigo']} AS clave_orden, '{entidad}' AS entidad, "
+            f"id AS entidad_id, {cfg['titulo']} AS titulo, "
+            f"(ts_rank({documento}, q.consulta){extra})::float8 AS puntaje "
+            f"FROM {cfg['tabla']}, q WHERE {condicion}"
+        )
+    sql = (
+        "WITH q AS (SELECT to_tsquery('simple', busqueda_unaccent(:tsquery)) AS consulta) "
+        + " UNION ALL ".join(partes)
+    )
+    params: Dict[str, Any] = {"tsquery": " & ".join(f"{t}:*" for t in terminos)}
+    # :prefijo solo existe si alguna entidad tiene clave (proyectos no): un
+    # parámetro sobrante hace fallar bindparams()
+    if usa_prefijo:
+        # Prefijo literal de RUC/número: solo si el primer término es un código
+        codigo = len(terminos) == 1 and any(c.isdigit() for c in terminos[0])
+        params["prefijo"] = f"{terminos[0]}%" if codigo else None
+    return sql, params
+
+
+# ═══════════════════════════════════════════════════════════════
+# ÍNDICE
+# ═══════════════════════════════════════════════════════════════
+
+def crear_indice(conn: Connection):
+    """Crea (idempotente) las estructuras del índice; usado también por Alembic"""
+    dialecto = conn.dialect.name
+    if dialecto == "sqlite":
+        existia = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'busqueda_fts'"
+        )).first() is not None
+        for sentencia in _ddl_sqlite():
+            conn.execute(text(sentencia))
+        if not existia:
+            _reconstruir_sqlite(conn)
+    elif dialecto == "postgresql":
+        for sentencia in _ddl_postgresql():
+            conn.execute(text(sentencia))
+    else:
+        raise NotImplementedError(f"Búsqueda full-text no soportada para {dialecto}")
+
+
+def eliminar_indice(conn: Connection):
+    dialecto = conn.dialect.name
+    if dialecto == "sqlite":
+        for cfg in ENTIDADES.values():
+            for sufijo in ("ai", "au", "ad"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS busqueda_{cfg['tabla']}_{sufijo}"))
+        conn.execute(text("DROP TABLE IF EXISTS busqueda_fts"))
+    elif dialecto == "postgresql":
+        for cfg in ENTIDADES.values():
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_{cfg['tabla']}_busqueda"))
+            for campo in _campos_trigrama(cfg):
+                conn.execute(text(f"DROP INDEX IF EXISTS ix_{cfg['tabla']}_{campo}_trgm"))
+        conn.execute(text("DROP FUNCTION IF EXISTS busqueda_unaccent(text)"))
+
+
+class SearchIndex:
+    """Índice de búsqueda ligado a un engine (se crea la primera vez que se usa)"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._disponible: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    def disponible(self) -> bool:
+        if self._disponible is None:
+            with self._lock:
+                if self._disponible is None:
+                    try:
+                        with self.engine.begin() as conn:
+                            crear_indice(conn)
+                        self._disponible = True
+                        logger.info(f"✅ Índice de búsqueda listo ({self.engine.dialect.name})")
+                    except Exception as e:
+                        logger.warning(f"⚠️ Índice de búsqueda no disponible, se usará ILIKE: {e}")
+                        self._disponible = False
+        return self._disponible
+
+    def reconstruir(self):
+        """Vuelve a poblar el índice (solo SQLite; en PostgreSQL es automático)"""
+        if self.engine.dialect.name == "sqlite" and self.disponible():
+            with self.engine.begin() as conn:
+                _reconstruir_sqlite(conn)
+
+    def buscar(
+        self,
+        db: Session,
+        consulta: str,
+        entidades: Optional[Sequence[str]] = None,
+        limite: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Búsqueda rankeada con paginación keyset.
+
+        Returns:
+            {"resultados": [...], "siguiente_cursor": str | None}
+        """
+        entidades = [e for e in (entidades or ENTIDADES) if e in ENTIDADES]
+        terminos = extraer_terminos(consulta)
+        if not terminos or not entidades or not self.disponible():
+            return {"resultados": [], "siguiente_cursor": None}
+
+        if db.bind.dialect.name == "sqlite":
+            base, params = _consulta_sqlite(terminos)
+        else:
+            base, params = _consulta_postgresql(terminos, entidades)
+
+        filtros = ["entidad IN :entidades"]
+        posicion = decodificar_cursor(cursor)
+        if posicion is not None:
+            filtros.append("(puntaje < :cursor_puntaje OR (puntaje = :cursor_puntaje AND clave_orden > :cursor_clave))")
+            params["cursor_puntaje"], params["cursor_clave"] = posicion
+
+        sql = text(
+            f"SELECT * FROM ({base}) AS r WHERE {' AND '.join(filtros)} "
+            "ORDER BY puntaje DESC, clave_orden ASC LIMIT :limite"
+        ).bindparams(
+            bindparam("entidades", value=list(entidades), expanding=True),
+            limite=limite + 1,
+            **params
+        )
+
+        filas = db.execute(sql).mappings().all()
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+
+        resultados = [
+            {
+                "entidad": fila["entidad"],
+                "id": int(fila["entidad_id"]),
+                "titulo": fila["titulo"],
+                "puntaje": round(float(fila["puntaje"]), 6)
+            }
+            for fila in filas
+        ]
+        siguiente = None
+        if hay_mas and filas:
+            ultima = filas[-1]
+            siguiente = codificar_cursor(float(ultima["puntaje"]), int(ultima["clave_orden"]))
+        return {"resultados": resultados, "siguiente_cursor": siguiente}
+
+    def ids_coincidentes(self, db: Session, entidad: str, consulta: str):
+        """
+        Subconsulta con los ids que coinciden (para `Modelo.id.in_(...)`).
+
+        Retorna None si el índice no está disponible (el caller usa ILIKE).
+        """
+        terminos = extraer_terminos(consulta)
+        if not terminos or not self.disponible():
+            return None
+
+        if db.bind.dialect.name == "sqlite":
+            base, params = _consulta_sqlite(terminos)
+        else:
+            base, params = _consulta_postgresql(terminos, [entidad])
+
+        sql = text(f"SELECT entidad_id FROM ({base}) AS r WHERE entidad = :entidad_filtro").bindparams(
+            entidad_filtro=entidad, **params
+        ).columns(column("entidad_id", Integer)).subquery()
+        return select(sql.c.entidad_id)
+
+
+def filtro_subcadena(modelo, entidad: str, consulta: str) -> List[Any]:
+    """
+    Condiciones ILIKE '%consulta%' sobre los campos `subcadena` de la
+    entidad, para combinar con `ids_coincidentes` en un OR: el índice
+    full-text solo encuentra prefijos de término y un RUC o email se busca
+    también por un fragmento intermedio. En PostgreSQL las cubren los
+    índices de trigramas.
+    """
+    consulta = (consulta or "").strip()
+    if not consulta:
+        return []
+    return [getattr(modelo, campo).ilike(f"%{consulta}%") for campo in ENTIDADES[entidad].get("subcadena", [])]
+
+
+_indice: Optional[SearchIndex] = None
+_indice_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Obtiene (o crea) el índice de búsqueda global"""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                from app.core.database import engine
+                _indice = SearchIndex(engine)
+    return _indice
@@ -35,6 +35,8 @@ from io import BytesIO
 import json
 import tempfile
 
+from app.services.docx_marker_engine import reemplazar_marcadores
+
 logger = logging.getLogger(__name__)
 
 class TemplateProcessor:
@@ -231,39 +233,13 @@ class TemplateProcessor:
         return subtotal, igv, total
     
     def _reemplazar_marcadores_pili(self, doc: Document, datos: Dict[str, str]):
-        """Reemplaza marcadores en el documento usando datos PILI"""
-        
-        # Reemplazar en párrafos
-        for paragraph in doc.paragraphs:
-            for marcador, valor in datos.items():
-                marcador_completo = f"{{{{{marcador}}}}}"
-                if marcador_completo in paragraph.text:
-                    paragraph.text = paragraph.text.replace(marcador_completo, valor)
-        
-        # Reemplazar en tablas existentes
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for marcador, valor in datos.items():
-                        marcador_completo = f"{{{{{marcador}}}}}"
-                        if marcador_completo in cell.text:
-                            cell.text = cell.text.replace(marcador_completo, valor)
-        
-        # Reemplazar en headers y footers
-        for section in doc.sections:
-            if section.header:
-                for paragraph in section.header.paragraphs:
-                    for marcador, valor in datos.items():
-                        marcador_completo = f"{{{{{marcador}}}}}"
-                        if marcador_completo in paragraph.text:
-                            paragraph.text = paragraph.text.replace(marcador_completo, valor)
-            
-            if section.footer:
-                for paragraph in section.footer.paragraphs:
-                    for marcador, valor in datos.items():
-                        marcador_completo = f"{{{{{marcador}}}}}"
-                        if marcador_completo in paragraph.text:
-                            paragraph.text = paragraph.text.replace(marcador_completo, valor)
+        """
+        Reemplaza marcadores en el documento usando datos PILI
+
+        Una sola pasada sobre párrafos, tablas, headers y footers
+        (ver docx_marker_engine); conserva el formato de los runs.
+        """
+        reemplazar_marcadores(doc, datos)
     
     def _procesar_elementos_especiales_pili(self, doc: Document, datos: Dict[str, str]):
         """Procesa elementos especiales como tablas e imágenes con lógica PILI"""
@@ -658,22 +634,7 @@ class TemplateProcessor:
         """
         🔄 CONSERVADO - Reemplaza marcadores simples en el documento
         """
-        
-        # Reemplazar en párrafos
-        for paragraph in doc.paragraphs:
-            for marcador, valor in datos.items():
-                marcador_completo = f"{{{{{marcador}}}}}"
-                if marcador_completo in paragraph.text:
-                    paragraph.text = paragraph.text.replace(marcador_completo, valor)
-        
-        # Reemplazar en tablas
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for marcador, valor in datos.items():
-                        marcador_completo = f"{{{{{marcador}}}}}"
-                        if marcador_completo in cell.text:
-                            cell.text = cell.text.replace(marcador_completo, valor)
+        reemplazar_marcadores(doc, datos)
     
     def _procesar_tabla_items_original(self, doc: Document, items: List[Dict[str, Any]]):
         """
@@ -0,0 +1,442 @@
+"""
+📒 TOKEN LEDGER - Contabilidad atómica de tokens por usuario
+📁 RUTA: backend/app/services/token_ledger.py
+
+Antes TokenManager cargaba el Usuario, restaba en Python y hacía commit:
+dos chats simultáneos leían el mismo saldo y ambos consumían (se podía
+gastar más que el límite), con dos viajes a la base por llamada.
+
+Ahora:
+- El saldo se mueve con UN UPDATE condicional por operación:
+  `tokens_usados = tokens_usados + n WHERE tokens_usados + n <= limite`
+  La fila del usuario serializa solo ese UPDATE (no un ciclo
+  leer-modificar-escribir) y nunca se supera el límite.
+- Cada movimiento queda en `consumos_tokens` (libro de solo agregar;
+  las tablas las crea la migración e3c91f6a2d48).
+- Streaming: `reservar` aparta la estimación (cuenta contra el límite),
+  `confirmar` ajusta a los tokens reales y `liberar` la devuelve. Las
+  reservas abandonadas (proceso caído) se liberan al vencer.
+- Estadísticas: un hilo consolida los movimientos confirmados en
+  `resumen_consumo_tokens` (día, operación) cada
+  TOKENS_CONSOLIDACION_SEGUNDOS; los totales globales salen del snapshot
+  de dashboard_metrics, al que se le informan los deltas en el commit.
+
+Funciona igual en SQLite y PostgreSQL (UPDATE ... RETURNING, UPSERT).
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, case, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.consumo_tokens import ConsumoTokens, ResumenConsumoTokens
+from app.models.usuario import Usuario
+
+logger = logging.getLogger(__name__)
+
+RESERVADO = "reservado"
+CONFIRMADO = "confirmado"
+LIBERADO = "liberado"
+
+DIAS_PERIODO = 30
+
+_USADOS = func.coalesce(Usuario.tokens_usados, 0)
+_LIMITE = func.coalesce(Usuario.tokens_mensuales, 0) + func.coalesce(Usuario.tokens_extra, 0)
+_HISTORICO = func.coalesce(Usuario.total_tokens_historico, 0)
+
+
+class Saldo(NamedTuple):
+    """Saldo del usuario después de un movimiento"""
+    tokens_usados: int
+    tokens_mensuales: int
+    tokens_extra: int
+
+    @property
+    def limite(self) -> int:
+        return (self.tokens_mensuales or 0) + (self.tokens_extra or 0)
+
+    @property
+    def disponibles(self) -> int:
+        return max(0, self.limite - (self.tokens_usados or 0))
+
+    @property
+    def porcentaje_usado(self) -> float:
+        return (self.tokens_usados / self.tokens_mensuales * 100) if self.tokens_mensuales else 0.0
+
+
+def _no_negativo(expresion):
+    return case((expresion < 0, 0), else_=expresion)
+
+
+def _registrar_metricas(db: Session, **cantidades: int):
+    from app.services.dashboard_metrics import metricas_activas
+    metricas = metricas_activas()
+    if metricas is not None:
+        metricas.sumar_tokens(db, **cantidades)
+
+
+class LibroTokens:
+    """Operaciones atómicas sobre el saldo de tokens (una transacción cada una)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Saldo
+    # ------------------------------------------------------------------
+
+    def _descontar(self, usuario_id: int, tokens: int, historico: bool) -> Optional[Saldo]:
+        """
+        UPDATE condicional: solo descuenta si alcanza y el periodo está
+        vigente. Retorna el saldo nuevo o None (sin cambios).
+        """
+        valores = {Usuario.tokens_usados: _USADOS + tokens}
+        if historico:
+            valores[Usuario.total_tokens_historico] = _HISTORICO + tokens
+
+        fila = self.db.execute(
+            update(Usuario)
+            .where(
+                Usuario.id == usuario_id,
+                _USADOS + tokens <= _LIMITE,
+                Usuario.fecha_reset_tokens.is_not(None),
+                Usuario.fecha_reset_tokens >= datetime.now()
+            )
+            .values(valores)
+            .returning(Usuario.tokens_usados, Usuario.tokens_mensuales, Usuario.tokens_extra)
+            .execution_options(synchronize_session=False)
+        ).first()
+        return Saldo(*fila) if fila else None
+
+    def resetear_si_vencido(self, usuario_id: Optional[int] = None) -> int:
+        """
+        Inicia un periodo nuevo (tokens_usados = 0) a los usuarios cuyo
+        periodo venció. Condicional: si dos procesos lo intentan, resetea uno.
+
+        Args:
+            usuario_id: Un usuario, o None para todos
+
+        Returns:
+            Cantidad de usuarios reseteados (ya confirmado)
+        """
+        ahora = datetime.now()
+        condicion = or_(Usuario.fecha_reset_tokens.is_(None), Usuario.fecha_reset_tokens < ahora)
+        if usuario_id is not None:
+            condicion = and_(Usuario.id == usuario_id, condicion)
+
+        resultado = self.db.execute(
+            update(Usuario)
+            .where(condicion)
+            .values(tokens_usados=0, fecha_reset_tokens=ahora + timedelta(days=DIAS_PERIODO))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+        if resultado.rowcount:
+            from app.services.dashboard_metrics import metricas_activas
+            metricas = metricas_activas()
+            if metricas is not None:
+                metricas.solicitar_recalculo()
+        return resultado.rowcount or 0
+
+    def _descontar_con_reset(self, usuario_id: int, tokens: int, historico: bool) -> Optional[Saldo]:
+        saldo = self._descontar(usuario_id, tokens, historico)
+        if saldo is None and self.resetear_si_vencido(usuario_id):
+            saldo = self._descontar(usuario_id, tokens, historico)
+        return saldo
+
+    # ------------------------------------------------------------------
+    # Movimientos
+    # ------------------------------------------------------------------
+
+    def _anotar(self, usuario_id: int, tokens: int, operacion: str, estado: str) -> int:
+        return self.db.execute(
+            insert(ConsumoTokens)
+            .values(
+                usuario_id=usuario_id,
+                tokens=tokens,
+                tokens_reservados=tokens if estado == RESERVADO else 0,
+                operacion=(operacion or "")[:100],
+                estado=estado,
+                consolidado=False,
+                fecha=datetime.now(),
+                fecha_cierre=None if estado == RESERVADO else datetime.now()
+            )
+            .returning(ConsumoTokens.id)
+        ).scalar_one()
+
+    def consumir(self, usuario_id: int, tokens: int, operacion: str = "") -> Optional[Saldo]:
+        """
+        Consume tokens si alcanzan (un UPDATE + el movimiento, un commit).
+
+        Returns:
+            Saldo nuevo, o None si no alcanzan o el usuario no existe
+        """
+        try:
+            saldo = self._descontar_con_reset(usuario_id, tokens, historico=True)
+            if saldo is None:
+                self.db.rollback()
+                return None
+            self._anotar(usuario_id, tokens, operacion, CONFIRMADO)
+            _registrar_metricas(self.db, tokens_usados=tokens, tokens_historico=tokens)
+            self.db.commit()
+            return saldo
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def reservar(self, usuario_id: int, tokens: int, operacion: str = "") -> Optional[int]:
+        """
+        Aparta tokens para una llamada cuyo consumo real se conoce al final.
+
+        Returns:
+            Id de la reserva, o None si no alcanzan o el usuario no existe
+        """
+        try:
+            if self._descontar_con_reset(usuario_id, tokens, historico=False) is None:
+                self.db.rollback()
+                return None
+            reserva_id = self._anotar(usuario_id, tokens, operacion, RESERVADO)
+            _registrar_metricas(self.db, tokens_usados=tokens)
+            self.db.commit()
+            return reserva_id
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def _cerrar(self, reserva_id: int, estado: str, tokens_reales: int) -> Optional[Saldo]:
+        """Cierra una reserva abierta (una sola vez) y ajusta el saldo"""
+        try:
+            fila = self.db.execute(
+                update(ConsumoTokens)
+                .where(ConsumoTokens.id == reserva_id, ConsumoTokens.estado == RESERVADO)
+                .values(estado=estado, tokens=tokens_reales, fecha_cierre=datetime.now())
+                .returning(ConsumoTokens.usuario_id, ConsumoTokens.tokens_reservados)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if fila is None:
+                self.db.rollback()
+                return None
+
+            usuario_id, reservados = fila
+            delta = tokens_reales - reservados
+            # El consumo real se registra aunque supere la estimación
+            saldo = self.db.execute(
+                update(Usuario)
+                .where(Usuario.id == usuario_id)
+                .values({
+                    Usuario.tokens_usados: _no_negativo(_USADOS + delta),
+                    Usuario.total_tokens_historico: _HISTORICO + tokens_reales
+                })
+                .returning(Usuario.tokens_usados, Usuario.tokens_mensuales, Usuario.tokens_extra)
+                .execution_options(synchronize_session=False)
+            ).first()
+            _registrar_metricas(self.db, tokens_usados=delta, tokens_historico=tokens_reales)
+            self.db.commit()
+            return Saldo(*saldo) if saldo else Saldo(0, 0, 0)
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def confirmar(self, reserva_id: int, tokens_reales: int) -> Optional[Saldo]:
+        """Confirma una reserva con los tokens realmente usados"""
+        return self._cerrar(reserva_id, CONFIRMADO, max(0, tokens_reales))
+
+    def liberar(self, reserva_id: int) -> Optional[Saldo]:
+        """Devuelve una reserva completa (llamada cancelada o fallida)"""
+        return self._cerrar(reserva_id, LIBERADO, 0)
+
+    def liberar_vencidas(self, max_edad_segundos: float) -> int:
+        """
+        Libera las reservas abiertas más antiguas que `max_edad_segundos`.
+        Un UPDATE ... RETURNING las cierra todas; los saldos se devuelven
+        por usuario en la misma transacción (un solo commit).
+        """
+        limite = datetime.now() - timedelta(seconds=max_edad_segundos)
+        try:
+            filas = self.db.execute(
+                update(ConsumoTokens)
+                .where(ConsumoTokens.estado == RESERVADO, ConsumoTokens.fecha < limite)
+                .values(estado=LIBERADO, tokens=0, fecha_cierre=datetime.now())
+                .returning(ConsumoTokens.usuario_id, ConsumoTokens.tokens_reservados)
+                .execution_options(synchronize_session=False)
+            ).all()
+
+            por_usuario: Dict[int, int] = defaultdict(int)
+            for usuario_id, reservados in filas:
+                por_usuario[usuario_id] += reservados or 0
+
+            for usuario_id, reservados in por_usuario.items():
+                self.db.execute(
+                    update(Usuario)
+                    .where(Usuario.id == usuario_id)
+                    .values({Usuario.tokens_usados: _no_negativo(_USADOS - reservados)})
+                    .execution_options(synchronize_session=False)
+                )
+            if por_usuario:
+                _registrar_metricas(self.db, tokens_usados=-sum(por_usuario.values()))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if filas:
+            logger.warning(f"⏳ {len(filas)} reservas de tokens vencidas liberadas")
+        return len(filas)
+
+    # ------------------------------------------------------------------
+    # Consolidación
+    # ------------------------------------------------------------------
+
+    def _upsert_resumen(self, dia: date, operacion: str, tokens: int, operaciones: int):
+        dialecto = self.db.get_bind().dialect.name
+        if dialecto == "postgresql":
+            insertar = postgresql.insert(ResumenConsumoTokens)
+        elif dialecto == "sqlite":
+            insertar = sqlite.insert(ResumenConsumoTokens)
+        else:
+            raise NotImplementedError(f"Consolidación de tokens no soportada para {dialecto}")
+        tabla = ResumenConsumoTokens.__table__
+        self.db.execute(
+            insertar.values(dia=dia, operacion=operacion, tokens=tokens, operaciones=operaciones)
+            .on_conflict_do_update(
+                index_elements=[tabla.c.dia, tabla.c.operacion],
+                set_={
+                    "tokens": tabla.c.tokens + tokens,
+                    "operaciones": tabla.c.operaciones + operaciones
+                }
+            )
+        )
+
+    def consolidar(self) -> int:
+        """
+        Suma los movimientos confirmados nuevos en resumen_consumo_tokens.
+        Cada movimiento se marca y se suma en la misma transacción: aunque
+        varios procesos consoliden a la vez, cada uno se cuenta una vez.
+
+        Returns:
+            Movimientos consolidados
+        """
+        try:
+            filas = self.db.execute(
+                update(ConsumoTokens)
+                .where(ConsumoTokens.estado == CONFIRMADO, ConsumoTokens.consolidado.is_(False))
+                .values(consolidado=True)
+                .returning(ConsumoTokens.fecha, ConsumoTokens.operacion, ConsumoTokens.tokens)
+                .execution_options(synchronize_session=False)
+            ).all()
+
+            grupos: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+            for fecha, operacion, tokens in filas:
+                dia = fecha.date() if isinstance(fecha, datetime) else date.today()
+                grupo = grupos[(dia, operacion or "")]
+                grupo[0] += tokens or 0
+                grupo[1] += 1
+
+            for (dia, operacion), (tokens, operaciones) in grupos.items():
+                self._upsert_resumen(dia, operacion, tokens, operaciones)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if filas:
+            logger.info(f"📒 {len(filas)} consumos de tokens consolidados")
+        return len(filas)
+
+    def resumen_diario(self, dias: int = 30) -> List[Dict]:
+        """Tokens confirmados por día (de la tabla consolidada)"""
+        desde = date.today() - timedelta(days=dias)
+        filas = self.db.execute(
+            select(
+                ResumenConsumoTokens.dia,
+                func.sum(ResumenConsumoTokens.tokens),
+                func.sum(ResumenConsumoTokens.operaciones)
+            )
+            .where(ResumenConsumoTokens.dia >= desde)
+            .group_by(ResumenConsumoTokens.dia)
+            .order_by(ResumenConsumoTokens.dia)
+        ).all()
+        return [
+            {"dia": dia.isoformat(), "tokens": int(tokens or 0), "operaciones": int(operaciones or 0)}
+            for dia, tokens, operaciones in filas
+        ]
+
+    def resumen_por_operacion(self, dias: int = 30) -> Dict[str, int]:
+        desde = date.today() - timedelta(days=dias)
+        filas = self.db.execute(
+            select(ResumenConsumoTokens.operacion, func.sum(ResumenConsumoTokens.tokens))
+            .where(ResumenConsumoTokens.dia >= desde)
+            .group_by(ResumenConsumoTokens.operacion)
+        ).all()
+        return {operacion or "sin_operacion": int(tokens or 0) for operacion, tokens in filas}
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONSOLIDACIÓN PERIÓDICA
+# ═══════════════════════════════════════════════════════════════
+
+class ConsolidadorTokens:
+    """Hilo que libera reservas vencidas y consolida el libro periódicamente"""
+
+    def __init__(self, session_factory, intervalo: float, vencimiento_reservas: float):
+        self.session_factory = session_factory
+        self.intervalo = intervalo
+        self.vencimiento_reservas = vencimiento_reservas
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def ejecutar(self) -> Dict[str, int]:
+        db = self.session_factory()
+        try:
+            libro = LibroTokens(db)
+            return {
+                "reservas_liberadas": libro.liberar_vencidas(self.vencimiento_reservas),
+                "consolidados": libro.consolidar()
+            }
+        finally:
+            db.close()
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.ejecutar()
+            except Exception as e:
+                logger.error(f"❌ Error consolidando consumos de tokens: {e}")
+
+    def iniciar(self):
+        """Arranca el hilo (idempotente)"""
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="token-ledger", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+
+_consolidador: Optional[ConsolidadorTokens] = None
+_consolidador_lock = threading.Lock()
+
+
+def get_consolidador() -> ConsolidadorTokens:
+    """Obtiene (o crea) el consolidador global"""
+    global _consolidador
+    if _consolidador is None:
+        with _consolidador_lock:
+            if _consolidador is None:
+                from app.core.database import SessionLocal
+                _consolidador = ConsolidadorTokens(
+                    session_factory=SessionLocal,
+                    intervalo=settings.TOKENS_CONSOLIDACION_SEGUNDOS,
+                    vencimiento_reservas=settings.TOKENS_RESERVA_VENCE_SEGUNDOS
+                )
+    return _consolidador
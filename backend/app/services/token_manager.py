@@ -1,13 +1,19 @@
 """
 Token Manager - Gestor de límites de tokens para usuarios
 Sistema de control de consumo con planes Free/Pro/Enterprise
+
+El saldo se mueve con UPDATEs condicionales y cada movimiento queda en el
+libro de consumo (ver services/token_ledger.py): dos llamadas simultáneas
+del mismo usuario nunca superan su límite.
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 from app.models.usuario import Usuario
 from app.core.features import FeatureFlags
+from app.services.token_ledger import LibroTokens, Saldo
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +38,23 @@ class TokenManager:
 
     def __init__(self, db: Session):
         self.db = db
+        self.libro = LibroTokens(db)
+
+    def _saldo(self, usuario_id: int):
+        """Columnas de tokens del usuario (reseteando el periodo si venció)"""
+        consulta = select(
+            Usuario.email, Usuario.plan, Usuario.tokens_mensuales, Usuario.tokens_usados,
+            Usuario.tokens_extra, Usuario.fecha_reset_tokens, Usuario.total_tokens_historico
+        ).where(Usuario.id == usuario_id)
+
+        fila = self.db.execute(consulta).first()
+        if fila is None:
+            return None
+        vencido = fila.fecha_reset_tokens is None or fila.fecha_reset_tokens < datetime.now()
+        if vencido and self.libro.resetear_si_vencido(usuario_id):
+            logger.info(f"🔄 Tokens reseteados para usuario {usuario_id} ({fila.email})")
+            fila = self.db.execute(consulta).first()
+        return fila
 
     def verificar_tokens(self, usuario_id: int, tokens_requeridos: int) -> tuple[bool, str]:
         """
@@ -49,25 +72,18 @@ class TokenManager:
             logger.info(f"🔓 TokenManager OFF - Permitiendo operación sin verificar tokens")
             return True, "Modo desarrollo - tokens ilimitados"
 
-        # Buscar usuario
-        usuario = self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        if not usuario:
+        fila = self._saldo(usuario_id)
+        if fila is None:
             return False, "Usuario no encontrado"
 
-        # Verificar si necesita reset de tokens (nuevo mes)
-        if usuario.necesita_reset_tokens():
-            usuario.resetear_tokens()
-            self.db.commit()
-            logger.info(f"🔄 Tokens reseteados para usuario {usuario.id} ({usuario.email})")
-
-        # Verificar disponibilidad
-        disponibles = usuario.tokens_disponibles()
+        # Verificar disponibilidad (orientativo: el descuento real es atómico en consumir_tokens)
+        disponibles = Saldo(fila.tokens_usados or 0, fila.tokens_mensuales or 0, fila.tokens_extra or 0).disponibles
 
         if disponibles >= tokens_requeridos:
             return True, f"Tokens disponibles: {disponibles:,}"
         else:
             faltante = tokens_requeridos - disponibles
-            return False, f"Tokens insuficientes. Necesitas {faltante:,} más. Considera upgradearte a plan {self._sugerir_plan(usuario.plan)}"
+            return False, f"Tokens insuficientes. Necesitas {faltante:,} más. Considera upgradearte a plan {self._sugerir_plan(fila.plan)}"
 
     def consumir_tokens(self, usuario_id: int, tokens: int, operacion: str = "") -> bool:
         """
@@ -86,109 +102,115 @@ class TokenManager:
             logger.info(f"🔓 TokenManager OFF - No consumiendo tokens")
             return True
 
-        usuario = self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        if not usuario:
-            logger.error(f"❌ Usuario {usuario_id} no encontrado")
+        saldo = self.libro.consumir(usuario_id, tokens, operacion)
+        if saldo is None:
+            logger.error(f"❌ No se pudieron consumir {tokens:,} tokens para usuario {usuario_id}")
             return False
 
-        if usuario.consumir_tokens(tokens):
-            self.db.commit()
-            disponibles = usuario.tokens_disponibles()
-            porcentaje_usado = (usuario.tokens_usados / usuario.tokens_mensuales) * 100
+        self._log_consumo(usuario_id, tokens, operacion, saldo)
+        return True
 
-            logger.info(
-                f"✅ Tokens consumidos: {tokens:,} | "
-                f"Usuario: {usuario.email} | "
-                f"Operación: {operacion} | "
-                f"Disponibles: {disponibles:,} ({100-porcentaje_usado:.1f}% restante)"
+    def _log_consumo(self, usuario_id: int, tokens: int, operacion: str, saldo: Saldo):
+        porcentaje_usado = saldo.porcentaje_usado
+        logger.info(
+            f"✅ Tokens consumidos: {tokens:,} | "
+            f"Usuario: {usuario_id} | "
+            f"Operación: {operacion} | "
+            f"Disponibles: {saldo.disponibles:,} ({100-porcentaje_usado:.1f}% restante)"
+        )
+
+        # Alerta si está por acabarse los tokens
+        if porcentaje_usado >= 90:
+            logger.warning(
+                f"⚠️ Usuario {usuario_id} ha usado {porcentaje_usado:.1f}% de sus tokens"
             )
 
-            # Alerta si está por acabarse los tokens
-            if porcentaje_usado >= 90:
-                logger.warning(
-                    f"⚠️ Usuario {usuario.email} ha usado {porcentaje_usado:.1f}% de sus tokens"
-                )
+    # ═══════════════════════════════════════════════════════════════
+    # RESERVAS (streaming: el consumo real se conoce al terminar)
+    # ═══════════════════════════════════════════════════════════════
+
+    def reservar_tokens(self, usuario_id: int, tokens_estimados: int, operacion: str = "") -> Optional[int]:
+        """
+        Aparta tokens antes de una llamada en streaming
+
+        Args:
+            usuario_id: ID del usuario
+            tokens_estimados: Estimación (cuenta contra el límite hasta confirmar)
+            operacion: Descripción de la operación
+
+        Returns:
+            Id de la reserva (0 con TokenManager OFF), o None si no alcanzan
+        """
+        if not FeatureFlags.TOKEN_MANAGER:
+            return 0
 
+        reserva_id = self.libro.reservar(usuario_id, tokens_estimados, operacion)
+        if reserva_id is None:
+            logger.error(f"❌ No se pudieron reservar {tokens_estimados:,} tokens para usuario {usuario_id}")
+        return reserva_id
+
+    def confirmar_reserva(self, reserva_id: int, tokens_reales: int) -> bool:
+        """
+        Confirma una reserva con los tokens realmente usados
+        (la diferencia con la estimación vuelve al saldo o se descuenta)
+        """
+        if not FeatureFlags.TOKEN_MANAGER or not reserva_id:
             return True
-        else:
-            logger.error(f"❌ No se pudieron consumir {tokens:,} tokens para usuario {usuario.email}")
+
+        saldo = self.libro.confirmar(reserva_id, tokens_reales)
+        if saldo is None:
+            logger.error(f"❌ Reserva de tokens {reserva_id} inexistente o ya cerrada")
             return False
+        logger.info(f"✅ Reserva {reserva_id} confirmada: {tokens_reales:,} tokens | Disponibles: {saldo.disponibles:,}")
+        return True
+
+    def liberar_reserva(self, reserva_id: int) -> bool:
+        """Devuelve una reserva completa (llamada cancelada o fallida)"""
+        if not FeatureFlags.TOKEN_MANAGER or not reserva_id:
+            return True
+        return self.libro.liberar(reserva_id) is not None
 
     def get_estadisticas_usuario(self, usuario_id: int) -> dict:
         """Retorna estadísticas de tokens del usuario"""
-        usuario = self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        if not usuario:
+        fila = self._saldo(usuario_id)
+        if fila is None:
             return {}
 
-        if usuario.necesita_reset_tokens():
-            usuario.resetear_tokens()
-            self.db.commit()
-
-        disponibles = usuario.tokens_disponibles()
-        porcentaje_usado = (usuario.tokens_usados / usuario.tokens_mensuales) * 100
+        saldo = Saldo(fila.tokens_usados or 0, fila.tokens_mensuales or 0, fila.tokens_extra or 0)
 
         return {
-            "plan": usuario.plan,
-            "tokens_mensuales": usuario.tokens_mensuales,
-            "tokens_usados": usuario.tokens_usados,
-            "tokens_disponibles": disponibles,
-            "tokens_extra": usuario.tokens_extra,
-            "porcentaje_usado": round(porcentaje_usado, 2),
-            "fecha_reset": usuario.fecha_reset_tokens.isoformat() if usuario.fecha_reset_tokens else None,
-            "total_historico": usuario.total_tokens_historico,
+            "plan": fila.plan,
+            "tokens_mensuales": fila.tokens_mensuales,
+            "tokens_usados": fila.tokens_usados,
+            "tokens_disponibles": saldo.disponibles,
+            "tokens_extra": fila.tokens_extra,
+            "porcentaje_usado": round(saldo.porcentaje_usado, 2),
+            "fecha_reset": fila.fecha_reset_tokens.isoformat() if fila.fecha_reset_tokens else None,
+            "total_historico": fila.total_tokens_historico,
         }
 
-    def get_estadisticas_globales(self) -> dict:
-        """Retorna estadísticas globales del sistema"""
-        from sqlalchemy import func
-
-        # Total usuarios
-        total_usuarios = self.db.query(Usuario).count()
-
-        # Usuarios por plan
-        usuarios_free = self.db.query(Usuario).filter(Usuario.plan == "free").count()
-        usuarios_pro = self.db.query(Usuario).filter(Usuario.plan == "pro").count()
-        usuarios_enterprise = self.db.query(Usuario).filter(Usuario.plan == "enterprise").count()
-
-        # Capacidad total
-        capacidad_total = self.db.query(func.sum(Usuario.tokens_mensuales)).scalar() or 0
-        tokens_usados = self.db.query(func.sum(Usuario.tokens_usados)).scalar() or 0
-        tokens_disponibles = capacidad_total - tokens_usados
+    def get_estadisticas_globales(self, dias: int = 30) -> dict:
+        """
+        Retorna estadísticas globales del sistema
+        Totales del snapshot de métricas (sin SUM sobre usuarios por request)
+        y consumo diario de la tabla consolidada del libro.
+        """
+        from app.services.dashboard_metrics import get_dashboard_metrics
 
-        # Tokens históricos
-        tokens_historico = self.db.query(func.sum(Usuario.total_tokens_historico)).scalar() or 0
-
-        return {
-            "total_usuarios": total_usuarios,
-            "usuarios_por_plan": {
-                "free": usuarios_free,
-                "pro": usuarios_pro,
-                "enterprise": usuarios_enterprise
-            },
-            "capacidad_total": capacidad_total,
-            "tokens_usados": tokens_usados,
-            "tokens_disponibles": tokens_disponibles,
-            "porcentaje_usado": round((tokens_usados / capacidad_total * 100), 2) if capacidad_total > 0 else 0,
-            "tokens_historico": tokens_historico
-        }
+        estadisticas = get_dashboard_metrics().estadisticas_tokens()
+        estadisticas["consumo_diario"] = self.libro.resumen_diario(dias)
+        estadisticas["consumo_por_operacion"] = self.libro.resumen_por_operacion(dias)
+        return estadisticas
 
     def resetear_tokens_usuarios(self) -> int:
         """
         Resetea los tokens de TODOS los usuarios que necesitan reset
-        Se ejecuta como cron job mensual
+        Se ejecuta como cron job mensual (un solo UPDATE)
 
         Returns:
             int: Cantidad de usuarios reseteados
         """
-        usuarios = self.db.query(Usuario).all()
-        reseteados = 0
-
-        for usuario in usuarios:
-            if usuario.necesita_reset_tokens():
-                usuario.resetear_tokens()
-                reseteados += 1
-
-        self.db.commit()
+        reseteados = self.libro.resetear_si_vencido()
         logger.info(f"🔄 Reset mensual completado: {reseteados} usuarios reseteados")
         return reseteados
 
@@ -212,12 +234,15 @@ class TokenManager:
         Returns:
             bool: True si se agregaron exitosamente
         """
-        usuario = self.db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        if not usuario:
-            return False
-
-        usuario.tokens_extra += tokens
+        resultado = self.db.execute(
+            update(Usuario)
+            .where(Usuario.id == usuario_id)
+            .values(tokens_extra=func.coalesce(Usuario.tokens_extra, 0) + tokens)
+            .execution_options(synchronize_session=False)
+        )
         self.db.commit()
+        if not resultado.rowcount:
+            return False
 
-        logger.info(f"💰 Tokens extra agregados: {tokens:,} para usuario {usuario.email}")
+        logger.info(f"💰 Tokens extra agregados: {tokens:,} para usuario {usuario_id}")
         return True
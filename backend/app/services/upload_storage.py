@@ -0,0 +1,167 @@
+"""
+📥 UPLOAD STORAGE - Escritura de uploads a disco en streaming
+📁 RUTA: backend/app/services/upload_storage.py
+
+Copia el UploadFile a disco por bloques (UPLOAD_CHUNK_SIZE_KB) sin cargarlo
+entero en memoria, y corta apenas se supera el tamaño máximo permitido.
+
+Starlette parsea (y guarda en un temporal) todo el multipart ANTES de llamar
+al endpoint, así que el límite también se aplica antes, en
+LimiteUploadMiddleware: por Content-Length o contando el cuerpo a medida que
+llega (uploads chunked), responde 413 sin seguir leyendo.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ArchivoDemasiadoGrandeError(ValueError):
+    """El upload superó el tamaño máximo permitido"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Archivo demasiado grande. Máximo: {max_bytes / (1024 * 1024):.1f} MB")
+
+
+def verificar_content_length(content_length: Optional[str], max_bytes: int):
+    """Rechaza antes de leer si el cliente declara un cuerpo mayor al límite"""
+    try:
+        declarado = int(content_length) if content_length else None
+    except ValueError:
+        declarado = None
+    if declarado is not None and declarado > max_bytes:
+        raise ArchivoDemasiadoGrandeError(max_bytes)
+
+
+class LimiteUploadMiddleware:
+    """
+    Middleware ASGI: corta con 413 los uploads a `rutas` cuyo cuerpo supera
+    max_bytes (+ margen para las cabeceras multipart) sin leerlos completos.
+    """
+
+    def __init__(self, app, rutas: Iterable[str], max_bytes: int, margen: int = 64 * 1024):
+        self.app = app
+        self.rutas = frozenset(rutas)
+        self.max_bytes = max_bytes
+        self.limite = max_bytes + margen
+
+    async def _responder_413(self, send):
+        cuerpo = json.dumps(
+            {"detail": str(ArchivoDemasiadoGrandeError(self.max_bytes))}, ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.rutas:
+            await self.app(scope, receive, send)
+            return
+
+        cabeceras = dict(scope.get("headers") or [])
+        try:
+            verificar_content_length(cabeceras.get(b"content-length", b"").decode() or None, self.limite)
+        except ArchivoDemasiadoGrandeError:
+            await self._responder_413(send)
+            return
+
+        recibidos = 0
+        excedido = False
+        respuesta_iniciada = False
+
+        async def recibir():
+            nonlocal recibidos, excedido
+            if excedido:
+                return {"type": "http.disconnect"}
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > self.limite:
+                    # Dejar de leer: para la app el cliente se desconectó
+                    # (una excepción aquí la convertiría en 400 el parser)
+                    excedido = True
+                    return {"type": "http.disconnect"}
+            return mensaje
+
+        async def enviar(mensaje):
+            nonlocal respuesta_iniciada
+            if excedido and not respuesta_iniciada:
+                # La respuesta de la app al cuerpo cortado se reemplaza por el 413
+                return
+            if mensaje["type"] == "http.response.start":
+                respuesta_iniciada = True
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        except Exception:
+            if not excedido:
+                raise
+        if excedido:
+            logger.warning(f"📥 Upload rechazado en {scope['path']}: más de {self.limite} bytes")
+            if not respuesta_iniciada:
+                await self._responder_413(send)
+
+
+async def guardar_upload_streaming(
+    archivo: UploadFile,
+    destino: Path,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> int:
+    """
+    Guarda el upload en `destino` por bloques.
+
+    Args:
+        archivo: UploadFile de FastAPI
+        destino: Ruta final del archivo
+        max_bytes: Tamaño máximo (default: settings.MAX_FILE_SIZE)
+        chunk_size: Bytes por bloque (default: UPLOAD_CHUNK_SIZE_KB)
+
+    Returns:
+        Bytes escritos
+
+    Raises:
+        ArchivoDemasiadoGrandeError: si se supera max_bytes (el archivo parcial se elimina)
+    """
+    max_bytes = max_bytes or settings.MAX_FILE_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE_KB * 1024
+
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(destino.name + ".part")
+
+    escritos = 0
+    try:
+        with open(temporal, "wb") as f:
+            while True:
+                bloque = await archivo.read(chunk_size)
+                if not bloque:
+                    break
+                escritos += len(bloque)
+                if escritos > max_bytes:
+                    raise ArchivoDemasiadoGrandeError(max_bytes)
+                f.write(bloque)
+        os.replace(temporal, destino)
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        raise
+
+    logger.info(f"📥 Upload guardado en streaming: {destino.name} ({escritos} bytes)")
+    return escritos
@@ -262,7 +262,8 @@ class WordGenerator:
 
         # Valores por defecto según tipo de documento
         if "cotizacion" in tipo_documento:
-            datos_procesados.setdefault("numero", self._generar_numero_cotizacion())
+            if not datos_procesados.get("numero"):
+                datos_procesados["numero"] = self._generar_numero_cotizacion()
             datos_procesados.setdefault("vigencia", "30 días calendario")
             if not datos_procesados.get("observaciones"):
                 obs_base = "Precios incluyen IGV."
@@ -605,9 +606,13 @@ class WordGenerator:
         doc.add_paragraph()  # Espacio
     
     def _generar_numero_cotizacion(self) -> str:
-        """Genera número único de cotización"""
-        fecha = datetime.now()
-        return f"COT-{fecha.strftime('%Y%m%d')}-001"
+        """
+        Número provisional para un documento sin número asignado. El
+        correlativo real (services/numeracion.py) se toma al guardar la
+        cotización; tomarlo aquí dejaría huecos por cada vista previa.
+        """
+        from app.services.numeracion import numero_borrador_cotizacion
+        return numero_borrador_cotizacion()
     
     # ═══════════════════════════════════════════════════════════════
     # 🔄 MÉTODOS AUXILIARES PARA FORMATEO
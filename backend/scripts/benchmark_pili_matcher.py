@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+Benchmark del matcher de PILI
+Compara la detección/extracción lineal (un `in` por keyword y un
+`re.search` por patrón) con el matcher compilado de app.services.pili_matcher,
+verificando que ambos den el mismo resultado, a medida que crecen las
+listas de keywords.
+
+Uso:
+    python scripts/benchmark_pili_matcher.py
+    python scripts/benchmark_pili_matcher.py --corpus mensajes.txt --tamanos 0 500 5000
+
+El corpus es un archivo de texto (un mensaje por línea) o JSONL con un
+campo "mensaje" / "content" (p. ej. un export del historial de chat).
+"""
+import argparse
+import copy
+import json
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.pili_brain import SERVICIOS_PILI  # noqa: E402
+from app.services import pili_matcher  # noqa: E402
+from app.services.pili_matcher import MatcherPILI  # noqa: E402
+
+CORPUS_BASE = [
+    "Necesito cotizar la instalación eléctrica de una casa de 150 m2 de 2 pisos",
+    "Hola, quiero una cotización para mi departamento de 85 metros cuadrados",
+    "Cotización para un local comercial de 200m² con 30 puntos de luz y 25 tomacorrientes",
+    "Tenemos una fábrica con motores de 50 HP y 3 tableros, necesitamos el proyecto ejecutivo",
+    "Sistema contraincendios para oficina de 450 m2: 40 detectores, rociadores y alarma NFPA 72",
+    "Quiero automatizar mi casa con domótica KNX, control de 12 luces y persianas inteligentes",
+    "Necesito el expediente técnico para la licencia de construcción en la municipalidad",
+    "Cisterna de 10 m3 con bomba de 1.5 hp y tanque elevado para edificio de 5 niveles",
+    "Certificado ITSE para restaurante, inspección de defensa civil y seguridad",
+    "Pozo a tierra para mi negocio, resistencia menor a 5 ohm, puesta a tierra SPT",
+    "Instalar 16 cámaras CCTV con red ethernet y wifi para vigilancia del almacén",
+    "Remodelación de la instalación eléctrica, actualización del tablero de 3 plantas",
+    "Ampliación de la red de datos de la oficina, 48 puntos de red cat6",
+    "hola",
+    "¿Cuánto cuesta?",
+    "Quiero un informe con análisis de cargas y cronograma detallado tipo Gantt (PMI)",
+    "Área de 320 para una planta industrial con 75 kw instalados",
+    "Vivienda nueva desde cero, 3 pisos, 120 m cuadrados por piso",
+    "Proyecto grande con varios sistemas: incendio, cámaras, control de acceso",
+    "Presupuesto de saneamiento: agua fría, desagüe y aparatos sanitarios para 4 departamentos",
+]
+
+
+# ═══════════════════════════════════════════════════════════════
+# Implementación lineal (referencia)
+# ═══════════════════════════════════════════════════════════════
+
+def _primer_numero(patrones, mensaje, conversor):
+    for patron in patrones:
+        match = re.search(patron, mensaje.lower())
+        if match:
+            return conversor(match.group(1))
+    return None
+
+
+def analizar_lineal(servicios, mensaje):
+    mensaje_lower = mensaje.lower()
+    scores = {}
+    for codigo, info in servicios.items():
+        scores[codigo] = sum(10 for keyword in info["keywords"] if keyword in mensaje_lower)
+    servicio = max(scores, key=scores.get) if max(scores.values()) > 0 else "electrico-residencial"
+
+    tipo = "nueva"
+    for nombre, palabras in pili_matcher.TIPOS_INSTALACION:
+        if any(palabra in mensaje.lower() for palabra in palabras):
+            tipo = nombre
+            break
+
+    area = _primer_numero(pili_matcher.PATRONES_AREA, mensaje, float)
+    pisos = _primer_numero(pili_matcher.PATRONES_PISOS, mensaje, int)
+    complejo = any(i in mensaje_lower for i in pili_matcher.INDICADORES_COMPLEJO)
+    if not complejo:
+        area_complejidad = _primer_numero(pili_matcher.PATRONES_AREA, mensaje, float)
+        complejo = bool(area_complejidad) and area_complejidad > 300
+    return (
+        servicio,
+        area,
+        1 if pisos is None else pisos,
+        _primer_numero(pili_matcher.PATRONES_CANTIDAD, mensaje, int),
+        _primer_numero(pili_matcher.PATRONES_POTENCIA, mensaje, float),
+        tipo,
+        "complejo" if complejo else "simple",
+    )
+
+
+def analizar_compilado(matcher, mensaje):
+    a = matcher.analizar(mensaje)
+    return (a.servicio, a.area_m2, a.num_pisos, a.cantidad_puntos,
+            a.potencia_hp, a.tipo_instalacion, a.complejidad)
+
+
+# ═══════════════════════════════════════════════════════════════
+# Utilidades
+# ═══════════════════════════════════════════════════════════════
+
+def cargar_corpus(ruta):
+    if not ruta:
+        return list(CORPUS_BASE)
+    mensajes = []
+    for linea in Path(ruta).read_text(encoding="utf-8").splitlines():
+        linea = linea.strip()
+        if not linea:
+            continue
+        if linea.startswith("{"):
+            datos = json.loads(linea)
+            linea = datos.get("mensaje") or datos.get("content") or ""
+        if linea:
+            mensajes.append(linea)
+    return mensajes
+
+
+def servicios_ampliados(extra, semilla=42):
+    """SERVICIOS_PILI con `extra` keywords sintéticas repartidas entre servicios"""
+    servicios = copy.deepcopy(SERVICIOS_PILI)
+    azar = random.Random(semilla)
+    codigos = list(servicios)
+    for i in range(extra):
+        largo = azar.randint(5, 12)
+        palabra = "".join(azar.choice(string.ascii_lowercase) for _ in range(largo))
+        servicios[codigos[i % len(codigos)]]["keywords"].append(palabra)
+    return servicios
+
+
+def medir(funcion, mensajes, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for mensaje in mensajes:
+            funcion(mensaje)
+    return (time.perf_counter() - inicio) / (repeticiones * len(mensajes)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del matcher de PILI")
+    parser.add_argument("--corpus", help="Archivo de mensajes (texto o JSONL)")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[0, 100, 1000, 5000],
+                        help="Keywords sintéticas adicionales por corrida")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    mensajes = cargar_corpus(args.corpus)
+    print("=" * 60)
+    print(f"BENCHMARK PILI MATCHER - {len(mensajes)} mensajes")
+    print("=" * 60)
+    print(f"{'keywords':>10} {'lineal (us)':>14} {'compilado (us)':>16} {'speedup':>9}")
+
+    for extra in args.tamanos:
+        servicios = servicios_ampliados(extra)
+        matcher = MatcherPILI(servicios)
+        total_keywords = sum(len(s["keywords"]) for s in servicios.values())
+
+        for mensaje in mensajes:
+            esperado = analizar_lineal(servicios, mensaje)
+            obtenido = analizar_compilado(matcher, mensaje)
+            if esperado != obtenido:
+                print(f"❌ Resultados distintos para {mensaje!r}:\n   {esperado}\n   {obtenido}")
+                sys.exit(1)
+
+        lineal = medir(lambda m: analizar_lineal(servicios, m), mensajes, args.repeticiones)
+        compilado = medir(matcher.analizar, mensajes, args.repeticiones)
+        print(f"{total_keywords:>10} {lineal:>14.1f} {compilado:>16.1f} {lineal / compilado:>8.1f}x")
+
+    print("✅ Mismos resultados en todas las corridas")
+
+
+if __name__ == "__main__":
+    main()
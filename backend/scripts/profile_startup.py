@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Perfil de arranque de la API
+Mide, en procesos nuevos (arranque en frío), cuánto tarda `import app.main`
+y cuánto tardarían además los servicios diferidos (app.core.lazy) si se
+cargaran al inicio, como antes. Con --importtime muestra los módulos más
+costosos según `python -X importtime`.
+
+Uso:
+    python scripts/profile_startup.py
+    python scripts/profile_startup.py --importtime --top 30
+    python scripts/profile_startup.py --repeticiones 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Se ejecuta en el proceso hijo: importa la app y luego precarga todo
+MEDICION = """
+import json, time
+inicio = time.perf_counter()
+import app.main
+importar = time.perf_counter() - inicio
+from app.core.lazy import precalentar
+inicio = time.perf_counter()
+servicios = precalentar()
+print(json.dumps({"importar": importar, "precalentar": time.perf_counter() - inicio, "servicios": servicios}))
+"""
+
+
+def _entorno():
+    entorno = dict(os.environ)
+    entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND_DIR), entorno.get("PYTHONPATH")]))
+    entorno["PRECALENTAR_SERVICIOS"] = "false"  # la medición precarga explícitamente
+    entorno["LOG_LEVEL"] = "WARNING"
+    return entorno
+
+
+def medir_arranque():
+    resultado = subprocess.run(
+        [sys.executable, "-c", MEDICION],
+        cwd=BACKEND_DIR, env=_entorno(), capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        print(resultado.stderr[-2000:])
+        sys.exit(resultado.returncode)
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def reporte_importtime(top):
+    """Módulos ordenados por tiempo acumulado (µs) de `-X importtime`"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=_entorno(), capture_output=True, text=True
+    )
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|")
+        filas.append((int(acumulado), int(propio), modulo.strip()))
+
+    filas.sort(reverse=True)
+    print(f"{'acumulado (ms)':>15} {'propio (ms)':>12}  módulo")
+    for acumulado, propio, modulo in filas[:top]:
+        print(f"{acumulado / 1000:>15.1f} {propio / 1000:>12.1f}  {modulo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de arranque de la API")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="Reporte de python -X importtime")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"PERFIL DE ARRANQUE - {args.repeticiones} procesos en frío")
+    print("=" * 60)
+
+    mediciones = [medir_arranque() for _ in range(args.repeticiones)]
+    importar = statistics.median(m["importar"] for m in mediciones)
+    precalentar = statistics.median(m["precalentar"] for m in mediciones)
+
+    print(f"import app.main (diferido):      {importar:8.2f} s")
+    print(f"+ servicios diferidos:           {precalentar:8.2f} s")
+    print(f"= arranque con carga inmediata:  {importar + precalentar:8.2f} s")
+    print()
+    print("Servicios diferidos (última corrida):")
+    for nombre, segundos in sorted(mediciones[-1]["servicios"].items(), key=lambda x: -x[1]):
+        print(f"  {segundos:6.2f} s  {nombre}")
+
+    if args.importtime:
+        print()
+        reporte_importtime(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Entrenamiento offline de los modelos del motor ML local
+Entrena el clasificador de servicios y lo persiste en models_dir
+(backend/ml_models por defecto) como artefacto versionado. Los workers de la
+API cargan ese archivo en lugar de entrenar al arrancar.
+
+Uso:
+    python scripts/train_ml_models.py
+    python scripts/train_ml_models.py --models-dir /srv/pili/ml_models
+    python scripts/train_ml_models.py --si-cambio     # solo si cambiaron los datos
+    python scripts/train_ml_models.py --listar
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.professional.ml.ml_engine import CLASSIFIER_NAME, MLEngine  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena los modelos del motor ML local")
+    parser.add_argument("--models-dir", default=None, help="Directorio de artefactos")
+    parser.add_argument("--si-cambio", action="store_true",
+                        help="No reentrenar si ya existe el artefacto de estos datos")
+    parser.add_argument("--conservar", type=int, default=3, help="Versiones antiguas a conservar")
+    parser.add_argument("--listar", action="store_true", help="Solo mostrar versiones existentes")
+    args = parser.parse_args()
+
+    engine = MLEngine(models_dir=args.models_dir)
+    engine.model_store.keep_versions = args.conservar
+
+    if not args.listar:
+        manifest = engine.train(force=not args.si_cambio)
+        print(json.dumps(manifest, indent=2, ensure_ascii=False))
+
+    print()
+    print(f"Versiones en {engine.models_dir}:")
+    vigente = (engine.model_store.manifest(CLASSIFIER_NAME) or {}).get("artifact")
+    for path in engine.model_store.versions(CLASSIFIER_NAME):
+        marca = "*" if path.name == vigente else " "
+        print(f"  {marca} {path.name}  {path.stat().st_size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Configuración de pruebas y fixtures compartidos
+Following testing-patterns: Shared fixtures and setup
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+import app.models  # noqa: F401  (registra todas las tablas en Base.metadata)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "unit: pruebas unitarias sin I/O externo")
+    config.addinivalue_line("markers", "integration: pruebas contra una base SQLite real")
+
+
+@pytest.fixture
+def engine_sqlite():
+    """Base SQLite en memoria compartida entre hilos, con todas las tablas"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def engine_archivo(tmp_path):
+    """Base SQLite en archivo: una conexión por hilo (pruebas de concurrencia)"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pruebas.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine_sqlite):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine_sqlite)
+
+
+@pytest.fixture
+def db_session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
@@ -0,0 +1,76 @@
+"""
+Pruebas de la carga diferida de servicios
+Following testing-patterns: AAA pattern, unit test principles
+"""
+import asyncio
+import sys
+import threading
+
+import pytest
+
+from app.core.lazy import ServicioDiferido, cargar
+
+
+@pytest.fixture
+def modulo_lento(tmp_path, monkeypatch):
+    """Módulo que tarda en importarse y cuenta cuántas veces se ejecutó"""
+    nombre = f"modulo_lento_{id(tmp_path)}"
+    (tmp_path / f"{nombre}.py").write_text(
+        "import time\n"
+        "import builtins\n"
+        "builtins.importaciones_lentas = getattr(builtins, 'importaciones_lentas', 0) + 1\n"
+        "time.sleep(0.3)\n"
+        "servicio = object()\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import builtins
+    builtins.importaciones_lentas = 0
+    yield nombre
+    sys.modules.pop(nombre, None)
+    del builtins.importaciones_lentas
+
+
+@pytest.mark.unit
+class TestServicioDiferido:
+
+    def test_cargar_keeps_event_loop_responsive(self, modulo_lento):
+        """El import corre en un hilo: el loop sigue atendiendo mientras tanto"""
+        # Arrange
+        servicio = ServicioDiferido(modulo_lento, "servicio")
+        ticks = 0
+
+        async def latir():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        async def escenario():
+            latido = asyncio.create_task(latir())
+            await cargar(servicio)
+            latido.cancel()
+
+        # Act
+        asyncio.run(escenario())
+
+        # Assert
+        assert servicio.cargado
+        assert ticks >= 10
+
+    def test_concurrent_resolution_imports_once(self, modulo_lento):
+        """Varios hilos a la vez obtienen el mismo objeto y el módulo se ejecuta una vez"""
+        # Arrange
+        import builtins
+        servicio = ServicioDiferido(modulo_lento, "servicio")
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(servicio.resolver())) for _ in range(4)]
+
+        # Act
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        # Assert
+        assert len({id(r) for r in resultados}) == 1
+        assert builtins.importaciones_lentas == 1
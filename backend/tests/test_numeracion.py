@@ -0,0 +1,44 @@
+"""
+Pruebas de la numeración atómica de cotizaciones
+Following testing-patterns: AAA pattern, unit test principles
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.numeracion import (
+    AsignadorSecuencias,
+    numero_borrador_cotizacion,
+    semilla_cotizaciones,
+)
+
+
+@pytest.mark.integration
+class TestAsignadorSecuencias:
+    """Contador por prefijo sobre SQLite"""
+
+    def test_concurrent_numbers_are_unique_and_consecutive(self, engine_archivo):
+        """Varios hilos no obtienen números repetidos ni saltos"""
+        # Arrange
+        asignador = AsignadorSecuencias(engine_archivo, semilla=semilla_cotizaciones)
+
+        # Act
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            numeros = list(pool.map(lambda _: asignador.siguiente("COT-202610"), range(40)))
+
+        # Assert
+        assert sorted(numeros) == list(range(1, 41))
+
+    def test_draft_number_does_not_consume_sequence(self, engine_sqlite):
+        """Las vistas previas no dejan huecos en la numeración"""
+        # Arrange
+        asignador = AsignadorSecuencias(engine_sqlite)
+        primero = asignador.siguiente("COT-202610")
+
+        # Act
+        borrador = numero_borrador_cotizacion()
+        segundo = asignador.siguiente("COT-202610")
+
+        # Assert
+        assert borrador.endswith("-BORRADOR")
+        assert segundo == primero + 1
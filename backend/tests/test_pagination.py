@@ -0,0 +1,85 @@
+"""
+Pruebas de la paginación keyset
+Following testing-patterns: AAA pattern, unit test principles
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.pagination import UMBRAL_ESTIMADO, paginar, total_aproximado
+from app.models.cliente import Cliente
+
+
+def _recorrer(db, limit):
+    """Todas las páginas siguiendo el cursor"""
+    vistos, cursor = [], None
+    while True:
+        filas, cursor = paginar(db.query(Cliente), Cliente, limit, cursor=cursor)
+        vistos += [c.id for c in filas]
+        if not cursor:
+            return vistos
+
+
+@pytest.mark.integration
+class TestPaginarKeyset:
+    """Keyset sobre (fecha_creacion DESC, id DESC) en SQLite"""
+
+    @pytest.fixture
+    def clientes(self, db_session):
+        base = datetime(2026, 1, 1)
+        for i in range(7):
+            # Tres fechas repetidas y tres filas sin fecha
+            fecha = base + timedelta(days=i % 3) if i < 4 else None
+            db_session.add(Cliente(nombre=f"Cliente {i}", ruc=f"2010000000{i}", fecha_creacion=fecha))
+        db_session.commit()
+        # fecha_creacion tiene server_default: forzar NULL en las últimas
+        db_session.query(Cliente).filter(Cliente.ruc >= "20100000004").update(
+            {Cliente.fecha_creacion: None}, synchronize_session=False
+        )
+        db_session.commit()
+        return [c.id for c in paginar(db_session.query(Cliente), Cliente, 100)[0]]
+
+    @pytest.mark.parametrize("limit", [1, 2, 3])
+    def test_pages_cover_every_row_once(self, db_session, clientes, limit):
+        """Ninguna fila se repite ni se salta, incluidas las de fecha NULL"""
+        # Act
+        vistos = _recorrer(db_session, limit)
+
+        # Assert
+        assert vistos == clientes
+        assert len(vistos) == 7
+
+
+@pytest.mark.unit
+class TestTotalAproximado:
+    """Estimación de pg_class.reltuples con respaldo a COUNT(*)"""
+
+    def _db(self, reltuples):
+        resultado = SimpleNamespace(scalar=lambda: reltuples)
+        return SimpleNamespace(
+            bind=SimpleNamespace(dialect=SimpleNamespace(name="postgresql")),
+            execute=lambda *args, **kwargs: resultado
+        )
+
+    def _query(self, total):
+        query = SimpleNamespace(count=lambda: total)
+        query.order_by = lambda *args: query
+        return query
+
+    @pytest.mark.parametrize("reltuples", [-1, 0, 42])
+    def test_invalid_or_small_estimate_counts(self, reltuples):
+        """Tabla sin analizar (-1/0) o chica: COUNT(*) exacto"""
+        # Act
+        total = total_aproximado(self._db(reltuples), self._query(17), Cliente, filtrado=False)
+
+        # Assert
+        assert total == 17
+
+    def test_large_table_uses_estimate(self):
+        """Tabla grande sin filtros: estadística del planificador"""
+        # Act
+        total = total_aproximado(self._db(UMBRAL_ESTIMADO * 3), self._query(17), Cliente, filtrado=False)
+
+        # Assert
+        assert total == UMBRAL_ESTIMADO * 3
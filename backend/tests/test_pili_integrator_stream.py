@@ -0,0 +1,100 @@
+"""
+Pruebas del streaming de conversación del PILIIntegrator
+Following testing-patterns: AAA pattern, unit test principles
+"""
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from app.services.llm_client import LLMClient, StubBackend
+from app.services.pili_integrator import PILIIntegrator
+
+
+class GeminiFalso:
+    """Mismo contrato que GeminiService.chat_conversacional_stream, sobre el backend stub"""
+
+    def __init__(self, llm, fallar=False):
+        self.llm = llm
+        self.fallar = fallar
+
+    async def chat_conversacional_stream(self, mensaje, historial, contexto=None):
+        if self.fallar:
+            raise RuntimeError("Gemini caído")
+        async with aclosing(self.llm.stream(mensaje)) as fragmentos:
+            async for fragmento in fragmentos:
+                yield fragmento
+
+
+def _integrador(gemini=None):
+    integrador = PILIIntegrator()
+    integrador.gemini_service = gemini
+    integrador.estado_servicios["gemini"] = gemini is not None
+    return integrador
+
+
+async def _eventos(integrador, mensaje, **kwargs):
+    return [evento async for evento in integrador.procesar_solicitud_stream(mensaje, "cotizacion-simple", **kwargs)]
+
+
+@pytest.mark.unit
+class TestProcesarSolicitudStream:
+    """Los fragmentos del LLM llegan uno a uno, antes del resultado"""
+
+    def test_llm_answer_arrives_in_several_tokens_before_result(self):
+        # Arrange
+        integrador = _integrador(GeminiFalso(LLMClient(StubBackend(latencia_ms=0))))
+
+        # Act
+        eventos = asyncio.run(_eventos(integrador, "instalación eléctrica para un local"))
+
+        # Assert
+        tipos = [evento["tipo"] for evento in eventos]
+        assert tipos.count("token") > 1
+        assert tipos[-1] == "resultado" and "resultado" not in tipos[:-1]
+        texto = "".join(evento["texto"] for evento in eventos if evento["tipo"] == "token")
+        assert eventos[-1]["respuesta"] == texto
+        assert eventos[-1]["modo"] == "GEMINI"
+
+    def test_gemini_failure_before_first_token_falls_back_to_local(self):
+        # Arrange
+        integrador = _integrador(GeminiFalso(LLMClient(StubBackend()), fallar=True))
+
+        # Act
+        eventos = asyncio.run(_eventos(integrador, "hola", servicio_forzado="cctv"))
+
+        # Assert
+        tokens = [evento for evento in eventos if evento["tipo"] == "token"]
+        assert len(tokens) == 1
+        assert eventos[-1]["success"] is True
+        assert eventos[-1]["respuesta"] == tokens[0]["texto"]
+        assert eventos[-1]["botones"]
+
+    def test_itse_never_uses_the_llm(self):
+        # Arrange
+        integrador = _integrador(GeminiFalso(LLMClient(StubBackend()), fallar=True))
+
+        # Act
+        eventos = asyncio.run(_eventos(integrador, "hola", servicio_forzado="itse"))
+
+        # Assert
+        assert eventos[-1]["success"] is True
+        assert eventos[-1]["modo"] != "GEMINI"
+
+    def test_closing_the_stream_releases_the_llm_slot(self):
+        # Arrange
+        llm = LLMClient(StubBackend(latencia_ms=0), max_concurrencia=1)
+        integrador = _integrador(GeminiFalso(llm))
+
+        async def escenario():
+            flujo = integrador.procesar_solicitud_stream("uno dos tres cuatro", "cotizacion-simple")
+            primero = await flujo.__anext__()
+            await flujo.aclose()
+            return primero, llm.semaforo.locked()
+
+        # Act
+        primero, ocupado = asyncio.run(escenario())
+
+        # Assert
+        assert primero["tipo"] == "token"
+        assert ocupado is False
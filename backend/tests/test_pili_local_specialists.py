@@ -0,0 +1,146 @@
+"""
+Pruebas de replay de los especialistas locales (fallback sin Gemini)
+Following testing-patterns: AAA pattern, unit test principles
+
+Cada servicio se recorre desde 'initial' con todas las opciones de sus
+botones y valores numéricos de borde hasta la cotización: ninguna
+combinación alcanzable debe terminar en KeyError.
+"""
+import copy
+
+import pytest
+
+from app.services.pili_local_specialists import LocalSpecialistFactory, obtener_grafo
+
+SERVICIOS = LocalSpecialistFactory.get_available_services()
+TEXTO_LIBRE = ["algo libre", "medio"]
+
+
+def _conversar(servicio, mensajes):
+    """Envía los mensajes en orden y retorna la última respuesta"""
+    especialista = LocalSpecialistFactory.create(servicio)
+    estado, respuesta = None, None
+    for mensaje in [""] + list(mensajes):
+        respuesta = especialista.process_message(mensaje, estado)
+        estado = respuesta["state"]
+    return respuesta
+
+
+def _es_cotizacion(respuesta):
+    return "items" in respuesta.get("datos_generados", {}) or respuesta["state"]["stage"] == "quotation"
+
+
+def _candidatos(grafo, respuesta):
+    """Mensajes posibles en la etapa actual: botones ofrecidos, opciones, bordes numéricos y texto libre"""
+    etapa = grafo.etapas.get(respuesta["state"]["stage"])
+    ofrecidos = [boton["value"] for boton in respuesta.get("botones", [])]
+    if etapa is None or etapa.type == "welcome":
+        return ofrecidos
+    if etapa.type == "buttons":
+        return sorted(set(ofrecidos) | set(etapa.valores)) + TEXTO_LIBRE
+    if etapa.type == "input_number":
+        validacion = etapa.validacion
+        bordes = {validacion.get("min", 0), validacion.get("max") or 100, 10}
+        return ofrecidos + [str(valor) for valor in sorted(bordes)]
+    if etapa.type == "input_text":
+        return ofrecidos + TEXTO_LIBRE
+    return []
+
+
+def _recorrer(servicio):
+    """Recorre todas las conversaciones alcanzables; retorna (cotizaciones, errores)"""
+    especialista = LocalSpecialistFactory.create(servicio)
+    grafo = obtener_grafo(servicio)
+    pendientes = [("", None, [])]
+    vistos, cotizaciones, errores = set(), 0, []
+    while pendientes:
+        mensaje, estado, camino = pendientes.pop()
+        try:
+            respuesta = especialista.process_message(mensaje, copy.deepcopy(estado))
+        except Exception as e:
+            errores.append((camino, repr(e)))
+            continue
+        if _es_cotizacion(respuesta):
+            cotizaciones += 1
+            continue
+        firma = (respuesta["state"]["stage"], repr(sorted(respuesta["state"]["data"].items())))
+        if firma in vistos:
+            continue
+        vistos.add(firma)
+        for siguiente in _candidatos(grafo, respuesta):
+            pendientes.append((siguiente, respuesta["state"], camino + [siguiente]))
+    return cotizaciones, errores
+
+
+@pytest.mark.unit
+class TestReplayServicios:
+    """Todas las rutas de cada servicio llegan a su cotización"""
+
+    @pytest.mark.parametrize("servicio", SERVICIOS)
+    def test_every_path_reaches_quotation_without_errors(self, servicio):
+        # Act
+        cotizaciones, errores = _recorrer(servicio)
+
+        # Assert
+        assert errores == []
+        assert cotizaciones > 0
+
+
+@pytest.mark.unit
+class TestRegresiones:
+    """Casos que antes fallaban con KeyError"""
+
+    def test_industrial_electricity_uses_its_own_prices(self):
+        """INDUSTRIAL no tiene punto_luz_empotrado: usa sus propias partidas"""
+        # Act
+        respuesta = _conversar("electricidad", ["INDUSTRIAL", "1000", "1", "80", "120", "2"])
+
+        # Assert
+        descripciones = [item["descripcion"] for item in respuesta["datos_generados"]["items"]]
+        assert descripciones[0] == "Puntos de luz industriales (80 und)"
+        assert respuesta["datos_generados"]["items"][0]["precio_unitario"] == 120
+
+    @pytest.mark.parametrize("tamano, precio", [("7", 650), ("10", 950), ("15", 1500)])
+    def test_every_hmi_size_has_a_price(self, tamano, precio):
+        # Act
+        respuesta = _conversar("automatizacion-industrial", ["AVANZADO", "16", "16", tamano])
+
+        # Assert
+        hmi = [i for i in respuesta["datos_generados"]["items"] if i["descripcion"].startswith("HMI")]
+        assert hmi[0]["precio_unitario"] == precio
+
+    def test_cctv_storage_uses_available_disks(self):
+        """3TB no existe: toma un disco de 4TB"""
+        # Act
+        respuesta = _conversar("cctv", ["IP", "10", "2MP", "15"])
+
+        # Assert
+        disco = [i for i in respuesta["datos_generados"]["items"] if i["descripcion"].startswith("Disco")]
+        assert disco[0]["descripcion"] == "Disco duro 4TB Purple (1 und)"
+
+    def test_cctv_large_storage_uses_several_disks(self):
+        # Act
+        respuesta = _conversar("cctv", ["IP", "64", "8MP", "365"])
+
+        # Assert
+        disco = [i for i in respuesta["datos_generados"]["items"] if i["descripcion"].startswith("Disco")][0]
+        assert disco["cantidad"] > 1
+
+    def test_typed_option_is_normalized(self):
+        """'medio' escrito a mano equivale al botón MEDIO"""
+        # Act
+        respuesta = _conversar("contraincendios", ["COMPLETO", "500", "2", "medio"])
+
+        # Assert
+        assert respuesta["state"]["data"]["nivel_riesgo"] == "MEDIO"
+        assert _es_cotizacion(respuesta)
+
+    def test_invalid_option_asks_again(self):
+        """Texto que no es una opción repite la pregunta con sus botones"""
+        # Act
+        respuesta = _conversar("expedientes", ["ARQUITECTURA", "500", "no sé"])
+
+        # Assert
+        assert respuesta["stage"] == "complejidad"
+        assert [b["value"] for b in respuesta["botones"]] == ["SIMPLE", "MEDIA", "ALTA"]
+        assert "complejidad" not in respuesta["state"]["data"]
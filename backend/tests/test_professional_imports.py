@@ -0,0 +1,49 @@
+"""
+Pruebas de importación perezosa del paquete professional
+Following testing-patterns: AAA pattern, unit test principles
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _ejecutar(codigo):
+    """Ejecuta en un intérprete limpio (sys.modules sin importaciones previas)"""
+    return subprocess.run(
+        [sys.executable, "-c", codigo], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120
+    )
+
+
+@pytest.mark.unit
+class TestPaqueteProfessional:
+    """Importar el motor ML no arrastra generadores, RAG ni gráficas"""
+
+    def test_ml_engine_imports_without_the_generators(self):
+        # Act
+        resultado = _ejecutar(
+            "import sys\n"
+            "from app.services.professional.ml.ml_engine import MLEngine\n"
+            "from app.services.professional.ml.model_store import ModelStore\n"
+            "cargados = [m for m in sys.modules if m.startswith('app.services.professional.')]\n"
+            "print(sorted({m.split('.')[3] for m in cargados}))\n"
+        )
+
+        # Assert
+        assert resultado.returncode == 0, resultado.stderr
+        assert resultado.stdout.strip().splitlines()[-1] == "['ml']"
+
+    def test_package_attribute_is_resolved_on_first_use(self):
+        # Act
+        resultado = _ejecutar(
+            "import app.services.professional as p\n"
+            "from app.services.professional.ml.ml_engine import MLEngine\n"
+            "print(p.MLEngine is MLEngine)\n"
+        )
+
+        # Assert
+        assert resultado.returncode == 0, resultado.stderr
+        assert resultado.stdout.strip().splitlines()[-1] == "True"
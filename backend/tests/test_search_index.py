@@ -0,0 +1,105 @@
+"""
+Pruebas del índice de búsqueda full-text
+Following testing-patterns: AAA pattern, unit test principles
+"""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql
+
+from app.models.cliente import Cliente
+from app.models.proyecto import Proyecto
+from app.services.search_index import (
+    SearchIndex,
+    _consulta_postgresql,
+    filtro_subcadena,
+)
+
+
+def _db_postgresql():
+    """Sesión falsa: ids_coincidentes solo consulta el nombre del dialecto"""
+    return SimpleNamespace(bind=SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+
+
+@pytest.mark.unit
+class TestConsultaPostgreSQL:
+    """SQL y parámetros de la rama PostgreSQL (sin servidor)"""
+
+    def test_proyecto_only_query_does_not_bind_prefijo(self):
+        """Proyectos no tienen clave: :prefijo no debe aparecer en el SQL ni en los parámetros"""
+        # Act
+        sql, params = _consulta_postgresql(["torre"], ["proyecto"])
+
+        # Assert
+        assert ":prefijo" not in sql
+        assert "prefijo" not in params
+
+    def test_proyecto_only_subquery_compiles(self):
+        """ids_coincidentes('proyecto') arma una subconsulta válida (antes: ArgumentError)"""
+        # Arrange
+        indice = SearchIndex(engine=None)
+        indice._disponible = True
+
+        # Act
+        subconsulta = indice.ids_coincidentes(_db_postgresql(), "proyecto", "torre norte")
+        compilado = subconsulta.compile(dialect=postgresql.dialect())
+
+        # Assert
+        assert "to_tsquery" in str(compilado)
+        assert compilado.params["tsquery"] == "torre:* & norte:*"
+
+    def test_code_term_binds_prefijo_for_entities_with_key(self):
+        """Un término con dígitos se busca también como prefijo literal de RUC/número"""
+        # Act
+        sql, params = _consulta_postgresql(["2012"], ["cliente", "proyecto"])
+
+        # Assert
+        assert ":prefijo" in sql
+        assert params["prefijo"] == "2012%"
+
+
+@pytest.mark.integration
+class TestBusquedaSQLite:
+    """Búsqueda real sobre FTS5"""
+
+    @pytest.fixture
+    def indice(self, engine_sqlite, db_session):
+        db_session.add_all([
+            Cliente(nombre="Constructora Andina SAC", ruc="20123456789", email="ventas@andina.pe"),
+            Cliente(nombre="Minera del Centro", ruc="20987654321", email="compras@centro.pe"),
+            Proyecto(nombre="Torre Norte", cliente="Constructora Andina SAC"),
+        ])
+        db_session.commit()
+        return SearchIndex(engine_sqlite)
+
+    def _clientes(self, db, indice, buscar):
+        coincidentes = indice.ids_coincidentes(db, "cliente", buscar)
+        filtro = or_(Cliente.id.in_(coincidentes), *filtro_subcadena(Cliente, "cliente", buscar))
+        return sorted(c.nombre for c in db.query(Cliente).filter(filtro))
+
+    def test_prefix_without_accents(self, db_session, indice):
+        """'construccion' y 'const' encuentran 'Constructora'"""
+        # Act
+        resultado = indice.buscar(db_session, "const", entidades=["cliente"])
+
+        # Assert
+        assert [r["titulo"] for r in resultado["resultados"]] == ["Constructora Andina SAC"]
+
+    def test_proyecto_only_search(self, db_session, indice):
+        """Búsqueda restringida a proyectos"""
+        # Act
+        resultado = indice.buscar(db_session, "torre", entidades=["proyecto"])
+
+        # Assert
+        assert [r["entidad"] for r in resultado["resultados"]] == ["proyecto"]
+
+    def test_cliente_ruc_substring_still_matches(self, db_session, indice):
+        """Un fragmento intermedio de RUC sigue encontrando al cliente"""
+        # Act / Assert
+        assert self._clientes(db_session, indice, "3456") == ["Constructora Andina SAC"]
+
+    def test_cliente_email_substring_still_matches(self, db_session, indice):
+        """Un fragmento de email (dominio) sigue encontrando al cliente"""
+        # Act / Assert
+        assert self._clientes(db_session, indice, "centro.pe") == ["Minera del Centro"]
@@ -0,0 +1,164 @@
+"""
+Pruebas del libro atómico de tokens
+Following testing-patterns: AAA pattern, unit test principles
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models.consumo_tokens import ConsumoTokens
+from app.models.usuario import Usuario
+from app.services.token_ledger import CONFIRMADO, LIBERADO, RESERVADO, LibroTokens
+
+LIMITE = 1000
+
+
+def _crear_usuario(factory, email="ana@tesla.pe", tokens_mensuales=LIMITE):
+    with factory() as db:
+        usuario = Usuario(
+            nombre="Ana", apellido="Quispe", email=email,
+            tokens_mensuales=tokens_mensuales, tokens_usados=0, tokens_extra=0,
+            total_tokens_historico=0,
+            fecha_reset_tokens=datetime.now() + timedelta(days=30)
+        )
+        db.add(usuario)
+        db.commit()
+        return usuario.id
+
+
+def _usados(factory, usuario_id):
+    with factory() as db:
+        return db.execute(select(Usuario.tokens_usados).where(Usuario.id == usuario_id)).scalar_one()
+
+
+def _con_libro(factory, operacion):
+    with factory() as db:
+        return operacion(LibroTokens(db))
+
+
+@pytest.fixture
+def factory(engine_archivo):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine_archivo)
+
+
+@pytest.mark.integration
+class TestConcurrencia:
+    """Varios hilos mueven el mismo saldo sin superar el límite"""
+
+    def test_concurrent_consume_never_exceeds_limit(self, factory):
+        # Arrange
+        usuario_id = _crear_usuario(factory)
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            saldos = list(pool.map(
+                lambda _: _con_libro(factory, lambda libro: libro.consumir(usuario_id, 30, "chat")),
+                range(50)
+            ))
+
+        # Assert
+        aceptados = [saldo for saldo in saldos if saldo is not None]
+        assert len(aceptados) == LIMITE // 30
+        assert _usados(factory, usuario_id) == len(aceptados) * 30
+
+    def test_concurrent_reserve_and_confirm_keeps_balance_consistent(self, factory):
+        """El saldo final es la suma de los consumos reales confirmados"""
+        # Arrange
+        usuario_id = _crear_usuario(factory)
+
+        def reservar_y_confirmar(i):
+            with factory() as db:
+                libro = LibroTokens(db)
+                reserva_id = libro.reservar(usuario_id, 50, "stream")
+                if reserva_id is None:
+                    return None
+                if i % 3 == 0:
+                    libro.liberar(reserva_id)
+                    return 0
+                libro.confirmar(reserva_id, 20)
+                return 20
+
+        def consumir(_):
+            return _con_libro(factory, lambda libro: 10 if libro.consumir(usuario_id, 10, "chat") else None)
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            reservas = pool.map(reservar_y_confirmar, range(30))
+            consumos = pool.map(consumir, range(30))
+            gastado = sum(t for t in list(reservas) + list(consumos) if t)
+
+        # Assert
+        assert _usados(factory, usuario_id) == gastado <= LIMITE
+        with factory() as db:
+            abiertas = db.execute(
+                select(func.count()).where(ConsumoTokens.estado == RESERVADO)
+            ).scalar_one()
+            confirmados = db.execute(
+                select(func.sum(ConsumoTokens.tokens)).where(ConsumoTokens.estado == CONFIRMADO)
+            ).scalar_one()
+        assert abiertas == 0
+        assert confirmados == gastado
+
+    def test_reservation_is_closed_only_once(self, factory):
+        # Arrange
+        usuario_id = _crear_usuario(factory)
+        reserva_id = _con_libro(factory, lambda libro: libro.reservar(usuario_id, 100))
+
+        # Act
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            cierres = list(pool.map(
+                lambda _: _con_libro(factory, lambda libro: libro.confirmar(reserva_id, 40)),
+                range(8)
+            ))
+
+        # Assert
+        assert sum(1 for saldo in cierres if saldo is not None) == 1
+        assert _usados(factory, usuario_id) == 40
+
+
+@pytest.mark.integration
+class TestLiberarVencidas:
+    """Reservas abandonadas se devuelven en una sola transacción"""
+
+    def test_expired_reservations_are_released_per_user(self, factory):
+        # Arrange
+        ana = _crear_usuario(factory)
+        luis = _crear_usuario(factory, email="luis@tesla.pe")
+        with factory() as db:
+            libro = LibroTokens(db)
+            viejas = [libro.reservar(ana, 100), libro.reservar(ana, 50), libro.reservar(luis, 70)]
+            libro.reservar(luis, 30)  # reciente: no vence
+            db.execute(
+                update(ConsumoTokens)
+                .where(ConsumoTokens.id.in_(viejas))
+                .values(fecha=datetime.now() - timedelta(hours=1))
+            )
+            db.commit()
+
+        # Act
+        liberadas = _con_libro(factory, lambda libro: libro.liberar_vencidas(600))
+
+        # Assert
+        assert liberadas == 3
+        assert _usados(factory, ana) == 0
+        assert _usados(factory, luis) == 30
+        with factory() as db:
+            estados = db.execute(
+                select(ConsumoTokens.estado).where(ConsumoTokens.id.in_(viejas))
+            ).scalars().all()
+        assert estados == [LIBERADO] * 3
+
+    def test_nothing_to_release(self, factory):
+        # Arrange
+        usuario_id = _crear_usuario(factory)
+        _con_libro(factory, lambda libro: libro.reservar(usuario_id, 100))
+
+        # Act
+        liberadas = _con_libro(factory, lambda libro: libro.liberar_vencidas(600))
+
+        # Assert
+        assert liberadas == 0
+        assert _usados(factory, usuario_id) == 100
@@ -0,0 +1,86 @@
+"""
+Pruebas del límite de uploads (LimiteUploadMiddleware)
+Following testing-patterns: AAA pattern, unit test principles
+"""
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.services.upload_storage import LimiteUploadMiddleware, guardar_upload_streaming
+
+MAX_BYTES = 64 * 1024
+MARGEN = 1024
+LIMITE = MAX_BYTES + MARGEN
+BOUNDARY = "limite-upload"
+
+
+def _multipart(tamano):
+    """Partes de un multipart con un archivo de `tamano` bytes, en bloques de 8 KB"""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="archivo"; filename="plano.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    enviados = 0
+    while enviados < tamano:
+        bloque = min(8192, tamano - enviados)
+        enviados += bloque
+        yield b"x" * bloque
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def cliente(tmp_path):
+    app = FastAPI()
+    llamadas = []
+
+    @app.post("/upload")
+    async def upload(archivo: UploadFile = File(...)):
+        llamadas.append(archivo.filename)
+        escritos = await guardar_upload_streaming(archivo, tmp_path / "destino" / archivo.filename, MAX_BYTES)
+        return {"bytes": escritos}
+
+    app.add_middleware(LimiteUploadMiddleware, rutas=["/upload"], max_bytes=MAX_BYTES, margen=MARGEN)
+    with TestClient(app) as client:
+        client.llamadas = llamadas
+        client.destino = tmp_path / "destino"
+        yield client
+
+
+def _cabeceras():
+    return {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+@pytest.mark.unit
+class TestLimiteUploadMiddleware:
+    """413 sin leer el cuerpo completo, con o sin Content-Length"""
+
+    def test_chunked_upload_over_limit_gets_413(self, cliente):
+        # Act
+        respuesta = cliente.post("/upload", content=_multipart(LIMITE * 2), headers=_cabeceras())
+
+        # Assert
+        assert respuesta.status_code == 413
+        assert "demasiado grande" in respuesta.json()["detail"]
+        assert cliente.llamadas == []
+        assert not cliente.destino.exists()
+
+    def test_declared_content_length_over_limit_gets_413(self, cliente):
+        # Arrange
+        cuerpo = b"".join(_multipart(LIMITE * 2))
+
+        # Act
+        respuesta = cliente.post("/upload", content=cuerpo, headers=_cabeceras())
+
+        # Assert
+        assert respuesta.status_code == 413
+        assert cliente.llamadas == []
+
+    def test_chunked_upload_under_limit_reaches_endpoint(self, cliente):
+        # Act
+        respuesta = cliente.post("/upload", content=_multipart(20_000), headers=_cabeceras())
+
+        # Assert
+        assert respuesta.status_code == 200
+        assert respuesta.json() == {"bytes": 20_000}
+        assert [p.name for p in cliente.destino.iterdir()] == ["plano.pdf"]